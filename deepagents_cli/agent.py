@@ -573,6 +573,7 @@ def create_cli_agent(
         if settings.has_autoglm:
             import importlib
 
+            from deepagents_cli.middleware.autoglm import device_pool
             from deepagents_cli.middleware.autoglm_middleware import (
                 AutoGLMConfig,
                 AutoGLMMiddleware,
@@ -589,12 +590,40 @@ def create_cli_agent(
 
             autoglm_config = AutoGLMConfig(
                 vision_model=vision_model,
+                stream_responses=settings.autoglm_stream_responses,
                 platform=settings.autoglm_platform,
                 device_id=settings.autoglm_device_id,
+                touch_backend=settings.autoglm_touch_backend,
                 wda_url=settings.autoglm_wda_url,
                 ios_device_id=settings.autoglm_ios_device_id,
+                ios_mjpeg_url=settings.autoglm_ios_mjpeg_url,
+                device_pool=settings.autoglm_device_pool,
+                device_labels=device_pool.parse_device_labels(
+                    settings.autoglm_device_labels
+                ),
+                device_wda_urls=device_pool.parse_device_map(
+                    settings.autoglm_device_wda_urls
+                ),
                 lang=settings.autoglm_lang,
                 max_steps=settings.autoglm_max_steps,
+                trajectory_dir=settings.autoglm_trajectory_dir,
+                action_cache=settings.autoglm_action_cache,
+                action_cache_path=str(
+                    settings.get_agent_dir(assistant_id) / "autoglm_action_cache.json"
+                ),
+                action_cache_size=settings.autoglm_action_cache_size,
+                screenshot_max_edge=settings.autoglm_screenshot_max_edge,
+                screenshot_format=settings.autoglm_screenshot_format,
+                screenshot_quality=settings.autoglm_screenshot_quality,
+                app_registry=settings.autoglm_app_registry,
+                settle_strategy=settings.autoglm_settle_strategy,
+                prefetch_screenshot=settings.autoglm_prefetch_screenshot,
+                unchanged_screen_policy=settings.autoglm_unchanged_screen_policy,
+                history_keep_turns=settings.autoglm_history_keep_turns,
+                history_max_tokens=settings.autoglm_history_max_tokens,
+                max_batch_actions=settings.autoglm_max_batch_actions,
+                timing_log=settings.autoglm_timing_log,
+                timing_otel=settings.autoglm_timing_otel,
                 expose_low_level_tools=settings.autoglm_expose_low_level_tools,
                 verbose=settings.autoglm_verbose,
             )
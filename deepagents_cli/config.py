@@ -442,11 +442,32 @@ class Settings:
     autoglm_vision_model_url: str | None = None
     autoglm_vision_model_name: str | None = None
     autoglm_vision_api_key: str | None = None
+    autoglm_stream_responses: bool = True
     autoglm_device_id: str | None = None
+    autoglm_touch_backend: str = "input"
     autoglm_wda_url: str = "http://localhost:8100"
     autoglm_ios_device_id: str | None = None
+    autoglm_ios_mjpeg_url: str | None = None
+    autoglm_device_pool: bool = False
+    autoglm_device_labels: str | None = None
+    autoglm_device_wda_urls: str | None = None
     autoglm_lang: str = "zh"
     autoglm_max_steps: int = 100
+    autoglm_trajectory_dir: str | None = None
+    autoglm_action_cache: bool = False
+    autoglm_action_cache_size: int = 1000
+    autoglm_screenshot_max_edge: int | None = None
+    autoglm_screenshot_format: str = "png"
+    autoglm_screenshot_quality: int = 85
+    autoglm_app_registry: str | None = None
+    autoglm_settle_strategy: str = "fixed"
+    autoglm_prefetch_screenshot: bool = False
+    autoglm_unchanged_screen_policy: str = "off"
+    autoglm_history_keep_turns: int | None = 8
+    autoglm_history_max_tokens: int | None = 16000
+    autoglm_max_batch_actions: int = 1
+    autoglm_timing_log: str | None = None
+    autoglm_timing_otel: bool = False
     autoglm_expose_low_level_tools: bool = False
     autoglm_verbose: bool = False
 
@@ -491,11 +512,60 @@ class Settings:
             "AUTOGLM_VISION_MODEL_NAME", "autoglm-phone-9b"
         )
         autoglm_vision_api_key = os.environ.get("AUTOGLM_VISION_API_KEY", "EMPTY")
+        autoglm_stream_responses = (
+            os.environ.get("AUTOGLM_STREAM_RESPONSES", "true").lower() == "true"
+        )
         autoglm_device_id = os.environ.get("AUTOGLM_DEVICE_ID")
+        autoglm_touch_backend = os.environ.get("AUTOGLM_TOUCH_BACKEND", "input")
         autoglm_wda_url = os.environ.get("AUTOGLM_WDA_URL", "http://localhost:8100")
         autoglm_ios_device_id = os.environ.get("AUTOGLM_IOS_DEVICE_ID")
+        autoglm_ios_mjpeg_url = os.environ.get("AUTOGLM_IOS_MJPEG_URL") or None
+        autoglm_device_pool = (
+            os.environ.get("AUTOGLM_DEVICE_POOL", "false").lower() == "true"
+        )
+        autoglm_device_labels = os.environ.get("AUTOGLM_DEVICE_LABELS") or None
+        autoglm_device_wda_urls = os.environ.get("AUTOGLM_DEVICE_WDA_URLS") or None
         autoglm_lang = os.environ.get("AUTOGLM_LANG", "zh")
         autoglm_max_steps = int(os.environ.get("AUTOGLM_MAX_STEPS", "100"))
+        autoglm_trajectory_dir = os.environ.get("AUTOGLM_TRAJECTORY_DIR") or None
+        autoglm_action_cache = (
+            os.environ.get("AUTOGLM_ACTION_CACHE", "false").lower() == "true"
+        )
+        autoglm_action_cache_size = int(
+            os.environ.get("AUTOGLM_ACTION_CACHE_SIZE", "1000")
+        )
+        autoglm_screenshot_max_edge_str = os.environ.get("AUTOGLM_SCREENSHOT_MAX_EDGE")
+        autoglm_screenshot_max_edge = (
+            int(autoglm_screenshot_max_edge_str)
+            if autoglm_screenshot_max_edge_str
+            else None
+        )
+        autoglm_screenshot_format = os.environ.get("AUTOGLM_SCREENSHOT_FORMAT", "png")
+        autoglm_screenshot_quality = int(
+            os.environ.get("AUTOGLM_SCREENSHOT_QUALITY", "85")
+        )
+        autoglm_app_registry = os.environ.get("AUTOGLM_APP_REGISTRY")
+        autoglm_settle_strategy = os.environ.get("AUTOGLM_SETTLE_STRATEGY", "fixed")
+        autoglm_prefetch_screenshot = (
+            os.environ.get("AUTOGLM_PREFETCH_SCREENSHOT", "false").lower() == "true"
+        )
+        autoglm_unchanged_screen_policy = os.environ.get(
+            "AUTOGLM_UNCHANGED_SCREEN_POLICY", "off"
+        )
+        # 0 disables the limit
+        autoglm_history_keep_turns = (
+            int(os.environ.get("AUTOGLM_HISTORY_KEEP_TURNS", "8")) or None
+        )
+        autoglm_history_max_tokens = (
+            int(os.environ.get("AUTOGLM_HISTORY_MAX_TOKENS", "16000")) or None
+        )
+        autoglm_max_batch_actions = int(
+            os.environ.get("AUTOGLM_MAX_BATCH_ACTIONS", "1")
+        )
+        autoglm_timing_log = os.environ.get("AUTOGLM_TIMING_LOG") or None
+        autoglm_timing_otel = (
+            os.environ.get("AUTOGLM_TIMING_OTEL", "false").lower() == "true"
+        )
         autoglm_expose_low_level_tools = (
             os.environ.get("AUTOGLM_EXPOSE_LOW_LEVEL_TOOLS", "false").lower() == "true"
         )
@@ -516,11 +586,32 @@ class Settings:
             autoglm_vision_model_url=autoglm_vision_model_url,
             autoglm_vision_model_name=autoglm_vision_model_name,
             autoglm_vision_api_key=autoglm_vision_api_key,
+            autoglm_stream_responses=autoglm_stream_responses,
             autoglm_device_id=autoglm_device_id,
+            autoglm_touch_backend=autoglm_touch_backend,
             autoglm_wda_url=autoglm_wda_url,
             autoglm_ios_device_id=autoglm_ios_device_id,
+            autoglm_ios_mjpeg_url=autoglm_ios_mjpeg_url,
+            autoglm_device_pool=autoglm_device_pool,
+            autoglm_device_labels=autoglm_device_labels,
+            autoglm_device_wda_urls=autoglm_device_wda_urls,
             autoglm_lang=autoglm_lang,
             autoglm_max_steps=autoglm_max_steps,
+            autoglm_trajectory_dir=autoglm_trajectory_dir,
+            autoglm_action_cache=autoglm_action_cache,
+            autoglm_action_cache_size=autoglm_action_cache_size,
+            autoglm_screenshot_max_edge=autoglm_screenshot_max_edge,
+            autoglm_screenshot_format=autoglm_screenshot_format,
+            autoglm_screenshot_quality=autoglm_screenshot_quality,
+            autoglm_app_registry=autoglm_app_registry,
+            autoglm_settle_strategy=autoglm_settle_strategy,
+            autoglm_prefetch_screenshot=autoglm_prefetch_screenshot,
+            autoglm_unchanged_screen_policy=autoglm_unchanged_screen_policy,
+            autoglm_history_keep_turns=autoglm_history_keep_turns,
+            autoglm_history_max_tokens=autoglm_history_max_tokens,
+            autoglm_max_batch_actions=autoglm_max_batch_actions,
+            autoglm_timing_log=autoglm_timing_log,
+            autoglm_timing_otel=autoglm_timing_otel,
             autoglm_expose_low_level_tools=autoglm_expose_low_level_tools,
             autoglm_verbose=autoglm_verbose,
         )
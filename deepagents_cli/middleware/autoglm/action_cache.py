@@ -0,0 +1,413 @@
+"""Cache of model answers for repeated phone tasks.
+
+Many phone tasks are the same instruction run against the same app state. The
+cache remembers, for each (normalized task, foreground app, screen hash), the
+model response that led to a successful task, together with the hash of the
+screen that followed it. On a later run of the same task the step loop uses the
+cached response instead of calling the vision model, then checks that the next
+screen matches the recorded follow-up. If it does not, the task falls back to
+the model for its remaining steps and the entry is dropped.
+
+Entries are only learned from tasks that finished successfully, and finish
+actions are never cached (their message usually reports what was on screen).
+Screens are compared with the perceptual hash from screen_change, so small
+differences such as the clock do not prevent a hit.
+"""
+
+import json
+import logging
+import re
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Container
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from deepagents_cli.middleware.autoglm import screen_change
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1000
+
+# Maximum differing dHash bits (out of 256) for two screens to count as the same
+# app state
+DEFAULT_MAX_DISTANCE = 8
+
+_CACHE_VERSION = 1
+
+
+def normalize_task(task: str) -> str:
+    """Normalize task text so trivially different phrasings share entries.
+
+    Args:
+        task: Task description.
+
+    Returns:
+        The task in NFKC form, lower case, with collapsed whitespace and without
+        trailing punctuation.
+    """
+    text = unicodedata.normalize("NFKC", task).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?。")
+
+
+@dataclass
+class CachedAction:
+    """A model response that worked for a task in a given app state."""
+
+    task: str
+    app: str
+    frame_hash: int
+    response: str
+    next_hash: int | None = None
+    """Hash of the screen after the action, used to verify a replayed action."""
+
+    hits: int = 0
+
+    @property
+    def key(self) -> tuple[str, str, int]:
+        """Cache key of the entry."""
+        return (self.task, self.app, self.frame_hash)
+
+
+class ActionCache:
+    """LRU cache of model responses, optionally persisted to a JSON file.
+
+    The cache is thread-safe, so pooled tasks on several devices can share it.
+    """
+
+    def __init__(
+        self,
+        path: str | Path | None = None,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+    ) -> None:
+        """Initialize the cache, loading the file if it exists.
+
+        Args:
+            path: JSON file to persist entries to. None keeps them in memory.
+            max_entries: Entries kept before the least recently used are evicted.
+            max_distance: Maximum dHash distance for a screen to match an entry.
+        """
+        self.path = Path(path).expanduser() if path else None
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.hits = 0
+        self.misses = 0
+        self.divergences = 0
+        self._entries: OrderedDict[tuple[str, str, int], CachedAction] = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes whole saves (snapshot, write, replace) between threads
+        self._save_lock = threading.Lock()
+        if self.path is not None and self.path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        """Number of cached entries.
+
+        Returns:
+            The number of entries.
+        """
+        return len(self._entries)
+
+    def lookup(
+        self,
+        task: str,
+        app: str,
+        frame_hash: int,
+        *,
+        exclude: Container[tuple[str, str, int]] = (),
+    ) -> CachedAction | None:
+        """Find the entry for a task and screen, counting a hit or a miss.
+
+        Args:
+            task: Task description (normalized here).
+            app: Foreground app.
+            frame_hash: dHash of the current screen.
+            exclude: Entry keys (see CachedAction.key) to skip.
+
+        Returns:
+            The closest matching entry, or None.
+        """
+        task = normalize_task(task)
+        with self._lock:
+            best = None
+            best_distance = self.max_distance + 1
+            for key, entry in self._entries.items():
+                if key[:2] != (task, app) or key in exclude:
+                    continue
+                distance = screen_change.hamming_distance(entry.frame_hash, frame_hash)
+                if distance < best_distance:
+                    best, best_distance = entry, distance
+            if best is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            best.hits += 1
+            self._entries.move_to_end(best.key)
+            return best
+
+    def store(
+        self,
+        task: str,
+        app: str,
+        frame_hash: int,
+        response: str,
+        next_hash: int | None = None,
+    ) -> None:
+        """Add or refresh an entry, evicting the least recently used if full.
+
+        Args:
+            task: Task description (normalized here).
+            app: Foreground app.
+            frame_hash: dHash of the screen the response was given for.
+            response: Model response to propose next time.
+            next_hash: dHash of the screen after the action.
+        """
+        entry = CachedAction(normalize_task(task), app, frame_hash, response, next_hash)
+        key = entry.key
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                entry.hits = previous.hits
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, entry: CachedAction) -> None:
+        """Drop an entry whose action no longer leads to the recorded screen.
+
+        Args:
+            entry: Entry returned by lookup().
+        """
+        with self._lock:
+            self._entries.pop(entry.key, None)
+            self.divergences += 1
+
+    def follows(self, entry: CachedAction, frame_hash: int | None) -> bool:
+        """Check that a screen matches the one recorded after an entry's action.
+
+        Args:
+            entry: Entry whose action was executed.
+            frame_hash: dHash of the screen after the action (None if unknown).
+
+        Returns:
+            True if it matches, or if either hash is unknown.
+        """
+        if entry.next_hash is None or frame_hash is None:
+            return True
+        distance = screen_change.hamming_distance(entry.next_hash, frame_hash)
+        return distance <= self.max_distance
+
+    def stats(self) -> dict[str, int]:
+        """Hit/miss counters.
+
+        Returns:
+            Dictionary with entries, hits, misses and divergences.
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "divergences": self.divergences,
+        }
+
+    def load(self) -> None:
+        """Replace the entries with those in the cache file.
+
+        A missing or unreadable file leaves the cache empty.
+        """
+        entries: OrderedDict[tuple[str, str, int], CachedAction] = OrderedDict()
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == _CACHE_VERSION:
+                for item in data.get("entries", []):
+                    entry = CachedAction(
+                        task=item["task"],
+                        app=item["app"],
+                        frame_hash=int(item["frame_hash"], 16),
+                        response=item["response"],
+                        next_hash=(
+                            int(item["next_hash"], 16)
+                            if item.get("next_hash")
+                            else None
+                        ),
+                        hits=item.get("hits", 0),
+                    )
+                    entries[entry.key] = entry
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning("Ignoring unreadable action cache %s: %s", self.path, e)
+            entries.clear()
+        with self._lock:
+            self._entries = entries
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        """Write the entries to the cache file (no-op without a path).
+
+        The file is replaced atomically, least recently used entries first. An
+        OSError from writing the file is passed on to the caller.
+        """
+        if self.path is None:
+            return
+        with self._save_lock:
+            self._save(self.path)
+
+    def _save(self, path: Path) -> None:
+        with self._lock:
+            entries: list[dict[str, Any]] = [
+                {
+                    "task": entry.task,
+                    "app": entry.app,
+                    "frame_hash": format(entry.frame_hash, "x"),
+                    "response": entry.response,
+                    "next_hash": (
+                        format(entry.next_hash, "x")
+                        if entry.next_hash is not None
+                        else None
+                    ),
+                    "hits": entry.hits,
+                }
+                for entry in self._entries.values()
+            ]
+        data = {"version": _CACHE_VERSION, "saved": time.time(), "entries": entries}
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # A unique temp file per save, so other processes sharing the cache
+        # file cannot replace it under us
+        with tempfile.NamedTemporaryFile(
+            "w",
+            encoding="utf-8",
+            dir=path.parent,
+            prefix=f".{path.name}.",
+            suffix=".tmp",
+            delete=False,
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+            json.dump(data, tmp, ensure_ascii=False)
+        try:
+            tmp_path.replace(path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+
+class TaskCache:
+    """Per-task use of an ActionCache by the step loop.
+
+    Call observe() after every screen capture, propose() instead of calling the
+    model, learn() after every executed action and commit() when the task
+    finished successfully.
+    """
+
+    def __init__(self, cache: ActionCache, task: str) -> None:
+        """Initialize for one task.
+
+        Args:
+            cache: Shared cache.
+            task: Task description.
+        """
+        self.cache = cache
+        self.task = task
+        self.enabled = True
+        self.diverged = False
+        self._proposed: CachedAction | None = None
+        # Entries already proposed in this task. An action that leaves the screen
+        # as it was would otherwise be proposed again and again.
+        self._used: set[tuple[str, str, int]] = set()
+        self._learned: list[CachedAction] = []
+        self._awaiting_next: CachedAction | None = None
+
+    def observe(self, frame_hash: int | None) -> bool:
+        """Process the screen captured after the previous action.
+
+        Verifies a cached action executed in the previous step and records the
+        follow-up screen of a learned one.
+
+        Args:
+            frame_hash: dHash of the captured screen (None for sensitive screens).
+
+        Returns:
+            False if a cached action did not lead to the recorded screen. The
+            cache is then disabled for the rest of the task.
+        """
+        if self._awaiting_next is not None:
+            self._awaiting_next.next_hash = frame_hash
+            self._awaiting_next = None
+        proposed, self._proposed = self._proposed, None
+        if proposed is not None and not self.cache.follows(proposed, frame_hash):
+            self._diverge(proposed)
+            return False
+        return True
+
+    def propose(self, app: str, frame_hash: int | None) -> str | None:
+        """Look up a cached response for the current screen.
+
+        Each entry is proposed at most once per task.
+
+        Args:
+            app: Foreground app.
+            frame_hash: dHash of the current screen.
+
+        Returns:
+            The cached model response, or None to call the model.
+        """
+        if not self.enabled or frame_hash is None:
+            return None
+        entry = self.cache.lookup(self.task, app, frame_hash, exclude=self._used)
+        if entry is None:
+            return None
+        self._used.add(entry.key)
+        self._proposed = entry
+        return entry.response
+
+    def learn(
+        self, app: str, frame_hash: int | None, response: str, *, success: bool
+    ) -> bool:
+        """Remember the response of an executed (non-finish) action.
+
+        Args:
+            app: Foreground app when the response was given.
+            frame_hash: dHash of the screen the response was given for.
+            response: Model (or cached) response.
+            success: Whether the action succeeded.
+
+        Returns:
+            False if the action was a cached one and failed. The cache is then
+            disabled for the rest of the task.
+        """
+        if not success:
+            proposed, self._proposed = self._proposed, None
+            if proposed is not None:
+                self._diverge(proposed)
+                return False
+            return True
+        if frame_hash is not None:
+            entry = CachedAction(normalize_task(self.task), app, frame_hash, response)
+            self._learned.append(entry)
+            self._awaiting_next = entry
+        return True
+
+    def commit(self) -> None:
+        """Store what was learned once the task finished successfully."""
+        for entry in self._learned:
+            self.cache.store(
+                entry.task, entry.app, entry.frame_hash, entry.response, entry.next_hash
+            )
+        self._learned.clear()
+        try:
+            self.cache.save()
+        except OSError as e:
+            # The entries stay in memory; a failed write must not fail the task
+            logger.warning("Could not save the action cache: %s", e)
+
+    def _diverge(self, entry: CachedAction) -> None:
+        self.cache.invalidate(entry)
+        self.diverged = True
+        self.enabled = False
@@ -10,7 +10,8 @@ Original: https://github.com/zai-org/Open-AutoGLM
 Files: phone_agent/model/client.py, phone_agent/actions/handler.py
 """
 
-import ast
+import itertools
+import re
 from typing import Any
 
 
@@ -18,8 +19,8 @@ def parse_response(response: str) -> tuple[str, str]:
     """Parse model response into thinking and action parts.
 
     The model can output responses in multiple formats, handled by priority:
-    1. Modern format with finish(message=...) - task completion
-    2. Modern format with do(action=...) - execute action
+    1-2. Modern format with finish(message=...) or do(action=...), split at
+       whichever call comes first
     3. Legacy XML format with <think>...</think><answer>...</answer>
     4. Fallback: treat entire response as action
 
@@ -38,19 +39,14 @@ def parse_response(response: str) -> tuple[str, str]:
         >>> print(action)
         "do(action=\"Tap\", element=[500, 300])"
     """
-    # Rule 1: Check for finish(message=
-    if "finish(message=" in response:
-        parts = response.split("finish(message=", 1)
-        thinking = parts[0].strip()
-        action = "finish(message=" + parts[1]
-        return thinking, action
-
-    # Rule 2: Check for do(action=
-    if "do(action=" in response:
-        parts = response.split("do(action=", 1)
-        thinking = parts[0].strip()
-        action = "do(action=" + parts[1]
-        return thinking, action
+    # Rules 1 and 2: split at the first finish(message= or do(action= call.
+    # A batched answer may list do() calls before a finish()
+    finish_at = response.find("finish(message=")
+    do_at = response.find("do(action=")
+    if finish_at >= 0 and (do_at < 0 or finish_at < do_at):
+        return _strip_tags(response[:finish_at]), response[finish_at:]
+    if do_at >= 0:
+        return _strip_tags(response[:do_at]), response[do_at:]
 
     # Rule 3: Fallback to legacy XML tag parsing
     if "<answer>" in response:
@@ -63,6 +59,146 @@ def parse_response(response: str) -> tuple[str, str]:
     return "", response.strip()
 
 
+def _strip_tags(thinking: str) -> str:
+    for tag in ("<think>", "</think>", "<answer>"):
+        thinking = thinking.replace(tag, "")
+    return thinking.strip()
+
+
+_ACTION_MARKERS = ("finish(message=", "do(action=")
+
+# Actions whose free text is matched with the last quote (see parse_action), so
+# the closing parenthesis cannot be trusted while the response is still streaming
+_FREE_TEXT_PREFIXES = ("finish(", 'do(action="Type"', 'do(action="Type_Name"')
+
+
+class StreamingResponseParser:
+    r"""Finds the action in a response while the model is still streaming it.
+
+    Chunks are fed as they arrive. As soon as the response contains a complete
+    ``do(...)`` call, or a ``finish(...)``/``Type`` call closed by ``</answer>``,
+    the caller can stop the stream and act. ``response`` is then the text up to
+    the end of the action, which parse_response() splits like a full response.
+
+    Scanning is incremental: every character is looked at once.
+
+    When the model may batch several actions (max_actions > 1) the answer is
+    only complete at ``</answer>`` or at the end of the stream, since another
+    action may follow each call.
+
+    Examples:
+        >>> parser = StreamingResponseParser()
+        >>> parser.feed('Tap it\ndo(action="Tap", ')
+        False
+        >>> parser.feed("element=[500, 300])\n")
+        True
+        >>> parse_response(parser.response)
+        ('Tap it', 'do(action="Tap", element=[500, 300])')
+    """
+
+    def __init__(self, max_actions: int = 1) -> None:
+        """Initialize an empty parser.
+
+        Args:
+            max_actions: Maximum number of actions per answer (see parse_actions).
+        """
+        self._batch = max_actions > 1
+        self._text = ""
+        self._scanned = 0
+        self._start: int | None = None
+        self._end: int | None = None
+        self._depth = 0
+        self._quote: str | None = None
+        self._escaped = False
+        self._free_text: bool | None = None
+
+    @property
+    def complete(self) -> bool:
+        """Whether a complete action has been received."""
+        return self._end is not None
+
+    @property
+    def response(self) -> str:
+        """The response up to the end of the action, or all text received so far."""
+        if self._end is None:
+            return self._text
+        return self._text[: self._end]
+
+    def feed(self, chunk: str) -> bool:
+        """Add a chunk of the streamed response.
+
+        Args:
+            chunk: Next piece of response text.
+
+        Returns:
+            True once the response contains a complete action.
+        """
+        if self._end is not None:
+            return True
+        self._text += chunk
+
+        if self._start is None:
+            # Rescan the tail of the previous chunk, a marker may span chunks
+            longest = max(len(marker) for marker in _ACTION_MARKERS)
+            search_from = max(0, self._scanned - longest + 1)
+            found = [
+                index
+                for index in (
+                    self._text.find(marker, search_from) for marker in _ACTION_MARKERS
+                )
+                if index >= 0
+            ]
+            if not found:
+                self._scanned = len(self._text)
+                return False
+            self._start = min(found)
+            self._scanned = self._text.index("(", self._start)
+
+        if self._free_text is None:
+            action = self._text[self._start :]
+            if any(action.startswith(prefix) for prefix in _FREE_TEXT_PREFIXES):
+                self._free_text = True
+            elif action.startswith("do(action=") and len(action) > len(
+                'do(action="Type_Name"'
+            ):
+                self._free_text = False
+
+        if self._free_text or self._batch:
+            end = self._text.find("</answer>", self._start)
+            if end >= 0:
+                self._end = end
+        else:
+            self._scan_call()
+        return self._end is not None
+
+    def _scan_call(self) -> None:
+        """Advance through the call, tracking string literals and brackets."""
+        text = self._text
+        for index in range(self._scanned, len(text)):
+            char = text[index]
+            if self._quote is not None:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == self._quote:
+                    self._quote = None
+            elif char in "\"'":
+                self._quote = char
+            elif char in "([{":
+                self._depth += 1
+            elif char in ")]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    # A Type action could not be recognized before this point
+                    if self._free_text is None:
+                        self._free_text = False
+                    self._end = index + 1
+                    self._scanned = index + 1
+                    return
+        self._scanned = len(text)
+
+
 def parse_action(action_str: str) -> dict[str, Any]:
     """Parse action string into a structured dictionary.
 
@@ -70,7 +206,17 @@ def parse_action(action_str: str) -> dict[str, Any]:
     1. do(action="ActionName", param1=value1, param2=value2, ...)
     2. finish(message="Task completed")
 
-    The function uses AST parsing for safety instead of eval().
+    The call is read in a single pass by a small parser for this grammar (no
+    eval() or AST). It tolerates common model slips so that fewer steps are
+    spent asking the model to try again:
+
+    - text around the call, such as ``<answer>`` tags or a trailing explanation
+    - a missing closing parenthesis, trailing commas and full-width commas
+    - raw newlines and tabs inside strings, single or curly quotes
+    - unquoted words (``action=Tap``) and tuples for coordinates
+    - unescaped quotes inside ``text`` and ``message``, which extend to the
+      last quote that can end the argument
+    - a positional action name or message (``do("Back")``, ``finish("done")``)
 
     Args:
         action_str: Action command string from the model.
@@ -104,102 +250,216 @@ def parse_action(action_str: str) -> dict[str, Any]:
         - Open: Open URL or deep link (placeholder)
     """
     try:
-        action_str = action_str.strip()
-
-        # Special handling for Type actions (text may contain quotes and commas)
-        if action_str.startswith('do(action="Type"') or action_str.startswith(
-            'do(action="Type_Name"'
-        ):
-            # Strategy 1: Find the LAST ") to handle text with embedded quotes
-            # This matches the finish() action parsing strategy
-            if 'text="' in action_str:
-                start_idx = action_str.index('text="') + len('text="')
-                # Find the last ") in the string to get the complete text
-                if '")' in action_str[start_idx:]:
-                    end_idx = action_str.rindex('")')
-                    text = action_str[start_idx:end_idx]
-                    action = {"_metadata": "do", "action": "Type", "text": text}
-                    return action
-
-            # Strategy 2: Try to find text with single quotes
-            if "text='" in action_str:
-                start_idx = action_str.index("text='") + len("text='")
-                if "')" in action_str[start_idx:]:
-                    end_idx = action_str.rindex("')")
-                    text = action_str[start_idx:end_idx]
-                    action = {"_metadata": "do", "action": "Type", "text": text}
-                    return action
-
-            msg = "Type action missing text parameter"
-            raise ValueError(msg)
+        return _ActionScanner(action_str).parse()
+    except ValueError as e:
+        msg = f"Failed to parse action '{action_str.strip()}': {e}"
+        raise ValueError(msg) from e
 
-        # Handle do(...) actions using AST parsing
-        if action_str.startswith("do("):
-            try:
-                # Escape special characters (newlines, tabs, etc.) for valid Python syntax
-                # This handles cases where model output contains unescaped newlines
-                action_str = action_str.replace("\n", "\\n")
-                action_str = action_str.replace("\r", "\\r")
-                action_str = action_str.replace("\t", "\\t")
-
-                # Parse the function call as an expression
-                tree = ast.parse(action_str, mode="eval")
-                if not isinstance(tree.body, ast.Call):
-                    msg = "Expected a function call"
-                    raise ValueError(msg)
-
-                call = tree.body
-                # Extract keyword arguments safely
-                action: dict[str, Any] = {"_metadata": "do"}
-                for keyword in call.keywords:
-                    key = keyword.arg
-                    # Use literal_eval to safely evaluate the value
-                    value = ast.literal_eval(keyword.value)
-                    action[key] = value
-
-                return action
-            except (SyntaxError, ValueError) as e:
-                msg = f"Failed to parse do() action: {e}"
-                raise ValueError(msg) from e
-
-        # Handle finish(...) actions
-        if action_str.startswith("finish("):
-            # Strategy 1: Find ") at the end - handles messages with internal quotes
-            # Look for finish(message="...") where ... can contain any characters including "
-            # We find the LAST occurrence of ") to handle nested quotes
-            if 'message="' in action_str:
-                start_idx = action_str.index('message="') + len('message="')
-                # Find the last ") in the string
-                if '")' in action_str[start_idx:]:
-                    end_idx = action_str.rindex('")')
-                    message = action_str[start_idx:end_idx]
-                    return {"_metadata": "finish", "message": message}
-
-            # Strategy 2: Try single quotes
-            if "message='" in action_str:
-                start_idx = action_str.index("message='") + len("message='")
-                if "')" in action_str[start_idx:]:
-                    end_idx = action_str.rindex("')")
-                    message = action_str[start_idx:end_idx]
-                    return {"_metadata": "finish", "message": message}
-
-            # Strategy 3: Fallback - extract everything after message= and clean it up
-            if "message=" in action_str:
-                message_raw = action_str.split("message=", 1)[1].strip()
-                # Remove surrounding quotes and trailing )
-                message = message_raw.strip('"').strip("'").rstrip(")")
-                return {"_metadata": "finish", "message": message}
-
-            msg = "finish action missing message parameter"
-            raise ValueError(msg)
 
-        # Unknown action format
-        msg = f"Unknown action format: {action_str}"
+def parse_actions(action_str: str, max_actions: int = 1) -> list[dict[str, Any]]:
+    """Parse an answer that may hold several actions, one per line.
+
+    A model allowed to batch actions answers with an ordered list such as::
+
+        do(action="Tap", element=[500, 300])
+        do(action="Type", text="alice")
+        do(action="Tap", element=[500, 600])
+
+    Each call must start its own line (optionally after a list marker such as
+    ``1.`` or ``-``), so that quotes, brackets or calls inside the text of a
+    ``Type`` action do not split it. Calls after a ``finish`` and beyond max_actions are dropped; the
+    model sees the resulting screen in the next step.
+
+    Args:
+        action_str: Action part of the model response.
+        max_actions: Maximum number of actions to return.
+
+    Returns:
+        Parsed actions in order (see parse_action). With a single call, or with
+        max_actions=1, the list only holds parse_action(action_str).
+
+    Raises:
+        ValueError: If the first action cannot be parsed.
+    """
+    first = _CALL_START.search(action_str)
+    if max_actions <= 1 or first is None:
+        return [parse_action(action_str)]
+    starts = [m.start(1) for m in _CALL_LINE.finditer(action_str, first.end())]
+    if not starts:
+        return [parse_action(action_str)]
+
+    # Text before the first call (e.g. an <answer> tag) stays with it
+    bounds = [0, *starts, len(action_str)]
+    actions = []
+    for start, end in itertools.pairwise(bounds):
+        try:
+            action = parse_action(action_str[start:end])
+        except ValueError:
+            if not actions:
+                raise
+            break  # Run the valid prefix, the model will see the result
+        actions.append(action)
+        if is_finish_action(action) or len(actions) >= max_actions:
+            break
+    return actions
+
+
+# Start of a call anywhere in the action string
+_CALL_START = re.compile(r"\b(do|finish)\(")
+# Start of a call at the beginning of a line, for batched answers
+_CALL_LINE = re.compile(r"^[ \t]*(?:(?:\d+[.)]|[-*])[ \t]*)?((?:do|finish)\()", re.M)
+_IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_SPACE = re.compile(r"[\s,，]*")
+_SPACE_ONLY = re.compile(r"\s*")
+# Bare (unquoted) word values run up to the next separator
+_BARE_WORD = re.compile(r"[^,，)\]\n]+")
+
+# Arguments whose value is free text: a quote inside ends the value only if
+# nothing but the end of the call (or another argument) follows it
+_FREE_TEXT_ARGS = frozenset({"text", "message"})
+_FREE_TEXT_END = re.compile(r"\s*(?:\)|[,，]\s*[A-Za-z_]\w*\s*=|$)")
+
+_QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"', "'": "'"}
+_LITERALS = {"True": True, "False": False, "None": None}
+
+
+class _ActionScanner:
+    """Single-pass parser for ``do(...)`` / ``finish(...)`` calls."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.pos = 0
+
+    def parse(self) -> dict[str, Any]:
+        match = _CALL_START.search(self.text)
+        if match is None:
+            msg = f"Unknown action format: {self.text.strip()}"
+            raise ValueError(msg)
+        self.pos = match.end()
+        kind = match.group(1)
+        args, positional = self._arguments()
+
+        if kind == "finish":
+            message = args.get("message", positional[0] if positional else None)
+            if message is None:
+                msg = "finish action missing message parameter"
+                raise ValueError(msg)
+            return {"_metadata": "finish", "message": str(message)}
+
+        if "action" not in args and positional:
+            args["action"] = positional[0]
+        if args.get("action") in ("Type", "Type_Name"):
+            if "text" not in args:
+                msg = "Type action missing text parameter"
+                raise ValueError(msg)
+            return {"_metadata": "do", "action": "Type", "text": str(args["text"])}
+        return {"_metadata": "do", **args}
+
+    def _arguments(self) -> tuple[dict[str, Any], list[Any]]:
+        args: dict[str, Any] = {}
+        positional: list[Any] = []
+        text = self.text
+        while True:
+            self.pos = _SPACE.match(text, self.pos).end()
+            if self.pos >= len(text) or text[self.pos] == ")":
+                return args, positional
+            name = _IDENTIFIER.match(text, self.pos)
+            if name is not None:
+                after = _SPACE_ONLY.match(text, name.end()).end()
+                if after < len(text) and text[after] in "=:":
+                    self.pos = _SPACE_ONLY.match(text, after + 1).end()
+                    key = name.group()
+                    if key in _FREE_TEXT_ARGS:
+                        args[key] = self._free_text()
+                    else:
+                        args[key] = self._value()
+                    continue
+            positional.append(self._value())
+
+    def _value(self) -> Any:
+        text = self.text
+        if self.pos >= len(text):
+            msg = "Unexpected end of action"
+            raise ValueError(msg)
+        char = text[self.pos]
+        if char in _QUOTES:
+            return self._string(_QUOTES[char])
+        if char in "[(":
+            return self._list("]" if char == "[" else ")")
+        number = _NUMBER.match(text, self.pos)
+        if number is not None:
+            self.pos = number.end()
+            value = number.group()
+            return float(value) if "." in value else int(value)
+        word = _BARE_WORD.match(text, self.pos)
+        if word is None:
+            msg = f"Unexpected {char!r} at position {self.pos}"
+            raise ValueError(msg)
+        self.pos = word.end()
+        value = word.group().strip()
+        return _LITERALS.get(value, value)
+
+    def _string(self, quote: str) -> str:
+        text = self.text
+        parts = []
+        index = self.pos + 1
+        while index < len(text):
+            char = text[index]
+            if char == quote:
+                self.pos = index + 1
+                return "".join(parts)
+            if char == "\\" and index + 1 < len(text):
+                escaped = text[index + 1]
+                parts.append(_ESCAPES.get(escaped, char + escaped))
+                index += 2
+                continue
+            parts.append(char)
+            index += 1
+        msg = "Unterminated string"
         raise ValueError(msg)
 
-    except Exception as e:
-        msg = f"Failed to parse action '{action_str}': {e}"
-        raise ValueError(msg) from e
+    def _free_text(self) -> str:
+        """Read a free-text value, ending at the last quote that can end it.
+
+        The text is returned as written (no escape processing). An unquoted or
+        unterminated value runs to the end of the call.
+        """
+        text = self.text
+        quote = _QUOTES.get(text[self.pos : self.pos + 1])
+        start = self.pos + 1 if quote else self.pos
+        if quote:
+            end = len(text)
+            while True:
+                end = text.rfind(quote, start, end)
+                if end < 0:
+                    break
+                if _FREE_TEXT_END.match(text, end + 1):
+                    self.pos = end + 1
+                    return text[start:end]
+
+        self.pos = len(text)
+        value = text[start:].rstrip()
+        if value.endswith(")"):
+            value = value[:-1].rstrip()
+        if quote:
+            value = value.removesuffix(quote)
+        return value.strip("'\"") if not quote else value
+
+    def _list(self, closing: str) -> list[Any]:
+        text = self.text
+        self.pos += 1
+        items = []
+        while True:
+            self.pos = _SPACE.match(text, self.pos).end()
+            if self.pos >= len(text):
+                msg = "Unterminated list"
+                raise ValueError(msg)
+            if text[self.pos] == closing:
+                self.pos += 1
+                return items
+            items.append(self._value())
 
 
 def is_finish_action(action: dict[str, Any]) -> bool:
@@ -0,0 +1,624 @@
+"""Client for the ADB server protocol, without spawning the ``adb`` binary.
+
+Every ``adb`` command line is a thin client: it connects to the ADB server on
+port 5037, sends a request and relays the reply. Spawning that process costs
+tens of milliseconds per call, more than a tap takes on the device. This module
+speaks the server's "smart socket" protocol directly:
+
+- Requests are a 4-digit hex length followed by the service name. The server
+  answers ``OKAY``, or ``FAIL`` followed by a hex-length-prefixed message.
+- ``host:*`` services (``host:version``, ``host:devices-l``, ``host:connect``)
+  are answered by the server itself.
+- ``host:transport:<serial>`` switches the connection to a device, after which
+  ``shell:``, ``exec:`` and ``sync:`` services run on the device.
+
+The server closes the socket once a ``shell:`` or ``exec:`` command finishes, so
+each command opens a new local connection (a fraction of a millisecond). The
+``sync:`` file transfer service handles any number of requests on a connection,
+so AdbClient keeps one open per device.
+
+AdbError means the request was not accepted (no server, unknown device,
+unsupported service) and the command did not run, so callers can safely fall
+back to the ``adb`` binary, which also starts the server if needed. Once the
+server has accepted a request the command may have run, so errors are not
+reported as AdbError: a timeout raises ``subprocess.TimeoutExpired`` and a lost
+connection raises the underlying OSError.
+
+Typical usage goes through the process-wide client:
+
+    >>> get_client().shell("emulator-5554", ["input", "tap", "500", "300"])
+"""
+
+import asyncio
+import atexit
+import contextlib
+import os
+import shlex
+import socket
+import struct
+import subprocess  # noqa: S404
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5037
+DEFAULT_TIMEOUT = 10.0
+CONNECT_TIMEOUT = 2.0
+
+# Largest DATA packet accepted by the sync service
+SYNC_MAX_DATA = 64 * 1024
+
+# Marker appended to shell output with the command's exit status: the legacy
+# ``shell:`` service only streams output and closes the socket
+_EXIT_MARKER = "__ADB_EXIT_"
+
+
+class AdbError(RuntimeError):
+    """Raised when the ADB server is unreachable or rejects a request."""
+
+
+def server_address() -> tuple[str, int]:
+    """Get the ADB server address, honoring the variables the adb binary reads.
+
+    Returns:
+        Host and port from ADB_SERVER_SOCKET (``tcp:host:port``), or from
+        ANDROID_ADB_SERVER_ADDRESS and ANDROID_ADB_SERVER_PORT, or the default.
+    """
+    spec = os.environ.get("ADB_SERVER_SOCKET", "")
+    if spec.startswith("tcp:"):
+        host, _, port = spec[4:].rpartition(":")
+        with contextlib.suppress(ValueError):
+            return host or DEFAULT_HOST, int(port)
+    host = os.environ.get("ANDROID_ADB_SERVER_ADDRESS") or DEFAULT_HOST
+    try:
+        port = int(os.environ.get("ANDROID_ADB_SERVER_PORT", DEFAULT_PORT))
+    except ValueError:
+        port = DEFAULT_PORT
+    return host, port
+
+
+def encode_request(service: str) -> bytes:
+    """Frame a service request.
+
+    Args:
+        service: Service name, e.g. ``host:version``.
+
+    Returns:
+        The request as sent to the server.
+    """
+    payload = service.encode("utf-8")
+    return b"%04x" % len(payload) + payload
+
+
+def transport_service(device_id: str | None) -> str:
+    """Get the service that switches a connection to a device.
+
+    Args:
+        device_id: Device serial. None uses ANDROID_SERIAL, like the adb binary,
+            or the only connected device.
+
+    Returns:
+        The ``host:transport`` service name.
+    """
+    serial = device_id or os.environ.get("ANDROID_SERIAL")
+    return f"host:transport:{serial}" if serial else "host:transport-any"
+
+
+def shell_command(args: list[str] | str) -> tuple[str, str]:
+    """Build a ``shell:`` command that reports its exit status.
+
+    Args:
+        args: Argument list (quoted for the device shell) or a raw shell string.
+
+    Returns:
+        Tuple of (command line, exit status marker).
+    """
+    command = args if isinstance(args, str) else shlex.join(args)
+    marker = f"{_EXIT_MARKER}{uuid.uuid4().hex}__"
+    # Grouped so that stdin is redirected for the whole pipeline or list, not
+    # just for its last command
+    return f"{{ {command}\n}} </dev/null; echo {marker}$?", marker
+
+
+def shell_result(
+    command: str, output: bytes, marker: str
+) -> subprocess.CompletedProcess[str]:
+    """Split the exit status marker off ``shell:`` output.
+
+    Args:
+        command: Command line, for the result's args.
+        output: Everything the service sent.
+        marker: Marker returned by shell_command.
+
+    Returns:
+        CompletedProcess with the output (stderr is merged into stdout) and the
+        exit status, or 255 if the command exited the shell before the marker.
+    """
+    text = output.decode("utf-8", errors="replace")
+    index = text.rfind(marker)
+    if index < 0:
+        return subprocess.CompletedProcess(command, 255, text, "")
+    try:
+        returncode = int(text[index + len(marker) :].strip() or "0")
+    except ValueError:
+        returncode = 1
+    return subprocess.CompletedProcess(command, returncode, text[:index], "")
+
+
+class _Connection:
+    """A blocking socket to the ADB server."""
+
+    def __init__(self, address: tuple[str, int], timeout: float | None) -> None:
+        try:
+            self.sock = socket.create_connection(address, timeout=CONNECT_TIMEOUT)
+        except OSError as e:
+            msg = f"ADB server at {address[0]}:{address[1]} is unreachable: {e}"
+            raise AdbError(msg) from e
+        self.sock.settimeout(timeout)
+
+    def request(self, service: str) -> None:
+        """Send a request and wait for the server to accept it.
+
+        Raises:
+            AdbError: If the server rejects the request, does not answer in time
+                or the connection fails.
+        """
+        try:
+            self.sock.sendall(encode_request(service))
+            status = self.read_exact(4)
+            if status == b"FAIL":
+                msg = f"{service}: {self.read_string()}"
+                raise AdbError(msg)
+        except OSError as e:
+            msg = f"{service}: {e}"
+            raise AdbError(msg) from e
+        if status != b"OKAY":
+            msg = f"{service}: unexpected reply {status!r}"
+            raise AdbError(msg)
+
+    def read_exact(self, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = self.sock.recv_into(view[received:])
+            if count == 0:
+                msg = "ADB server closed the connection"
+                raise ConnectionError(msg)
+            received += count
+        return bytes(buffer)
+
+    def read_string(self) -> str:
+        length = int(self.read_exact(4), 16)
+        return self.read_exact(length).decode("utf-8", errors="replace")
+
+    def read_all(self) -> bytes:
+        chunks = []
+        while chunk := self.sock.recv(SYNC_MAX_DATA):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError):
+            self.sock.close()
+
+
+class AdbClient:
+    """Blocking ADB server client.
+
+    Thread-safe: every command uses its own connection, and the per-device sync
+    connections are used under a lock.
+    """
+
+    def __init__(self, host: str | None = None, port: int | None = None) -> None:
+        """Initialize the client. Nothing is connected until the first request.
+
+        Args:
+            host: Server host (see server_address for the default).
+            port: Server port (see server_address for the default).
+        """
+        default_host, default_port = server_address()
+        self.address = (host or default_host, port or default_port)
+        self._sync: dict[str | None, _Connection] = {}
+        self._sync_lock = threading.Lock()
+
+    def version(self) -> int:
+        """Get the server's protocol version.
+
+        Returns:
+            The version number reported by ``host:version``.
+
+        Raises:
+            AdbError: If the server is unreachable.
+        """
+        return int(self._query("host:version"), 16)
+
+    def devices(self) -> str:
+        """List connected devices.
+
+        Returns:
+            One line per device in the ``adb devices -l`` format, without the
+            "List of devices attached" header.
+
+        Raises:
+            AdbError: If the server is unreachable.
+        """
+        return self._query("host:devices-l")
+
+    def connect(self, address: str, timeout: float = DEFAULT_TIMEOUT) -> str:
+        """Connect the server to a device over TCP/IP.
+
+        Args:
+            address: Device address (host:port).
+            timeout: Timeout in seconds.
+
+        Returns:
+            The server's message, as printed by ``adb connect``.
+
+        Raises:
+            AdbError: If the server is unreachable or did not answer in time.
+            subprocess.TimeoutExpired: If the connection attempt did not finish
+                in time.
+        """
+        return self._query(f"host:connect:{address}", timeout)
+
+    def disconnect(self, address: str | None = None) -> str:
+        """Disconnect a TCP/IP device, or all of them.
+
+        Args:
+            address: Device address. None disconnects all.
+
+        Returns:
+            The server's message, as printed by ``adb disconnect``.
+
+        Raises:
+            AdbError: If the server is unreachable.
+        """
+        return self._query(f"host:disconnect:{address or ''}")
+
+    def shell(
+        self,
+        device_id: str | None,
+        args: list[str] | str,
+        timeout: float | None = DEFAULT_TIMEOUT,
+    ) -> subprocess.CompletedProcess[str]:
+        """Run a command in the device shell.
+
+        Args:
+            device_id: Optional device ID.
+            args: Argument list (quoted for the device shell) or a raw shell
+                string (allows pipes and redirections on the device side).
+            timeout: Timeout in seconds (None waits indefinitely).
+
+        Returns:
+            CompletedProcess with the exit status and output (stderr is merged
+            into stdout).
+
+        Raises:
+            AdbError: If the command could not be started.
+            subprocess.TimeoutExpired: If the command did not finish in time.
+            OSError: If the connection was lost while the command ran.
+        """
+        command, marker = shell_command(args)
+        output = self._stream(device_id, f"shell:{command}", timeout)
+        return shell_result(command, output, marker)
+
+    def exec_out(
+        self,
+        device_id: str | None,
+        args: list[str],
+        timeout: float | None = DEFAULT_TIMEOUT,
+    ) -> bytes:
+        """Run a command and return its binary stdout (``adb exec-out``).
+
+        Args:
+            device_id: Optional device ID.
+            args: Command and arguments.
+            timeout: Timeout in seconds (None waits indefinitely).
+
+        Returns:
+            The command's stdout.
+
+        Raises:
+            AdbError: If the command could not be started.
+            subprocess.TimeoutExpired: If the command did not finish in time.
+            OSError: If the connection was lost while the command ran.
+        """
+        return self._stream(device_id, f"exec:{shlex.join(args)}", timeout)
+
+    def open_stream(
+        self,
+        device_id: str | None,
+        service: str,
+        timeout: float | None = DEFAULT_TIMEOUT,
+    ) -> socket.socket:
+        """Open a two-way stream to a device service.
+
+        Used for long-lived services such as ``localabstract:<name>`` (a UNIX
+        socket on the device) or a ``shell:`` command that should run for as long
+        as the stream stays open.
+
+        Args:
+            device_id: Optional device ID.
+            service: Device service name.
+            timeout: Timeout in seconds for each socket operation (None blocks).
+
+        Returns:
+            The connected socket. The caller closes it.
+
+        Raises:
+            AdbError: If the service could not be opened in time.
+        """
+        return self._open(device_id, service, timeout).sock
+
+    def push(
+        self, device_id: str | None, data: bytes, remote_path: str, mode: int = 0o644
+    ) -> None:
+        """Write a file on the device.
+
+        Args:
+            device_id: Optional device ID.
+            data: File content.
+            remote_path: Path on the device.
+            mode: Permission bits of the file.
+
+        Raises:
+            AdbError: If the transfer was refused.
+        """
+
+        def send(conn: _Connection) -> None:
+            conn.sock.sendall(_sync_packet(b"SEND", f"{remote_path},{mode}".encode()))
+            for start in range(0, len(data), SYNC_MAX_DATA):
+                conn.sock.sendall(
+                    _sync_packet(b"DATA", data[start : start + SYNC_MAX_DATA])
+                )
+            conn.sock.sendall(b"DONE" + struct.pack("<I", int(time.time())))
+            status, length = struct.unpack("<4sI", conn.read_exact(8))
+            if status == b"FAIL":
+                msg = f"push {remote_path}: {conn.read_exact(length).decode()}"
+                raise AdbError(msg)
+
+        self._sync_request(device_id, send)
+
+    def pull(self, device_id: str | None, remote_path: str) -> bytes:
+        """Read a file from the device.
+
+        Args:
+            device_id: Optional device ID.
+            remote_path: Path on the device.
+
+        Returns:
+            File content.
+
+        Raises:
+            AdbError: If the transfer was refused.
+        """
+
+        def receive(conn: _Connection) -> bytes:
+            conn.sock.sendall(_sync_packet(b"RECV", remote_path.encode()))
+            chunks = []
+            while True:
+                status, length = struct.unpack("<4sI", conn.read_exact(8))
+                if status == b"DONE":
+                    return b"".join(chunks)
+                data = conn.read_exact(length)
+                if status == b"FAIL":
+                    msg = f"pull {remote_path}: {data.decode()}"
+                    raise AdbError(msg)
+                chunks.append(data)
+
+        return self._sync_request(device_id, receive)
+
+    def close(self) -> None:
+        """Close the sync connections."""
+        with self._sync_lock:
+            connections = list(self._sync.values())
+            self._sync.clear()
+        for conn in connections:
+            conn.close()
+
+    def _open(
+        self, device_id: str | None, service: str, timeout: float | None
+    ) -> _Connection:
+        """Open a connection to a device service.
+
+        Returns:
+            The connection, ready to stream the service's output.
+        """
+        conn = _Connection(self.address, timeout)
+        try:
+            conn.request(transport_service(device_id))
+            conn.request(service)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    def _query(self, service: str, timeout: float | None = DEFAULT_TIMEOUT) -> str:
+        conn = _Connection(self.address, timeout)
+        try:
+            conn.request(service)
+            try:
+                return conn.read_string()
+            except TimeoutError:
+                raise subprocess.TimeoutExpired(service, timeout or 0) from None
+        finally:
+            conn.close()
+
+    def _stream(
+        self, device_id: str | None, service: str, timeout: float | None
+    ) -> bytes:
+        conn = self._open(device_id, service, timeout)
+        try:
+            return conn.read_all()
+        except TimeoutError:
+            # The command is running on the device: report it like the binary
+            raise subprocess.TimeoutExpired(service, timeout or 0) from None
+        finally:
+            conn.close()
+
+    def _sync_request(
+        self, device_id: str | None, operation: Callable[[_Connection], T]
+    ) -> T:
+        """Run a sync operation on the device's kept-open sync connection.
+
+        A kept connection the server has dropped is replaced once.
+        """
+        with self._sync_lock:
+            conn = self._sync.pop(device_id, None)
+            if conn is not None:
+                try:
+                    result = operation(conn)
+                except OSError:
+                    conn.close()  # Dropped while idle: retry on a new connection
+                except BaseException:
+                    conn.close()
+                    raise
+                else:
+                    self._sync[device_id] = conn
+                    return result
+
+            conn = self._open(device_id, "sync:", DEFAULT_TIMEOUT)
+            try:
+                result = operation(conn)
+            except OSError as e:
+                conn.close()
+                # Unlike commands, file transfers can safely be repeated
+                msg = f"sync: {e}"
+                raise AdbError(msg) from e
+            except BaseException:
+                conn.close()
+                raise
+            self._sync[device_id] = conn
+            return result
+
+
+def _sync_packet(request: bytes, data: bytes) -> bytes:
+    return request + struct.pack("<I", len(data)) + data
+
+
+class AsyncAdbClient:
+    """Asyncio ADB server client for the commands used by the step loop.
+
+    Cancelling a call closes its connection, which stops the device command.
+    """
+
+    def __init__(self, host: str | None = None, port: int | None = None) -> None:
+        """Initialize the client.
+
+        Args:
+            host: Server host (see server_address for the default).
+            port: Server port (see server_address for the default).
+        """
+        default_host, default_port = server_address()
+        self.address = (host or default_host, port or default_port)
+
+    async def shell(
+        self,
+        device_id: str | None,
+        args: list[str] | str,
+        timeout: float = DEFAULT_TIMEOUT,
+    ) -> subprocess.CompletedProcess[str]:
+        """Run a command in the device shell (see AdbClient.shell).
+
+        Returns:
+            CompletedProcess with the exit status and output.
+
+        Raises:
+            AdbError: If the command could not be started.
+            TimeoutError: If the command did not finish in time.
+            OSError: If the connection was lost while the command ran.
+        """
+        command, marker = shell_command(args)
+        output = await self._stream(device_id, f"shell:{command}", timeout)
+        return shell_result(command, output, marker)
+
+    async def exec_out(
+        self, device_id: str | None, args: list[str], timeout: float = DEFAULT_TIMEOUT
+    ) -> bytes:
+        """Run a command and return its binary stdout (see AdbClient.exec_out).
+
+        Returns:
+            The command's stdout.
+
+        Raises:
+            AdbError: If the command could not be started.
+            TimeoutError: If the command did not finish in time.
+            OSError: If the connection was lost while the command ran.
+        """
+        return await self._stream(device_id, f"exec:{shlex.join(args)}", timeout)
+
+    async def _stream(
+        self, device_id: str | None, service: str, timeout: float
+    ) -> bytes:
+        accepted = False
+        try:
+            async with asyncio.timeout(timeout):
+                try:
+                    reader, writer = await asyncio.open_connection(*self.address)
+                except OSError as e:
+                    host, port = self.address
+                    msg = f"ADB server at {host}:{port} is unreachable: {e}"
+                    raise AdbError(msg) from e
+                try:
+                    await _request(reader, writer, transport_service(device_id))
+                    await _request(reader, writer, service)
+                    accepted = True
+                    return await reader.read()
+                finally:
+                    writer.close()
+                    with contextlib.suppress(OSError):
+                        await writer.wait_closed()
+        except TimeoutError as e:
+            if accepted:
+                raise
+            msg = f"{service}: ADB server did not answer in time"
+            raise AdbError(msg) from e
+
+
+async def _request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter, service: str
+) -> None:
+    """Send a request and wait for the server to accept it.
+
+    Raises:
+        AdbError: If the server rejects the request or the connection fails.
+    """
+    try:
+        writer.write(encode_request(service))
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b"FAIL":
+            length = int(await reader.readexactly(4), 16)
+            message = (await reader.readexactly(length)).decode(errors="replace")
+            msg = f"{service}: {message}"
+            raise AdbError(msg)
+    except (OSError, asyncio.IncompleteReadError) as e:
+        msg = f"{service}: {e}"
+        raise AdbError(msg) from e
+    if status != b"OKAY":
+        msg = f"{service}: unexpected reply {status!r}"
+        raise AdbError(msg)
+
+
+_default_client: AdbClient | None = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> AdbClient:
+    """Get the process-wide ADB server client.
+
+    Returns:
+        The shared AdbClient. Its connections are closed automatically at exit.
+    """
+    global _default_client  # noqa: PLW0603
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = AdbClient()
+            atexit.register(_default_client.close)
+        return _default_client
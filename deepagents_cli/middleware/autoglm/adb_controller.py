@@ -13,21 +13,32 @@ This module provides comprehensive ADB control capabilities including:
 - Text input via ADB Keyboard
 - System key events (back, home)
 - App launching and management
+
+Shell commands run through a persistent ``adb shell`` session when one is passed
+via the ``shell`` argument (see adb_shell.py), avoiding a process spawn per call.
+Without a session every command falls back to a one-shot ``adb shell`` process.
+
+Touch gestures go through a TouchInjector when one is passed via the ``touch``
+argument (see touch.py), falling back to ``input`` if it is unavailable.
 """
 
 import base64
-import os
-import pathlib
+import re
+import shlex
+import struct
 import subprocess
-import tempfile
 import time
-import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from io import BytesIO
 
+import numpy as np
 from PIL import Image
 
+from deepagents_cli.middleware.autoglm import adb_client
+from deepagents_cli.middleware.autoglm.adb_shell import AdbShellError, AdbShellSession
+from deepagents_cli.middleware.autoglm.touch import TouchError, TouchInjector
+
 # Constants and defaults
 DEFAULT_TAP_DELAY = 0.5
 DEFAULT_SWIPE_DELAY = 0.5
@@ -36,6 +47,55 @@ DEFAULT_HOME_DELAY = 0.5
 DEFAULT_LAUNCH_DELAY = 2.0
 DEFAULT_LONG_PRESS_DURATION = 3000
 DEFAULT_DOUBLE_TAP_INTERVAL = 0.2
+_IME_POLL_INTERVAL = 0.05
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+ADB_KEYBOARD_IME = "com.android.adbkeyboard/.AdbIME"
+
+# Whether ADB Keyboard is installed and enabled, per device ID (None for the
+# default device). Installing an IME is rare enough that one check per device
+# and process is sufficient; pass refresh=True to check_adb_keyboard to recheck.
+_adb_keyboard_available: dict[str | None, bool] = {}
+
+# `screencap` raw framebuffer pixel formats (android.graphics.PixelFormat) mapped
+# to (bytes per pixel, PIL raw decoder mode)
+_RAW_PIXEL_FORMATS: dict[int, tuple[int, str]] = {
+    1: (4, "RGBA"),  # RGBA_8888
+    2: (4, "RGBX"),  # RGBX_8888
+    3: (3, "RGB"),  # RGB_888
+    4: (2, "BGR;16"),  # RGB_565
+    5: (4, "BGRA"),  # BGRA_8888
+}
+
+# Focused window lines in `dumpsys window` and the package/activity component in them
+_FOCUS_PATTERN = "mCurrentFocus|mFocusedApp"
+_COMPONENT_RE = re.compile(r"([\w.]+)/[\w.$]+")
+
+# Text input through ADB Keyboard. `am broadcast` waits for the keyboard's
+# receiver, which commits the text before returning, so no fixed delay is needed
+# between broadcasts. The receiver does not set a result code, and a broadcast
+# nobody receives completes just the same, so a broadcast only counts as
+# delivered if ADB Keyboard was the active input method when it was sent.
+_BROADCAST_ACK = "Broadcast completed"
+_IME_INACTIVE = "ADB Keyboard is not the active input method"
+# Largest base64 payload sent in a single broadcast: below the device shell's
+# per-argument limit (128 KB) and well below the Binder buffer (1 MB)
+BULK_INPUT_MAX_BYTES = 64 * 1024
+# Longest payload passed on a one-shot `adb shell` command line (older adbd
+# versions cap a shell request at 4 KB); larger ones are pushed as a file
+_INLINE_INPUT_MAX_BYTES = 3000
+_DEVICE_INPUT_FILE = "/data/local/tmp/autoglm_input.b64"
+# Chunked fallback: characters per broadcast and attempts per chunk
+_INPUT_CHUNK_SIZE = 300
+_INPUT_CHUNK_RETRIES = 3
+_INPUT_RETRY_DELAY = 0.5
+_INPUT_TIMEOUT = 10.0
+
+# Black-screen detection: long edge of the brightness sample, fraction of the
+# height taken by each system bar, and (rows, columns) of the page region grid
+_LUMA_SAMPLE_EDGE = 128
+_SYSTEM_BAR_FRACTION = 0.06
+_REGION_GRID = (8, 4)
 
 
 class ConnectionType(Enum):
@@ -64,6 +124,10 @@ class Screenshot:
     width: int
     height: int
     is_sensitive: bool = False
+    image: Image.Image | None = field(default=None, repr=False, compare=False)
+    """Decoded image, when available, so consumers don't decode base64_data again."""
+    format: str = "png"
+    """Encoding of base64_data: "png", or "jpeg" for MJPEG stream frames."""
 
 
 # Device Connection Management
@@ -72,9 +136,17 @@ class Screenshot:
 def check_adb_available() -> bool:
     """Check if ADB tool is available on the system.
 
+    A reachable ADB server counts as available, even without the adb binary.
+
     Returns:
         True if adb command is available, False otherwise.
     """
+    try:
+        adb_client.get_client().version()
+        return True
+    except adb_client.AdbError:
+        pass
+
     try:
         result = subprocess.run(
             ["adb", "version"],
@@ -95,16 +167,20 @@ def list_devices() -> list[DeviceInfo]:
         List of DeviceInfo objects for each connected device.
     """
     try:
-        result = subprocess.run(
-            ["adb", "devices", "-l"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=5,
-        )
+        try:
+            lines = adb_client.get_client().devices().splitlines()
+        except adb_client.AdbError:
+            result = subprocess.run(
+                ["adb", "devices", "-l"],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                timeout=5,
+            )
+            lines = result.stdout.strip().split("\n")[1:]  # Skip header
 
         devices = []
-        for line in result.stdout.strip().split("\n")[1:]:  # Skip header
+        for line in lines:
             if not line.strip():
                 continue
 
@@ -158,15 +234,17 @@ def connect_device(address: str, timeout: int = 10) -> tuple[bool, str]:
         address = f"{address}:5555"
 
     try:
-        result = subprocess.run(
-            ["adb", "connect", address],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=timeout,
-        )
-
-        output = result.stdout + result.stderr
+        try:
+            output = adb_client.get_client().connect(address, timeout=timeout)
+        except adb_client.AdbError:
+            result = subprocess.run(
+                ["adb", "connect", address],
+                capture_output=True,
+                text=True,
+                encoding="utf-8",
+                timeout=timeout,
+            )
+            output = result.stdout + result.stderr
 
         if "connected" in output.lower():
             return True, f"Connected to {address}"
@@ -190,129 +268,340 @@ def disconnect_device(address: str | None = None) -> tuple[bool, str]:
         Tuple of (success, message).
     """
     try:
-        cmd = ["adb", "disconnect"]
+        try:
+            output = adb_client.get_client().disconnect(address)
+        except adb_client.AdbError:
+            cmd = ["adb", "disconnect"]
+            if address:
+                cmd.append(address)
+
+            result = subprocess.run(
+                cmd, capture_output=True, text=True, encoding="utf-8", timeout=5
+            )
+            output = result.stdout + result.stderr
         if address:
-            cmd.append(address)
-
-        result = subprocess.run(
-            cmd, capture_output=True, text=True, encoding="utf-8", timeout=5
-        )
-        output = result.stdout + result.stderr
+            _adb_keyboard_available.pop(address, None)
+        else:
+            _adb_keyboard_available.clear()
         return True, output.strip() or "Disconnected"
 
     except Exception as e:
         return False, f"Disconnect error: {e}"
 
 
-def check_adb_keyboard(device_id: str | None = None) -> bool:
+def check_adb_keyboard(
+    device_id: str | None = None,
+    shell: AdbShellSession | None = None,
+    *,
+    refresh: bool = False,
+) -> bool:
     """Check if ADB Keyboard is installed and enabled on the device.
 
+    The answer is cached per device, so only the first call runs `pm list` and
+    `ime list` on the device.
+
     Args:
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
+        refresh: Ignore the cached answer and check the device again.
 
     Returns:
         True if ADB Keyboard is available, False otherwise.
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    if not refresh and device_id in _adb_keyboard_available:
+        return _adb_keyboard_available[device_id]
 
     try:
         # Check if ADB Keyboard package is installed
-        result = subprocess.run(
-            adb_prefix + ["shell", "pm", "list", "packages"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=5,
-        )
+        result = _run_shell(["pm", "list", "packages"], device_id, shell, timeout=5)
 
         if "com.android.adbkeyboard" not in result.stdout:
-            return False
+            available = False
+        else:
+            # Check if ADB Keyboard is enabled
+            result = _run_shell(["ime", "list", "-s"], device_id, shell, timeout=5)
+            available = ADB_KEYBOARD_IME in result.stdout
 
-        # Check if ADB Keyboard is enabled
-        result = subprocess.run(
-            adb_prefix + ["shell", "ime", "list", "-s"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=5,
-        )
+    except Exception:
+        # Unreachable device: don't cache, the next call checks again
+        return False
+
+    _adb_keyboard_available[device_id] = available
+    return available
 
-        return "com.android.adbkeyboard/.AdbIME" in result.stdout
 
+def list_packages(
+    device_id: str | None = None, shell: AdbShellSession | None = None
+) -> set[str] | None:
+    """List the packages installed on the device.
+
+    Args:
+        device_id: Optional device ID.
+        shell: Optional persistent shell session.
+
+    Returns:
+        Set of package names, or None if they could not be listed.
+    """
+    try:
+        result = _run_shell(["pm", "list", "packages"], device_id, shell, timeout=10)
     except Exception:
-        return False
+        return None
+    if result.returncode != 0:
+        return None
+    return {
+        line.removeprefix("package:").strip()
+        for line in result.stdout.splitlines()
+        if line.startswith("package:")
+    }
 
 
 # Screenshot Capture
 
 
-def take_screenshot(device_id: str | None = None, timeout: int = 10) -> Screenshot:
+def take_screenshot(
+    device_id: str | None = None, timeout: int = 10, raw: bool = False
+) -> Screenshot:
     """Capture a screenshot from the Android device.
 
+    The image is streamed from ``screencap`` (an ``exec:`` request to the ADB
+    server, or ``adb exec-out`` if the server is unreachable) straight into
+    memory, with no file on the device or the host.
+
     Args:
         device_id: Optional device ID.
         timeout: Timeout in seconds.
+        raw: Capture the raw framebuffer (``screencap`` without ``-p``) instead of
+            a device-encoded PNG. Skips the slow on-device PNG compression at the
+            cost of transferring uncompressed pixels (fast over USB, slow over WiFi).
 
     Returns:
         Screenshot object containing base64 data and dimensions.
         Returns black fallback image if capture fails.
         Sets is_sensitive=True if screen appears to be blocked (black screen).
     """
-    temp_path = os.path.join(tempfile.gettempdir(), f"screenshot_{uuid.uuid4()}.png")
-    adb_prefix = _get_adb_prefix(device_id)
+    try:
+        returncode, stdout, stderr = _screencap(device_id, raw, timeout)
+    except Exception as e:
+        print(f"Screenshot error: {e}")
+        return create_fallback_screenshot(is_sensitive=False)
+
+    return screenshot_from_screencap(returncode, stdout, stderr, raw=raw)
+
+
+def screencap_args(raw: bool = False) -> list[str]:
+    """Build the device-side ``screencap`` command.
+
+    Args:
+        raw: Capture the raw framebuffer instead of a device-encoded PNG.
+
+    Returns:
+        Command and arguments for the device.
+    """
+    return ["screencap"] if raw else ["screencap", "-p"]
+
+
+def screencap_command(device_id: str | None = None, raw: bool = False) -> list[str]:
+    """Build the ``adb exec-out screencap`` command line.
+
+    Args:
+        device_id: Optional device ID.
+        raw: Capture the raw framebuffer instead of a device-encoded PNG.
+
+    Returns:
+        Command and arguments for the host.
+    """
+    return _get_adb_prefix(device_id) + ["exec-out", *screencap_args(raw)]
+
+
+def _screencap(
+    device_id: str | None, raw: bool, timeout: float
+) -> tuple[int, bytes, bytes]:
+    """Run screencap through the ADB server, or the adb binary if unreachable.
 
+    Args:
+        device_id: Optional device ID.
+        raw: Capture the raw framebuffer instead of a device-encoded PNG.
+        timeout: Timeout in seconds.
+
+    Returns:
+        Tuple of (return code, stdout, stderr).
+    """
     try:
-        # Execute screenshot command
+        data = adb_client.get_client().exec_out(
+            device_id, screencap_args(raw), timeout=timeout
+        )
+    except adb_client.AdbError:
         result = subprocess.run(
-            adb_prefix + ["shell", "screencap", "-p", "/sdcard/tmp.png"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=timeout,
+            screencap_command(device_id, raw), capture_output=True, timeout=timeout
         )
+        return result.returncode, result.stdout, result.stderr
+    return 0, data, b""
 
-        # Check for explicit failure indicators
-        output = result.stdout + result.stderr
-        if "Status: -1" in output or "Failed" in output or result.returncode != 0:
-            return _create_fallback_screenshot(is_sensitive=True)
 
-        # Pull screenshot to local temp path
-        pull_result = subprocess.run(
-            adb_prefix + ["pull", "/sdcard/tmp.png", temp_path],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            timeout=5,
-        )
+def screenshot_from_screencap(
+    returncode: int, stdout: bytes, stderr: bytes, raw: bool = False
+) -> Screenshot:
+    """Turn the output of ``adb exec-out screencap`` into a Screenshot.
 
-        if pull_result.returncode != 0 or not pathlib.Path(temp_path).exists():
-            return _create_fallback_screenshot(is_sensitive=True)
+    Shared by the blocking capture and the asyncio controller, which runs the same
+    command through the asyncio ADB client or as an asyncio subprocess.
 
-        # Read and analyze image
-        img = Image.open(temp_path)
-        width, height = img.size
+    Args:
+        returncode: Exit status of the adb process.
+        stdout: Captured image bytes.
+        stderr: Captured error output.
+        raw: Whether stdout holds a raw framebuffer instead of a PNG.
 
-        # Check if image is black/nearly black (indicates sensitive screen)
-        # Enable verbose output to help debug detection
-        is_sensitive = _is_black_or_nearly_black_screen(img, verbose=True)
+    Returns:
+        Screenshot object containing base64 data and dimensions.
+        Returns black fallback image if capture fails.
+        Sets is_sensitive=True if screen appears to be blocked (black screen).
+    """
+    try:
+        # Check for explicit failure indicators
+        errors = stderr.decode("utf-8", errors="replace")
+        if (
+            returncode != 0
+            or not stdout
+            or "Status: -1" in errors
+            or "Failed" in errors
+        ):
+            return create_fallback_screenshot(is_sensitive=True)
+
+        if raw:
+            img = decode_raw_screencap(stdout)
+            buffered = BytesIO()
+            img.save(buffered, format="PNG", compress_level=1)
+            png_data = buffered.getvalue()
+        else:
+            png_data = _strip_png_preamble(stdout)
+            img = Image.open(BytesIO(png_data))
 
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        base64_data = base64.b64encode(buffered.getvalue()).decode("utf-8")
+        width, height = img.size
 
-        # Cleanup
-        pathlib.Path(temp_path).unlink()
+        # Check if image is black/nearly black (indicates sensitive screen)
+        is_sensitive = _is_black_or_nearly_black_screen(img)
 
         return Screenshot(
-            base64_data=base64_data,
+            base64_data=base64.b64encode(png_data).decode("utf-8"),
             width=width,
             height=height,
             is_sensitive=is_sensitive,
+            image=img,
         )
 
     except Exception as e:
         print(f"Screenshot error: {e}")
-        return _create_fallback_screenshot(is_sensitive=False)
+        return create_fallback_screenshot(is_sensitive=False)
+
+
+def decode_raw_screencap(data: bytes) -> Image.Image:
+    """Decode raw ``screencap`` output into an image without a PNG round trip.
+
+    The raw format is a little-endian header of width, height and pixel format
+    (plus a color space word since Android 9) followed by the pixel rows.
+
+    Args:
+        data: Raw bytes from ``adb exec-out screencap``.
+
+    Returns:
+        Decoded PIL image backed by the captured buffer.
+
+    Raises:
+        ValueError: If the header is malformed or the pixel format is unsupported.
+    """
+    if len(data) < 12:
+        msg = f"Raw screencap too short ({len(data)} bytes)"
+        raise ValueError(msg)
+
+    width, height, pixel_format = struct.unpack_from("<III", data)
+    if pixel_format not in _RAW_PIXEL_FORMATS:
+        msg = f"Unsupported screencap pixel format: {pixel_format}"
+        raise ValueError(msg)
+    bytes_per_pixel, decoder_mode = _RAW_PIXEL_FORMATS[pixel_format]
+
+    pixel_bytes = width * height * bytes_per_pixel
+    # Android 9+ appends a color space word to the header
+    header_size = 16 if len(data) >= 16 + pixel_bytes else 12
+    if len(data) < header_size + pixel_bytes:
+        msg = (
+            f"Raw screencap truncated: expected {pixel_bytes} pixel bytes "
+            f"for {width}x{height}, got {len(data) - header_size}"
+        )
+        raise ValueError(msg)
+
+    image_mode = "RGB" if decoder_mode in {"RGB", "BGR;16"} else "RGBA"
+    img = Image.frombuffer(
+        image_mode,
+        (width, height),
+        memoryview(data)[header_size : header_size + pixel_bytes],
+        "raw",
+        decoder_mode,
+        0,
+        1,
+    )
+    if decoder_mode == "RGBX":
+        # PIL maps RGBX buffers as mode "RGBX", which PNG cannot store
+        img = img.convert("RGB")
+    return img
+
+
+def capture_frame(device_id: str | None = None, timeout: float = 5) -> np.ndarray:
+    """Capture a low-resolution grayscale frame for change detection.
+
+    Uses the raw framebuffer (no on-device PNG encoding), which is the cheapest
+    way to poll the screen.
+
+    Args:
+        device_id: Optional device ID.
+        timeout: Timeout in seconds for the capture.
+
+    Returns:
+        2-D uint8 luma array (see sample_luma).
+
+    Raises:
+        RuntimeError: If the capture fails.
+    """
+    return frame_from_screencap(*_screencap(device_id, True, timeout))
+
+
+def frame_from_screencap(returncode: int, stdout: bytes, stderr: bytes) -> np.ndarray:
+    """Turn raw ``adb exec-out screencap`` output into a change-detection frame.
+
+    Args:
+        returncode: Exit status of the adb process.
+        stdout: Raw framebuffer bytes.
+        stderr: Captured error output.
+
+    Returns:
+        2-D uint8 luma array (see sample_luma).
+
+    Raises:
+        RuntimeError: If the capture failed.
+    """
+    if returncode != 0 or not stdout:
+        msg = f"screencap failed: {stderr.decode('utf-8', errors='replace')}"
+        raise RuntimeError(msg)
+    return sample_luma(decode_raw_screencap(stdout))
+
+
+def _strip_png_preamble(data: bytes) -> bytes:
+    """Drop anything a device prints to stdout before the PNG signature.
+
+    Args:
+        data: Bytes from ``adb exec-out screencap -p``.
+
+    Returns:
+        The PNG bytes starting at the signature.
+
+    Raises:
+        ValueError: If no PNG signature is present.
+    """
+    offset = data.find(PNG_SIGNATURE)
+    if offset < 0:
+        msg = "screencap output is not a PNG image"
+        raise ValueError(msg)
+    return data[offset:] if offset else data
 
 
 def _is_black_or_nearly_black_screen(
@@ -320,40 +609,29 @@ def _is_black_or_nearly_black_screen(
 ) -> bool:
     """Check if an image is black or nearly black (indicating a sensitive/blocked screen).
 
+    The status and navigation bars stay lit on secure screens, so they are excluded
+    and the remaining page is split into a grid of regions. The screen counts as
+    black only when every region is dark, which also keeps dark-mode pages with a
+    bit of visible content from being misclassified.
+
     Args:
         img: PIL Image object to check.
-        threshold: Maximum average brightness (0-255) to consider as black.
-                  Default 30.0 accounts for status bar while detecting mostly black screens.
+        threshold: Maximum average brightness (0-255) of any page region to
+            consider the screen black.
         verbose: Print debug information about brightness detection.
 
     Returns:
         True if image is predominantly black, False otherwise.
     """
     try:
-        # Convert to RGB if needed
-        if img.mode != "RGB":
-            img = img.convert("RGB")
-
-        # Resize to speed up analysis (check a sample)
-        sample_size = (100, 100)
-        img_small = img.resize(sample_size, Image.Resampling.LANCZOS)
-
-        # Calculate average brightness using PIL (no numpy required)
-        pixels = list(img_small.getdata())
-        total_brightness = sum(sum(pixel) / 3 for pixel in pixels)  # Average of R,G,B
-        avg_brightness = total_brightness / len(pixels)
+        region_means = _region_brightness(sample_luma(img))
+        brightest = float(region_means.max())
+        is_black = brightest < threshold
 
         if verbose:
             print(
-                f"[DEBUG] Screenshot brightness: {avg_brightness:.2f} (threshold: {threshold})"
-            )
-
-        # If average brightness is very low, it's likely a black screen
-        is_black = avg_brightness < threshold
-
-        if verbose and is_black:
-            print(
-                f"[DEBUG] Detected sensitive/black screen (brightness {avg_brightness:.2f} < {threshold})"
+                f"[DEBUG] Screenshot brightness: brightest region {brightest:.2f}, "
+                f"mean {float(region_means.mean()):.2f} (threshold: {threshold})"
             )
 
         return is_black
@@ -365,7 +643,63 @@ def _is_black_or_nearly_black_screen(
         return False
 
 
-def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
+def sample_luma(img: Image.Image) -> np.ndarray:
+    """Subsample an image to roughly _LUMA_SAMPLE_EDGE pixels and return its luma.
+
+    Used for black-screen detection and for cheap frame-to-frame comparisons.
+
+    Args:
+        img: Image to sample.
+
+    Returns:
+        2-D uint8 array of brightness values.
+    """
+    step = max(1, max(img.size) // _LUMA_SAMPLE_EDGE)
+    if step > 1:
+        # Nearest-neighbour resize is a strided subsample done in C
+        size = (max(1, img.width // step), max(1, img.height // step))
+        img = img.resize(size, Image.Resampling.NEAREST)
+    if img.mode != "L":
+        img = img.convert("L")
+    return np.asarray(img)
+
+
+def screenshot_luma(screenshot: Screenshot) -> np.ndarray:
+    """Sample the luma of a screenshot, decoding its PNG if it holds no image.
+
+    Args:
+        screenshot: Screenshot to sample.
+
+    Returns:
+        2-D uint8 array of brightness values (see sample_luma).
+    """
+    img = screenshot.image
+    if img is None:
+        img = Image.open(BytesIO(base64.b64decode(screenshot.base64_data)))
+    return sample_luma(img)
+
+
+def _region_brightness(luma: np.ndarray) -> np.ndarray:
+    """Compute the mean brightness of each page region, ignoring the system bars.
+
+    Returns:
+        1-D array with one mean per grid region.
+    """
+    height = luma.shape[0]
+    bar = int(height * _SYSTEM_BAR_FRACTION)
+    if height - 2 * bar > 0:
+        luma = luma[bar : height - bar]
+
+    rows, cols = _REGION_GRID
+    cell_h, cell_w = luma.shape[0] // rows, luma.shape[1] // cols
+    if cell_h == 0 or cell_w == 0:
+        return np.array([luma.mean()])
+
+    cells = luma[: cell_h * rows, : cell_w * cols].reshape(rows, cell_h, cols, cell_w)
+    return cells.mean(axis=(1, 3), dtype=np.float32).ravel()
+
+
+def create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
     """Create a black fallback image when screenshot fails."""
     default_width, default_height = 1080, 2400
 
@@ -386,7 +720,12 @@ def _create_fallback_screenshot(is_sensitive: bool) -> Screenshot:
 
 
 def tap(
-    x: int, y: int, device_id: str | None = None, delay: float | None = None
+    x: int,
+    y: int,
+    device_id: str | None = None,
+    delay: float | None = None,
+    shell: AdbShellSession | None = None,
+    touch: TouchInjector | None = None,
 ) -> None:
     """Tap at the specified coordinates.
 
@@ -395,40 +734,45 @@ def tap(
         y: Y coordinate.
         device_id: Optional device ID.
         delay: Delay in seconds after tap.
+        shell: Optional persistent shell session.
+        touch: Optional touch injector.
     """
     if delay is None:
         delay = DEFAULT_TAP_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
+    if not _inject_touch(touch, "tap", x, y):
+        _run_shell(["input", "tap", str(x), str(y)], device_id, shell)
     time.sleep(delay)
 
 
 def double_tap(
-    x: int, y: int, device_id: str | None = None, delay: float | None = None
+    x: int,
+    y: int,
+    device_id: str | None = None,
+    delay: float | None = None,
+    shell: AdbShellSession | None = None,
+    touch: TouchInjector | None = None,
 ) -> None:
     """Double tap at the specified coordinates.
 
+    With a touch injector both taps are sent as one gesture; with ``input`` they
+    are two commands DEFAULT_DOUBLE_TAP_INTERVAL apart.
+
     Args:
         x: X coordinate.
         y: Y coordinate.
         device_id: Optional device ID.
         delay: Delay in seconds after double tap.
+        shell: Optional persistent shell session.
+        touch: Optional touch injector.
     """
     if delay is None:
         delay = DEFAULT_TAP_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
-    time.sleep(DEFAULT_DOUBLE_TAP_INTERVAL)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "tap", str(x), str(y)], capture_output=True
-    )
+    if not _inject_touch(touch, "double_tap", x, y):
+        _run_shell(["input", "tap", str(x), str(y)], device_id, shell)
+        time.sleep(DEFAULT_DOUBLE_TAP_INTERVAL)
+        _run_shell(["input", "tap", str(x), str(y)], device_id, shell)
     time.sleep(delay)
 
 
@@ -438,6 +782,8 @@ def long_press(
     duration_ms: int = DEFAULT_LONG_PRESS_DURATION,
     device_id: str | None = None,
     delay: float | None = None,
+    shell: AdbShellSession | None = None,
+    touch: TouchInjector | None = None,
 ) -> None:
     """Long press at the specified coordinates.
 
@@ -447,17 +793,19 @@ def long_press(
         duration_ms: Duration of press in milliseconds.
         device_id: Optional device ID.
         delay: Delay in seconds after long press.
+        shell: Optional persistent shell session.
+        touch: Optional touch injector.
     """
     if delay is None:
         delay = DEFAULT_TAP_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix
-        + ["shell", "input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
-        capture_output=True,
-    )
+    if not _inject_touch(touch, "long_press", x, y, duration_ms):
+        _run_shell(
+            ["input", "swipe", str(x), str(y), str(x), str(y), str(duration_ms)],
+            device_id,
+            shell,
+            timeout=duration_ms / 1000 + 10,
+        )
     time.sleep(delay)
 
 
@@ -469,6 +817,8 @@ def swipe(
     duration_ms: int | None = None,
     device_id: str | None = None,
     delay: float | None = None,
+    shell: AdbShellSession | None = None,
+    touch: TouchInjector | None = None,
 ) -> None:
     """Swipe from start to end coordinates.
 
@@ -480,319 +830,361 @@ def swipe(
         duration_ms: Duration of swipe in milliseconds (auto-calculated if None).
         device_id: Optional device ID.
         delay: Delay in seconds after swipe.
+        shell: Optional persistent shell session.
+        touch: Optional touch injector.
     """
     if delay is None:
         delay = DEFAULT_SWIPE_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-
     if duration_ms is None:
         # Calculate duration based on distance
         dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
         duration_ms = int(dist_sq / 1000)
         duration_ms = max(300, min(duration_ms, 800))
 
-    subprocess.run(
-        adb_prefix
-        + [
-            "shell",
-            "input",
-            "swipe",
-            str(start_x),
-            str(start_y),
-            str(end_x),
-            str(end_y),
-            str(duration_ms),
-        ],
-        capture_output=True,
-    )
+    if not _inject_touch(touch, "swipe", start_x, start_y, end_x, end_y, duration_ms):
+        _run_shell(
+            [
+                "input",
+                "swipe",
+                str(start_x),
+                str(start_y),
+                str(end_x),
+                str(end_y),
+                str(duration_ms),
+            ],
+            device_id,
+            shell,
+            timeout=duration_ms / 1000 + 10,
+        )
     time.sleep(delay)
 
 
 # System Keys
 
 
-def press_back(device_id: str | None = None, delay: float | None = None) -> None:
+def press_back(
+    device_id: str | None = None,
+    delay: float | None = None,
+    shell: AdbShellSession | None = None,
+) -> None:
     """Press the back button.
 
     Args:
         device_id: Optional device ID.
         delay: Delay in seconds after pressing back.
+        shell: Optional persistent shell session.
     """
     if delay is None:
         delay = DEFAULT_BACK_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "4"], capture_output=True
-    )
+    _run_shell(["input", "keyevent", "4"], device_id, shell)
     time.sleep(delay)
 
 
-def press_home(device_id: str | None = None, delay: float | None = None) -> None:
+def press_home(
+    device_id: str | None = None,
+    delay: float | None = None,
+    shell: AdbShellSession | None = None,
+) -> None:
     """Press the home button.
 
     Args:
         device_id: Optional device ID.
         delay: Delay in seconds after pressing home.
+        shell: Optional persistent shell session.
     """
     if delay is None:
         delay = DEFAULT_HOME_DELAY
 
-    adb_prefix = _get_adb_prefix(device_id)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", "KEYCODE_HOME"], capture_output=True
-    )
+    _run_shell(["input", "keyevent", "KEYCODE_HOME"], device_id, shell)
     time.sleep(delay)
 
 
-def send_keyevent(keycode: str, device_id: str | None = None) -> None:
+def send_keyevent(
+    keycode: str, device_id: str | None = None, shell: AdbShellSession | None = None
+) -> None:
     """Send a keyevent to the device.
 
     Args:
         keycode: The keycode to send (e.g., "KEYCODE_ENTER", "KEYCODE_BACK").
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-    subprocess.run(
-        adb_prefix + ["shell", "input", "keyevent", keycode],
-        capture_output=True,
-        text=True,
-    )
+    _run_shell(["input", "keyevent", keycode], device_id, shell)
 
 
 # Text Input
 
 
-def type_text(text: str, device_id: str | None = None, verbose: bool = False) -> None:
+def type_text(
+    text: str,
+    device_id: str | None = None,
+    verbose: bool = False,
+    shell: AdbShellSession | None = None,
+) -> None:
     """Type text using ADB Keyboard.
 
+    The whole text is sent in one broadcast when its base64 form fits in
+    BULK_INPUT_MAX_BYTES. Through a persistent shell session the payload is
+    written to the session directly; with one-shot processes a large payload is
+    pushed to the device as a file and expanded there, since older adbd versions
+    limit the length of a shell command line.
+
+    If the bulk broadcast is not acknowledged, or the text is larger, it is sent
+    in chunks of a few hundred characters. Each chunk waits for its broadcast to
+    complete (retrying a few times) instead of sleeping a fixed delay.
+
     Args:
         text: The text to type.
         device_id: Optional device ID.
         verbose: Enable detailed logging for debugging (default: False).
+        shell: Optional persistent shell session.
 
     Note:
         Requires ADB Keyboard to be installed and enabled.
 
-        For long text (>500 chars), automatically splits into chunks to avoid
-        Android Binder transaction size limits (1MB shared buffer).
-
-        Safe chunk size: ~500 chars (after base64 encoding ~667 bytes + overhead).
-
     References:
         - Android Binder buffer: 1MB shared across all process transactions
         - Recommended Intent data size: a few KB to avoid TransactionTooLargeException
         - Base64 encoding overhead: ~33% size increase
 
     Raises:
-        RuntimeError: If text input fails after retries.
+        RuntimeError: If chunked text input fails after retries.
     """
-    adb_prefix = _get_adb_prefix(device_id)
+    encoded_text = _b64(text)
+    if len(encoded_text) <= BULK_INPUT_MAX_BYTES:
+        if verbose:
+            print(f"[type_text] Sending {len(text)} chars in one broadcast")
+        if _broadcast_input(encoded_text, device_id, shell, verbose=verbose):
+            return
+        if verbose:
+            print("[type_text] Broadcast not acknowledged, sending in chunks")
+
+    chunks = [
+        text[i : i + _INPUT_CHUNK_SIZE] for i in range(0, len(text), _INPUT_CHUNK_SIZE)
+    ]
+    if verbose:
+        print(f"[type_text] Sending {len(text)} chars in {len(chunks)} chunks")
+
+    failed_chunks = []
+    for chunk_num, chunk in enumerate(chunks, start=1):
+        for attempt in range(1, _INPUT_CHUNK_RETRIES + 1):
+            if _broadcast_input(_b64(chunk), device_id, shell, verbose=verbose):
+                break
+            if verbose:
+                print(
+                    f"[type_text] Chunk {chunk_num}/{len(chunks)} not acknowledged "
+                    f"(attempt {attempt}/{_INPUT_CHUNK_RETRIES})"
+                )
+            if attempt < _INPUT_CHUNK_RETRIES:
+                time.sleep(_INPUT_RETRY_DELAY)
+        else:
+            failed_chunks.append(chunk_num)
+
+    if failed_chunks:
+        error_msg = (
+            f"Failed to send chunks {failed_chunks} after {_INPUT_CHUNK_RETRIES} "
+            "retries. Text is incomplete."
+        )
+        if verbose:
+            print(f"[type_text] CRITICAL ERROR: {error_msg}")
+        raise RuntimeError(error_msg)
 
-    # Maximum safe characters per chunk to avoid Binder transaction limits
-    # Conservative value to ensure reliability across different devices
-    # Reduced from 500 to 300 to improve reliability with long text
-    MAX_CHUNK_SIZE = 300
 
-    # Increased delay for better reliability with long text
-    # Increased to 1.2s to ensure each chunk is fully processed before next one
-    CHUNK_DELAY = 1.2  # 1200ms between chunks for better reliability
+def _b64(text: str) -> str:
+    return base64.b64encode(text.encode("utf-8")).decode("ascii")
 
-    # Retry configuration for failed chunks
-    MAX_RETRIES = 3  # Maximum retry attempts per chunk
-    RETRY_DELAY = 0.5  # Delay between retries in seconds
 
-    # Short text: use original single-broadcast approach
-    if len(text) <= MAX_CHUNK_SIZE:
+def _broadcast_input(
+    encoded_text: str,
+    device_id: str | None,
+    shell: AdbShellSession | None,
+    *,
+    verbose: bool = False,
+) -> bool:
+    """Send base64 text to ADB Keyboard in one broadcast.
+
+    Args:
+        encoded_text: Base64 of the UTF-8 text.
+        device_id: Optional device ID.
+        shell: Optional persistent shell session.
+        verbose: Print failures.
+
+    Returns:
+        True if ADB Keyboard is the active input method and `am broadcast`
+        reported the broadcast as completed.
+    """
+    try:
+        if shell is None and len(encoded_text) > _INLINE_INPUT_MAX_BYTES:
+            result = _broadcast_input_file(encoded_text, device_id)
+        else:
+            result = _run_shell(
+                _if_adb_keyboard_active(
+                    "am broadcast -a ADB_INPUT_B64 --es msg "
+                    + shlex.quote(encoded_text)
+                ),
+                device_id,
+                shell,
+                timeout=_INPUT_TIMEOUT,
+            )
+    except (subprocess.TimeoutExpired, OSError) as e:
         if verbose:
-            print(f"[type_text] Sending short text ({len(text)} chars)")
-        encoded_text = base64.b64encode(text.encode("utf-8")).decode("utf-8")
-        result = subprocess.run(
-            adb_prefix
-            + [
-                "shell",
-                "am",
-                "broadcast",
-                "-a",
-                "ADB_INPUT_B64",
-                "--es",
-                "msg",
-                encoded_text,
-            ],
+            print(f"[type_text] Broadcast failed: {e}")
+        return False
+
+    acknowledged = result.returncode == 0 and _BROADCAST_ACK in result.stdout
+    if verbose and not acknowledged:
+        print(
+            f"[type_text] Broadcast failed with return code {result.returncode}: "
+            f"{(result.stderr or result.stdout).strip()}"
+        )
+    return acknowledged
+
+
+def _broadcast_input_file(
+    encoded_text: str, device_id: str | None
+) -> subprocess.CompletedProcess[str]:
+    """Push base64 text to the device and broadcast it from there.
+
+    Args:
+        encoded_text: Base64 of the UTF-8 text.
+        device_id: Optional device ID.
+
+    Returns:
+        Result of the device-side broadcast (or of the failed push).
+    """
+    try:
+        adb_client.get_client().push(
+            device_id, encoded_text.encode("ascii"), _DEVICE_INPUT_FILE
+        )
+    except adb_client.AdbError:
+        pushed = subprocess.run(
+            [*_get_adb_prefix(device_id), "shell", f"cat > {_DEVICE_INPUT_FILE}"],
+            input=encoded_text,
             capture_output=True,
             text=True,
-            encoding="utf-8",
+            timeout=_INPUT_TIMEOUT,
         )
-        if verbose and result.returncode != 0:
-            print(
-                f"[type_text] Warning: broadcast failed with return code {result.returncode}"
-            )
-            print(f"[type_text] stderr: {result.stderr}")
-    else:
-        # Long text: split into chunks and send sequentially
-        total_chunks = (len(text) + MAX_CHUNK_SIZE - 1) // MAX_CHUNK_SIZE
-        if verbose:
-            print(
-                f"[type_text] Sending long text ({len(text)} chars) in {total_chunks} chunks"
-            )
+        if pushed.returncode != 0:
+            return pushed
+    broadcast = f'am broadcast -a ADB_INPUT_B64 --es msg "$(cat {_DEVICE_INPUT_FILE})"'
+    return _run_shell(
+        f"{_if_adb_keyboard_active(broadcast)}; rm -f {_DEVICE_INPUT_FILE}",
+        device_id,
+        timeout=_INPUT_TIMEOUT,
+    )
 
-        failed_chunks = []
-        for i in range(0, len(text), MAX_CHUNK_SIZE):
-            chunk_num = i // MAX_CHUNK_SIZE + 1
-            chunk = text[i : i + MAX_CHUNK_SIZE]
-            encoded_chunk = base64.b64encode(chunk.encode("utf-8")).decode("utf-8")
 
-            if verbose:
-                chunk_preview = chunk[:50] + "..." if len(chunk) > 50 else chunk
-                print(
-                    f"[type_text] Sending chunk {chunk_num}/{total_chunks} ({len(chunk)} chars): {chunk_preview}"
-                )
+def _if_adb_keyboard_active(command: str) -> str:
+    """Guard a device shell command so it only runs while ADB Keyboard is active.
 
-            # Retry mechanism for failed chunks
-            success = False
-            for retry in range(MAX_RETRIES):
-                try:
-                    result = subprocess.run(
-                        adb_prefix
-                        + [
-                            "shell",
-                            "am",
-                            "broadcast",
-                            "-a",
-                            "ADB_INPUT_B64",
-                            "--es",
-                            "msg",
-                            encoded_chunk,
-                        ],
-                        capture_output=True,
-                        text=True,
-                        encoding="utf-8",
-                        timeout=5,  # Add timeout to avoid hanging
-                    )
+    The check runs in the same shell request as the command, so it costs no
+    extra round trip. Otherwise the guard prints _IME_INACTIVE and fails.
 
-                    # Check if broadcast succeeded
-                    if result.returncode == 0:
-                        success = True
-                        if retry > 0 and verbose:
-                            print(
-                                f"[type_text] Chunk {chunk_num}/{total_chunks} succeeded on retry {retry}"
-                            )
-                        break
-                    if verbose:
-                        print(
-                            f"[type_text] Chunk {chunk_num}/{total_chunks} failed (attempt {retry + 1}/{MAX_RETRIES})"
-                        )
-                        print(
-                            f"[type_text] Return code: {result.returncode}, stderr: {result.stderr}"
-                        )
-
-                    if retry < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
-
-                except subprocess.TimeoutExpired:
-                    if verbose:
-                        print(
-                            f"[type_text] Chunk {chunk_num}/{total_chunks} timeout (attempt {retry + 1}/{MAX_RETRIES})"
-                        )
-                    if retry < MAX_RETRIES - 1:
-                        time.sleep(RETRY_DELAY)
-
-            if not success:
-                failed_chunks.append(chunk_num)
-                if verbose:
-                    print(
-                        f"[type_text] ERROR: Chunk {chunk_num}/{total_chunks} failed after {MAX_RETRIES} attempts"
-                    )
-
-            # Delay between chunks to ensure proper delivery
-            # Increased delay for better reliability
-            if i + MAX_CHUNK_SIZE < len(text):  # Not the last chunk
-                time.sleep(CHUNK_DELAY)
+    Args:
+        command: Shell command to guard.
 
-        if failed_chunks:
-            error_msg = f"Failed to send chunks {failed_chunks} after {MAX_RETRIES} retries. Text is incomplete."
-            if verbose:
-                print(f"[type_text] CRITICAL ERROR: {error_msg}")
-            # Raise exception to notify caller
-            raise RuntimeError(error_msg)
-        if verbose:
-            print(f"[type_text] Successfully sent all {total_chunks} chunks")
+    Returns:
+        The guarded shell command.
+    """
+    return (
+        'if [ "$(settings get secure default_input_method)" = '
+        f"{shlex.quote(ADB_KEYBOARD_IME)} ]; then {command}; "
+        f"else echo {shlex.quote(_IME_INACTIVE)}; false; fi"
+    )
 
 
-def clear_text(device_id: str | None = None) -> None:
+def clear_text(
+    device_id: str | None = None, shell: AdbShellSession | None = None
+) -> None:
     """Clear text in the currently focused input field.
 
     Args:
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "am", "broadcast", "-a", "ADB_CLEAR_TEXT"],
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
-    )
+    _run_shell(["am", "broadcast", "-a", "ADB_CLEAR_TEXT"], device_id, shell)
 
 
-def set_adb_keyboard(device_id: str | None = None) -> str:
+def set_adb_keyboard(
+    device_id: str | None = None, shell: AdbShellSession | None = None
+) -> str:
     """Switch to ADB Keyboard and return original IME.
 
     Args:
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
 
     Returns:
         The original keyboard IME identifier for later restoration.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
     # Get current IME
-    result = subprocess.run(
-        adb_prefix + ["shell", "settings", "get", "secure", "default_input_method"],
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
+    result = _run_shell(
+        ["settings", "get", "secure", "default_input_method"], device_id, shell
     )
     current_ime = (result.stdout + result.stderr).strip()
 
     # Switch to ADB Keyboard if not already set
-    if "com.android.adbkeyboard/.AdbIME" not in current_ime:
-        subprocess.run(
-            adb_prefix + ["shell", "ime", "set", "com.android.adbkeyboard/.AdbIME"],
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-        )
+    if ADB_KEYBOARD_IME not in current_ime:
+        _run_shell(["ime", "set", ADB_KEYBOARD_IME], device_id, shell)
 
     # Warm up the keyboard
-    type_text("", device_id)
+    type_text("", device_id, shell=shell)
 
     return current_ime
 
 
-def restore_keyboard(ime: str, device_id: str | None = None) -> None:
+def wait_for_ime(
+    ime: str,
+    device_id: str | None = None,
+    timeout: float = 1.0,
+    shell: AdbShellSession | None = None,
+) -> bool:
+    """Poll until the given IME is the device's active input method.
+
+    Args:
+        ime: The IME identifier to wait for.
+        device_id: Optional device ID.
+        timeout: Maximum seconds to wait.
+        shell: Optional persistent shell session.
+
+    Returns:
+        True if the IME became active in time, False otherwise.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        result = _run_shell(
+            ["settings", "get", "secure", "default_input_method"], device_id, shell
+        )
+        if result.stdout.strip() == ime:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(_IME_POLL_INTERVAL)
+
+
+def restore_keyboard(
+    ime: str, device_id: str | None = None, shell: AdbShellSession | None = None
+) -> None:
     """Restore the original keyboard IME.
 
     Args:
         ime: The IME identifier to restore.
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    subprocess.run(
-        adb_prefix + ["shell", "ime", "set", ime],
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
-    )
+    _run_shell(["ime", "set", ime], device_id, shell)
 
 
 # App Management
 
 
 def launch_app(
-    app_name: str, device_id: str | None = None, delay: float | None = None
+    app_name: str,
+    device_id: str | None = None,
+    delay: float | None = None,
+    shell: AdbShellSession | None = None,
 ) -> bool:
     """Launch an app by name.
 
@@ -800,6 +1192,7 @@ def launch_app(
         app_name: The app name (e.g., "微信", "Chrome", "Settings") or package name.
         device_id: Optional device ID.
         delay: Delay in seconds after launching.
+        shell: Optional persistent shell session.
 
     Returns:
         True if launch command succeeded, False otherwise.
@@ -816,13 +1209,9 @@ def launch_app(
         # Assume app_name is already a package name
         package_name = app_name
 
-    adb_prefix = _get_adb_prefix(device_id)
-
     try:
-        result = subprocess.run(
-            adb_prefix
-            + [
-                "shell",
+        result = _run_shell(
+            [
                 "monkey",
                 "-p",
                 package_name,
@@ -830,7 +1219,8 @@ def launch_app(
                 "android.intent.category.LAUNCHER",
                 "1",
             ],
-            capture_output=True,
+            device_id,
+            shell,
             timeout=10,
         )
 
@@ -841,55 +1231,130 @@ def launch_app(
         return False
 
 
-def get_current_app(device_id: str | None = None) -> str:
+def get_current_app(
+    device_id: str | None = None, shell: AdbShellSession | None = None
+) -> str:
     """Get the app name of the currently focused app.
 
+    Only the focus lines of ``dumpsys window displays`` are transferred (filtered
+    on the device). The full ``dumpsys window`` dump is used as a fallback for
+    Android versions that do not report focus per display.
+
     Args:
         device_id: Optional device ID.
+        shell: Optional persistent shell session.
 
     Returns:
         The app name (user-friendly) of the current app, or "System Home" if not found.
         Examples: "微信", "Chrome", "System Home"
     """
-    adb_prefix = _get_adb_prefix(device_id)
-
-    result = subprocess.run(
-        adb_prefix + ["shell", "dumpsys", "window"],
-        capture_output=True,
-        text=True,
-        encoding="utf-8",
+    result = _run_shell(
+        f"dumpsys window displays | grep -E '{_FOCUS_PATTERN}'", device_id, shell
     )
-    output = result.stdout
-    if not output:
-        raise ValueError("No output from dumpsys window")
+    package = _parse_focused_package(result.stdout)
+
+    if package is None:
+        result = _run_shell(["dumpsys", "window"], device_id, shell)
+        output = result.stdout
+        if not output:
+            raise ValueError("No output from dumpsys window")
+        package = _parse_focused_package(output)
+
+    if package is None:
+        return "System Home"
 
     # Import apps module for package name lookup
     from deepagents_cli.middleware.autoglm import apps
 
-    # Parse window focus info
-    for line in output.split("\n"):
-        if "mCurrentFocus" in line or "mFocusedApp" in line:
-            # Extract package name from line like "Window{...com.example.app/...}"
-            parts = line.split()
-            for part in parts:
-                if "/" in part and "}" in part:
-                    # Extract package from pattern like "com.example.app/.MainActivity}"
-                    package = part.split("/")[0].split("{")[-1]
+    # Convert package name to user-friendly app name, falling back to the package
+    return apps.get_app_name(package) or package
 
-                    # Convert package name to user-friendly app name
-                    app_name = apps.get_app_name(package)
-                    if app_name:
-                        return app_name  # Return "微信" instead of "com.tencent.mm"
 
-                    # If package not found in mapping, return package name as fallback
-                    return package
+def _parse_focused_package(output: str) -> str | None:
+    """Extract the focused package from ``dumpsys window`` output.
 
-    return "System Home"
+    Args:
+        output: Full or grep-filtered ``dumpsys window`` output.
+
+    Returns:
+        The package name, or None if no focused window was found.
+    """
+    for line in output.splitlines():
+        if "mCurrentFocus" in line or "mFocusedApp" in line:
+            # Extract package from e.g. "Window{1a2b u0 com.example.app/.MainActivity}"
+            match = _COMPONENT_RE.search(line)
+            if match:
+                return match.group(1)
+    return None
 
 
 # Helper Functions
 
 
+def _run_shell(
+    args: list[str] | str,
+    device_id: str | None,
+    shell: AdbShellSession | None = None,
+    timeout: float | None = None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command in the device shell.
+
+    Uses the persistent session when one is given. Otherwise, or if the session
+    cannot be (re)established, the command is sent to the ADB server directly,
+    falling back to a one-shot ``adb shell`` process if the server is unreachable.
+
+    Args:
+        args: Command and arguments to run on the device, or a raw shell string
+            (allows pipes on the device side).
+        device_id: Optional device ID.
+        shell: Optional persistent shell session.
+        timeout: Timeout in seconds (None waits indefinitely).
+
+    Returns:
+        CompletedProcess with text stdout/stderr.
+    """
+    if shell is not None:
+        try:
+            return shell.run(args, timeout=timeout)
+        except AdbShellError:
+            pass  # Fall back to a one-shot command below
+
+    try:
+        return adb_client.get_client().shell(device_id, args, timeout=timeout)
+    except adb_client.AdbError:
+        pass
+
+    command = [args] if isinstance(args, str) else args
+    return subprocess.run(
+        _get_adb_prefix(device_id) + ["shell", *command],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        timeout=timeout,
+    )
+
+
+def _inject_touch(touch: TouchInjector | None, gesture: str, *args: int) -> bool:
+    """Run a gesture on the touch injector, if there is one.
+
+    Args:
+        touch: Optional touch injector.
+        gesture: Name of the TouchInjector method.
+        *args: Gesture arguments.
+
+    Returns:
+        True if the gesture was injected, False if the caller should fall back
+        to ``input``.
+    """
+    if touch is None:
+        return False
+    try:
+        getattr(touch, gesture)(*args)
+    except TouchError:
+        return False
+    return True
+
+
 def _get_adb_prefix(device_id: str | None) -> list[str]:
     """Get ADB command prefix with optional device specifier.
 
@@ -12,8 +12,18 @@ The mapping includes:
 - International apps (Chrome, Gmail, WhatsApp, etc.)
 - System apps (Settings, Clock, Contacts, etc.)
 - Multiple name variations for the same app (case-insensitive, with/without spaces, etc.)
+
+Lookups go through an AppIndex built once at import (and updated in place when a
+user registry is loaded), so no lookup scans the tables.
 """
 
+import json
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import yaml
+
 # Comprehensive app name to package name mapping
 APP_PACKAGES: dict[str, str] = {
     # ========== Chinese Social & Messaging ==========
@@ -244,6 +254,7 @@ def find_package_name(app_name: str) -> str | None:
     1. Exact match (case-sensitive)
     2. Case-insensitive match
     3. Match after removing spaces and special characters
+    4. Closest name by trigram similarity (e.g. "小红书app" -> "小红书")
 
     Args:
         app_name: The display name of the app.
@@ -259,31 +270,14 @@ def find_package_name(app_name: str) -> str | None:
         >>> find_package_name("Gmail")  # Mixed case
         "com.google.android.gm"
     """
-    # Try exact match first
-    package = APP_PACKAGES.get(app_name)
-    if package:
-        return package
-
-    # Try case-insensitive match
-    app_name_lower = app_name.lower()
-    for name, package in APP_PACKAGES.items():
-        if name.lower() == app_name_lower:
-            return package
-
-    # Try matching after removing spaces and hyphens
-    app_name_normalized = app_name.replace(" ", "").replace("-", "").lower()
-    for name, package in APP_PACKAGES.items():
-        name_normalized = name.replace(" ", "").replace("-", "").lower()
-        if name_normalized == app_name_normalized:
-            return package
-
-    return None
+    return _ANDROID_INDEX.find(app_name)
 
 
 def get_app_name(package_name: str) -> str | None:
     """Get the app display name from its Android package name.
 
-    If multiple app names map to the same package, returns the first match found.
+    If multiple app names map to the same package, returns the first one listed
+    in APP_PACKAGES.
 
     Args:
         package_name: The Android package name (e.g., "com.tencent.mm").
@@ -299,10 +293,7 @@ def get_app_name(package_name: str) -> str | None:
         >>> get_app_name("com.unknown.package")
         None
     """
-    for name, package in APP_PACKAGES.items():
-        if package == package_name:
-            return name
-    return None
+    return _ANDROID_INDEX.name_for(package_name)
 
 
 def list_supported_apps() -> list[str]:
@@ -569,3 +560,245 @@ def get_bundle_id(app_name: str) -> str | None:
         The iOS bundle ID, or None if not found.
     """
     return APP_PACKAGES_IOS.get(app_name)
+
+
+def find_bundle_id(app_name: str) -> str | None:
+    """Find the iOS bundle ID for an app with fuzzy matching.
+
+    Uses the same strategies as find_package_name().
+
+    Args:
+        app_name: The display name of the app.
+
+    Returns:
+        The iOS bundle ID, or None if not found.
+    """
+    return _IOS_INDEX.find(app_name)
+
+
+def get_ios_app_name(bundle_id: str) -> str | None:
+    """Get the app display name from its iOS bundle ID.
+
+    Args:
+        bundle_id: The iOS bundle ID (e.g., "com.tencent.xin").
+
+    Returns:
+        The display name of the app if found, None otherwise.
+    """
+    return _IOS_INDEX.name_for(bundle_id)
+
+
+# ========== Lookup Index ==========
+
+# Minimum fraction of a known name's trigrams that must appear in the query for a
+# fuzzy match
+FUZZY_MIN_SCORE = 0.5
+# Minimum overall similarity between the query and the matched name. Coverage
+# alone would let any query containing a known name match it, e.g. "微信读书"
+# (a different app) would open "微信".
+FUZZY_MIN_RATIO = 0.8
+# Generic words dropped from the end of a query before fuzzy matching, so that
+# "小红书app" or "settings page" still match their app
+_FUZZY_SUFFIXES = ("application", "browser", "page", "app", "应用", "软件", "客户端")
+
+
+def _normalize(name: str) -> str:
+    """Casefold a name and drop spaces, hyphens and other punctuation.
+
+    Returns:
+        The normalized name.
+    """
+    return "".join(ch for ch in name.casefold() if ch.isalnum())
+
+
+def _strip_suffixes(name: str) -> str:
+    """Drop generic words such as "app" from the end of a normalized name.
+
+    Returns:
+        The name without the generic words, or the name itself if it is nothing
+        but generic words.
+    """
+    stripped = True
+    while stripped:
+        stripped = False
+        for suffix in _FUZZY_SUFFIXES:
+            if name.endswith(suffix) and len(name) > len(suffix):
+                name = name.removesuffix(suffix)
+                stripped = True
+    return name
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"^{text}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class AppIndex:
+    """Precomputed lookup tables for an app name to package/bundle ID mapping.
+
+    Within one mapping the first name listed wins (matching dictionary order), while
+    mappings added later with update() override earlier ones. The reverse
+    package -> name map always keeps the first display name seen for a package.
+    """
+
+    def __init__(self, packages: dict[str, str] | None = None) -> None:
+        """Build the index.
+
+        Args:
+            packages: Mapping of app display names to package/bundle IDs.
+        """
+        self._exact: dict[str, str] = {}
+        self._casefolded: dict[str, str] = {}
+        self._normalized: dict[str, str] = {}
+        self._names: dict[str, str] = {}
+        # trigram -> normalized names containing it, and trigram count per name
+        self._trigrams: defaultdict[str, set[str]] = defaultdict(set)
+        self._trigram_counts: dict[str, int] = {}
+        if packages:
+            self.update(packages)
+
+    def update(self, packages: dict[str, str]) -> None:
+        """Add names to the index, overriding existing entries with the same name.
+
+        Args:
+            packages: Mapping of app display names to package/bundle IDs.
+        """
+        casefolded: dict[str, str] = {}
+        normalized: dict[str, str] = {}
+        for name, package in packages.items():
+            casefolded.setdefault(name.casefold(), package)
+            key = _normalize(name)
+            if key:
+                normalized.setdefault(key, package)
+            self._names.setdefault(package, name)
+
+        self._exact.update(packages)
+        self._casefolded.update(casefolded)
+        self._normalized.update(normalized)
+        for key in normalized:
+            trigrams = _trigrams(key)
+            self._trigram_counts[key] = len(trigrams)
+            for trigram in trigrams:
+                self._trigrams[trigram].add(key)
+
+    def find(self, app_name: str, fuzzy: bool = True) -> str | None:
+        """Resolve an app name to its package/bundle ID.
+
+        Args:
+            app_name: The display name of the app, in any case or spacing.
+            fuzzy: Fall back to trigram similarity when no normalized name matches.
+
+        Returns:
+            The package/bundle ID, or None if nothing matches.
+        """
+        package = (
+            self._exact.get(app_name)
+            or self._casefolded.get(app_name.casefold())
+            or self._normalized.get(_normalize(app_name))
+        )
+        if package or not fuzzy:
+            return package
+        return self._fuzzy_find(app_name)
+
+    def name_for(self, package: str) -> str | None:
+        """Get the display name registered for a package/bundle ID.
+
+        Args:
+            package: The package/bundle ID.
+
+        Returns:
+            The first display name registered for it, or None.
+        """
+        return self._names.get(package)
+
+    def _fuzzy_find(self, app_name: str) -> str | None:
+        query = _strip_suffixes(_normalize(app_name))
+        if not query:
+            return None
+
+        shared: Counter[str] = Counter()
+        for trigram in _trigrams(query):
+            shared.update(self._trigrams.get(trigram, ()))
+
+        scored = [
+            (count / self._trigram_counts[key], key) for key, count in shared.items()
+        ]
+        if not scored:
+            return None
+        best_score = max(score for score, _ in scored)
+        if best_score < FUZZY_MIN_SCORE:
+            return None
+
+        # Break ties between equally covered names on overall similarity
+        ratio, best_key = max(
+            (SequenceMatcher(None, query, _strip_suffixes(key)).ratio(), key)
+            for score, key in scored
+            if score == best_score
+        )
+        if ratio < FUZZY_MIN_RATIO:
+            return None
+        return self._normalized[best_key]
+
+
+_ANDROID_INDEX = AppIndex(APP_PACKAGES)
+_IOS_INDEX = AppIndex(APP_PACKAGES_IOS)
+
+
+def register_apps(packages: dict[str, str], platform: str = "android") -> None:
+    """Add or override app name mappings for a platform.
+
+    Args:
+        packages: Mapping of app display names to package/bundle IDs.
+        platform: "android" or "ios".
+
+    Raises:
+        ValueError: If the platform is unknown.
+    """
+    if platform == "android":
+        APP_PACKAGES.update(packages)
+        _ANDROID_INDEX.update(packages)
+    elif platform == "ios":
+        APP_PACKAGES_IOS.update(packages)
+        _IOS_INDEX.update(packages)
+    else:
+        msg = f"Unknown platform: {platform}. Must be 'android' or 'ios'."
+        raise ValueError(msg)
+
+
+def load_app_registry(path: str | Path) -> int:
+    """Load user app mappings from a JSON or YAML file and merge them into the index.
+
+    The file maps platforms to name -> package tables:
+
+        android:
+          我的应用: com.example.myapp
+        ios:
+          我的应用: com.example.MyApp
+
+    Args:
+        path: Path to a .json, .yaml or .yml file.
+
+    Returns:
+        Number of mappings registered.
+
+    Raises:
+        ValueError: If the file content is not in the expected format.
+    """
+    path = Path(path).expanduser()
+    text = path.read_text(encoding="utf-8")
+    data = json.loads(text) if path.suffix == ".json" else yaml.safe_load(text)
+
+    if not isinstance(data, dict):
+        msg = f"App registry {path} must map platforms to app tables"
+        raise ValueError(msg)  # noqa: TRY004
+
+    count = 0
+    for platform, packages in data.items():
+        if not isinstance(packages, dict) or not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in packages.items()
+        ):
+            msg = f"App registry {path}: '{platform}' must map app names to IDs"
+            raise ValueError(msg)
+        register_apps(packages, platform)
+        count += len(packages)
+    return count
@@ -0,0 +1,883 @@
+"""Asyncio platform controllers for the phone_task step loop.
+
+phone_task runs on an event loop that also waits for the vision model and
+watches the interrupt flag. A blocking controller would hold the loop while a
+tap, swipe or screenshot is in flight and during the sleep after it, so Ctrl+C
+would only be noticed once the device call returns. The controllers here are
+coroutines that can be cancelled at any await:
+
+- AsyncAndroidController sends ``screencap`` to the ADB server over an asyncio
+  connection (closed when the call is cancelled), or runs ``adb exec-out
+  screencap`` as an asyncio subprocess (killed when the call is cancelled) if
+  the server is unreachable. It waits with asyncio.sleep.
+  Short input commands go through the persistent ``adb shell`` session on a
+  worker thread, where they take a few milliseconds. Taps and swipes use a
+  TouchInjector instead of ``input`` when ``touch_backend`` enables one.
+- AsyncIOSController talks to WebDriverAgent through AsyncWDAClient.
+- ThreadedAsyncController runs any blocking PlatformController in worker threads.
+
+InterruptEvent is the interrupt flag shared by the signal handler, worker
+threads and the step loop, which awaits it instead of polling.
+
+SyncPlatformController wraps an async controller for code that needs a blocking
+PlatformController, such as the low-level adb_* tools and
+platform.create_controller. It runs every device
+coroutine on one private event loop thread, because subprocess pipes and HTTP
+connections belong to the loop that created them. Its ``aio`` attribute exposes
+the same controller to coroutines running on other loops.
+"""
+
+import asyncio
+import contextlib
+import logging
+import threading
+from collections.abc import Coroutine
+from http import HTTPStatus
+from typing import Any, Protocol, TypeVar
+
+import httpx
+import numpy as np
+
+from deepagents_cli.middleware.autoglm import (
+    adb_client,
+    adb_controller,
+    adb_shell,
+    touch,
+)
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.ios import (
+    device as ios_device,
+    screenshot as ios_screenshot,
+)
+from deepagents_cli.middleware.autoglm.ios.wda_client import AsyncWDAClient
+from deepagents_cli.middleware.autoglm.platform import (
+    MJPEG_MAX_FRAME_AGE,
+    PlatformConfig,
+    PlatformController,
+    start_mjpeg_stream,
+    verify_requirements,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Default sleep after each iOS action (matches the blocking ios.device functions)
+_IOS_ACTION_DELAY = 1.0
+
+_SCREENCAP_TIMEOUT = 10.0
+# Status codes WebDriverAgent answers successful commands with
+_WDA_SUCCESS = frozenset({HTTPStatus.OK, HTTPStatus.CREATED})
+_FRAME_TIMEOUT = 5.0
+
+
+class AsyncPlatformController(Protocol):
+    """Protocol for controllers whose device calls are coroutines.
+
+    Mirrors PlatformController. Cancelling a call abandons it as soon as possible;
+    a command already delivered to the device may still take effect.
+    """
+
+    async def take_screenshot(self) -> Screenshot:
+        """Capture a screenshot from the device.
+
+        Returns:
+            Screenshot with base64_data, width, height and the is_sensitive flag.
+        """
+        ...
+
+    async def tap(self, x: int, y: int) -> None:
+        """Tap at the specified coordinates.
+
+        Args:
+            x: X coordinate.
+            y: Y coordinate.
+        """
+        ...
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        """Swipe from start to end coordinates.
+
+        Args:
+            start_x: Starting X coordinate.
+            start_y: Starting Y coordinate.
+            end_x: Ending X coordinate.
+            end_y: Ending Y coordinate.
+            duration: Duration of swipe in seconds (optional).
+        """
+        ...
+
+    async def type_text(self, text: str) -> None:
+        """Type text at the currently focused input field.
+
+        Args:
+            text: The text to type.
+        """
+        ...
+
+    async def launch_app(self, app_name: str) -> bool:
+        """Launch an app by name.
+
+        Args:
+            app_name: The app name.
+
+        Returns:
+            True if app was launched successfully, False otherwise.
+        """
+        ...
+
+    async def press_home(self) -> None:
+        """Press the home button."""
+        ...
+
+    async def press_back(self) -> None:
+        """Press the back button."""
+        ...
+
+    async def get_current_app(self) -> str:
+        """Get the currently active app name.
+
+        Returns:
+            The app name, or "System Home" if on home screen.
+        """
+        ...
+
+    async def capture_frame(self) -> np.ndarray:
+        """Capture a low-resolution grayscale frame for change detection.
+
+        Returns:
+            2-D uint8 luma array.
+        """
+        ...
+
+    async def aclose(self) -> None:
+        """Release connections held by the controller."""
+        ...
+
+
+class AsyncAndroidController:
+    """Asyncio controller for Android devices using ADB."""
+
+    def __init__(self, config: PlatformConfig):
+        """Initialize Android controller.
+
+        Args:
+            config: Platform configuration.
+        """
+        self.config = config
+        self.device_id = config.device_id
+        self.shell: adb_shell.AdbShellSession | None = (
+            adb_shell.get_pool().get(self.device_id) if config.use_shell_pool else None
+        )
+        self.adb = adb_client.AsyncAdbClient()
+        self.touch = touch.create_injector(
+            config.touch_backend, self.device_id, self.shell
+        )
+
+    async def take_screenshot(self) -> Screenshot:
+        """Capture a screenshot from the Android device.
+
+        Returns:
+            The screenshot, or a fallback image if the capture failed.
+        """
+        raw = self.config.raw_screencap
+        try:
+            returncode, stdout, stderr = await self._screencap(raw, _SCREENCAP_TIMEOUT)
+        except (OSError, TimeoutError) as e:
+            logger.warning("Screenshot error: %s", e)
+            return await asyncio.to_thread(
+                adb_controller.create_fallback_screenshot, is_sensitive=False
+            )
+        # Decoding and black-screen detection are CPU work: keep them off the loop
+        screenshot = await asyncio.to_thread(
+            adb_controller.screenshot_from_screencap, returncode, stdout, stderr, raw
+        )
+        if self.touch is not None:
+            self.touch.set_screen_size(screenshot.width, screenshot.height)
+        return screenshot
+
+    async def tap(self, x: int, y: int) -> None:
+        """Tap at the specified coordinates on Android device."""
+        await asyncio.to_thread(
+            adb_controller.tap,
+            x,
+            y,
+            self.device_id,
+            delay=0,
+            shell=self.shell,
+            touch=self.touch,
+        )
+        await asyncio.sleep(self._delay(adb_controller.DEFAULT_TAP_DELAY))
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        """Swipe on Android device."""
+        # Convert duration from seconds to milliseconds for ADB
+        duration_ms = int(duration * 1000) if duration is not None else None
+        await asyncio.to_thread(
+            adb_controller.swipe,
+            start_x,
+            start_y,
+            end_x,
+            end_y,
+            duration_ms=duration_ms,
+            device_id=self.device_id,
+            delay=0,
+            shell=self.shell,
+            touch=self.touch,
+        )
+        await asyncio.sleep(self._delay(adb_controller.DEFAULT_SWIPE_DELAY))
+
+    async def type_text(self, text: str) -> None:
+        """Type text on Android device using ADB Keyboard."""
+        # Chunked broadcasts with retries: reuse the blocking implementation
+        await asyncio.to_thread(
+            adb_controller.type_text, text, device_id=self.device_id, shell=self.shell
+        )
+
+    async def launch_app(self, app_name: str) -> bool:
+        """Launch an app on Android device.
+
+        Returns:
+            True if the app is known and the launch command was sent.
+        """
+        launched = await asyncio.to_thread(
+            adb_controller.launch_app,
+            app_name,
+            device_id=self.device_id,
+            delay=0,
+            shell=self.shell,
+        )
+        await asyncio.sleep(self._delay(adb_controller.DEFAULT_LAUNCH_DELAY))
+        return launched
+
+    async def press_home(self) -> None:
+        """Press home button on Android device."""
+        await asyncio.to_thread(
+            adb_controller.press_home, self.device_id, delay=0, shell=self.shell
+        )
+        await asyncio.sleep(self._delay(adb_controller.DEFAULT_HOME_DELAY))
+
+    async def press_back(self) -> None:
+        """Press back button on Android device."""
+        await asyncio.to_thread(
+            adb_controller.press_back, self.device_id, delay=0, shell=self.shell
+        )
+        await asyncio.sleep(self._delay(adb_controller.DEFAULT_BACK_DELAY))
+
+    async def get_current_app(self) -> str:
+        """Get currently active app on Android device.
+
+        Returns:
+            The app name, or "System Home" if on home screen.
+        """
+        return await asyncio.to_thread(
+            adb_controller.get_current_app, device_id=self.device_id, shell=self.shell
+        )
+
+    async def capture_frame(self) -> np.ndarray:
+        """Capture a low-resolution frame from the raw Android framebuffer.
+
+        Returns:
+            2-D uint8 luma array.
+
+        Raises:
+            RuntimeError: If the capture fails.
+        """
+        try:
+            returncode, stdout, stderr = await self._screencap(True, _FRAME_TIMEOUT)
+        except (OSError, TimeoutError) as e:
+            msg = f"screencap failed: {e}"
+            raise RuntimeError(msg) from e
+        return await asyncio.to_thread(
+            adb_controller.frame_from_screencap, returncode, stdout, stderr
+        )
+
+    async def aclose(self) -> None:
+        """Stop the touch injector. The shell session belongs to the shared pool."""
+        if self.touch is not None:
+            await asyncio.to_thread(self.touch.close)
+
+    async def _screencap(
+        self,
+        raw: bool,
+        timeout: float,  # noqa: ASYNC109
+    ) -> tuple[int, bytes, bytes]:
+        """Run screencap through the ADB server, or the adb binary if unreachable.
+
+        Returns:
+            Tuple of (return code, stdout, stderr).
+        """
+        try:
+            data = await self.adb.exec_out(
+                self.device_id, adb_controller.screencap_args(raw), timeout
+            )
+        except adb_client.AdbError:
+            return await _run_host(
+                adb_controller.screencap_command(self.device_id, raw), timeout
+            )
+        return 0, data, b""
+
+    def _delay(self, default: float) -> float:
+        """Post-action delay: the configured override or the primitive's default.
+
+        Returns:
+            Delay in seconds.
+        """
+        if self.config.action_delay is None:
+            return default
+        return self.config.action_delay
+
+
+class AsyncIOSController:
+    """Asyncio controller for iOS devices using WebDriverAgent."""
+
+    def __init__(
+        self, config: PlatformConfig, app_packages: dict[str, str] | None = None
+    ):
+        """Initialize iOS controller.
+
+        Args:
+            config: Platform configuration.
+            app_packages: Dictionary mapping app names to bundle IDs. If None, the
+                built-in app index (including user registries) is used.
+        """
+        self.config = config
+        self.wda_url = config.wda_url
+        self.device_id = config.ios_device_id
+        self.app_packages = app_packages
+        self.wda = AsyncWDAClient(config.wda_url, session_id=config.wda_session_id)
+        self.mjpeg = start_mjpeg_stream(config)
+
+    @property
+    def session_id(self) -> str | None:
+        """The WDA session id (refreshed by the client if WDA restarts)."""
+        return self.wda.session_id
+
+    async def take_screenshot(self) -> Screenshot:
+        """Capture a screenshot from the iOS device.
+
+        Uses the latest MJPEG stream frame when the stream is enabled and fresh.
+        Falls back to idevicescreenshot (in a worker thread) if WDA fails.
+
+        Returns:
+            The screenshot.
+        """
+        frame = self.mjpeg.latest(MJPEG_MAX_FRAME_AGE) if self.mjpeg else None
+        if frame is not None:
+            return frame.to_screenshot()
+
+        try:
+            response = await self.wda.get("screenshot", timeout=_SCREENCAP_TIMEOUT)
+            if response.status_code == HTTPStatus.OK:
+                base64_data = response.json().get("value", "")
+                if base64_data:
+                    return await asyncio.to_thread(
+                        ios_screenshot.screenshot_from_base64, base64_data
+                    )
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("WDA screenshot failed: %s", e)
+
+        return await asyncio.to_thread(
+            ios_screenshot.get_idevice_screenshot, self.device_id
+        )
+
+    async def tap(self, x: int, y: int) -> None:
+        """Tap at the specified coordinates on iOS device."""
+        response = await self._post(
+            "tapping", "actions", ios_device.tap_actions(x, y), timeout=15
+        )
+        if response is not None:
+            await asyncio.sleep(self._delay())
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        """Swipe on iOS device."""
+        payload = ios_device.drag_payload(start_x, start_y, end_x, end_y, duration)
+        response = await self._post(
+            "swiping",
+            "wda/dragfromtoforduration",
+            payload,
+            timeout=payload["duration"] + 10,
+        )
+        if response is not None:
+            await asyncio.sleep(self._delay())
+
+    async def type_text(self, text: str) -> None:
+        """Type text on iOS device using WebDriverAgent."""
+        response = await self._post(
+            "typing text",
+            "wda/keys",
+            {"value": list(text), "frequency": 60},
+            timeout=30,
+        )
+        if response is not None and response.status_code not in _WDA_SUCCESS:
+            logger.warning(
+                "Text input may have failed. Status: %s", response.status_code
+            )
+
+    async def launch_app(self, app_name: str) -> bool:
+        """Launch an app on iOS device.
+
+        Returns:
+            True if WebDriverAgent launched the app, False otherwise.
+        """
+        bundle_id = ios_device.resolve_bundle_id(app_name, self.app_packages)
+        if bundle_id is None:
+            return False
+
+        response = await self._post(
+            "launching app", "wda/apps/launch", {"bundleId": bundle_id}
+        )
+        if response is None:
+            return False
+        await asyncio.sleep(self._delay())
+        return response.status_code in _WDA_SUCCESS
+
+    async def press_home(self) -> None:
+        """Press home button on iOS device."""
+        response = await self._post("pressing home", "wda/homescreen", scoped=False)
+        if response is not None:
+            await asyncio.sleep(self._delay())
+
+    async def press_back(self) -> None:
+        """Navigate back on iOS device (swipe from left edge)."""
+        response = await self._post(
+            "performing back gesture",
+            "wda/dragfromtoforduration",
+            ios_device.BACK_GESTURE,
+        )
+        if response is not None:
+            await asyncio.sleep(self._delay())
+
+    async def get_current_app(self) -> str:
+        """Get currently active app on iOS device.
+
+        Returns:
+            The app name, or "System Home" if on home screen or on errors.
+        """
+        try:
+            response = await self.wda.get("wda/activeAppInfo", timeout=5)
+            if response.status_code == HTTPStatus.OK:
+                value = response.json().get("value", {})
+                return ios_device.app_name_for_bundle(
+                    value.get("bundleId", ""), self.app_packages
+                )
+        except (httpx.HTTPError, ValueError) as e:
+            logger.warning("Error getting current app: %s", e)
+
+        return "System Home"
+
+    async def capture_frame(self) -> np.ndarray:
+        """Capture a low-resolution frame from a WebDriverAgent screenshot.
+
+        Returns:
+            2-D uint8 luma array.
+        """
+        screenshot = await self.take_screenshot()
+        return await asyncio.to_thread(adb_controller.screenshot_luma, screenshot)
+
+    async def aclose(self) -> None:
+        """Close the pooled WebDriverAgent connections and the MJPEG stream."""
+        if self.mjpeg is not None:
+            await asyncio.to_thread(self.mjpeg.stop)
+        await self.wda.aclose()
+
+    async def _post(
+        self,
+        action: str,
+        endpoint: str,
+        payload: object = None,
+        *,
+        scoped: bool = True,
+        timeout: float = 10,  # noqa: ASYNC109
+    ) -> httpx.Response | None:
+        """Send a WDA command, logging (not raising) connection errors.
+
+        Args:
+            action: Description of the command for the error message.
+            endpoint: Endpoint path.
+            payload: JSON request body.
+            scoped: Send to the session-scoped endpoint.
+            timeout: Read timeout in seconds.
+
+        Returns:
+            The HTTP response, or None if the request failed.
+        """
+        try:
+            return await self.wda.post(
+                endpoint, json=payload, scoped=scoped, timeout=timeout
+            )
+        except httpx.HTTPError as e:
+            logger.warning("Error %s: %s", action, e)
+            return None
+
+    def _delay(self) -> float:
+        """Post-action delay: the configured override or the iOS default.
+
+        Returns:
+            Delay in seconds.
+        """
+        if self.config.action_delay is None:
+            return _IOS_ACTION_DELAY
+        return self.config.action_delay
+
+
+class ThreadedAsyncController:
+    """Async view of a blocking PlatformController, calling it in worker threads.
+
+    Cancelling a call stops waiting for it; the blocking call itself runs to
+    completion in its thread.
+    """
+
+    def __init__(self, controller: PlatformController):
+        """Initialize the wrapper.
+
+        Args:
+            controller: Blocking controller to call.
+        """
+        self.controller = controller
+
+    async def take_screenshot(self) -> Screenshot:
+        """Capture a screenshot in a worker thread.
+
+        Returns:
+            The screenshot.
+        """
+        return await asyncio.to_thread(self.controller.take_screenshot)
+
+    async def tap(self, x: int, y: int) -> None:
+        """Tap in a worker thread."""
+        await asyncio.to_thread(self.controller.tap, x, y)
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        """Swipe in a worker thread."""
+        await asyncio.to_thread(
+            self.controller.swipe, start_x, start_y, end_x, end_y, duration=duration
+        )
+
+    async def type_text(self, text: str) -> None:
+        """Type text in a worker thread."""
+        await asyncio.to_thread(self.controller.type_text, text)
+
+    async def launch_app(self, app_name: str) -> bool:
+        """Launch an app in a worker thread.
+
+        Returns:
+            True if app was launched successfully, False otherwise.
+        """
+        return await asyncio.to_thread(self.controller.launch_app, app_name)
+
+    async def press_home(self) -> None:
+        """Press home in a worker thread."""
+        await asyncio.to_thread(self.controller.press_home)
+
+    async def press_back(self) -> None:
+        """Press back in a worker thread."""
+        await asyncio.to_thread(self.controller.press_back)
+
+    async def get_current_app(self) -> str:
+        """Look up the current app in a worker thread.
+
+        Returns:
+            The app name.
+        """
+        return await asyncio.to_thread(self.controller.get_current_app)
+
+    async def capture_frame(self) -> np.ndarray:
+        """Capture a frame in a worker thread.
+
+        Returns:
+            2-D uint8 luma array.
+        """
+        return await asyncio.to_thread(self.controller.capture_frame)
+
+    async def aclose(self) -> None:
+        """Close the wrapped controller if it holds connections."""
+        close = getattr(self.controller, "close", None)
+        if close is not None:
+            await asyncio.to_thread(close)
+
+
+class SyncPlatformController:
+    """Blocking PlatformController backed by an async controller.
+
+    All device coroutines run on a private event loop in a daemon thread. The
+    blocking methods wait for them there; ``aio`` submits the same coroutines
+    from any other event loop, and cancelling such a call cancels the device
+    coroutine too.
+    """
+
+    def __init__(self, controller: AsyncPlatformController):
+        """Start the device I/O loop.
+
+        Args:
+            controller: Async controller to drive.
+        """
+        self.controller = controller
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="autoglm-device-io", daemon=True
+        )
+        self._thread.start()
+        self.aio = _LoopBoundController(controller, self._loop)
+
+    @property
+    def shell(self) -> adb_shell.AdbShellSession | None:
+        """The persistent ADB shell of an Android controller, if any."""
+        return getattr(self.controller, "shell", None)
+
+    @property
+    def touch(self) -> touch.TouchInjector | None:
+        """The touch injector of an Android controller, if any."""
+        return getattr(self.controller, "touch", None)
+
+    def take_screenshot(self) -> Screenshot:
+        """Capture a screenshot from the device.
+
+        Returns:
+            The screenshot.
+        """
+        return self._run(self.controller.take_screenshot())
+
+    def tap(self, x: int, y: int) -> None:
+        """Tap at the specified coordinates."""
+        self._run(self.controller.tap(x, y))
+
+    def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        """Swipe from start to end coordinates."""
+        self._run(self.controller.swipe(start_x, start_y, end_x, end_y, duration))
+
+    def type_text(self, text: str) -> None:
+        """Type text at the currently focused input field."""
+        self._run(self.controller.type_text(text))
+
+    def launch_app(self, app_name: str) -> bool:
+        """Launch an app by name.
+
+        Returns:
+            True if app was launched successfully, False otherwise.
+        """
+        return self._run(self.controller.launch_app(app_name))
+
+    def press_home(self) -> None:
+        """Press the home button."""
+        self._run(self.controller.press_home())
+
+    def press_back(self) -> None:
+        """Press the back button."""
+        self._run(self.controller.press_back())
+
+    def get_current_app(self) -> str:
+        """Get the currently active app name.
+
+        Returns:
+            The app name, or "System Home" if on home screen.
+        """
+        return self._run(self.controller.get_current_app())
+
+    def capture_frame(self) -> np.ndarray:
+        """Capture a low-resolution grayscale frame for change detection.
+
+        Returns:
+            2-D uint8 luma array.
+        """
+        return self._run(self.controller.capture_frame())
+
+    def close(self) -> None:
+        """Close the controller and stop the device I/O loop."""
+        if not self._loop.is_running():
+            return
+        try:
+            self._run(self.controller.aclose())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def _run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the device I/O loop and wait for its result.
+
+        Returns:
+            The coroutine's result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+class _LoopBoundController:
+    """AsyncPlatformController that runs the wrapped calls on another loop."""
+
+    def __init__(
+        self, controller: AsyncPlatformController, loop: asyncio.AbstractEventLoop
+    ):
+        self._controller = controller
+        self._loop = loop
+
+    async def take_screenshot(self) -> Screenshot:
+        return await self._submit(self._controller.take_screenshot())
+
+    async def tap(self, x: int, y: int) -> None:
+        await self._submit(self._controller.tap(x, y))
+
+    async def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,
+    ) -> None:
+        await self._submit(
+            self._controller.swipe(start_x, start_y, end_x, end_y, duration)
+        )
+
+    async def type_text(self, text: str) -> None:
+        await self._submit(self._controller.type_text(text))
+
+    async def launch_app(self, app_name: str) -> bool:
+        return await self._submit(self._controller.launch_app(app_name))
+
+    async def press_home(self) -> None:
+        await self._submit(self._controller.press_home())
+
+    async def press_back(self) -> None:
+        await self._submit(self._controller.press_back())
+
+    async def get_current_app(self) -> str:
+        return await self._submit(self._controller.get_current_app())
+
+    async def capture_frame(self) -> np.ndarray:
+        return await self._submit(self._controller.capture_frame())
+
+    async def aclose(self) -> None:
+        await self._submit(self._controller.aclose())
+
+    async def _submit(self, coro: Coroutine[Any, Any, T]) -> T:
+        # Cancelling the wrapping future cancels the task on the device loop
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return await asyncio.wrap_future(future)
+
+
+class InterruptEvent(threading.Event):
+    """threading.Event that coroutines can await without polling.
+
+    set() may be called from any thread or from a signal handler; it wakes
+    every wait_async() caller on its own event loop.
+    """
+
+    def __init__(self) -> None:
+        """Initialize a cleared event."""
+        super().__init__()
+        self._waiters: set[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = set()
+
+    def set(self) -> None:
+        """Set the event and wake threads and coroutines waiting for it."""
+        super().set()
+        # No lock: a signal handler may interrupt a coroutine registering itself
+        for loop, future in tuple(self._waiters):
+            with contextlib.suppress(RuntimeError):  # Loop already closed
+                loop.call_soon_threadsafe(_resolve, future)
+
+    async def wait_async(self) -> None:
+        """Wait until the event is set."""
+        if self.is_set():
+            return
+        loop = asyncio.get_running_loop()
+        waiter = (loop, loop.create_future())
+        self._waiters.add(waiter)
+        try:
+            # set() may have run before the waiter was registered
+            if not self.is_set():
+                await waiter[1]
+        finally:
+            self._waiters.discard(waiter)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def create_async_controller(
+    config: PlatformConfig, app_packages: dict[str, str] | None = None
+) -> AsyncPlatformController:
+    """Factory function to create the appropriate async platform controller.
+
+    The platform is checked with verify_requirements first, which raises
+    ValueError for an unknown platform and RuntimeError if platform-specific
+    requirements are not met.
+
+    Args:
+        config: Platform configuration.
+        app_packages: Dictionary mapping app names to package/bundle IDs.
+
+    Returns:
+        Async controller (AsyncAndroidController or AsyncIOSController).
+    """
+    if verify_requirements(config) == "android":
+        return AsyncAndroidController(config)
+    return AsyncIOSController(config, app_packages)
+
+
+async def _run_host(
+    cmd: list[str],
+    timeout: float,  # noqa: ASYNC109
+) -> tuple[int, bytes, bytes]:
+    """Run a host command as an asyncio subprocess.
+
+    The process is killed if the call times out (raising TimeoutError) or is
+    cancelled, so an abandoned screencap does not keep streaming in the
+    background. OSError is raised if the command cannot be started.
+
+    Args:
+        cmd: Command and arguments.
+        timeout: Timeout in seconds.
+
+    Returns:
+        Tuple of (return code, stdout, stderr).
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        async with asyncio.timeout(timeout):
+            stdout, stderr = await process.communicate()
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await asyncio.shield(process.wait())
+        raise
+    return process.returncode, stdout, stderr
@@ -0,0 +1,422 @@
+"""Device pool for running phone tasks on several devices at once.
+
+A ``DevicePool`` holds the connected Android and iOS devices and lends each task
+a free one, chosen by platform, affinity label or installed app. A device runs
+one task at a time; tasks that find no free matching device wait for one:
+
+    >>> pool = DevicePool.discover(labels={"emulator-5554": ["rack-a"]})
+    >>> with pool.acquire(labels=["rack-a"], app="微信") as lease:
+    ...     run_task(lease.device)
+    >>> print(pool.report())
+"""
+
+import statistics
+import threading
+import time
+from collections.abc import Callable, Generator, Iterable
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from deepagents_cli.middleware.autoglm import adb_controller, apps
+from deepagents_cli.middleware.autoglm.ios import connection as ios_connection
+
+DEVICE_PLATFORMS = ("android", "ios")
+
+# How often a waiting task checks its interrupt flag
+_INTERRUPT_POLL_INTERVAL = 0.1
+
+
+@dataclass
+class PooledDevice:
+    """A device in the pool and its usage counters."""
+
+    device_id: str
+    """ADB serial or iOS UDID."""
+
+    platform: str
+    """'android' or 'ios'."""
+
+    labels: frozenset[str] = frozenset()
+    """Affinity labels used to route tasks to this device."""
+
+    model: str | None = None
+
+    wda_url: str | None = None
+    """WebDriverAgent URL (iOS only)."""
+
+    busy: bool = False
+    tasks: int = 0
+    """Number of tasks started on the device."""
+
+    busy_seconds: float = 0.0
+    """Total time spent running finished tasks."""
+
+    busy_since: float | None = field(default=None, repr=False)
+
+    def busy_time(self, now: float) -> float:
+        """Time spent running tasks, including the current one.
+
+        Args:
+            now: Current time.monotonic() value.
+
+        Returns:
+            Busy time in seconds.
+        """
+        if self.busy_since is None:
+            return self.busy_seconds
+        return self.busy_seconds + now - self.busy_since
+
+
+@dataclass(frozen=True)
+class DeviceLease:
+    """A device lent to one task."""
+
+    device: PooledDevice
+    queue_wait: float
+    """Seconds the task waited for a free device."""
+
+
+class DevicePool:
+    """Schedules tasks onto free devices, one task per device."""
+
+    def __init__(
+        self,
+        devices: Iterable[PooledDevice],
+        *,
+        installed_apps: Callable[[PooledDevice], set[str] | None] | None = None,
+    ) -> None:
+        """Initialize the pool.
+
+        Args:
+            devices: Devices to schedule tasks on.
+            installed_apps: Returns the package names / bundle IDs installed on a
+                device, or None if unknown. Defaults to querying the device.
+        """
+        self.devices = {device.device_id: device for device in devices}
+        self._installed_apps = installed_apps or list_installed_apps
+        self._app_cache: dict[str, set[str] | None] = {}
+        self._free = threading.Condition()
+        self._queue_waits: list[float] = []
+        self._waiting = 0
+        self._started = time.monotonic()
+
+    @classmethod
+    def discover(
+        cls,
+        labels: dict[str, list[str]] | None = None,
+        wda_urls: dict[str, str] | None = None,
+        default_wda_url: str = "http://localhost:8100",
+    ) -> "DevicePool":
+        """Build a pool from the connected Android and iOS devices.
+
+        Args:
+            labels: Affinity labels per device ID.
+            wda_urls: WebDriverAgent URL per iOS UDID. Each device needs its own
+                WDA port; devices without an entry use default_wda_url.
+            default_wda_url: WDA URL for iOS devices without an entry.
+
+        Returns:
+            The pool (empty if no devices are connected).
+        """
+        labels = labels or {}
+        wda_urls = wda_urls or {}
+        devices = []
+
+        if adb_controller.check_adb_available():
+            devices.extend(
+                PooledDevice(
+                    device_id=info.device_id,
+                    platform="android",
+                    labels=frozenset(labels.get(info.device_id, ())),
+                    model=info.model,
+                )
+                for info in adb_controller.list_devices()
+                if info.status == "device"  # Skip offline/unauthorized devices
+            )
+
+        if ios_connection.check_libimobiledevice():
+            devices.extend(
+                PooledDevice(
+                    device_id=info.device_id,
+                    platform="ios",
+                    labels=frozenset(labels.get(info.device_id, ())),
+                    model=info.device_name or info.model,
+                    wda_url=wda_urls.get(info.device_id, default_wda_url),
+                )
+                for info in ios_connection.list_devices()
+            )
+
+        return cls(devices)
+
+    @contextmanager
+    def acquire(
+        self,
+        platform: str | None = None,
+        labels: Iterable[str] = (),
+        app: str | None = None,
+        *,
+        timeout: float | None = None,
+        interrupt: threading.Event | None = None,
+    ) -> Generator[DeviceLease]:
+        """Borrow a free device matching the requirements for a block.
+
+        Args:
+            platform: Required platform ('android' or 'ios').
+            labels: Labels the device must all have.
+            app: App (display name, package name or bundle ID) that must be
+                installed. Devices whose apps cannot be listed are not excluded.
+            timeout: Maximum seconds to wait for a free device.
+            interrupt: Stop waiting when this event is set.
+
+        Yields:
+            The lease; the device is returned to the pool when the block exits.
+        """
+        lease = self.checkout(
+            platform, labels, app, timeout=timeout, interrupt=interrupt
+        )
+        try:
+            yield lease
+        finally:
+            self.release(lease.device)
+
+    def checkout(
+        self,
+        platform: str | None = None,
+        labels: Iterable[str] = (),
+        app: str | None = None,
+        *,
+        timeout: float | None = None,
+        interrupt: threading.Event | None = None,
+    ) -> DeviceLease:
+        """Wait for a free device matching the requirements and mark it busy.
+
+        Pair with release(), or use acquire(). Among free devices, the
+        least used one is picked to spread wear across the rack.
+
+        Args:
+            platform: Required platform ('android' or 'ios').
+            labels: Labels the device must all have.
+            app: App that must be installed (see acquire).
+            timeout: Maximum seconds to wait for a free device.
+            interrupt: Stop waiting when this event is set.
+
+        Returns:
+            The lease.
+
+        Raises:
+            ValueError: If platform is unknown.
+            RuntimeError: If no device in the pool matches the requirements.
+            TimeoutError: If no matching device became free in time.
+            KeyboardInterrupt: If the interrupt event was set while waiting.
+        """
+        if platform is not None:
+            platform = platform.lower()
+            if platform not in DEVICE_PLATFORMS:
+                msg = (
+                    f"Unknown platform: {platform}. "
+                    f"Must be one of {', '.join(DEVICE_PLATFORMS)}."
+                )
+                raise ValueError(msg)
+        required = frozenset(labels)
+        candidates = [
+            device
+            for device in self.devices.values()
+            if (platform is None or device.platform == platform)
+            and required <= device.labels
+            and (app is None or self.has_app(device, app))
+        ]
+        if not candidates:
+            msg = f"No device in the pool matches {_describe(platform, required, app)}"
+            raise RuntimeError(msg)
+
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        with self._free:
+            self._waiting += 1
+            try:
+                while True:
+                    free = [device for device in candidates if not device.busy]
+                    if free:
+                        break
+                    if interrupt is not None and interrupt.is_set():
+                        msg = "Interrupted while waiting for a device"
+                        raise KeyboardInterrupt(msg)
+                    wait = None
+                    if deadline is not None:
+                        wait = deadline - time.monotonic()
+                        if wait <= 0:
+                            msg = (
+                                f"No device matching "
+                                f"{_describe(platform, required, app)} "
+                                f"became free within {timeout}s"
+                            )
+                            raise TimeoutError(msg)
+                    if interrupt is not None and (
+                        wait is None or wait > _INTERRUPT_POLL_INTERVAL
+                    ):
+                        wait = _INTERRUPT_POLL_INTERVAL
+                    self._free.wait(wait)
+            finally:
+                self._waiting -= 1
+
+            now = time.monotonic()
+            device = min(free, key=lambda d: (d.busy_time(now), d.tasks))
+            device.busy = True
+            device.busy_since = now
+            device.tasks += 1
+            queue_wait = now - start
+            self._queue_waits.append(queue_wait)
+        return DeviceLease(device, queue_wait)
+
+    def release(self, device: PooledDevice) -> None:
+        """Return a device to the pool and wake waiting tasks.
+
+        Args:
+            device: Device returned by checkout().
+        """
+        with self._free:
+            if device.busy_since is not None:
+                device.busy_seconds += time.monotonic() - device.busy_since
+            device.busy = False
+            device.busy_since = None
+            self._free.notify_all()
+
+    def has_app(self, device: PooledDevice, app: str) -> bool:
+        """Check whether an app is installed on a device.
+
+        The installed apps are listed once per device and cached.
+
+        Args:
+            device: Device to check.
+            app: App display name, package name or bundle ID.
+
+        Returns:
+            False only if the device's apps are known and the app is not among them.
+        """
+        if device.device_id not in self._app_cache:
+            self._app_cache[device.device_id] = self._installed_apps(device)
+        installed = self._app_cache[device.device_id]
+        if installed is None:
+            return True
+        if device.platform == "ios":
+            app_id = apps.find_bundle_id(app)
+        else:
+            app_id = apps.find_package_name(app)
+        return (app_id or app) in installed
+
+    def stats(self) -> dict[str, Any]:
+        """Queue wait and utilization figures.
+
+        Returns:
+            Dictionary with the number of waiting tasks, queue wait percentiles in
+            seconds, and per-device task counts and utilization (busy fraction of
+            the pool's lifetime).
+        """
+        with self._free:
+            now = time.monotonic()
+            uptime = max(now - self._started, 1e-9)
+            waits = sorted(self._queue_waits)
+            devices = {
+                device.device_id: {
+                    "platform": device.platform,
+                    "busy": device.busy,
+                    "tasks": device.tasks,
+                    "utilization": round(device.busy_time(now) / uptime, 3),
+                }
+                for device in self.devices.values()
+            }
+            waiting = self._waiting
+
+        return {
+            "waiting": waiting,
+            "tasks": len(waits),
+            "queue_wait_p50": round(statistics.median(waits), 3) if waits else 0.0,
+            "queue_wait_max": round(waits[-1], 3) if waits else 0.0,
+            "devices": devices,
+        }
+
+    def report(self) -> str:
+        """Format stats() as a short human-readable report.
+
+        Returns:
+            Multi-line report.
+        """
+        stats = self.stats()
+        header = (
+            f"Device pool: {len(self.devices)} devices, {stats['tasks']} tasks, "
+            f"{stats['waiting']} waiting, queue wait p50 "
+            f"{stats['queue_wait_p50']:.2f}s / max {stats['queue_wait_max']:.2f}s"
+        )
+        lines = [header]
+        for device_id, device in stats["devices"].items():
+            state = "busy" if device["busy"] else "idle"
+            lines.append(
+                f"  {device_id} ({device['platform']}, {state}): "
+                f"{device['tasks']} tasks, {device['utilization']:.0%} utilized"
+            )
+        return "\n".join(lines)
+
+
+def list_installed_apps(device: PooledDevice) -> set[str] | None:
+    """List the package names / bundle IDs installed on a device.
+
+    Args:
+        device: Device to query.
+
+    Returns:
+        Set of app IDs, or None if they could not be listed.
+    """
+    if device.platform == "ios":
+        return ios_connection.list_installed_apps(device.device_id)
+    return adb_controller.list_packages(device.device_id)
+
+
+def parse_device_map(spec: str | None) -> dict[str, str]:
+    """Parse a "device=value;device=value" setting.
+
+    Args:
+        spec: Setting value; None or empty gives an empty map.
+
+    Returns:
+        Values keyed by device ID.
+
+    Raises:
+        ValueError: If an entry has no "=".
+    """
+    mapping = {}
+    for entry in (spec or "").split(";"):
+        if not entry.strip():
+            continue
+        device_id, sep, value = entry.partition("=")
+        if not sep or not device_id.strip():
+            msg = f"Invalid device entry: {entry!r}. Expected <device id>=<value>."
+            raise ValueError(msg)
+        mapping[device_id.strip()] = value.strip()
+    return mapping
+
+
+def parse_device_labels(spec: str | None) -> dict[str, list[str]]:
+    """Parse a "device=label,label;device=label" setting.
+
+    Args:
+        spec: Setting value; None or empty gives an empty map.
+
+    Returns:
+        Labels keyed by device ID.
+    """
+    return {
+        device_id: [label.strip() for label in value.split(",") if label.strip()]
+        for device_id, value in parse_device_map(spec).items()
+    }
+
+
+def _describe(platform: str | None, labels: frozenset[str], app: str | None) -> str:
+    parts = []
+    if platform:
+        parts.append(f"platform={platform}")
+    if labels:
+        parts.append(f"labels={','.join(sorted(labels))}")
+    if app:
+        parts.append(f"app={app}")
+    return " ".join(parts) or "any device"
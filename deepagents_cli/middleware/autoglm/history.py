@@ -0,0 +1,238 @@
+"""Token-budgeted conversation history for the phone_task step loop.
+
+Every step adds a screen turn and an assistant reply. Resending the whole
+conversation makes prefill cost grow quadratically over a long task. This module
+keeps the system prompt, the task message and the most recent turns verbatim,
+and folds older turns into a compact rolling summary of the actions taken.
+
+Token counts are estimates (no tokenizer is loaded): CJK characters count as one
+token each, other text as one token per four characters, and each image as a
+fixed cost.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any
+
+DEFAULT_KEEP_TURNS = 8
+DEFAULT_MAX_TOKENS = 16000
+MAX_SUMMARY_LINES = 30
+
+# Rough per-image cost for vision models that tile screenshots into patches
+IMAGE_TOKEN_ESTIMATE = 1000
+
+# First code point of the CJK blocks, where one character is about one token
+_WIDE_CHAR_START = 0x2E80
+
+# Fixed overhead per message for role markers and separators
+_MESSAGE_OVERHEAD = 4
+
+_SUMMARY_HEADER = {
+    "zh": "** 之前的操作（摘要） **",
+    "en": "** Earlier Actions (Summary) **",
+}
+
+_OMITTED = {
+    "zh": "（省略了更早的 {count} 步）",
+    "en": "({count} earlier steps omitted)",
+}
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the token count of a string.
+
+    Args:
+        text: Text to measure.
+
+    Returns:
+        Estimated number of tokens.
+    """
+    wide = sum(1 for char in text if ord(char) >= _WIDE_CHAR_START)
+    return wide + math.ceil((len(text) - wide) / 4)
+
+
+def estimate_message_tokens(message: dict[str, Any]) -> int:
+    """Estimate the token count of a chat message.
+
+    Args:
+        message: Message dict with "role" and "content" (string or content list).
+
+    Returns:
+        Estimated number of tokens.
+    """
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return _MESSAGE_OVERHEAD + estimate_text_tokens(content)
+
+    tokens = _MESSAGE_OVERHEAD
+    for item in content:
+        if item.get("type") == "text":
+            tokens += estimate_text_tokens(item.get("text", ""))
+        else:
+            tokens += IMAGE_TOKEN_ESTIMATE
+    return tokens
+
+
+def estimate_tokens(messages: list[dict[str, Any]]) -> int:
+    """Estimate the token count of a list of chat messages.
+
+    Returns:
+        Estimated number of tokens.
+    """
+    return sum(estimate_message_tokens(message) for message in messages)
+
+
+@dataclass
+class _Turn:
+    """Messages of one step, closed by the assistant reply."""
+
+    messages: list[dict[str, Any]] = field(default_factory=list)
+    summary: str | None = None  # One-line description used once folded
+
+
+class MessageHistory:
+    """Conversation history with a rolling summary of older turns.
+
+    Args:
+        system_prompt: System prompt, always sent first.
+        keep_turns: Number of most recent turns kept verbatim. None keeps all.
+        max_tokens: Estimated token budget for the whole prompt. When exceeded,
+            older turns are folded into the summary until it fits, always
+            keeping at least the latest turn. None disables the budget.
+        lang: Language of the summary header ("zh" or "en").
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        keep_turns: int | None = DEFAULT_KEEP_TURNS,
+        max_tokens: int | None = DEFAULT_MAX_TOKENS,
+        lang: str = "zh",
+    ) -> None:
+        """Initialize an empty history."""
+        self.system_message = {"role": "system", "content": system_prompt}
+        self.keep_turns = keep_turns
+        self.max_tokens = max_tokens
+        self.lang = lang if lang in _SUMMARY_HEADER else "zh"
+
+        self._task_message: dict[str, Any] | None = None
+        self._turns: list[_Turn] = [_Turn()]
+        self._summary_lines: list[str] = []
+        self._omitted = 0
+        self._folded_turns = 0
+
+    @property
+    def folded_turns(self) -> int:
+        """Number of turns folded into the summary so far."""
+        return self._folded_turns
+
+    def add_user(
+        self, content: str | list[dict[str, Any]], *, pinned: bool = False
+    ) -> None:
+        """Append a user message to the current turn.
+
+        Args:
+            content: Message content.
+            pinned: Keep this message (the one carrying the task) for the whole
+                conversation instead of adding it to the current turn.
+        """
+        message = {"role": "user", "content": content}
+        if pinned:
+            self._task_message = message
+            return
+        self._turns[-1].messages.append(message)
+
+    def add_assistant(self, content: str, summary: str | None = None) -> None:
+        """Append the assistant reply, closing the current turn.
+
+        Args:
+            content: Assistant message content.
+            summary: One-line description of the step, used when the turn is
+                folded into the rolling summary. Defaults to the first line of
+                the content.
+        """
+        turn = self._turns[-1]
+        turn.messages.append({"role": "assistant", "content": content})
+        turn.summary = summary or content.strip().splitlines()[0][:200]
+        self._turns.append(_Turn())
+        self._compact()
+
+    def strip_images(self) -> None:
+        """Remove images from the latest message, keeping only its text."""
+        message = self._latest_message()
+        if message is not None and isinstance(message.get("content"), list):
+            message["content"] = [
+                item for item in message["content"] if item.get("type") == "text"
+            ]
+
+    def messages(self) -> list[dict[str, Any]]:
+        """Build the prompt, folding old turns until it fits the token budget.
+
+        Returns:
+            Messages to send to the model.
+        """
+        messages = self._build()
+        if self.max_tokens is None:
+            return messages
+        while estimate_tokens(messages) > self.max_tokens and self._fold_oldest():
+            messages = self._build()
+        return messages
+
+    def _build(self) -> list[dict[str, Any]]:
+        messages = [self.system_message]
+        if self._task_message is not None:
+            messages.append(self._task_message)
+        summary = self._summary_message()
+        if summary is not None:
+            messages.append(summary)
+        for turn in self._turns:
+            messages.extend(turn.messages)
+        return messages
+
+    def _summary_message(self) -> dict[str, Any] | None:
+        if not self._summary_lines:
+            return None
+        lines = [_SUMMARY_HEADER[self.lang]]
+        if self._omitted:
+            lines.append(_OMITTED[self.lang].format(count=self._omitted))
+        lines.extend(self._summary_lines)
+        return {"role": "user", "content": "\n".join(lines)}
+
+    def _compact(self) -> None:
+        """Fold closed turns beyond keep_turns into the summary."""
+        if self.keep_turns is None:
+            return
+        while self._closed_turns() > self.keep_turns and self._fold_oldest():
+            pass
+
+    def _closed_turns(self) -> int:
+        return sum(1 for turn in self._turns if turn.summary is not None)
+
+    def _fold_oldest(self) -> bool:
+        """Fold the oldest closed turn into the summary.
+
+        The most recent turn (closed or still open) is never folded.
+
+        Returns:
+            True if a turn was folded.
+        """
+        # The last turn is always the open one; when it is still empty the latest
+        # closed turn has to stay instead
+        foldable = len(self._turns) - 1
+        if not self._turns[-1].messages:
+            foldable -= 1
+        if foldable < 1:
+            return False
+        turn = self._turns.pop(0)
+        self._folded_turns += 1
+        self._summary_lines.append(f"{self._folded_turns}. {turn.summary}")
+        if len(self._summary_lines) > MAX_SUMMARY_LINES:
+            self._summary_lines.pop(0)
+            self._omitted += 1
+        return True
+
+    def _latest_message(self) -> dict[str, Any] | None:
+        for turn in reversed(self._turns):
+            if turn.messages:
+                return turn.messages[-1]
+        return self._task_message
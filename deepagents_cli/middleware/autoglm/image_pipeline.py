@@ -0,0 +1,147 @@
+"""Screenshot preparation for the vision model.
+
+Device screenshots are full-resolution PNGs (1080x2400 or larger), which makes every
+step upload megabytes of base64 and inflates model prefill. This module downscales
+and re-encodes a screenshot once per step into a model-friendly format.
+
+Coordinates are unaffected: the model answers in 0-999 relative space, which the
+middleware maps back onto the original device resolution.
+"""
+
+import base64
+from dataclasses import dataclass
+from io import BytesIO
+
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+
+SUPPORTED_FORMATS = ("png", "jpeg", "webp")
+
+
+@dataclass
+class EncodedImage:
+    """A screenshot encoded for the vision model."""
+
+    base64_data: str
+    format: str  # "png", "jpeg" or "webp"
+    width: int
+    height: int
+    original_bytes: int
+    encoded_bytes: int
+
+    @property
+    def bytes_saved(self) -> int:
+        """Bytes saved compared to sending the original screenshot."""
+        return self.original_bytes - self.encoded_bytes
+
+    def to_message_content(self) -> dict:
+        """Convert to LangChain message content format.
+
+        Returns:
+            Dict with type and image_url for multimodal messages.
+        """
+        return {
+            "type": "image_url",
+            "image_url": {"url": f"data:image/{self.format};base64,{self.base64_data}"},
+        }
+
+
+def validate_format(image_format: str) -> str:
+    """Normalize and validate an output format name.
+
+    Args:
+        image_format: Format name, case-insensitive ("jpg" is accepted for "jpeg").
+
+    Returns:
+        The normalized format name.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    normalized = image_format.lower()
+    if normalized == "jpg":
+        normalized = "jpeg"
+    if normalized not in SUPPORTED_FORMATS:
+        msg = (
+            f"Unsupported screenshot format: {image_format}. "
+            f"Must be one of {', '.join(SUPPORTED_FORMATS)}."
+        )
+        raise ValueError(msg)
+    return normalized
+
+
+def prepare_for_model(
+    screenshot: Screenshot,
+    max_edge: int | None = None,
+    image_format: str = "png",
+    quality: int = 85,
+) -> EncodedImage:
+    """Downscale and encode a screenshot for the vision model.
+
+    When the output would be identical to the capture (same format, no resize
+    needed) the original base64 payload is passed through without decoding.
+
+    Args:
+        screenshot: Captured screenshot (PNG payload, or JPEG for MJPEG frames).
+        max_edge: Maximum length of the long edge in pixels. None keeps the
+            original resolution.
+        image_format: Output format: "png", "jpeg" or "webp".
+        quality: Encoder quality for JPEG/WebP (1-100). Ignored for PNG.
+
+    Returns:
+        The encoded image with size accounting.
+    """
+    image_format = validate_format(image_format)
+    original_bytes = _decoded_length(screenshot.base64_data)
+    width, height = screenshot.width, screenshot.height
+
+    needs_resize = max_edge is not None and max(width, height) > max_edge
+    if image_format == screenshot.format and not needs_resize:
+        return EncodedImage(
+            base64_data=screenshot.base64_data,
+            format=image_format,
+            width=width,
+            height=height,
+            original_bytes=original_bytes,
+            encoded_bytes=original_bytes,
+        )
+
+    img = screenshot.image
+    if img is None:
+        img = Image.open(BytesIO(base64.b64decode(screenshot.base64_data)))
+
+    if needs_resize:
+        scale = max_edge / max(img.size)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        # reducing_gap lets PIL box-reduce first, then resample the small image
+        img = img.resize(size, Image.Resampling.BICUBIC, reducing_gap=2.0)
+
+    if img.mode not in {"RGB", "L"}:
+        img = img.convert("RGB")
+
+    buffered = BytesIO()
+    if image_format == "png":
+        img.save(buffered, format="PNG")
+    else:
+        img.save(buffered, format=image_format.upper(), quality=quality)
+    data = buffered.getvalue()
+
+    return EncodedImage(
+        base64_data=base64.b64encode(data).decode("utf-8"),
+        format=image_format,
+        width=img.width,
+        height=img.height,
+        original_bytes=original_bytes,
+        encoded_bytes=len(data),
+    )
+
+
+def _decoded_length(base64_data: str) -> int:
+    """Compute the decoded size of a base64 string without decoding it.
+
+    Returns:
+        Number of bytes the payload decodes to.
+    """
+    padding = len(base64_data) - len(base64_data.rstrip("="))
+    return len(base64_data) * 3 // 4 - padding
@@ -21,7 +21,9 @@ from .device import (
     tap,
 )
 from .input import clear_text, type_text
+from .mjpeg import MjpegStream
 from .screenshot import get_screenshot
+from .wda_client import AsyncWDAClient, WDAClient, get_client
 
 __all__ = [
     # Connection
@@ -29,6 +31,9 @@ __all__ = [
     "list_devices",
     "check_libimobiledevice",
     "is_wda_ready",
+    "WDAClient",
+    "AsyncWDAClient",
+    "get_client",
     # Device control
     "tap",
     "double_tap",
@@ -40,6 +45,7 @@ __all__ = [
     "get_current_app",
     # Screenshot
     "get_screenshot",
+    "MjpegStream",
     # Input
     "type_text",
     "clear_text",
@@ -4,6 +4,8 @@ import subprocess
 from dataclasses import dataclass
 from enum import Enum
 
+from .wda_client import get_client
+
 
 class ConnectionType(Enum):
     """Type of iOS connection."""
@@ -195,21 +197,7 @@ class XCTestConnection:
         Returns:
             True if WDA is ready, False otherwise.
         """
-        try:
-            import requests
-
-            response = requests.get(
-                f"{self.wda_url}/status",
-                timeout=timeout,
-                verify=False,
-                proxies={"http": None, "https": None},
-            )
-            return response.status_code == 200
-        except ImportError:
-            print("Error: requests library not found. Install it: pip install requests")
-            return False
-        except Exception:
-            return False
+        return get_client(self.wda_url).is_ready(timeout=timeout)
 
     def start_wda_session(self) -> tuple[bool, str]:
         """Start a new WebDriverAgent session.
@@ -218,31 +206,12 @@ class XCTestConnection:
             Tuple of (success, session_id or error_message).
         """
         try:
-            import requests
-
-            response = requests.post(
-                f"{self.wda_url}/session",
-                json={"capabilities": {}},
-                timeout=30,
-                verify=False,
-                proxies={"http": None, "https": None},
-            )
-
-            if response.status_code in (200, 201):
-                data = response.json()
-                session_id = data.get("sessionId") or data.get("value", {}).get(
-                    "sessionId"
-                )
-                return True, session_id or "session_started"
-            return False, f"Failed to start session: {response.text}"
-
-        except ImportError:
-            return (
-                False,
-                "requests library not found. Install it: pip install requests",
-            )
+            session_id = get_client(self.wda_url).start_session()
+        except RuntimeError as e:
+            return False, str(e)
         except Exception as e:
             return False, f"Error starting WDA session: {e}"
+        return True, session_id or "session_started"
 
     def get_wda_status(self) -> dict | None:
         """Get WebDriverAgent status information.
@@ -251,14 +220,7 @@ class XCTestConnection:
             Status dictionary or None if not available.
         """
         try:
-            import requests
-
-            response = requests.get(
-                f"{self.wda_url}/status",
-                timeout=5,
-                verify=False,
-                proxies={"http": None, "https": None},
-            )
+            response = get_client(self.wda_url).get("status", timeout=5)
 
             if response.status_code == 200:
                 return response.json()
@@ -371,6 +333,37 @@ def list_devices() -> list[DeviceInfo]:
     return conn.list_devices()
 
 
+def list_installed_apps(device_id: str | None = None) -> set[str] | None:
+    """List the bundle IDs of user-installed apps.
+
+    Args:
+        device_id: Device UDID. If None, uses the only connected device.
+
+    Returns:
+        Set of bundle IDs, or None if they could not be listed.
+
+    Note:
+        Requires ideviceinstaller (brew install ideviceinstaller).
+    """
+    command = ["ideviceinstaller", "-l"]
+    if device_id:
+        command += ["-u", device_id]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+
+    # Lines look like: com.example.App, "1.0", "Example"
+    bundle_ids = set()
+    for line in result.stdout.splitlines():
+        bundle_id = line.split(",", 1)[0].strip()
+        if "." in bundle_id and " " not in bundle_id:
+            bundle_ids.add(bundle_id)
+    return bundle_ids
+
+
 def check_libimobiledevice() -> bool:
     """Check if libimobiledevice tools are available.
 
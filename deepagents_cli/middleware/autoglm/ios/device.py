@@ -1,71 +1,161 @@
 """Device control utilities for iOS automation via WebDriverAgent."""
 
 import time
+from typing import Any
+
+from .wda_client import WDAClient, get_client
 
 SCALE_FACTOR = 3  # 3 for most modern iPhone
 
+# Swipe from the left edge, which iOS treats as a back gesture in most apps
+BACK_GESTURE = {"fromX": 0, "fromY": 640, "toX": 400, "toY": 640, "duration": 0.3}
+
+
+def tap_actions(x: int, y: int) -> dict[str, Any]:
+    """Build the W3C WebDriver Actions payload for a tap.
+
+    Args:
+        x: X coordinate in screenshot pixels.
+        y: Y coordinate in screenshot pixels.
+
+    Returns:
+        Request body for the ``actions`` endpoint.
+    """
+    return {
+        "actions": [
+            {
+                "type": "pointer",
+                "id": "finger1",
+                "parameters": {"pointerType": "touch"},
+                "actions": [
+                    {
+                        "type": "pointerMove",
+                        "duration": 0,
+                        "x": x / SCALE_FACTOR,
+                        "y": y / SCALE_FACTOR,
+                    },
+                    {"type": "pointerDown", "button": 0},
+                    {"type": "pause", "duration": 0.1},
+                    {"type": "pointerUp", "button": 0},
+                ],
+            }
+        ]
+    }
+
+
+def drag_payload(
+    start_x: int,
+    start_y: int,
+    end_x: int,
+    end_y: int,
+    duration: float | None = None,
+) -> dict[str, Any]:
+    """Build the ``wda/dragfromtoforduration`` payload for a swipe.
+
+    Args:
+        start_x: Starting X coordinate in screenshot pixels.
+        start_y: Starting Y coordinate in screenshot pixels.
+        end_x: Ending X coordinate in screenshot pixels.
+        end_y: Ending Y coordinate in screenshot pixels.
+        duration: Duration of swipe in seconds (auto-calculated if None).
 
-def _get_wda_session_url(wda_url: str, session_id: str | None, endpoint: str) -> str:
-    """Get the correct WDA URL for a session endpoint.
+    Returns:
+        Request body with the duration in seconds under "duration".
+    """
+    if duration is None:
+        # Calculate duration based on distance
+        dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
+        duration = dist_sq / 1000000  # Convert to seconds
+        duration = max(0.3, min(duration, 2.0))  # Clamp between 0.3-2 seconds
+
+    return {
+        "fromX": start_x / SCALE_FACTOR,
+        "fromY": start_y / SCALE_FACTOR,
+        "toX": end_x / SCALE_FACTOR,
+        "toY": end_y / SCALE_FACTOR,
+        "duration": duration,
+    }
+
+
+def resolve_bundle_id(
+    app_name: str, app_packages: dict[str, str] | None = None
+) -> str | None:
+    """Resolve an app name to its bundle ID.
 
     Args:
-        wda_url: Base WDA URL.
-        session_id: Optional session ID.
-        endpoint: The endpoint path.
+        app_name: The app name. Matched exactly against app_packages when given,
+            otherwise resolved (with fuzzy matching) by the built-in app index.
+        app_packages: Optional dictionary mapping app names to bundle IDs.
 
     Returns:
-        Full URL for the endpoint.
+        The bundle ID, or None if the app is unknown.
     """
-    base = wda_url.rstrip("/")
-    if session_id:
-        return f"{base}/session/{session_id}/{endpoint}"
-    # Try to use WDA endpoints without session when possible
-    return f"{base}/{endpoint}"
+    if app_packages is None:
+        from deepagents_cli.middleware.autoglm.apps import find_bundle_id
+
+        return find_bundle_id(app_name)
+    return app_packages.get(app_name)
+
+
+def app_name_for_bundle(
+    bundle_id: str, app_packages: dict[str, str] | None = None
+) -> str:
+    """Map the bundle ID reported by ``wda/activeAppInfo`` to an app name.
+
+    Args:
+        bundle_id: Bundle ID of the active app (may be empty).
+        app_packages: Optional dictionary mapping app names to bundle IDs. If None,
+            the built-in app index is used.
+
+    Returns:
+        The app name if recognized, otherwise "System Home".
+    """
+    if bundle_id and app_packages is None:
+        from deepagents_cli.middleware.autoglm.apps import get_ios_app_name
+
+        app_name = get_ios_app_name(bundle_id)
+        if app_name:
+            return app_name
+    elif bundle_id and app_packages:
+        # Try to find app name from bundle ID
+        for app_name, package in app_packages.items():
+            if package == bundle_id:
+                return app_name
+
+    return "System Home"
 
 
 def get_current_app(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     app_packages: dict[str, str] | None = None,
+    client: WDAClient | None = None,
 ) -> str:
     """Get the currently active app bundle ID and name.
 
     Args:
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
-        app_packages: Optional dictionary mapping app names to bundle IDs.
+        app_packages: Optional dictionary mapping app names to bundle IDs. If None,
+            the built-in app index is used.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         The app name if recognized, otherwise "System Home".
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
         # Get active app info from WDA using activeAppInfo endpoint
-        response = requests.get(
-            f"{wda_url.rstrip('/')}/wda/activeAppInfo",
-            timeout=5,
-            verify=False,
-            proxies={"http": None, "https": None},
-        )
+        response = client.get("wda/activeAppInfo", timeout=5)
 
         if response.status_code == 200:
             data = response.json()
             # Extract bundle ID from response
             # Response format: {"value": {"bundleId": "com.apple.AppStore", "name": "", "pid": 825, "processArguments": {...}}, "sessionId": "..."}
             value = data.get("value", {})
-            bundle_id = value.get("bundleId", "")
-
-            if bundle_id and app_packages:
-                # Try to find app name from bundle ID
-                for app_name, package in app_packages.items():
-                    if package == bundle_id:
-                        return app_name
-
-            return "System Home"
+            return app_name_for_bundle(value.get("bundleId", ""), app_packages)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error getting current app: {e}")
 
@@ -78,6 +168,7 @@ def tap(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Tap at the specified coordinates using WebDriver W3C Actions API.
 
@@ -87,46 +178,21 @@ def tap(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after tap.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
-        url = _get_wda_session_url(wda_url, session_id, "actions")
-
-        # W3C WebDriver Actions API for tap/click
-        actions = {
-            "actions": [
-                {
-                    "type": "pointer",
-                    "id": "finger1",
-                    "parameters": {"pointerType": "touch"},
-                    "actions": [
-                        {
-                            "type": "pointerMove",
-                            "duration": 0,
-                            "x": x / SCALE_FACTOR,
-                            "y": y / SCALE_FACTOR,
-                        },
-                        {"type": "pointerDown", "button": 0},
-                        {"type": "pause", "duration": 0.1},
-                        {"type": "pointerUp", "button": 0},
-                    ],
-                }
-            ]
-        }
-
-        requests.post(
-            url,
-            json=actions,
+        client.post(
+            "actions",
+            json=tap_actions(x, y),
+            session_id=session_id,
+            scoped=True,
             timeout=15,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error tapping: {e}")
 
@@ -137,6 +203,7 @@ def double_tap(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Double tap at the specified coordinates using WebDriver W3C Actions API.
 
@@ -146,11 +213,10 @@ def double_tap(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after double tap.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "actions")
+        client = client or get_client(wda_url)
 
         # W3C WebDriver Actions API for double tap
         actions = {
@@ -178,18 +244,12 @@ def double_tap(
             ]
         }
 
-        requests.post(
-            url,
-            json=actions,
-            timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
+        client.post(
+            "actions", json=actions, session_id=session_id, scoped=True, timeout=10
         )
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error double tapping: {e}")
 
@@ -201,6 +261,7 @@ def long_press(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Long press at the specified coordinates using WebDriver W3C Actions API.
 
@@ -211,11 +272,10 @@ def long_press(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after long press.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "actions")
+        client = client or get_client(wda_url)
 
         # W3C WebDriver Actions API for long press
         # Convert duration to milliseconds
@@ -242,12 +302,16 @@ def long_press(
             ]
         }
 
-        requests.post(url, json=actions, timeout=int(duration + 10), verify=False)
+        client.post(
+            "actions",
+            json=actions,
+            session_id=session_id,
+            scoped=True,
+            timeout=duration + 10,
+        )
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error long pressing: {e}")
 
@@ -261,6 +325,7 @@ def swipe(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Swipe from start to end coordinates using WDA dragfromtoforduration endpoint.
 
@@ -273,39 +338,23 @@ def swipe(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after swipe.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        if duration is None:
-            # Calculate duration based on distance
-            dist_sq = (start_x - end_x) ** 2 + (start_y - end_y) ** 2
-            duration = dist_sq / 1000000  # Convert to seconds
-            duration = max(0.3, min(duration, 2.0))  # Clamp between 0.3-2 seconds
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
-
-        # WDA dragfromtoforduration API payload
-        payload = {
-            "fromX": start_x / SCALE_FACTOR,
-            "fromY": start_y / SCALE_FACTOR,
-            "toX": end_x / SCALE_FACTOR,
-            "toY": end_y / SCALE_FACTOR,
-            "duration": duration,
-        }
+        client = client or get_client(wda_url)
+
+        payload = drag_payload(start_x, start_y, end_x, end_y, duration)
 
-        requests.post(
-            url,
+        client.post(
+            "wda/dragfromtoforduration",
             json=payload,
-            timeout=int(duration + 10),
-            verify=False,
-            proxies={"http": None, "https": None},
+            session_id=session_id,
+            scoped=True,
+            timeout=payload["duration"] + 10,
         )
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error swiping: {e}")
 
@@ -314,6 +363,7 @@ def back(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Navigate back (swipe from left edge).
 
@@ -321,31 +371,25 @@ def back(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after navigation.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Note:
         iOS doesn't have a universal back button. This simulates a back gesture
         by swiping from the left edge of the screen.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/dragfromtoforduration")
+        client = client or get_client(wda_url)
 
-        # Swipe from left edge to simulate back gesture
-        payload = {
-            "fromX": 0,
-            "fromY": 640,
-            "toX": 400,
-            "toY": 640,
-            "duration": 0.3,
-        }
-
-        requests.post(url, json=payload, timeout=10, verify=False)
+        client.post(
+            "wda/dragfromtoforduration",
+            json=BACK_GESTURE,
+            session_id=session_id,
+            scoped=True,
+            timeout=10,
+        )
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error performing back gesture: {e}")
 
@@ -354,6 +398,7 @@ def home(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Press the home button.
 
@@ -361,20 +406,15 @@ def home(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after pressing home.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/wda/homescreen"
+        client = client or get_client(wda_url)
 
-        requests.post(
-            url, timeout=10, verify=False, proxies={"http": None, "https": None}
-        )
+        client.post("wda/homescreen", timeout=10)
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error pressing home: {e}")
 
@@ -385,72 +425,65 @@ def launch_app(
     session_id: str | None = None,
     delay: float = 1.0,
     app_packages: dict[str, str] | None = None,
+    client: WDAClient | None = None,
 ) -> bool:
     """Launch an app by name.
 
     Args:
-        app_name: The app name (must be in app_packages dictionary).
+        app_name: The app name. Matched exactly against app_packages when given,
+            otherwise resolved (with fuzzy matching) by the built-in app index.
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after launching.
-        app_packages: Dictionary mapping app names to bundle IDs.
+        app_packages: Optional dictionary mapping app names to bundle IDs.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         True if app was launched, False if app not found.
     """
-    if app_packages is None:
-        # Import default iOS app packages if not provided
-        from deepagents_cli.middleware.autoglm.apps import APP_PACKAGES_IOS
-
-        app_packages = APP_PACKAGES_IOS
-
-    if app_name not in app_packages:
+    bundle_id = resolve_bundle_id(app_name, app_packages)
+    if bundle_id is None:
         return False
 
     try:
-        import requests
-
-        bundle_id = app_packages[app_name]
-        url = _get_wda_session_url(wda_url, session_id, "wda/apps/launch")
+        client = client or get_client(wda_url)
 
-        response = requests.post(
-            url,
+        response = client.post(
+            "wda/apps/launch",
             json={"bundleId": bundle_id},
+            session_id=session_id,
+            scoped=True,
             timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
         time.sleep(delay)
         return response.status_code in (200, 201)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
-        return False
     except Exception as e:
         print(f"Error launching app: {e}")
         return False
 
 
 def get_screen_size(
-    wda_url: str = "http://localhost:8100", session_id: str | None = None
+    wda_url: str = "http://localhost:8100",
+    session_id: str | None = None,
+    client: WDAClient | None = None,
 ) -> tuple[int, int]:
     """Get the screen dimensions.
 
     Args:
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         Tuple of (width, height). Returns (375, 812) as default if unable to fetch.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "window/size")
+        client = client or get_client(wda_url)
 
-        response = requests.get(
-            url, timeout=5, verify=False, proxies={"http": None, "https": None}
+        response = client.get(
+            "window/size", session_id=session_id, scoped=True, timeout=5
         )
 
         if response.status_code == 200:
@@ -460,8 +493,6 @@ def get_screen_size(
             height = value.get("height", 812)
             return width, height
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error getting screen size: {e}")
 
@@ -474,6 +505,7 @@ def press_button(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 1.0,
+    client: WDAClient | None = None,
 ) -> None:
     """Press a physical button.
 
@@ -482,23 +514,14 @@ def press_button(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after pressing.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/wda/pressButton"
+        client = client or get_client(wda_url)
 
-        requests.post(
-            url,
-            json={"name": button_name},
-            timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
-        )
+        client.post("wda/pressButton", json={"name": button_name}, timeout=10)
 
         time.sleep(delay)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error pressing button: {e}")
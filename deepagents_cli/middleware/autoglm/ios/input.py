@@ -2,23 +2,7 @@
 
 import time
 
-
-def _get_wda_session_url(wda_url: str, session_id: str | None, endpoint: str) -> str:
-    """Get the correct WDA URL for a session endpoint.
-
-    Args:
-        wda_url: Base WDA URL.
-        session_id: Optional session ID.
-        endpoint: The endpoint path.
-
-    Returns:
-        Full URL for the endpoint.
-    """
-    base = wda_url.rstrip("/")
-    if session_id:
-        return f"{base}/session/{session_id}/{endpoint}"
-    # Try to use WDA endpoints without session when possible
-    return f"{base}/{endpoint}"
+from .wda_client import WDAClient, get_client
 
 
 def type_text(
@@ -26,6 +10,7 @@ def type_text(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     frequency: int = 60,
+    client: WDAClient | None = None,
 ) -> None:
     """Type text into the currently focused input field.
 
@@ -34,23 +19,22 @@ def type_text(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         frequency: Typing frequency (keys per minute). Default is 60.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Note:
         The input field must be focused before calling this function.
         Use tap() to focus on the input field first.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/keys")
+        client = client or get_client(wda_url)
 
         # Send text to WDA
-        response = requests.post(
-            url,
+        response = client.post(
+            "wda/keys",
             json={"value": list(text), "frequency": frequency},
+            session_id=session_id,
+            scoped=True,
             timeout=30,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
         if response.status_code not in (200, 201):
@@ -58,8 +42,6 @@ def type_text(
                 f"Warning: Text input may have failed. Status: {response.status_code}"
             )
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error typing text: {e}")
 
@@ -67,25 +49,25 @@ def type_text(
 def clear_text(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
+    client: WDAClient | None = None,
 ) -> None:
     """Clear text in the currently focused input field.
 
     Args:
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Note:
         This sends a clear command to the active element.
         The input field must be focused before calling this function.
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
         # First, try to get the active element
-        url = _get_wda_session_url(wda_url, session_id, "element/active")
-
-        response = requests.get(
-            url, timeout=10, verify=False, proxies={"http": None, "https": None}
+        response = client.get(
+            "element/active", session_id=session_id, scoped=True, timeout=10
         )
 
         if response.status_code == 200:
@@ -96,22 +78,17 @@ def clear_text(
 
             if element_id:
                 # Clear the element
-                clear_url = _get_wda_session_url(
-                    wda_url, session_id, f"element/{element_id}/clear"
-                )
-                requests.post(
-                    clear_url,
+                client.post(
+                    f"element/{element_id}/clear",
+                    session_id=session_id,
+                    scoped=True,
                     timeout=10,
-                    verify=False,
-                    proxies={"http": None, "https": None},
                 )
                 return
 
         # Fallback: send backspace commands
-        _clear_with_backspace(wda_url, session_id)
+        _clear_with_backspace(wda_url, session_id, client=client)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error clearing text: {e}")
 
@@ -120,6 +97,7 @@ def _clear_with_backspace(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     max_backspaces: int = 100,
+    client: WDAClient | None = None,
 ) -> None:
     """Clear text by sending backspace keys.
 
@@ -127,20 +105,19 @@ def _clear_with_backspace(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         max_backspaces: Maximum number of backspaces to send.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/keys")
+        client = client or get_client(wda_url)
 
         # Send backspace character multiple times
         backspace_char = "\u0008"  # Backspace Unicode character
-        requests.post(
-            url,
+        client.post(
+            "wda/keys",
             json={"value": [backspace_char] * max_backspaces},
+            session_id=session_id,
+            scoped=True,
             timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
     except Exception as e:
@@ -151,6 +128,7 @@ def send_keys(
     keys: list[str],
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
+    client: WDAClient | None = None,
 ) -> None:
     """Send a sequence of keys.
 
@@ -158,26 +136,23 @@ def send_keys(
         keys: List of keys to send.
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Example:
         >>> send_keys(["H", "e", "l", "l", "o"])
         >>> send_keys(["\n"])  # Send enter key
     """
     try:
-        import requests
-
-        url = _get_wda_session_url(wda_url, session_id, "wda/keys")
+        client = client or get_client(wda_url)
 
-        requests.post(
-            url,
+        client.post(
+            "wda/keys",
             json={"value": keys},
+            session_id=session_id,
+            scoped=True,
             timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error sending keys: {e}")
 
@@ -186,6 +161,7 @@ def press_enter(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
     delay: float = 0.5,
+    client: WDAClient | None = None,
 ) -> None:
     """Press the Enter/Return key.
 
@@ -193,32 +169,29 @@ def press_enter(
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
         delay: Delay in seconds after pressing enter.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
-    send_keys(["\n"], wda_url, session_id)
+    send_keys(["\n"], wda_url, session_id, client=client)
     time.sleep(delay)
 
 
 def hide_keyboard(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
+    client: WDAClient | None = None,
 ) -> None:
     """Hide the on-screen keyboard.
 
     Args:
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
+        client: WDA client to use. Defaults to the shared client for wda_url.
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
-        url = f"{wda_url.rstrip('/')}/wda/keyboard/dismiss"
-
-        requests.post(
-            url, timeout=10, verify=False, proxies={"http": None, "https": None}
-        )
+        client.post("wda/keyboard/dismiss", timeout=10)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error hiding keyboard: {e}")
 
@@ -226,31 +199,29 @@ def hide_keyboard(
 def is_keyboard_shown(
     wda_url: str = "http://localhost:8100",
     session_id: str | None = None,
+    client: WDAClient | None = None,
 ) -> bool:
     """Check if the on-screen keyboard is currently shown.
 
     Args:
         wda_url: WebDriverAgent URL.
         session_id: Optional WDA session ID.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         True if keyboard is shown, False otherwise.
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
-        url = _get_wda_session_url(wda_url, session_id, "wda/keyboard/shown")
-
-        response = requests.get(
-            url, timeout=5, verify=False, proxies={"http": None, "https": None}
+        response = client.get(
+            "wda/keyboard/shown", session_id=session_id, scoped=True, timeout=5
         )
 
         if response.status_code == 200:
             data = response.json()
             return data.get("value", False)
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception:
         pass
 
@@ -260,62 +231,54 @@ def is_keyboard_shown(
 def set_pasteboard(
     text: str,
     wda_url: str = "http://localhost:8100",
+    client: WDAClient | None = None,
 ) -> None:
     """Set the device pasteboard (clipboard) content.
 
     Args:
         text: Text to set in pasteboard.
         wda_url: WebDriverAgent URL.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Note:
         This can be useful for inputting large amounts of text.
         After setting pasteboard, you can simulate paste gesture.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/wda/setPasteboard"
+        client = client or get_client(wda_url)
 
-        requests.post(
-            url,
+        client.post(
+            "wda/setPasteboard",
             json={"content": text, "contentType": "plaintext"},
             timeout=10,
-            verify=False,
-            proxies={"http": None, "https": None},
         )
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error setting pasteboard: {e}")
 
 
 def get_pasteboard(
     wda_url: str = "http://localhost:8100",
+    client: WDAClient | None = None,
 ) -> str | None:
     """Get the device pasteboard (clipboard) content.
 
     Args:
         wda_url: WebDriverAgent URL.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         Pasteboard content or None if failed.
     """
     try:
-        import requests
+        client = client or get_client(wda_url)
 
-        url = f"{wda_url.rstrip('/')}/wda/getPasteboard"
-
-        response = requests.post(
-            url, timeout=10, verify=False, proxies={"http": None, "https": None}
-        )
+        response = client.post("wda/getPasteboard", timeout=10)
 
         if response.status_code == 200:
             data = response.json()
             return data.get("value")
 
-    except ImportError:
-        print("Error: requests library required. Install: pip install requests")
     except Exception as e:
         print(f"Error getting pasteboard: {e}")
 
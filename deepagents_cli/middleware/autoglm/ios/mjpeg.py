@@ -0,0 +1,270 @@
+"""Background reader for the WebDriverAgent MJPEG screenshot stream.
+
+Besides the ``/screenshot`` endpoint, WDA serves a continuous
+``multipart/x-mixed-replace`` JPEG stream (port 9100 by default, see its
+``mjpegServerPort`` setting). An ``MjpegStream`` reads that stream in a daemon
+thread and keeps the latest frame in memory. A screenshot then costs a lock and
+a base64 encode instead of an HTTP round trip and an on-device PNG encode:
+
+    >>> stream = MjpegStream("http://localhost:9100")
+    >>> stream.start()
+    >>> frame = stream.latest(max_age=1.0)
+    >>> screenshot = frame.to_screenshot() if frame else None
+"""
+
+import base64
+import struct
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+import requests
+from urllib3 import HTTPResponse
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from deepagents_cli.middleware.autoglm.ios.screenshot import Screenshot
+
+DEFAULT_MJPEG_URL = "http://localhost:9100"
+
+_SOI = b"\xff\xd8"  # JPEG start of image
+_EOI = b"\xff\xd9"  # JPEG end of image
+
+# Start-of-frame markers carry the dimensions; C4, C8 and CC are other segments
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Give up on a frame that grows beyond this without an end marker
+_MAX_FRAME_BYTES = 16 * 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class MjpegFrame:
+    """One JPEG frame from the stream."""
+
+    data: bytes
+    width: int
+    height: int
+    timestamp: float  # time.monotonic() when the frame was received
+
+    def to_screenshot(self) -> Screenshot:
+        """Convert the frame to a JPEG Screenshot.
+
+        Returns:
+            Screenshot with format "jpeg".
+        """
+        return Screenshot(
+            base64_data=base64.b64encode(self.data).decode("ascii"),
+            width=self.width,
+            height=self.height,
+            format="jpeg",
+        )
+
+
+class MjpegStream:
+    """Keeps the latest frame of a WDA MJPEG stream, reconnecting on errors."""
+
+    def __init__(
+        self,
+        url: str = DEFAULT_MJPEG_URL,
+        *,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 5.0,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        """Initialize the reader. Nothing is read until start() is called.
+
+        Args:
+            url: URL of the MJPEG stream.
+            connect_timeout: Seconds to wait for a TCP connection.
+            read_timeout: Seconds without data before reconnecting.
+            reconnect_delay: Seconds to wait before reconnecting after an error.
+        """
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.reconnect_delay = reconnect_delay
+        self.frames_received = 0
+
+        self._frame: MjpegFrame | None = None
+        self._frame_ready = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._http = requests.Session()
+        # WDA is reached over localhost/iproxy or the LAN: never use a proxy
+        self._http.trust_env = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the reader thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the reader thread (no-op if it is already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wda-mjpeg", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop the reader thread.
+
+        Args:
+            timeout: Seconds to wait for the thread to exit.
+        """
+        self._stop.set()
+        self._http.close()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest(self, max_age: float | None = None) -> MjpegFrame | None:
+        """Return the most recent frame.
+
+        Args:
+            max_age: Ignore frames older than this many seconds.
+
+        Returns:
+            The frame, or None if there is none (recent enough).
+        """
+        with self._frame_ready:
+            frame = self._frame
+        if frame is None:
+            return None
+        if max_age is not None and time.monotonic() - frame.timestamp > max_age:
+            return None
+        return frame
+
+    def wait_for_frame(
+        self, timeout: float, newer_than: float | None = None
+    ) -> MjpegFrame | None:
+        """Wait for a frame received after a given time.
+
+        Args:
+            timeout: Maximum seconds to wait.
+            newer_than: time.monotonic() value the frame must be newer than.
+                Defaults to now, i.e. the next frame.
+
+        Returns:
+            The frame, or None on timeout.
+        """
+        if newer_than is None:
+            newer_than = time.monotonic()
+        with self._frame_ready:
+            self._frame_ready.wait_for(
+                lambda: self._frame is not None and self._frame.timestamp > newer_than,
+                timeout,
+            )
+            frame = self._frame
+        if frame is None or frame.timestamp <= newer_than:
+            return None
+        return frame
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self._http.get(
+                    self.url,
+                    stream=True,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                ) as response:
+                    response.raise_for_status()
+                    for data in iter_jpeg_frames(_read_available(response.raw)):
+                        if self._stop.is_set():
+                            return
+                        self._publish(data)
+            except (requests.RequestException, Urllib3Error, OSError) as e:
+                # Reading the raw body raises urllib3's errors, not requests'
+                if self._stop.is_set():
+                    return
+                print(f"MJPEG stream error: {e}")
+            except Exception:
+                # stop() closes the session under a pending read, which can fail
+                # in other ways; anything else is a bug and must not be hidden
+                if self._stop.is_set():
+                    return
+                raise
+            self._stop.wait(self.reconnect_delay)
+
+    def _publish(self, data: bytes) -> None:
+        size = jpeg_size(data)
+        if size is None:
+            return
+        frame = MjpegFrame(data, size[0], size[1], time.monotonic())
+        with self._frame_ready:
+            self._frame = frame
+            self.frames_received += 1
+            self._frame_ready.notify_all()
+
+
+def _read_available(raw: HTTPResponse) -> Iterator[bytes]:
+    """Yield body bytes as soon as they arrive.
+
+    ``iter_content`` blocks until a whole chunk is filled, which would delay each
+    frame until the next ones arrive.
+    """
+    while chunk := raw.read1(_CHUNK_SIZE):
+        yield chunk
+
+
+def iter_jpeg_frames(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Split a byte stream into JPEG images.
+
+    Frames are delimited by their start/end of image markers, so multipart
+    boundaries and part headers between them are skipped whatever their format.
+    The end marker cannot occur inside JPEG entropy-coded data.
+
+    Args:
+        chunks: Raw chunks of the HTTP response body.
+
+    Yields:
+        Complete JPEG images.
+    """
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            start = buffer.find(_SOI)
+            if start < 0:
+                # Keep a trailing 0xFF that may begin the next marker
+                del buffer[: max(0, len(buffer) - 1)]
+                break
+            end = buffer.find(_EOI, start + 2)
+            if end < 0:
+                if start:
+                    del buffer[:start]
+                if len(buffer) > _MAX_FRAME_BYTES:
+                    buffer.clear()
+                break
+            yield bytes(buffer[start : end + 2])
+            del buffer[: end + 2]
+
+
+def jpeg_size(data: bytes) -> tuple[int, int] | None:
+    """Read the dimensions of a JPEG from its start-of-frame segment.
+
+    Args:
+        data: JPEG image bytes.
+
+    Returns:
+        Tuple of (width, height), or None if no frame header was found.
+    """
+    if not data.startswith(_SOI):
+        return None
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1  # Fill byte
+            continue
+        if marker in _SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack_from(">HH", data, offset + 5)
+            return width, height
+        (length,) = struct.unpack_from(">H", data, offset + 2)
+        offset += 2 + length
+    return None
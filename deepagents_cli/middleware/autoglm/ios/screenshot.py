@@ -3,14 +3,23 @@
 import base64
 import os
 import pathlib
+import struct
 import subprocess
 import tempfile
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import BytesIO
 
 from PIL import Image
 
+from .wda_client import WDAClient, get_client
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Base64 characters covering the PNG signature and the IHDR width/height fields
+# (24 bytes)
+_PNG_HEADER_CHARS = 32
+
 
 @dataclass
 class Screenshot:
@@ -20,6 +29,8 @@ class Screenshot:
     width: int
     height: int
     is_sensitive: bool = False
+    image: Image.Image | None = field(default=None, repr=False, compare=False)
+    format: str = "png"
 
 
 def get_screenshot(
@@ -27,6 +38,7 @@ def get_screenshot(
     session_id: str | None = None,
     device_id: str | None = None,
     timeout: int = 10,
+    client: WDAClient | None = None,
 ) -> Screenshot:
     """Capture a screenshot from the connected iOS device.
 
@@ -35,6 +47,7 @@ def get_screenshot(
         session_id: Optional WDA session ID.
         device_id: Optional device UDID (for idevicescreenshot fallback).
         timeout: Timeout in seconds for screenshot operations.
+        client: WDA client to use. Defaults to the shared client for wda_url.
 
     Returns:
         Screenshot object containing base64 data and dimensions.
@@ -44,7 +57,7 @@ def get_screenshot(
         If both fail, returns a black fallback image.
     """
     # Try WebDriverAgent first (preferred method)
-    screenshot = _get_screenshot_wda(wda_url, session_id, timeout)
+    screenshot = _get_screenshot_wda(client or get_client(wda_url), timeout)
     if screenshot:
         return screenshot
 
@@ -57,47 +70,95 @@ def get_screenshot(
     return _create_fallback_screenshot(is_sensitive=False)
 
 
-def _get_screenshot_wda(
-    wda_url: str, session_id: str | None, timeout: int
-) -> Screenshot | None:
+def screenshot_from_base64(base64_data: str) -> Screenshot:
+    """Build a Screenshot from the base64 PNG returned by WebDriverAgent.
+
+    The dimensions come from the PNG header, so the image is not decoded.
+
+    Args:
+        base64_data: Base64-encoded PNG.
+
+    Returns:
+        Screenshot with the image dimensions.
+    """
+    size = png_size(base64_data)
+    if size is None:
+        # Not a PNG (or a malformed header): let PIL identify it
+        img = Image.open(BytesIO(base64.b64decode(base64_data)))
+        size = img.size
+    width, height = size
+
+    return Screenshot(
+        base64_data=base64_data,
+        width=width,
+        height=height,
+        is_sensitive=False,
+    )
+
+
+def png_size(base64_data: str) -> tuple[int, int] | None:
+    """Read the dimensions of a base64-encoded PNG from its IHDR chunk.
+
+    Only the first few base64 characters are decoded.
+
+    Args:
+        base64_data: Base64-encoded PNG.
+
+    Returns:
+        Tuple of (width, height), or None if the data is not a PNG.
+    """
+    # Encoders may wrap lines; drop whitespace from the prefix only
+    head = "".join(base64_data[: _PNG_HEADER_CHARS * 2].split())
+    try:
+        header = base64.b64decode(head[:_PNG_HEADER_CHARS])
+    except ValueError:
+        return None
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE):
+        return None
+    if header[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", header[16:24])
+    return width, height
+
+
+def get_idevice_screenshot(
+    device_id: str | None = None, timeout: int = 10
+) -> Screenshot:
+    """Capture a screenshot with idevicescreenshot only.
+
+    Used when WebDriverAgent cannot deliver a screenshot.
+
+    Args:
+        device_id: Optional device UDID.
+        timeout: Timeout in seconds.
+
+    Returns:
+        Screenshot object, or a black fallback image if the capture fails.
+    """
+    screenshot = _get_screenshot_idevice(device_id, timeout)
+    return screenshot or _create_fallback_screenshot(is_sensitive=False)
+
+
+def _get_screenshot_wda(client: WDAClient, timeout: int) -> Screenshot | None:
     """Capture screenshot using WebDriverAgent.
 
     Args:
-        wda_url: WebDriverAgent URL.
-        session_id: Optional WDA session ID.
+        client: WDA client.
         timeout: Timeout in seconds.
 
     Returns:
         Screenshot object or None if failed.
     """
     try:
-        import requests
-
-        url = f"{wda_url.rstrip('/')}/screenshot"
-
-        response = requests.get(
-            url, timeout=timeout, verify=False, proxies={"http": None, "https": None}
-        )
+        response = client.get("screenshot", timeout=timeout)
 
         if response.status_code == 200:
             data = response.json()
             base64_data = data.get("value", "")
 
             if base64_data:
-                # Decode to get dimensions
-                img_data = base64.b64decode(base64_data)
-                img = Image.open(BytesIO(img_data))
-                width, height = img.size
-
-                return Screenshot(
-                    base64_data=base64_data,
-                    width=width,
-                    height=height,
-                    is_sensitive=False,
-                )
-
-    except ImportError:
-        print("Note: requests library not installed. Install: pip install requests")
+                return screenshot_from_base64(base64_data)
+
     except Exception as e:
         print(f"WDA screenshot failed: {e}")
 
@@ -0,0 +1,473 @@
+"""Connection-pooled HTTP client for WebDriverAgent.
+
+A bare ``requests.get/post`` opens a new TCP connection for every tap, swipe or
+screenshot, which costs hundreds of milliseconds on WiFi-attached devices. A
+``WDAClient`` keeps HTTP keep-alive connections open in a ``requests.Session``
+and adds:
+
+- Connect/read timeouts with per-call overrides
+- Retry with exponential backoff (connection errors for every method, plus
+  gateway errors and read errors for idempotent GETs; a tap is never replayed
+  after it reached the device)
+- A cached WDA session id, recreated once if WDA reports it as invalid
+
+The free functions in this package accept a client through a ``client``
+argument and otherwise share one client per WDA URL:
+
+    >>> client = WDAClient("http://localhost:8100")
+    >>> session_id = client.ensure_session()
+    >>> response = client.post("actions", json=payload, scoped=True)
+
+``AsyncWDAClient`` offers the same interface as coroutines on top of
+``httpx.AsyncClient`` for the async iOS controller, so a pending request can be
+cancelled without waiting for WDA to answer.
+"""
+
+import asyncio
+import atexit
+import threading
+from typing import Any
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_WDA_URL = "http://localhost:8100"
+DEFAULT_CONNECT_TIMEOUT = 3.0
+DEFAULT_READ_TIMEOUT = 10.0
+DEFAULT_RETRIES = 2
+DEFAULT_BACKOFF = 0.2
+DEFAULT_POOL_SIZE = 4
+
+_RETRY_STATUSES = (502, 503, 504)
+
+
+class WDAClient:
+    """HTTP client for one WebDriverAgent server with pooled connections.
+
+    The underlying ``requests.Session`` is thread-safe for concurrent requests,
+    so one client can be shared by the step loop and background captures.
+    """
+
+    def __init__(
+        self,
+        wda_url: str = DEFAULT_WDA_URL,
+        session_id: str | None = None,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        """Initialize the client. Connections are opened lazily.
+
+        Args:
+            wda_url: WebDriverAgent URL.
+            session_id: Known WDA session id, if any.
+            connect_timeout: Seconds to wait for a TCP connection.
+            read_timeout: Default seconds to wait for a response.
+            retries: Maximum retries per request.
+            backoff: Backoff factor in seconds between retries (doubles each try).
+            pool_size: Maximum number of kept-alive connections.
+        """
+        self.wda_url = wda_url.rstrip("/")
+        self.session_id = session_id
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session_lock = threading.Lock()
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=retry
+        )
+        self.http = requests.Session()
+        # WDA is reached over localhost/iproxy or the LAN: never use a proxy
+        self.http.trust_env = False
+        self.http.verify = False
+        self.http.mount("http://", adapter)
+        self.http.mount("https://", adapter)
+
+    def url(
+        self, endpoint: str, *, session_id: str | None = None, scoped: bool = False
+    ) -> str:
+        """Build the full URL of an endpoint.
+
+        Args:
+            endpoint: Endpoint path, e.g. "actions" or "wda/homescreen".
+            session_id: Session id overriding the cached one.
+            scoped: Prefix the path with ``session/<id>/`` when a session is known.
+
+        Returns:
+            Full URL.
+        """
+        return _endpoint_url(
+            self.wda_url, endpoint, session_id or self.session_id, scoped
+        )
+
+    def get(
+        self,
+        endpoint: str,
+        *,
+        session_id: str | None = None,
+        scoped: bool = False,
+        timeout: float | None = None,
+    ) -> requests.Response:
+        """Send a GET request.
+
+        Args:
+            endpoint: Endpoint path.
+            session_id: Session id overriding the cached one.
+            scoped: Send to the session-scoped endpoint.
+            timeout: Read timeout in seconds (default: read_timeout).
+
+        Returns:
+            The HTTP response.
+        """
+        return self._request("GET", endpoint, session_id, scoped, timeout)
+
+    def post(
+        self,
+        endpoint: str,
+        json: Any = None,
+        *,
+        session_id: str | None = None,
+        scoped: bool = False,
+        timeout: float | None = None,
+    ) -> requests.Response:
+        """Send a POST request with an optional JSON body.
+
+        Args:
+            endpoint: Endpoint path.
+            json: JSON-serializable request body.
+            session_id: Session id overriding the cached one.
+            scoped: Send to the session-scoped endpoint.
+            timeout: Read timeout in seconds (default: read_timeout).
+
+        Returns:
+            The HTTP response.
+        """
+        return self._request("POST", endpoint, session_id, scoped, timeout, json)
+
+    def is_ready(self, timeout: float = 2.0) -> bool:
+        """Check whether WDA answers its status endpoint.
+
+        Returns:
+            True if WDA is reachable.
+        """
+        try:
+            return self.get("status", timeout=timeout).status_code == 200
+        except requests.RequestException:
+            return False
+
+    def start_session(self, timeout: float = 30.0) -> str | None:
+        """Create a new WDA session and cache its id.
+
+        Returns:
+            The new session id, or None if WDA did not return one.
+
+        Raises:
+            RuntimeError: If WDA rejects the request.
+        """
+        response = self.post("session", json={"capabilities": {}}, timeout=timeout)
+        if response.status_code not in (200, 201):
+            msg = f"Failed to start session: {response.text}"
+            raise RuntimeError(msg)
+        data = response.json()
+        session_id = data.get("sessionId") or data.get("value", {}).get("sessionId")
+        self.session_id = session_id
+        return session_id
+
+    def ensure_session(self) -> str | None:
+        """Return the cached session id, creating a session if there is none.
+
+        Returns:
+            The session id, or None if WDA did not return one.
+        """
+        with self._session_lock:
+            if self.session_id is None:
+                self.start_session()
+            return self.session_id
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        self.http.close()
+
+    def _request(
+        self,
+        method: str,
+        endpoint: str,
+        session_id: str | None,
+        scoped: bool,
+        timeout: float | None,
+        json: Any = None,
+    ) -> requests.Response:
+        timeouts = (self.connect_timeout, timeout or self.read_timeout)
+        url = self.url(endpoint, session_id=session_id, scoped=scoped)
+        response = self.http.request(method, url, json=json, timeout=timeouts)
+
+        # A cached session can expire (WDA restarted); recreate it once. Explicit
+        # session ids belong to the caller and are left alone.
+        if (
+            scoped
+            and session_id is None
+            and self.session_id is not None
+            and _is_invalid_session(response)
+        ):
+            stale = self.session_id
+            with self._session_lock:
+                if self.session_id == stale:
+                    self.start_session()
+            url = self.url(endpoint, scoped=scoped)
+            response = self.http.request(method, url, json=json, timeout=timeouts)
+        return response
+
+
+class AsyncWDAClient:
+    """Asyncio HTTP client for one WebDriverAgent server with pooled connections.
+
+    Mirrors WDAClient: the same timeouts, retries of idempotent GETs on gateway
+    errors, and cached session handling. Pooled connections belong to the event
+    loop that opened them, so a client must only be used from one loop.
+    """
+
+    def __init__(
+        self,
+        wda_url: str = DEFAULT_WDA_URL,
+        session_id: str | None = None,
+        *,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        read_timeout: float = DEFAULT_READ_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        pool_size: int = DEFAULT_POOL_SIZE,
+    ) -> None:
+        """Initialize the client. Connections are opened lazily.
+
+        Args:
+            wda_url: WebDriverAgent URL.
+            session_id: Known WDA session id, if any.
+            connect_timeout: Seconds to wait for a TCP connection.
+            read_timeout: Default seconds to wait for a response.
+            retries: Maximum retries per request.
+            backoff: Backoff factor in seconds between retries (doubles each try).
+            pool_size: Maximum number of kept-alive connections.
+        """
+        self.wda_url = wda_url.rstrip("/")
+        self.session_id = session_id
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._session_lock = asyncio.Lock()
+
+        # Connection errors are retried by the transport for every method
+        transport = httpx.AsyncHTTPTransport(
+            retries=retries,
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+            verify=False,
+        )
+        # WDA is reached over localhost/iproxy or the LAN: never use a proxy
+        self.http = httpx.AsyncClient(transport=transport, trust_env=False)
+
+    def url(
+        self, endpoint: str, *, session_id: str | None = None, scoped: bool = False
+    ) -> str:
+        """Build the full URL of an endpoint.
+
+        Args:
+            endpoint: Endpoint path, e.g. "actions" or "wda/homescreen".
+            session_id: Session id overriding the cached one.
+            scoped: Prefix the path with ``session/<id>/`` when a session is known.
+
+        Returns:
+            Full URL.
+        """
+        return _endpoint_url(
+            self.wda_url, endpoint, session_id or self.session_id, scoped
+        )
+
+    async def get(
+        self,
+        endpoint: str,
+        *,
+        session_id: str | None = None,
+        scoped: bool = False,
+        timeout: float | None = None,
+    ) -> httpx.Response:
+        """Send a GET request.
+
+        Args:
+            endpoint: Endpoint path.
+            session_id: Session id overriding the cached one.
+            scoped: Send to the session-scoped endpoint.
+            timeout: Read timeout in seconds (default: read_timeout).
+
+        Returns:
+            The HTTP response.
+        """
+        return await self._request("GET", endpoint, session_id, scoped, timeout)
+
+    async def post(
+        self,
+        endpoint: str,
+        json: Any = None,
+        *,
+        session_id: str | None = None,
+        scoped: bool = False,
+        timeout: float | None = None,
+    ) -> httpx.Response:
+        """Send a POST request with an optional JSON body.
+
+        Args:
+            endpoint: Endpoint path.
+            json: JSON-serializable request body.
+            session_id: Session id overriding the cached one.
+            scoped: Send to the session-scoped endpoint.
+            timeout: Read timeout in seconds (default: read_timeout).
+
+        Returns:
+            The HTTP response.
+        """
+        return await self._request("POST", endpoint, session_id, scoped, timeout, json)
+
+    async def start_session(self, timeout: float = 30.0) -> str | None:
+        """Create a new WDA session and cache its id.
+
+        Returns:
+            The new session id, or None if WDA did not return one.
+
+        Raises:
+            RuntimeError: If WDA rejects the request.
+        """
+        response = await self.post(
+            "session", json={"capabilities": {}}, timeout=timeout
+        )
+        if response.status_code not in (200, 201):
+            msg = f"Failed to start session: {response.text}"
+            raise RuntimeError(msg)
+        data = response.json()
+        session_id = data.get("sessionId") or data.get("value", {}).get("sessionId")
+        self.session_id = session_id
+        return session_id
+
+    async def ensure_session(self) -> str | None:
+        """Return the cached session id, creating a session if there is none.
+
+        Returns:
+            The session id, or None if WDA did not return one.
+        """
+        async with self._session_lock:
+            if self.session_id is None:
+                await self.start_session()
+            return self.session_id
+
+    async def aclose(self) -> None:
+        """Close all pooled connections."""
+        await self.http.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        session_id: str | None,
+        scoped: bool,
+        timeout: float | None,
+        json: Any = None,
+    ) -> httpx.Response:
+        timeouts = httpx.Timeout(
+            timeout or self.read_timeout, connect=self.connect_timeout
+        )
+        url = self.url(endpoint, session_id=session_id, scoped=scoped)
+        response = await self._send(method, url, json, timeouts)
+
+        # A cached session can expire (WDA restarted); recreate it once. Explicit
+        # session ids belong to the caller and are left alone.
+        if (
+            scoped
+            and session_id is None
+            and self.session_id is not None
+            and _is_invalid_session(response)
+        ):
+            stale = self.session_id
+            async with self._session_lock:
+                if self.session_id == stale:
+                    await self.start_session()
+            url = self.url(endpoint, scoped=scoped)
+            response = await self._send(method, url, json, timeouts)
+        return response
+
+    async def _send(
+        self, method: str, url: str, json: Any, timeouts: httpx.Timeout
+    ) -> httpx.Response:
+        attempt = 0
+        while True:
+            response = await self.http.request(method, url, json=json, timeout=timeouts)
+            # Only GETs are replayed: a tap must never run twice
+            if (
+                method != "GET"
+                or response.status_code not in _RETRY_STATUSES
+                or attempt >= self.retries
+            ):
+                return response
+            await asyncio.sleep(self.backoff * 2**attempt)
+            attempt += 1
+
+
+def _endpoint_url(
+    wda_url: str, endpoint: str, session_id: str | None, scoped: bool
+) -> str:
+    """Build the URL of a plain or session-scoped endpoint.
+
+    Returns:
+        Full URL.
+    """
+    if scoped and session_id:
+        return f"{wda_url}/session/{session_id}/{endpoint}"
+    return f"{wda_url}/{endpoint}"
+
+
+def _is_invalid_session(response: requests.Response | httpx.Response) -> bool:
+    """Check whether WDA rejected a request because of an unknown session id.
+
+    Returns:
+        True if the session id was rejected.
+    """
+    return response.status_code == 404 and "invalid session id" in response.text
+
+
+_clients: dict[str, WDAClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(wda_url: str = DEFAULT_WDA_URL) -> WDAClient:
+    """Return the shared client for a WDA URL, creating it on first use.
+
+    Returns:
+        The shared WDAClient.
+    """
+    key = wda_url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if not _clients:
+                atexit.register(close_all)
+            client = _clients[key] = WDAClient(key)
+        return client
+
+
+def close_all() -> None:
+    """Close all shared clients."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
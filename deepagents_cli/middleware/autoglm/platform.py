@@ -2,19 +2,23 @@
 
 This module provides a unified interface for controlling both Android and iOS devices,
 abstracting platform-specific implementations behind a common Protocol.
+
+The controllers themselves live in async_platform.py. create_controller returns a
+blocking PlatformController that runs them on a private event loop thread.
 """
 
 from dataclasses import dataclass
 from typing import Protocol
 
-from . import adb_controller
-from .adb_controller import Screenshot
-from .ios import (
-    connection as ios_connection,
-    device as ios_device,
-    input as ios_input,
-    screenshot as ios_screenshot,
-)
+import numpy as np
+
+from deepagents_cli.middleware.autoglm import adb_controller
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.ios import connection as ios_connection
+from deepagents_cli.middleware.autoglm.ios.mjpeg import MjpegStream
+
+# Oldest MJPEG frame still used as a screenshot, in seconds
+MJPEG_MAX_FRAME_AGE = 1.0
 
 
 @dataclass
@@ -23,13 +27,23 @@ class PlatformConfig:
 
     platform: str  # "android" or "ios"
 
+    # Seconds to sleep after each action. None keeps each primitive's default;
+    # 0 disables the sleeps when the caller waits for the screen to settle.
+    action_delay: float | None = None
+
     # Android-specific
     device_id: str | None = None
+    use_shell_pool: bool = True  # Reuse a persistent `adb shell` per device
+    raw_screencap: bool = False  # Capture raw framebuffer instead of device PNG
+    touch_backend: str = "input"  # How taps and swipes are injected (see touch.py)
 
     # iOS-specific
     wda_url: str = "http://localhost:8100"
     ios_device_id: str | None = None
     wda_session_id: str | None = None
+    # WDA MJPEG stream (e.g. http://localhost:9100). When set, screenshots come
+    # from the latest stream frame instead of the /screenshot endpoint.
+    wda_mjpeg_url: str | None = None
 
 
 class PlatformController(Protocol):
@@ -110,158 +124,67 @@ class PlatformController(Protocol):
         """
         ...
 
+    def capture_frame(self) -> np.ndarray:
+        """Capture a low-resolution grayscale frame for change detection.
 
-class AndroidController:
-    """Platform controller for Android devices using ADB."""
-
-    def __init__(self, config: PlatformConfig):
-        """Initialize Android controller.
-
-        Args:
-            config: Platform configuration.
+        Returns:
+            2-D uint8 luma array.
         """
-        self.config = config
-        self.device_id = config.device_id
-
-    def take_screenshot(self) -> Screenshot:
-        """Capture a screenshot from the Android device."""
-        return adb_controller.take_screenshot(device_id=self.device_id)
-
-    def tap(self, x: int, y: int) -> None:
-        """Tap at the specified coordinates on Android device."""
-        adb_controller.tap(x, y, device_id=self.device_id)
-
-    def swipe(
-        self,
-        start_x: int,
-        start_y: int,
-        end_x: int,
-        end_y: int,
-        duration: float | None = None,
-    ) -> None:
-        """Swipe on Android device."""
-        # Convert duration from seconds to milliseconds for ADB
-        duration_ms = int(duration * 1000) if duration is not None else None
-        adb_controller.swipe(
-            start_x,
-            start_y,
-            end_x,
-            end_y,
-            duration_ms=duration_ms,
-            device_id=self.device_id,
-        )
-
-    def type_text(self, text: str) -> None:
-        """Type text on Android device using ADB Keyboard."""
-        adb_controller.type_text(text, device_id=self.device_id)
-
-    def launch_app(self, app_name: str) -> bool:
-        """Launch an app on Android device."""
-        return adb_controller.launch_app(app_name, device_id=self.device_id)
-
-    def press_home(self) -> None:
-        """Press home button on Android device."""
-        adb_controller.press_home(device_id=self.device_id)
-
-    def press_back(self) -> None:
-        """Press back button on Android device."""
-        adb_controller.press_back(device_id=self.device_id)
-
-    def get_current_app(self) -> str:
-        """Get currently active app on Android device."""
-        return adb_controller.get_current_app(device_id=self.device_id)
-
+        ...
 
-class IOSController:
-    """Platform controller for iOS devices using WebDriverAgent."""
 
-    def __init__(
-        self, config: PlatformConfig, app_packages: dict[str, str] | None = None
-    ):
-        """Initialize iOS controller.
+def start_mjpeg_stream(config: PlatformConfig) -> MjpegStream | None:
+    """Start reading the WDA MJPEG stream if one is configured.
 
-        Args:
-            config: Platform configuration.
-            app_packages: Dictionary mapping app names to bundle IDs.
-        """
-        self.config = config
-        self.wda_url = config.wda_url
-        self.device_id = config.ios_device_id
-        self.session_id = config.wda_session_id
-        self.app_packages = app_packages or {}
+    Args:
+        config: Platform configuration.
 
-    def take_screenshot(self) -> Screenshot:
-        """Capture a screenshot from the iOS device."""
-        return ios_screenshot.get_screenshot(
-            wda_url=self.wda_url,
-            session_id=self.session_id,
-            device_id=self.device_id,
-        )
+    Returns:
+        The running stream, or None if wda_mjpeg_url is not set.
+    """
+    if not config.wda_mjpeg_url:
+        return None
+    stream = MjpegStream(config.wda_mjpeg_url)
+    stream.start()
+    return stream
 
-    def tap(self, x: int, y: int) -> None:
-        """Tap at the specified coordinates on iOS device."""
-        ios_device.tap(x, y, wda_url=self.wda_url, session_id=self.session_id)
 
-    def swipe(
-        self,
-        start_x: int,
-        start_y: int,
-        end_x: int,
-        end_y: int,
-        duration: float | None = None,
-    ) -> None:
-        """Swipe on iOS device."""
-        ios_device.swipe(
-            start_x,
-            start_y,
-            end_x,
-            end_y,
-            duration=duration,
-            wda_url=self.wda_url,
-            session_id=self.session_id,
-        )
+def create_controller(
+    config: PlatformConfig, app_packages: dict[str, str] | None = None
+) -> PlatformController:
+    """Factory function to create the appropriate platform controller.
 
-    def type_text(self, text: str) -> None:
-        """Type text on iOS device using WebDriverAgent."""
-        ios_input.type_text(text, wda_url=self.wda_url, session_id=self.session_id)
+    Args:
+        config: Platform configuration.
+        app_packages: Dictionary mapping app names to package/bundle IDs.
 
-    def launch_app(self, app_name: str) -> bool:
-        """Launch an app on iOS device."""
-        return ios_device.launch_app(
-            app_name,
-            wda_url=self.wda_url,
-            session_id=self.session_id,
-            app_packages=self.app_packages,
-        )
+    Returns:
+        Blocking adapter around the platform's async controller.
 
-    def press_home(self) -> None:
-        """Press home button on iOS device."""
-        ios_device.home(wda_url=self.wda_url, session_id=self.session_id)
+    Raises:
+        ValueError: If platform is unknown.
+        RuntimeError: If platform-specific requirements are not met.
+    """
+    # async_platform builds on this module's config and protocol
+    from deepagents_cli.middleware.autoglm.async_platform import (  # noqa: PLC0415
+        SyncPlatformController,
+        create_async_controller,
+    )
 
-    def press_back(self) -> None:
-        """Navigate back on iOS device (swipe from left edge)."""
-        ios_device.back(wda_url=self.wda_url, session_id=self.session_id)
+    return SyncPlatformController(create_async_controller(config, app_packages))
 
-    def get_current_app(self) -> str:
-        """Get currently active app on iOS device."""
-        return ios_device.get_current_app(
-            wda_url=self.wda_url,
-            session_id=self.session_id,
-            app_packages=self.app_packages,
-        )
 
+def verify_requirements(config: PlatformConfig) -> str:
+    """Check that the platform tooling and a device are available.
 
-def create_controller(
-    config: PlatformConfig, app_packages: dict[str, str] | None = None
-) -> PlatformController:
-    """Factory function to create the appropriate platform controller.
+    For iOS this also creates a WDA session when none is configured, storing its
+    id in config.wda_session_id.
 
     Args:
         config: Platform configuration.
-        app_packages: Dictionary mapping app names to package/bundle IDs.
 
     Returns:
-        Platform controller instance (AndroidController or IOSController).
+        The normalized platform name ("android" or "ios").
 
     Raises:
         ValueError: If platform is unknown.
@@ -282,7 +205,7 @@ def create_controller(
                 "No Android devices connected. Please connect a device via USB or WiFi."
             )
 
-        return AndroidController(config)
+        return platform
 
     if platform == "ios":
         # Verify iOS requirements
@@ -314,6 +237,6 @@ def create_controller(
             else:
                 print("⚠️  Using default WDA session (no explicit session ID)")
 
-        return IOSController(config, app_packages)
+        return platform
 
     raise ValueError(f"Unknown platform: {platform}. Must be 'android' or 'ios'.")
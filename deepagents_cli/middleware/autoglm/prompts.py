@@ -232,6 +232,49 @@ REMEMBER:
     )
 
 
+def get_batch_actions_prompt(lang: str, max_actions: int) -> str:
+    """Get the system prompt addendum that allows several actions per answer.
+
+    Appended to the phone agent prompt when batching is enabled. It overrides
+    the "one action per answer" rule for predictable sequences such as filling
+    in a form.
+
+    Args:
+        lang: Prompt language ("zh" or "en").
+        max_actions: Maximum number of actions per answer.
+
+    Returns:
+        Prompt text to append to the system prompt.
+    """
+    if lang == "en":
+        return f"""
+# Batched actions
+When the next few operations can all be planned from the current screen (for
+example tap a field, type, tap the next field, type, submit), you may put up to
+{max_actions} actions in one <answer>, one per line, in execution order:
+<answer>
+do(action="Tap", element=[x,y])
+do(action="Type", text="xxx")
+do(action="Tap", element=[x,y])
+</answer>
+The actions run back to back. If one fails or the page changes, the rest are
+skipped and you will see the new screen. Only batch actions whose coordinates
+stay valid; after an action that opens a new page, end the answer.
+"""
+    return f"""
+批量操作：
+当接下来的几个操作都可以根据当前屏幕确定时（例如：点击输入框 → 输入 → 点击下一个输入框 → 输入 → 提交），
+可以在一个 <answer> 中给出最多 {max_actions} 个操作，每行一个，按执行顺序排列：
+<answer>
+do(action="Tap", element=[x,y])
+do(action="Type", text="xxx")
+do(action="Tap", element=[x,y])
+</answer>
+这些操作会连续执行。如果某个操作失败或页面发生变化，其余操作将被跳过，你会看到新的屏幕。
+只批量给出坐标仍然有效的操作；执行会打开新页面的操作后应结束本次回答。
+"""
+
+
 # Convenience constants that call the functions
 PHONE_AGENT_PROMPT_ZH = get_phone_agent_prompt_zh()
 PHONE_AGENT_PROMPT_EN = get_phone_agent_prompt_en()
@@ -0,0 +1,96 @@
+"""Perceptual hashing to detect when the screen did not change between steps.
+
+After a ``Wait`` or an action with no visible effect, the next screenshot is
+identical to the previous one and sending it to the vision model again is wasted
+work. A difference hash (dHash) is computed for every captured frame. Frames
+whose hashes differ by at most a few bits are treated as unchanged, and the
+step loop applies one of the policies below instead of a regular model call:
+
+- ``off``: always call the model (default)
+- ``repoll``: wait briefly and capture again, a few times, before calling the model
+- ``text``: call the model with a text-only "screen unchanged" turn (no image)
+- ``reuse``: repeat the previous action without calling the model
+"""
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+from PIL import Image
+
+UNCHANGED_SCREEN_POLICIES = ("off", "repoll", "text", "reuse")
+
+DEFAULT_HASH_SIZE = 16  # 16x16 gradient grid -> 256-bit hash
+
+
+@dataclass
+class TaskStats:
+    """Per-task counters reported with the phone_task result."""
+
+    steps: int = 0
+    model_calls: int = 0
+    unchanged_frames: int = 0
+    repolls: int = 0
+    text_only_turns: int = 0
+    model_calls_avoided: int = 0
+    cache_hits: int = 0
+    cache_divergences: int = 0
+    batched_actions: int = 0
+    batch_aborts: int = 0
+
+    def to_dict(self) -> dict[str, int]:
+        """Convert to a plain dictionary.
+
+        Returns:
+            Counter names mapped to their values.
+        """
+        return asdict(self)
+
+
+def validate_policy(policy: str) -> str:
+    """Normalize and validate an unchanged-screen policy name.
+
+    Args:
+        policy: One of UNCHANGED_SCREEN_POLICIES (case-insensitive).
+
+    Returns:
+        The normalized policy name.
+
+    Raises:
+        ValueError: If the policy is not supported.
+    """
+    normalized = policy.lower()
+    if normalized not in UNCHANGED_SCREEN_POLICIES:
+        msg = (
+            f"Unsupported unchanged screen policy: {policy}. "
+            f"Must be one of {', '.join(UNCHANGED_SCREEN_POLICIES)}."
+        )
+        raise ValueError(msg)
+    return normalized
+
+
+def dhash(img: Image.Image, hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """Compute the difference hash of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and each
+    bit records whether a cell is brighter than its right neighbour.
+
+    Args:
+        img: Image to hash.
+        hash_size: Grid size; the hash has hash_size**2 bits.
+
+    Returns:
+        The hash as an integer.
+    """
+    small = img.resize((hash_size + 1, hash_size), Image.Resampling.BOX)
+    pixels = np.asarray(small.convert("L"), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Count the differing bits between two hashes.
+
+    Returns:
+        Number of differing bits.
+    """
+    return (a ^ b).bit_count()
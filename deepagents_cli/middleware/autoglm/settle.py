@@ -0,0 +1,169 @@
+"""Adaptive post-action waiting: return as soon as the screen stops changing.
+
+After a tap, swipe or launch the UI animates for a variable amount of time. Fixed
+sleeps have to cover the slowest case. This module instead polls cheap
+low-resolution grayscale frames and stops once consecutive frames match, with a
+hard cap for screens that never settle (videos, spinners).
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+SETTLE_STRATEGIES = ("fixed", "adaptive")
+
+DEFAULT_SETTLE_TIMEOUT = 3.0
+DEFAULT_MIN_WAIT = 0.1
+DEFAULT_POLL_INTERVAL = 0.05
+DEFAULT_DIFF_THRESHOLD = 1.0  # Mean absolute luma difference (0-255)
+DEFAULT_PAGE_CHANGE_THRESHOLD = 10.0
+KEYBOARD_FRACTION = 0.45  # Bottom share of the screen a soft keyboard may cover
+
+
+@dataclass
+class SettleResult:
+    """Outcome of waiting for the screen to settle."""
+
+    settled: bool  # False if the timeout was hit or the wait was interrupted
+    elapsed: float  # Seconds spent waiting
+    frames: int  # Number of frames captured
+
+
+def validate_strategy(strategy: str) -> str:
+    """Normalize and validate a settle strategy name.
+
+    Args:
+        strategy: "fixed" or "adaptive" (case-insensitive).
+
+    Returns:
+        The normalized strategy name.
+
+    Raises:
+        ValueError: If the strategy is not supported.
+    """
+    normalized = strategy.lower()
+    if normalized not in SETTLE_STRATEGIES:
+        msg = (
+            f"Unsupported settle strategy: {strategy}. "
+            f"Must be one of {', '.join(SETTLE_STRATEGIES)}."
+        )
+        raise ValueError(msg)
+    return normalized
+
+
+def frame_difference(previous: np.ndarray, current: np.ndarray) -> float:
+    """Compute the mean absolute difference between two luma frames.
+
+    Args:
+        previous: Earlier frame.
+        current: Later frame.
+
+    Returns:
+        Mean absolute difference (0-255). Infinite if the frame sizes differ
+        (e.g. the screen rotated).
+    """
+    if previous.shape != current.shape:
+        return float("inf")
+    diff = np.abs(previous.astype(np.int16) - current.astype(np.int16))
+    return float(diff.mean())
+
+
+def page_changed(
+    reference: np.ndarray,
+    current: np.ndarray,
+    threshold: float = DEFAULT_PAGE_CHANGE_THRESHOLD,
+) -> bool:
+    """Check whether the screen moved to a different page.
+
+    Used between batched actions: typing and focusing fields change small areas
+    and may open the soft keyboard, while navigation replaces most of the screen.
+    Only the rows above the keyboard area are compared.
+
+    Args:
+        reference: Frame of the screen the actions were planned on.
+        current: Frame captured before the next action.
+        threshold: Minimum mean luma difference counted as a page change.
+
+    Returns:
+        True if the upper part of the screen differs by more than the threshold,
+        or the frame sizes differ.
+    """
+    if reference.shape != current.shape:
+        return True
+    rows = max(1, round(reference.shape[0] * (1 - KEYBOARD_FRACTION)))
+    return frame_difference(reference[:rows], current[:rows]) > threshold
+
+
+def wait_until_stable(
+    capture_frame: Callable[[], np.ndarray],
+    timeout: float = DEFAULT_SETTLE_TIMEOUT,
+    min_wait: float = DEFAULT_MIN_WAIT,
+    interval: float = DEFAULT_POLL_INTERVAL,
+    threshold: float = DEFAULT_DIFF_THRESHOLD,
+    stable_frames: int = 1,
+    interrupt: threading.Event | None = None,
+) -> SettleResult:
+    """Block until consecutive frames stop changing, or the timeout is reached.
+
+    Args:
+        capture_frame: Returns a low-resolution grayscale frame of the screen.
+        timeout: Maximum seconds to wait, including min_wait.
+        min_wait: Seconds to wait before the first capture, giving the UI time to
+            start reacting to the action.
+        interval: Pause between captures in seconds.
+        threshold: Maximum frame difference still considered unchanged.
+        stable_frames: Number of consecutive unchanged comparisons required.
+        interrupt: Optional event that aborts the wait when set.
+
+    Returns:
+        SettleResult describing how the wait ended. Capture errors end the wait
+        early and count as not settled.
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+
+    def _elapsed() -> float:
+        return time.monotonic() - start
+
+    if _sleep(min_wait, interrupt):
+        return SettleResult(settled=False, elapsed=_elapsed(), frames=0)
+
+    frames = 0
+    unchanged = 0
+    previous: np.ndarray | None = None
+    while time.monotonic() < deadline:
+        try:
+            current = capture_frame()
+        except Exception:  # noqa: BLE001
+            return SettleResult(settled=False, elapsed=_elapsed(), frames=frames)
+        frames += 1
+
+        if previous is not None:
+            if frame_difference(previous, current) <= threshold:
+                unchanged += 1
+                if unchanged >= stable_frames:
+                    return SettleResult(settled=True, elapsed=_elapsed(), frames=frames)
+            else:
+                unchanged = 0
+        previous = current
+
+        remaining = deadline - time.monotonic()
+        if _sleep(min(interval, max(remaining, 0)), interrupt):
+            break
+
+    return SettleResult(settled=False, elapsed=_elapsed(), frames=frames)
+
+
+def _sleep(seconds: float, interrupt: threading.Event | None) -> bool:
+    """Sleep, waking early if the interrupt is set.
+
+    Returns:
+        True if the interrupt was set.
+    """
+    if interrupt is None:
+        time.sleep(seconds)
+        return False
+    return interrupt.wait(seconds)
@@ -0,0 +1,384 @@
+"""Per-stage timing spans for phone tasks.
+
+Every step of a phone_task is split into stages, each measured as a span:
+
+- ``capture``: screenshot and foreground-app lookup (including re-polls), with
+  the concurrent ``screenshot`` and ``current_app`` spans inside it
+- ``sensitive``: time spent waiting for the user on a sensitive page
+- ``encode``: downscaling/re-encoding the screenshot for the vision model
+- ``model``: the vision model call (or action cache lookup), and ``first_token``
+  from the request to the first streamed chunk
+- ``parse``: parsing the model response into actions
+- ``action``: executing the action on the device
+- ``settle``: waiting for the screen to settle after the action
+- ``batch_check``: the page-change check before each batched action
+
+Spans go to pluggable sinks as they end (a JSON Lines file, an in-memory
+collector or OpenTelemetry) and are aggregated into a per-stage p50/p95 summary
+that is attached to the phone_task result:
+
+    >>> timer = TaskTimer([JsonlSink("timings.jsonl")])
+    >>> timings = timer.step(1)
+    >>> with timings.span("capture"):
+    ...     screenshot = controller.take_screenshot()
+    >>> timer.summary()["capture"]["p95"]
+"""
+
+import contextlib
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections.abc import Iterator, Sequence
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    """One timed stage of a step."""
+
+    task_id: str
+    step: int
+    stage: str
+    start: float
+    """Wall-clock start time (seconds since the epoch)."""
+    duration: float
+    """Seconds the stage took."""
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a JSON-serializable dictionary.
+
+        Returns:
+            Span fields, with times rounded to microseconds.
+        """
+        record = asdict(self)
+        record["start"] = round(self.start, 6)
+        record["duration"] = round(self.duration, 6)
+        return record
+
+
+class TimingSink(Protocol):
+    """Receives spans as they end. Sinks may be shared by concurrent tasks."""
+
+    def emit(self, span: Span) -> None:
+        """Handle a finished span."""
+        ...
+
+    def close(self) -> None:
+        """Flush and release resources."""
+        ...
+
+
+class MemorySink:
+    """Collects spans in memory, e.g. for tests or notebooks."""
+
+    def __init__(self) -> None:
+        """Create an empty sink."""
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def emit(self, span: Span) -> None:
+        """Keep a finished span.
+
+        Args:
+            span: Finished span.
+        """
+        with self._lock:
+            self.spans.append(span)
+
+    def close(self) -> None:
+        """Do nothing: the collected spans stay available."""
+
+    def durations(self, stage: str) -> list[float]:
+        """Durations of all collected spans of a stage.
+
+        Args:
+            stage: Stage name.
+
+        Returns:
+            Durations in seconds, in the order the spans ended.
+        """
+        with self._lock:
+            return [span.duration for span in self.spans if span.stage == stage]
+
+
+class JsonlSink:
+    """Appends spans to a JSON Lines file, one span per line."""
+
+    def __init__(self, path: str | Path) -> None:
+        """Open the file for appending, creating its directory if needed.
+
+        Args:
+            path: JSON Lines file to append spans to.
+        """
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def emit(self, span: Span) -> None:
+        """Append a finished span as one line. Spans after close() are dropped.
+
+        Args:
+            span: Finished span.
+        """
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """Close the file."""
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetrySink:
+    """Exports spans through the OpenTelemetry tracer provider.
+
+    Requires the optional ``opentelemetry-api`` package; exporters (OTLP,
+    LangSmith's OpenTelemetry endpoint, ...) are configured the usual way on the
+    global tracer provider.
+    """
+
+    def __init__(self, tracer_name: str = "deepagents_cli.autoglm") -> None:
+        """Create the sink.
+
+        Args:
+            tracer_name: Instrumentation scope name of the tracer.
+
+        Raises:
+            ImportError: If opentelemetry-api is not installed.
+        """
+        try:
+            from opentelemetry import trace  # noqa: PLC0415
+        except ImportError as e:
+            msg = (
+                "OpenTelemetry timing export requires the opentelemetry-api "
+                "package. Install it with: pip install opentelemetry-api"
+            )
+            raise ImportError(msg) from e
+        self._tracer = trace.get_tracer(tracer_name)
+
+    def emit(self, span: Span) -> None:
+        """Export a finished span with its original start and end times.
+
+        Args:
+            span: Finished span.
+        """
+        start_ns = int(span.start * 1e9)
+        attributes = {
+            "phone_task.id": span.task_id,
+            "phone_task.step": span.step,
+            **{
+                f"phone_task.{key}": value
+                for key, value in span.attributes.items()
+                if isinstance(value, str | bool | int | float)
+            },
+        }
+        otel_span = self._tracer.start_span(
+            f"phone_task.{span.stage}", start_time=start_ns, attributes=attributes
+        )
+        otel_span.end(end_time=start_ns + int(span.duration * 1e9))
+
+    def close(self) -> None:
+        """Do nothing: the tracer provider owns the exporters."""
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentile with linear interpolation between the closest ranks.
+
+    Args:
+        values: Samples (need not be sorted).
+        q: Percentile between 0 and 100.
+
+    Returns:
+        The percentile, or 0.0 for no samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = math.floor(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class StepTimer:
+    """Times the stages of one step.
+
+    Durations of a stage measured more than once in the step (e.g. screenshots
+    taken while re-polling) are added up.
+    """
+
+    def __init__(self, timer: "TaskTimer", step: int) -> None:
+        """Create the step's timer (see TaskTimer.step).
+
+        Args:
+            timer: Task timer the spans are sent to.
+            step: Step number.
+        """
+        self.step = step
+        self.durations: dict[str, float] = {}
+        """Seconds per stage, as recorded in the trajectory."""
+        self._timer = timer
+
+    @contextlib.contextmanager
+    def span(self, stage: str, **attributes: Any) -> Iterator[None]:
+        """Time the enclosed block as a stage.
+
+        The span is recorded even if the block raises (e.g. on an interrupt).
+
+        Args:
+            stage: Stage name.
+            **attributes: Extra span attributes.
+
+        Yields:
+            Nothing.
+        """
+        wall_start = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(
+                stage, time.perf_counter() - start, start=wall_start, **attributes
+            )
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        *,
+        start: float | None = None,
+        **attributes: Any,
+    ) -> None:
+        """Record a stage measured by the caller.
+
+        Args:
+            stage: Stage name.
+            seconds: Duration of the stage.
+            start: Wall-clock start time. Defaults to now minus the duration.
+            **attributes: Extra span attributes.
+        """
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+        if start is None:
+            start = time.time() - seconds
+        self._timer.emit(
+            Span(self._timer.task_id, self.step, stage, start, seconds, attributes)
+        )
+
+
+class TaskTimer:
+    """Collects the stage timings of one phone task and reports percentiles."""
+
+    def __init__(self, sinks: Sequence[TimingSink] = ()) -> None:
+        """Create the timer.
+
+        Args:
+            sinks: Sinks every span is sent to.
+        """
+        self.task_id = uuid.uuid4().hex[:12]
+        """Identifies the task's spans in shared sinks."""
+        self._sinks = list(sinks)
+        self._steps: list[StepTimer] = []
+
+    def step(self, step: int) -> StepTimer:
+        """Start timing a step (or one action of a batched step).
+
+        Args:
+            step: Step number.
+
+        Returns:
+            The step's timer.
+        """
+        timer = StepTimer(self, step)
+        self._steps.append(timer)
+        return timer
+
+    def emit(self, span: Span) -> None:
+        """Send a span to every sink. A sink that fails is removed.
+
+        Args:
+            span: Finished span.
+        """
+        for sink in self._sinks:
+            try:
+                sink.emit(span)
+            except Exception:
+                # Rebind rather than mutate: other threads may be iterating
+                self._sinks = [other for other in self._sinks if other is not sink]
+                logger.warning(
+                    "Timing sink %s failed and was disabled",
+                    type(sink).__name__,
+                    exc_info=True,
+                )
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Aggregate the stage durations of all steps.
+
+        Returns:
+            Per stage: the number of samples, p50, p95, max and total seconds.
+        """
+        samples: dict[str, list[float]] = {}
+        for step in self._steps:
+            for stage, seconds in step.durations.items():
+                samples.setdefault(stage, []).append(seconds)
+        return {
+            stage: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "max": round(max(values), 4),
+                "total": round(sum(values), 4),
+            }
+            for stage, values in samples.items()
+        }
+
+
+def format_summary(summary: dict[str, dict[str, float]]) -> str:
+    """Render a timing summary as a small text table.
+
+    Args:
+        summary: Result of TaskTimer.summary().
+
+    Returns:
+        One line per stage, slowest total first.
+    """
+    rows = sorted(summary.items(), key=lambda item: -item[1]["total"])
+    lines = [f"{'stage':<12} {'n':>4} {'p50':>8} {'p95':>8} {'total':>8}"]
+    lines.extend(
+        f"{stage:<12} {stats['count']:>4} {stats['p50']:>7.3f}s "
+        f"{stats['p95']:>7.3f}s {stats['total']:>7.2f}s"
+        for stage, stats in rows
+    )
+    return "\n".join(lines)
+
+
+def create_sinks(
+    log_path: str | None = None, *, otel: bool = False
+) -> list[TimingSink]:
+    """Create the sinks selected in the configuration.
+
+    Args:
+        log_path: JSON Lines file to append spans to, or None.
+        otel: Also export spans through OpenTelemetry.
+
+    Returns:
+        The configured sinks (possibly empty).
+    """
+    sinks: list[TimingSink] = []
+    if log_path:
+        sinks.append(JsonlSink(log_path))
+    if otel:
+        sinks.append(OpenTelemetrySink())
+    return sinks
@@ -0,0 +1,663 @@
+"""Low-latency touch injection for Android, without ``input``.
+
+``input tap`` and ``input swipe`` start a Java process (app_process) on the
+device for every gesture, roughly 300 ms before the touch lands, and a double
+tap made of two ``input tap`` calls is often too slow to register as one. A
+TouchInjector keeps a device-side injector alive instead and describes every
+gesture in the minitouch protocol:
+
+    d <contact> <x> <y> <pressure>   put a finger down
+    m <contact> <x> <y> <pressure>   move a finger
+    u <contact>                      lift a finger
+    c                                commit the pending changes as one frame
+    w <ms>                           wait
+
+Two backends run these commands:
+
+- ``minitouch`` streams them to a minitouch daemon
+  (https://github.com/DeviceFarmer/minitouch) over one ADB connection to its
+  ``localabstract:minitouch`` socket. The binary built for the device's ABI has
+  to be pushed to MINITOUCH_PATH; it is started when no daemon is running.
+- ``sendevent`` writes raw multi-touch (protocol B) events to the touchscreen's
+  event node, one shell round trip per gesture. Nothing has to be installed,
+  but every event is a small process on the device (about a millisecond).
+
+``auto`` uses minitouch when it is available and sendevent otherwise; ``input``
+disables the injector. Callers fall back to ``input`` whenever an injector
+raises TouchError.
+
+Coordinates are screen pixels in the current orientation. They are mapped to
+the touch panel's natural orientation using the display rotation, which is read
+when the injector starts and again whenever the screen switches between
+portrait and landscape (see TouchInjector.set_screen_size).
+"""
+
+import contextlib
+import re
+import socket
+import subprocess  # noqa: S404
+import threading
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+
+from deepagents_cli.middleware.autoglm import adb_client
+from deepagents_cli.middleware.autoglm.adb_shell import AdbShellError, AdbShellSession
+
+TOUCH_BACKENDS = ("input", "auto", "minitouch", "sendevent")
+
+MINITOUCH_PATH = "/data/local/tmp/minitouch"
+MINITOUCH_SOCKET = "minitouch"
+_MINITOUCH_START_TIMEOUT = 3.0
+_MINITOUCH_POLL_INTERVAL = 0.05
+_SOCKET_TIMEOUT = 2.0
+_SHELL_TIMEOUT = 5.0
+
+TAP_HOLD_MS = 20  # Finger contact time of a tap
+DOUBLE_TAP_GAP_MS = 80  # Well inside Android's 300 ms double-tap timeout
+MOVE_INTERVAL_MS = 16  # One move event per display frame
+DEFAULT_PRESSURE = 50
+
+# Linux input event types and codes
+_EV_SYN = 0
+_EV_KEY = 1
+_EV_ABS = 3
+_SYN_REPORT = 0
+_BTN_TOUCH = 330
+_ABS_MT_SLOT = 47
+_ABS_MT_POSITION_X = 53
+_ABS_MT_POSITION_Y = 54
+_ABS_MT_TRACKING_ID = 57
+_ABS_MT_PRESSURE = 58
+
+_AXIS_RE = re.compile(r"(ABS_MT_\w+)\s*:\s*value -?\d+, min -?\d+, max (-?\d+)")
+_HEADER_RE = re.compile(r"^\^ (\d+) (\d+) (\d+) (\d+)", re.MULTILINE)
+_SIZE_RE = re.compile(r"size: (\d+)x(\d+)")
+_ROTATION_RE = re.compile(r"(?:SurfaceOrientation: |orientation=)(?:ROTATION_)?(\d+)")
+
+Point = tuple[int, int]
+
+
+class TouchError(RuntimeError):
+    """Raised when the touch injector is unavailable or a gesture was not sent."""
+
+
+@dataclass
+class TouchPanel:
+    """Coordinate space of the touchscreen in its natural orientation."""
+
+    max_x: int
+    max_y: int
+    max_contacts: int = 10
+    max_pressure: int = 0  # 0 if the panel reports no pressure
+    path: str | None = None  # Event node, used by the sendevent backend
+
+
+def validate_backend(backend: str) -> str:
+    """Normalize and validate a touch backend name.
+
+    Args:
+        backend: One of TOUCH_BACKENDS (case-insensitive).
+
+    Returns:
+        The normalized backend name.
+
+    Raises:
+        ValueError: If the backend is not supported.
+    """
+    normalized = backend.lower()
+    if normalized not in TOUCH_BACKENDS:
+        msg = (
+            f"Unsupported touch backend: {backend}. "
+            f"Must be one of {', '.join(TOUCH_BACKENDS)}."
+        )
+        raise ValueError(msg)
+    return normalized
+
+
+def parse_getevent(output: str) -> TouchPanel | None:
+    """Find the touchscreen in ``getevent -pl`` output.
+
+    Args:
+        output: Output of ``getevent -pl``.
+
+    Returns:
+        The first multi-touch (protocol B) device, preferring one flagged as a
+        direct input device (a touchscreen rather than a touchpad). None if
+        there is none.
+    """
+    fallback = None
+    for block in re.split(r"^add device \d+: ", output, flags=re.MULTILINE)[1:]:
+        axes = {name: int(maximum) for name, maximum in _AXIS_RE.findall(block)}
+        if not {"ABS_MT_SLOT", "ABS_MT_POSITION_X", "ABS_MT_POSITION_Y"} <= set(axes):
+            continue
+        panel = TouchPanel(
+            max_x=axes["ABS_MT_POSITION_X"],
+            max_y=axes["ABS_MT_POSITION_Y"],
+            max_contacts=axes["ABS_MT_SLOT"] + 1,
+            max_pressure=axes.get("ABS_MT_PRESSURE", 0),
+            path=block.split(maxsplit=1)[0],
+        )
+        if "INPUT_PROP_DIRECT" in block:
+            return panel
+        fallback = fallback or panel
+    return fallback
+
+
+def parse_minitouch_header(header: str) -> TouchPanel:
+    """Parse the banner minitouch sends when a client connects.
+
+    Args:
+        header: Banner lines (``v <version>``, ``^ <contacts> <max-x> <max-y>
+            <max-pressure>``, ``$ <pid>``).
+
+    Returns:
+        The panel described by the banner.
+
+    Raises:
+        TouchError: If the banner has no limits line.
+    """
+    match = _HEADER_RE.search(header)
+    if match is None:
+        msg = f"Unexpected minitouch banner: {header!r}"
+        raise TouchError(msg)
+    contacts, max_x, max_y, max_pressure = map(int, match.groups())
+    return TouchPanel(max_x, max_y, contacts, max_pressure)
+
+
+def tap_commands(
+    x: int, y: int, pressure: int = DEFAULT_PRESSURE, hold_ms: int = TAP_HOLD_MS
+) -> list[str]:
+    """Build a tap (or a long press, with a long hold_ms).
+
+    Args:
+        x: Panel X coordinate.
+        y: Panel Y coordinate.
+        pressure: Contact pressure.
+        hold_ms: Milliseconds between finger down and up.
+
+    Returns:
+        Minitouch commands.
+    """
+    return [f"d 0 {x} {y} {pressure}", "c", f"w {hold_ms}", "u 0", "c"]
+
+
+def stroke_commands(
+    strokes: Sequence[tuple[Point, Point]],
+    duration_ms: int,
+    pressure: int = DEFAULT_PRESSURE,
+) -> list[str]:
+    """Build a gesture moving one finger per stroke, all at the same time.
+
+    Args:
+        strokes: Start and end panel coordinates of each finger.
+        duration_ms: Milliseconds from finger down to finger up.
+        pressure: Contact pressure.
+
+    Returns:
+        Minitouch commands with one move per finger every MOVE_INTERVAL_MS.
+    """
+    steps = max(1, round(duration_ms / MOVE_INTERVAL_MS))
+    wait = f"w {max(1, round(duration_ms / steps))}"
+    commands = [
+        f"d {contact} {x} {y} {pressure}" for contact, ((x, y), _) in enumerate(strokes)
+    ]
+    commands.append("c")
+    for step in range(1, steps + 1):
+        t = step / steps
+        commands.append(wait)
+        commands.extend(
+            f"m {contact} {round(x0 + (x1 - x0) * t)} {round(y0 + (y1 - y0) * t)} "
+            f"{pressure}"
+            for contact, ((x0, y0), (x1, y1)) in enumerate(strokes)
+        )
+        commands.append("c")
+    commands.extend(f"u {contact}" for contact in range(len(strokes)))
+    commands.append("c")
+    return commands
+
+
+def commands_duration(commands: Sequence[str]) -> float:
+    """Get the time a command list spends waiting.
+
+    Args:
+        commands: Minitouch commands.
+
+    Returns:
+        Total of the ``w`` commands in seconds.
+    """
+    return sum(int(c[2:]) for c in commands if c.startswith("w ")) / 1000
+
+
+def sendevent_script(commands: Sequence[str], panel: TouchPanel) -> str:
+    """Translate minitouch commands into ``sendevent`` calls (protocol B).
+
+    Args:
+        commands: Minitouch commands.
+        panel: Touchscreen to write to (needs its event node path).
+
+    Returns:
+        A one-line shell script.
+    """
+    script = [f"e() {{ sendevent {panel.path} $1 $2 $3; }}"]
+    down: set[int] = set()
+    for command in commands:
+        op, *args = command.split()
+        if op == "w":
+            script.append(f"sleep {int(args[0]) / 1000:g}")
+            continue
+        if op == "c":
+            events = [(_EV_SYN, _SYN_REPORT, 0)]
+        elif op == "u":
+            contact = int(args[0])
+            events = [
+                (_EV_ABS, _ABS_MT_SLOT, contact),
+                (_EV_ABS, _ABS_MT_TRACKING_ID, -1),
+            ]
+            down.discard(contact)
+            if not down:
+                events.append((_EV_KEY, _BTN_TOUCH, 0))
+        else:
+            contact, x, y, pressure = map(int, args)
+            events = [(_EV_ABS, _ABS_MT_SLOT, contact)]
+            if op == "d":
+                events.append((_EV_ABS, _ABS_MT_TRACKING_ID, contact + 1))
+                if not down:
+                    events.append((_EV_KEY, _BTN_TOUCH, 1))
+                down.add(contact)
+            events += [
+                (_EV_ABS, _ABS_MT_POSITION_X, x),
+                (_EV_ABS, _ABS_MT_POSITION_Y, y),
+            ]
+            if panel.max_pressure:
+                events.append((_EV_ABS, _ABS_MT_PRESSURE, pressure))
+        script.extend(f"e {kind} {code} {value}" for kind, code, value in events)
+    return "; ".join(script)
+
+
+class _Minitouch:
+    """Streams commands to a minitouch daemon over one ADB connection."""
+
+    def __init__(self, device_id: str | None, run: Callable[[str], str]) -> None:
+        self.device_id = device_id
+        self._run = run
+        self._sock: socket.socket | None = None
+        self._daemon: socket.socket | None = None
+
+    def open(self) -> TouchPanel:
+        client = adb_client.get_client()
+        try:
+            return self._connect(client)
+        except (adb_client.AdbError, OSError):
+            pass  # No daemon running yet
+
+        try:
+            self._run(f"test -x {MINITOUCH_PATH}")
+        except TouchError:
+            msg = f"minitouch is not installed at {MINITOUCH_PATH}"
+            raise TouchError(msg) from None
+        try:
+            # The daemon runs for as long as this shell stream stays open
+            self._daemon = client.open_stream(
+                self.device_id, f"shell:{MINITOUCH_PATH}", timeout=None
+            )
+        except (adb_client.AdbError, OSError) as e:
+            msg = f"Could not start minitouch: {e}"
+            raise TouchError(msg) from e
+
+        deadline = time.monotonic() + _MINITOUCH_START_TIMEOUT
+        while True:
+            try:
+                return self._connect(client)
+            except (adb_client.AdbError, OSError) as e:
+                if time.monotonic() > deadline:
+                    self.close()
+                    msg = f"minitouch did not start: {e}"
+                    raise TouchError(msg) from e
+                time.sleep(_MINITOUCH_POLL_INTERVAL)
+
+    def _connect(self, client: adb_client.AdbClient) -> TouchPanel:
+        sock = client.open_stream(
+            self.device_id, f"localabstract:{MINITOUCH_SOCKET}", _SOCKET_TIMEOUT
+        )
+        header = b""
+        try:
+            while not re.search(rb"^\$ .*\n", header, re.MULTILINE):
+                chunk = sock.recv(1024)
+                if not chunk:
+                    msg = "minitouch closed the connection"
+                    raise ConnectionError(msg)
+                header += chunk
+        except BaseException:
+            sock.close()
+            raise
+        self._sock = sock
+        return parse_minitouch_header(header.decode("ascii", errors="replace"))
+
+    def send(self, commands: Sequence[str]) -> None:
+        if self._sock is None:
+            msg = "minitouch is not connected"
+            raise TouchError(msg)
+        try:
+            self._sock.sendall(("\n".join(commands) + "\n").encode("ascii"))
+        except OSError as e:
+            self.close()
+            msg = f"minitouch connection lost: {e}"
+            raise TouchError(msg) from e
+        # The daemon performs the waits: return once the gesture is over
+        time.sleep(commands_duration(commands))
+
+    def close(self) -> None:
+        for sock in (self._sock, self._daemon):
+            if sock is not None:
+                with contextlib.suppress(OSError):
+                    sock.close()
+        self._sock = self._daemon = None
+
+
+class _Sendevent:
+    """Runs each gesture as one script of ``sendevent`` calls."""
+
+    def __init__(self, run: Callable[..., str]) -> None:
+        self._run = run
+        self._panel: TouchPanel | None = None
+
+    def open(self) -> TouchPanel:
+        panel = parse_getevent(self._run("getevent -pl"))
+        if panel is None:
+            msg = "No multi-touch (protocol B) touchscreen found"
+            raise TouchError(msg)
+        self._panel = panel
+        return panel
+
+    def send(self, commands: Sequence[str]) -> None:
+        if self._panel is None:
+            msg = "sendevent backend is not open"
+            raise TouchError(msg)
+        self._run(
+            sendevent_script(commands, self._panel),
+            timeout=commands_duration(commands) + _SHELL_TIMEOUT,
+        )
+
+    def close(self) -> None:
+        self._panel = None
+
+
+class TouchInjector:
+    """Injects touch gestures through a device-side injector kept between calls.
+
+    Thread-safe. The backend is started on the first gesture. If it cannot be
+    started, every later gesture raises TouchError right away, so callers fall
+    back to ``input`` without retrying.
+    """
+
+    def __init__(
+        self,
+        device_id: str | None = None,
+        backend: str = "auto",
+        shell: AdbShellSession | None = None,
+    ) -> None:
+        """Initialize the injector. Nothing runs on the device until a gesture.
+
+        Args:
+            device_id: Optional device ID.
+            backend: "auto", "minitouch" or "sendevent".
+            shell: Optional persistent shell session for device commands.
+        """
+        self.device_id = device_id
+        self.backend = validate_backend(backend)
+        self.shell = shell
+        self._lock = threading.Lock()
+        self._transport: _Minitouch | _Sendevent | None = None
+        self._panel: TouchPanel | None = None
+        self._error: str | None = None
+        self._screen: Point | None = None  # Current screen size in pixels
+        self._natural: Point | None = None  # Screen size in natural orientation
+        self._rotation: int | None = None  # Quarter turns, as Display.getRotation
+
+    @property
+    def error(self) -> str | None:
+        """Why the injector is unavailable, or None."""
+        return self._error
+
+    def set_screen_size(self, width: int, height: int) -> None:
+        """Report the current screen size, e.g. from the latest screenshot.
+
+        The display rotation is read again before the next gesture when the
+        screen switched between portrait and landscape.
+
+        Args:
+            width: Screen width in pixels.
+            height: Screen height in pixels.
+        """
+        with self._lock:
+            previous = self._screen
+            if previous is not None and (previous[0] > previous[1]) != (width > height):
+                self._rotation = None
+            self._screen = (width, height)
+
+    def tap(self, x: int, y: int) -> None:
+        """Tap at screen coordinates.
+
+        Raises:
+            TouchError: If the gesture could not be injected.
+        """
+        self._inject(lambda: tap_commands(*self._to_panel(x, y), self._pressure()))
+
+    def double_tap(self, x: int, y: int, interval_ms: int = DOUBLE_TAP_GAP_MS) -> None:
+        """Tap twice in quick succession, in a single gesture.
+
+        Raises:
+            TouchError: If the gesture could not be injected.
+        """
+
+        def build() -> list[str]:
+            tap = tap_commands(*self._to_panel(x, y), self._pressure())
+            return [*tap, f"w {interval_ms}", *tap]
+
+        self._inject(build)
+
+    def long_press(self, x: int, y: int, duration_ms: int) -> None:
+        """Hold a finger at screen coordinates.
+
+        Raises:
+            TouchError: If the gesture could not be injected.
+        """
+        self._inject(
+            lambda: tap_commands(
+                *self._to_panel(x, y), self._pressure(), hold_ms=duration_ms
+            )
+        )
+
+    def swipe(
+        self, start_x: int, start_y: int, end_x: int, end_y: int, duration_ms: int
+    ) -> None:
+        """Swipe one finger between screen coordinates.
+
+        Raises:
+            TouchError: If the gesture could not be injected.
+        """
+        self.gesture([((start_x, start_y), (end_x, end_y))], duration_ms)
+
+    def gesture(self, strokes: Sequence[tuple[Point, Point]], duration_ms: int) -> None:
+        """Move several fingers at once, e.g. two strokes apart for a pinch.
+
+        Args:
+            strokes: Start and end screen coordinates of each finger.
+            duration_ms: Milliseconds from finger down to finger up.
+
+        Raises:
+            TouchError: If the gesture could not be injected or uses more
+                fingers than the panel tracks.
+        """
+
+        def build() -> list[str]:
+            if self._panel is not None and len(strokes) > self._panel.max_contacts:
+                msg = (
+                    f"The touchscreen tracks at most {self._panel.max_contacts} fingers"
+                )
+                raise TouchError(msg)
+            panel_strokes = [
+                (self._to_panel(*start), self._to_panel(*end)) for start, end in strokes
+            ]
+            return stroke_commands(panel_strokes, duration_ms, self._pressure())
+
+        self._inject(build)
+
+    def close(self) -> None:
+        """Stop the injector. The next gesture starts it again."""
+        with self._lock:
+            if self._transport is not None:
+                self._transport.close()
+            self._transport = None
+
+    def _inject(self, build: Callable[[], list[str]]) -> None:
+        with self._lock:
+            transport = self._open()
+            commands = build()
+            try:
+                transport.send(commands)
+            except TouchError:
+                # Reconnect on the next gesture
+                transport.close()
+                self._transport = None
+                raise
+
+    def _open(self) -> _Minitouch | _Sendevent:
+        if self._transport is not None:
+            return self._transport
+        if self._error is not None:
+            raise TouchError(self._error)
+
+        names = (
+            ("minitouch", "sendevent") if self.backend == "auto" else (self.backend,)
+        )
+        errors = []
+        for name in names:
+            transport = (
+                _Minitouch(self.device_id, self._shell)
+                if name == "minitouch"
+                else _Sendevent(self._shell)
+            )
+            try:
+                self._panel = transport.open()
+            except TouchError as e:
+                errors.append(f"{name}: {e}")
+                continue
+            self._transport = transport
+            break
+        else:
+            self._error = "; ".join(errors)
+            print(f"Touch injection unavailable, using input: {self._error}")
+            raise TouchError(self._error)
+
+        if self._natural is None:
+            self._natural = self._read_natural_size()
+        return self._transport
+
+    def _read_natural_size(self) -> Point:
+        """Read the display size in its natural orientation (``wm size``).
+
+        Returns:
+            Width and height in pixels, or the panel range if unknown.
+        """
+        try:
+            sizes = _SIZE_RE.findall(self._shell("wm size"))
+        except TouchError:
+            sizes = []
+        if sizes:
+            # An override size (wm size WxH) follows the physical size
+            width, height = sizes[-1]
+            return int(width), int(height)
+        return self._panel.max_x + 1, self._panel.max_y + 1
+
+    def _read_rotation(self) -> int:
+        """Read the display rotation.
+
+        Returns:
+            Quarter turns from the natural orientation (0 if unknown).
+        """
+        try:
+            output = self._shell(
+                "dumpsys input | grep -m 1 -E 'SurfaceOrientation|orientation='"
+            )
+        except TouchError:
+            return 0
+        match = _ROTATION_RE.search(output)
+        if match is None:
+            return 0
+        value = int(match.group(1))
+        return value // 90 % 4 if value >= 90 else value % 4
+
+    def _to_panel(self, x: int, y: int) -> Point:
+        """Map screen pixels in the current orientation to panel coordinates.
+
+        Returns:
+            Panel X and Y coordinates.
+        """
+        if self._rotation is None:
+            self._rotation = self._read_rotation()
+        rotation = self._rotation
+        natural_width, natural_height = self._natural
+        width, height = self._screen or (
+            (natural_height, natural_width)
+            if rotation % 2
+            else (natural_width, natural_height)
+        )
+        u = min(max(x / width, 0.0), 1.0)
+        v = min(max(y / height, 0.0), 1.0)
+        if rotation == 1:
+            u, v = 1 - v, u
+        elif rotation == 2:
+            u, v = 1 - u, 1 - v
+        elif rotation == 3:
+            u, v = v, 1 - u
+        return round(u * self._panel.max_x), round(v * self._panel.max_y)
+
+    def _pressure(self) -> int:
+        return min(DEFAULT_PRESSURE, self._panel.max_pressure)
+
+    def _shell(self, command: str, timeout: float = _SHELL_TIMEOUT) -> str:
+        """Run a device command on the persistent session or the ADB server.
+
+        Returns:
+            The command output.
+
+        Raises:
+            TouchError: If the command could not run or failed.
+        """
+        try:
+            if self.shell is not None:
+                result = self.shell.run(command, timeout=timeout)
+            else:
+                result = adb_client.get_client().shell(
+                    self.device_id, command, timeout=timeout
+                )
+        except (AdbShellError, adb_client.AdbError, subprocess.TimeoutExpired) as e:
+            msg = f"{command.split(maxsplit=1)[0]}: {e}"
+            raise TouchError(msg) from e
+        if result.returncode != 0:
+            msg = f"{command.split(maxsplit=1)[0]} failed: {result.stdout.strip()}"
+            raise TouchError(msg)
+        return result.stdout
+
+
+def create_injector(
+    backend: str,
+    device_id: str | None = None,
+    shell: AdbShellSession | None = None,
+) -> TouchInjector | None:
+    """Create the touch injector for a backend name.
+
+    Args:
+        backend: One of TOUCH_BACKENDS.
+        device_id: Optional device ID.
+        shell: Optional persistent shell session.
+
+    Returns:
+        The injector, or None for the "input" backend.
+    """
+    backend = validate_backend(backend)
+    if backend == "input":
+        return None
+    return TouchInjector(device_id, backend, shell)
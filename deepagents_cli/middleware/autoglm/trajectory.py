@@ -0,0 +1,407 @@
+"""Record phone_task trajectories and replay them without the vision model.
+
+A trajectory is one append-only JSON Lines file per task. Every line is a record
+with a ``type``:
+
+- ``task``: task description, device info and start time (first line)
+- ``frame``: a screenshot, stored once and addressed by the hash of its data
+- ``step``: frame ID, foreground app, prompt text, model response, parsed action,
+  action result and per-stage timings
+- ``end``: final status, message and task stats (last line)
+
+Records are flushed as they are written, so a crashed or interrupted task leaves
+a readable prefix. Identical frames (e.g. after a ``Wait``) are stored once.
+
+``replay`` runs the recorded actions again, optionally checking before each one
+that the screen still looks like the recorded frame:
+
+    >>> trajectory = load_trajectory("checkin.jsonl")
+    >>> result = replay(trajectory, execute, capture=controller.take_screenshot)
+"""
+
+import base64
+import hashlib
+import json
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Any
+
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm import action_parser, screen_change
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+
+TRAJECTORY_VERSION = 1
+
+# Maximum differing dHash bits (out of 256) for the live screen to still match a
+# recorded frame during replay. Looser than unchanged-screen detection so that
+# clocks, badges and other small changes do not stop a replay.
+DEFAULT_MAX_DISTANCE = 24
+
+
+def frame_id(screenshot: Screenshot) -> str:
+    """Content address of a screenshot.
+
+    Args:
+        screenshot: Screenshot to identify.
+
+    Returns:
+        Hex digest of the encoded image data.
+    """
+    digest = hashlib.blake2b(screenshot.base64_data.encode("ascii"), digest_size=16)
+    return digest.hexdigest()
+
+
+class TrajectoryRecorder:
+    """Writes the trajectory of one phone task to a JSON Lines file."""
+
+    def __init__(self, path: str | Path, task: str, device: dict[str, Any]) -> None:
+        """Create the file and write the task record.
+
+        Args:
+            path: Trajectory file to create (parent directories are created).
+            task: Task description.
+            device: Device information (platform, device ID, ...).
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.finished = False
+        self._frames: set[str] = set()
+        self._file: IO[str] | None = self.path.open("a", encoding="utf-8")
+        self._write(
+            {
+                "type": "task",
+                "version": TRAJECTORY_VERSION,
+                "task": task,
+                "device": device,
+                "started": time.time(),
+            }
+        )
+
+    def record_frame(self, screenshot: Screenshot) -> str | None:
+        """Store a screenshot unless an identical one was stored already.
+
+        Args:
+            screenshot: Captured screenshot.
+
+        Returns:
+            The frame ID, or None for sensitive screens (which are not stored).
+        """
+        if screenshot.is_sensitive:
+            return None
+        key = frame_id(screenshot)
+        if key not in self._frames:
+            self._frames.add(key)
+            self._write(
+                {
+                    "type": "frame",
+                    "id": key,
+                    "format": screenshot.format,
+                    "width": screenshot.width,
+                    "height": screenshot.height,
+                    "data": screenshot.base64_data,
+                }
+            )
+        return key
+
+    def record_step(
+        self,
+        step: int,
+        *,
+        frame: str | None,
+        width: int,
+        height: int,
+        current_app: str | None = None,
+        prompt: str | None = None,
+        response: str | None = None,
+        action: dict[str, Any] | None = None,
+        result: dict[str, Any] | None = None,
+        timings: dict[str, float] | None = None,
+        note: str | None = None,
+    ) -> None:
+        """Append a step record.
+
+        Args:
+            step: Step number.
+            frame: ID returned by record_frame(), None for sensitive screens.
+            width: Screen width the action coordinates were converted with.
+            height: Screen height the action coordinates were converted with.
+            current_app: Foreground app.
+            prompt: Text sent to the model for this step (None without a call).
+            response: Raw model response (None without a call).
+            action: Parsed action, None if parsing failed or nothing was done.
+            result: Action result with 'success' and 'message'.
+            timings: Seconds spent per stage (see timing.py for the stages).
+            note: Why the step is special, e.g. "sensitive" or "reused".
+        """
+        record = {
+            "type": "step",
+            "step": step,
+            "frame": frame,
+            "width": width,
+            "height": height,
+            "current_app": current_app,
+            "prompt": prompt,
+            "response": response,
+            "action": action,
+            "result": result,
+            "timings": {
+                stage: round(seconds, 4) for stage, seconds in (timings or {}).items()
+            },
+        }
+        if note:
+            record["note"] = note
+        self._write(record)
+
+    def finish(
+        self, status: str, message: str = "", stats: dict[str, Any] | None = None
+    ) -> None:
+        """Append the end record.
+
+        Args:
+            status: "success" or "error".
+            message: Final message of the task.
+            stats: Task counters.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        self._write(
+            {
+                "type": "end",
+                "status": status,
+                "message": message,
+                "stats": stats or {},
+                "ended": time.time(),
+            }
+        )
+
+    def close(self) -> None:
+        """Close the file, recording an error end if finish() was not called."""
+        if self._file is None:
+            return
+        self.finish("error", "Recording stopped before the task ended")
+        self._file.close()
+        self._file = None
+
+    def _write(self, record: dict[str, Any]) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+
+@dataclass
+class TrajectoryStep:
+    """One recorded step."""
+
+    step: int
+    frame: str | None
+    width: int
+    height: int
+    current_app: str | None = None
+    prompt: str | None = None
+    response: str | None = None
+    action: dict[str, Any] | None = None
+    result: dict[str, Any] | None = None
+    timings: dict[str, float] = field(default_factory=dict)
+    note: str | None = None
+
+
+@dataclass
+class Trajectory:
+    """A trajectory loaded from a file."""
+
+    task: str
+    device: dict[str, Any]
+    frames: dict[str, dict[str, Any]]
+    """Frame records by ID."""
+
+    steps: list[TrajectoryStep]
+    end: dict[str, Any] | None = None
+    """End record, None if the recording was cut short."""
+
+    def frame_image(self, key: str) -> Image.Image:
+        """Decode a recorded frame.
+
+        Args:
+            key: Frame ID.
+
+        Returns:
+            The decoded image.
+        """
+        data = base64.b64decode(self.frames[key]["data"])
+        return Image.open(BytesIO(data))
+
+
+def load_trajectory(path: str | Path) -> Trajectory:
+    """Read a trajectory file.
+
+    A truncated last line (from a crash while writing) is ignored.
+
+    Args:
+        path: Trajectory file.
+
+    Returns:
+        The trajectory.
+
+    Raises:
+        ValueError: If the file does not start with a task record.
+    """
+    task: dict[str, Any] | None = None
+    frames: dict[str, dict[str, Any]] = {}
+    steps: list[TrajectoryStep] = []
+    end = None
+
+    with Path(path).open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            kind = record.pop("type", None)
+            if kind == "task":
+                task = record
+            elif kind == "frame":
+                frames[record["id"]] = record
+            elif kind == "step":
+                steps.append(TrajectoryStep(**record))
+            elif kind == "end":
+                end = record
+
+    if task is None:
+        msg = f"Not a trajectory file: {path}"
+        raise ValueError(msg)
+    return Trajectory(
+        task=task["task"],
+        device=task.get("device", {}),
+        frames=frames,
+        steps=steps,
+        end=end,
+    )
+
+
+@dataclass
+class ReplayResult:
+    """Outcome of a replay."""
+
+    completed: bool
+    """Whether the replay reached the recorded finish action."""
+
+    steps: int = 0
+    """Number of actions executed."""
+
+    message: str = ""
+    diverged_at: int | None = None
+    """Recorded step number at which the screen no longer matched."""
+
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert to a plain dictionary.
+
+        Returns:
+            Field names mapped to their values.
+        """
+        return asdict(self)
+
+
+def replay(
+    trajectory: Trajectory,
+    execute: Callable[[dict[str, Any], int, int], dict[str, Any]],
+    *,
+    capture: Callable[[], Screenshot] | None = None,
+    settle: Callable[[str | None], None] | None = None,
+    should_stop: Callable[[], bool] | None = None,
+    max_distance: int | None = DEFAULT_MAX_DISTANCE,
+) -> ReplayResult:
+    """Run the actions of a recorded trajectory again.
+
+    Steps whose action failed or could not be parsed are skipped, since they did
+    not change the screen when recorded. A step recorded on a sensitive screen
+    was completed by hand and stops the replay. Later actions of a batched answer
+    ran without a screenshot of their own, so their screens are not checked.
+
+    Args:
+        trajectory: Recorded trajectory.
+        execute: Executes an action given the screen width and height, returning
+            a dict with 'success' and 'message' (e.g. the middleware's
+            _execute_action).
+        capture: Takes a screenshot before each action. Its size is used for the
+            coordinates, and it is compared with the recorded frame. Without it,
+            the recorded size is used and nothing is checked.
+        settle: Waits after an action, given the action name.
+        should_stop: Polled before each step; returning True stops the replay.
+        max_distance: Maximum dHash distance between the live screen and the
+            recorded frame. None disables the check.
+
+    Returns:
+        The replay result.
+    """
+    start = time.perf_counter()
+    executed = 0
+
+    def result(completed: bool, message: str, **kwargs: Any) -> ReplayResult:
+        return ReplayResult(
+            completed=completed,
+            steps=executed,
+            message=message,
+            elapsed=round(time.perf_counter() - start, 3),
+            **kwargs,
+        )
+
+    for step in trajectory.steps:
+        if should_stop is not None and should_stop():
+            return result(False, f"Replay stopped before step {step.step}")
+        if step.note == "sensitive":
+            return result(False, f"Step {step.step} needs manual input on the device")
+
+        action = step.action
+        if action is None or (step.result and not step.result.get("success")):
+            continue
+        if action_parser.is_finish_action(action):
+            return result(True, action.get("message", "Task completed"))
+
+        width, height = step.width, step.height
+        if capture is not None:
+            screenshot = capture()
+            width, height = screenshot.width, screenshot.height
+            if (
+                max_distance is not None
+                and step.note != "batched"
+                and step.frame in trajectory.frames
+                and not screenshot.is_sensitive
+            ):
+                distance = screen_change.hamming_distance(
+                    screen_change.dhash(_image(screenshot)),
+                    screen_change.dhash(trajectory.frame_image(step.frame)),
+                )
+                if distance > max_distance:
+                    return result(
+                        False,
+                        f"Screen differs from the recording at step {step.step} "
+                        f"({distance} bits)",
+                        diverged_at=step.step,
+                    )
+
+        outcome = execute(action, width, height)
+        executed += 1
+        if not outcome.get("success"):
+            return result(
+                False,
+                f"Step {step.step} failed: {outcome.get('message', '')}",
+                diverged_at=step.step,
+            )
+        if settle is not None:
+            settle(action.get("action"))
+
+    return result(False, "The recording ends without a finish action")
+
+
+def _image(screenshot: Screenshot) -> Image.Image:
+    if screenshot.image is not None:
+        return screenshot.image
+    return Image.open(BytesIO(base64.b64decode(screenshot.base64_data)))
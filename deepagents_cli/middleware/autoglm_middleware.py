@@ -18,15 +18,21 @@ from __future__ import annotations
 
 import asyncio
 import base64
+import contextlib
+import copy
+import re
 import signal
 import tempfile
 import threading
 import time
+import uuid
 import weakref
 from collections.abc import Awaitable, Callable
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from io import BytesIO
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
 from langchain.agents.middleware.types import (
     AgentMiddleware,
@@ -38,21 +44,76 @@ from langchain.tools import ToolRuntime, tool
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import ToolMessage
 from langgraph.types import Command
+from PIL import Image
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
 from deepagents_cli.middleware.autoglm import (
+    action_cache,
     action_parser,
     adb_controller,
     apps,
+    device_pool,
+    history,
+    image_pipeline,
     prompts,
+    screen_change,
+    settle,
+    timing,
+    touch,
+    trajectory,
+)
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.adb_shell import AdbShellSession
+from deepagents_cli.middleware.autoglm.async_platform import (
+    AsyncPlatformController,
+    InterruptEvent,
+    SyncPlatformController,
+    ThreadedAsyncController,
+    create_async_controller,
 )
 from deepagents_cli.middleware.autoglm.platform import (
     PlatformConfig,
     PlatformController,
-    create_controller,
 )
+from deepagents_cli.middleware.autoglm.screen_change import TaskStats
+
+T = TypeVar("T")
+
+# Pause between steps, and the minimum adaptive settle wait after launching an app
+_STEP_DELAY = 0.5
+_LAUNCH_MIN_WAIT = 0.5
+
+# Pause between the two taps of a double tap
+_DOUBLE_TAP_INTERVAL = 0.2
+
+# Actions awaited on the async controller; the rest run _execute_action in a
+# worker thread
+_ASYNC_ACTIONS = frozenset(
+    {"Launch", "Tap", "Double Tap", "Swipe", "Back", "Home", "Wait"}
+)
+
+# Actions that are safe to repeat without asking the model when the screen did
+# not change, with the "reuse" unchanged screen policy
+_REUSABLE_ACTIONS = frozenset({"Wait", "Swipe"})
+
+_UNCHANGED_SCREEN_NOTE = {
+    "zh": "[系统提示]: 屏幕与上一步相同，未发送截图。",
+    "en": "[System note]: The screen is unchanged since the previous step, "
+    "so no screenshot is attached.",
+}
+
+# Appended to the phone_task description in device farm mode
+_DEVICE_POOL_TOOL_NOTE = """
+
+Device selection (device farm mode):
+    The task runs on a free device from the device pool; concurrent phone_task
+    calls run on different devices. Optional arguments narrow the choice:
+    - platform: "android" or "ios"
+    - labels: affinity labels the device must all have, e.g. ["rack-a"]
+    - app: an app that must be installed on the device, e.g. "WeChat"
+"""
 
 # AutoGLM Phone Task Usage Guide
 AUTOGLM_SYSTEM_PROMPT = """
@@ -109,6 +170,10 @@ class AutoGLMConfig:
     vision_model: BaseChatModel | None = None
     """Vision-language model for GUI understanding. Must support multimodal input."""
 
+    stream_responses: bool = True
+    """Stream vision model responses and act as soon as the action is complete,
+    cancelling the rest of the response. False waits for the full response."""
+
     # Platform settings
     platform: str = "android"
     """Platform to control: 'android' or 'ios'. Default is 'android'."""
@@ -117,6 +182,16 @@ class AutoGLMConfig:
     device_id: str | None = None
     """ADB device ID. If None, will use the first available device."""
 
+    raw_screencap: bool = False
+    """Capture the raw Android framebuffer instead of a device-encoded PNG.
+    Faster over USB (no on-device PNG compression), slower over WiFi."""
+
+    touch_backend: str = "input"
+    """How Android taps, swipes and long presses are injected: 'input' runs the
+    input command (a Java process per gesture), 'sendevent' writes touchscreen
+    events from the persistent shell, 'minitouch' streams them to a minitouch
+    daemon, 'auto' picks minitouch if installed, else sendevent (see touch.py)."""
+
     # iOS device settings
     wda_url: str = "http://localhost:8100"
     """WebDriverAgent URL for iOS devices. Default: http://localhost:8100"""
@@ -124,6 +199,24 @@ class AutoGLMConfig:
     ios_device_id: str | None = None
     """iOS device UDID. If None, will use the first available device."""
 
+    ios_mjpeg_url: str | None = None
+    """WebDriverAgent MJPEG stream URL (e.g. http://localhost:9100). When set, the
+    stream is read in the background and screenshots use its latest frame."""
+
+    # Device farm settings
+    device_pool: bool = False
+    """Run phone tasks on a pool of all connected Android and iOS devices instead
+    of a single device. Concurrent phone_task calls run on different free devices,
+    and phone_task accepts platform, labels and app arguments to pick one.
+    Low-level tools are not available in this mode."""
+
+    device_labels: dict[str, list[str]] | None = None
+    """Affinity labels per device ID (device pool only)."""
+
+    device_wda_urls: dict[str, str] | None = None
+    """WebDriverAgent URL per iOS UDID (device pool only). Each iOS device needs
+    its own WDA port; devices without an entry use wda_url."""
+
     # Language settings
     lang: str = "zh"
     """Language for system prompts: 'zh' for Chinese, 'en' for English."""
@@ -135,6 +228,101 @@ class AutoGLMConfig:
     screenshot_dir: str | None = None
     """Directory for saving screenshots. If None, uses temporary directory."""
 
+    trajectory_dir: str | None = None
+    """Directory for per-task trajectory files (frames, prompts, responses,
+    actions and stage timings). When set, the phone_replay tool can run a
+    recorded task again without the vision model. None disables recording."""
+
+    # Vision model image settings
+    screenshot_max_edge: int | None = None
+    """Downscale screenshots sent to the vision model so the long edge is at most
+    this many pixels. None sends the full device resolution."""
+
+    screenshot_format: str = "png"
+    """Image format sent to the vision model: 'png', 'jpeg' or 'webp'."""
+
+    screenshot_quality: int = 85
+    """Encoder quality (1-100) for 'jpeg' and 'webp' screenshots."""
+
+    app_registry: str | None = None
+    """Path to a JSON/YAML file of extra app name -> package/bundle ID mappings,
+    merged into the built-in app tables (see apps.load_app_registry)."""
+
+    # Post-action waiting
+    settle_strategy: str = "fixed"
+    """How to wait after actions: 'fixed' sleeps for hard-coded delays, 'adaptive'
+    polls low-resolution frames and continues as soon as the screen stops changing."""
+
+    settle_timeout: float = settle.DEFAULT_SETTLE_TIMEOUT
+    """Maximum seconds to wait for the screen to settle ('adaptive' only)."""
+
+    prefetch_screenshot: bool = False
+    """Settle, capture, hash and encode the next screen in the background as soon
+    as an action has been dispatched, while the step's bookkeeping (trajectory,
+    action cache, history) runs. Not used after a batch of actions."""
+
+    # Unchanged screen detection
+    unchanged_screen_policy: str = "off"
+    """What to do when a frame matches the previous one (perceptual hash): 'off'
+    calls the model as usual, 'repoll' waits and captures again, 'text' sends a
+    text-only turn without the image, 'reuse' repeats a previous Wait/Swipe."""
+
+    unchanged_screen_threshold: int = 2
+    """Maximum differing hash bits (out of 256) for frames to count as unchanged."""
+
+    unchanged_screen_backoff: float = 0.5
+    """Seconds between re-polls with the 'repoll' policy."""
+
+    unchanged_screen_max_repolls: int = 3
+    """Maximum re-polls per step before calling the model anyway."""
+
+    unchanged_screen_max_reuse: int = 2
+    """Maximum consecutive repeated actions with the 'reuse' policy."""
+
+    # Conversation history
+    history_keep_turns: int | None = history.DEFAULT_KEEP_TURNS
+    """Recent steps sent verbatim; older steps are folded into a summary of
+    actions taken. None keeps the full history."""
+
+    history_max_tokens: int | None = history.DEFAULT_MAX_TOKENS
+    """Estimated prompt token budget; older steps are summarized until the
+    prompt fits. None disables the budget."""
+
+    # Batched actions
+    max_batch_actions: int = 1
+    """Maximum actions the model may answer with in one step (e.g. tap a field,
+    type, tap the next field). They run back to back and the batch stops at the
+    first failure or page change. 1 disables batching."""
+
+    # Action cache
+    action_cache: bool = False
+    """Reuse model answers from earlier successful runs of the same task when the
+    screen matches, verifying each cached action against the screen that followed
+    it. Falls back to the model as soon as a screen differs."""
+
+    action_cache_path: str | None = None
+    """JSON file the action cache is persisted to. None keeps it in memory."""
+
+    action_cache_size: int = 1000
+    """Maximum cached actions; the least recently used are evicted."""
+
+    current_app_cache_ttl: float = 2.0
+    """Seconds to reuse the foreground-app lookup. The cache is dropped after every
+    executed action. 0 disables caching."""
+
+    # Timing instrumentation
+    timing_log: str | None = None
+    """JSON Lines file every stage timing span (capture, encode, model, action,
+    settle, ...) is appended to. The p50/p95 per stage is always reported in the
+    phone_task result, this keeps the individual spans."""
+
+    timing_otel: bool = False
+    """Also export timing spans through OpenTelemetry (needs opentelemetry-api
+    and a configured tracer provider)."""
+
+    timing_sinks: list[timing.TimingSink] | None = None
+    """Extra sinks for timing spans, e.g. a timing.MemorySink."""
+
     # Tool exposure settings
     expose_low_level_tools: bool = False
     """Whether to expose low-level ADB tools (tap, swipe, etc.) to the main agent."""
@@ -144,6 +332,17 @@ class AutoGLMConfig:
     """Enable verbose logging for debugging."""
 
 
+@dataclass
+class _PreparedScreen:
+    """Screen captured and prepared in the background for the next step."""
+
+    screenshot: Screenshot
+    current_app: str
+    frame_hash: int | None
+    encoded_image: image_pipeline.EncodedImage | None
+    """Image for the vision model; None for sensitive screens."""
+
+
 class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
     """Middleware providing Android GUI automation capabilities.
 
@@ -251,7 +450,8 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
     1. **Use Ctrl+C for emergency stops**: Cancel tasks that are taking too long
     2. **Use HITL for sensitive operations**: Require approval for irreversible actions
     3. **Combine both**: HITL for approval + Ctrl+C for cancellation during execution
-    4. **Avoid concurrent tasks**: Only one phone_task should run at a time (enforced by lock)
+    4. **Avoid concurrent tasks**: Only one phone_task should run at a time (enforced by lock),
+       unless device_pool is enabled, which runs one task per device
     """
 
     _instances: weakref.WeakSet[AutoGLMMiddleware] = weakref.WeakSet()
@@ -273,6 +473,20 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             msg = "vision_model must be provided in AutoGLMConfig"
             raise ValueError(msg)
 
+        config.screenshot_format = image_pipeline.validate_format(
+            config.screenshot_format
+        )
+        config.settle_strategy = settle.validate_strategy(config.settle_strategy)
+        config.touch_backend = touch.validate_backend(config.touch_backend)
+        config.unchanged_screen_policy = screen_change.validate_policy(
+            config.unchanged_screen_policy
+        )
+
+        if config.app_registry:
+            count = apps.load_app_registry(config.app_registry)
+            if config.verbose:
+                print(f"Loaded {count} app mappings from {config.app_registry}")
+
         # Setup screenshot directory
         if config.screenshot_dir:
             self.screenshot_dir = Path(config.screenshot_dir)
@@ -286,16 +500,22 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             self.system_prompt = prompts.get_phone_agent_prompt_en()
         else:
             self.system_prompt = prompts.get_phone_agent_prompt_zh()
+        if config.max_batch_actions > 1:
+            self.system_prompt += prompts.get_batch_actions_prompt(
+                config.lang, config.max_batch_actions
+            )
 
         # Platform controller will be initialized in before_agent after system checks
         self.controller: PlatformController | None = None
+        # Async view of a controller without one of its own (see _aio)
+        self._threaded_controller: ThreadedAsyncController | None = None
 
         # Interrupt handling
         # Note: These are instance-level variables, so concurrent phone_task calls
         # will share the same interrupt state. Since phone_task controls a physical
         # device, concurrent execution is not recommended. We use a lock to prevent it.
         self._task_lock = threading.Lock()
-        self._interrupt_flag = threading.Event()
+        self._interrupt_flag = InterruptEvent()
         self._interrupt_count = 0  # Track number of Ctrl+C presses
         self._last_interrupt_time = 0.0  # Track timestamp of last Ctrl+C
         self._interrupt_reset_timeout = 2.0  # Reset count after 2 seconds
@@ -304,6 +524,34 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         self._original_ime = None  # Track original keyboard for cleanup
         self._active_task_count = 0  # Track number of active tasks
 
+        # Debug screenshots are written off the step loop by a single worker
+        self._screenshot_writer: ThreadPoolExecutor | None = None
+
+        # Device farm mode: the pool is discovered in before_agent. Each pooled
+        # task runs on a per-device copy of this middleware (see _device_worker).
+        self.device_pool: device_pool.DevicePool | None = None
+        self._pool_lock = threading.Lock()
+        self._workers: set[AutoGLMMiddleware] = set()
+
+        # Foreground app cache: (app name, monotonic time of lookup)
+        self._current_app_cache: tuple[str, float] | None = None
+
+        # Trajectory of the running task (see trajectory_dir)
+        self._trajectory: trajectory.TrajectoryRecorder | None = None
+
+        # Shared by pooled workers (see timing_log)
+        self.timing_sinks = [
+            *timing.create_sinks(config.timing_log, otel=config.timing_otel),
+            *(config.timing_sinks or []),
+        ]
+
+        # Shared by pooled workers (see action_cache)
+        self.action_cache: action_cache.ActionCache | None = None
+        if config.action_cache:
+            self.action_cache = action_cache.ActionCache(
+                config.action_cache_path, max_entries=config.action_cache_size
+            )
+
         # Rich console for beautiful output
         self._console = Console()
 
@@ -353,26 +601,25 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             self._original_sigint_handler = signal.signal(signal.SIGINT, signal.SIG_DFL)
             self._setup_signal_handler()
 
-        # Create platform configuration
-        platform_config = PlatformConfig(
-            platform=self.config.platform,
-            device_id=self.config.device_id,
-            wda_url=self.config.wda_url,
-            ios_device_id=self.config.ios_device_id,
-        )
-
-        # Get app packages for platform controller
-        app_packages = (
-            apps.APP_PACKAGES
-            if self.config.platform == "android"
-            else apps.APP_PACKAGES_IOS
-        )
+        if self.config.device_pool:
+            # Device farm mode: controllers are created per task
+            self.device_pool = device_pool.DevicePool.discover(
+                labels=self.config.device_labels,
+                wda_urls=self.config.device_wda_urls,
+                default_wda_url=self.config.wda_url,
+            )
+            if not self.device_pool.devices:
+                msg = (
+                    "No devices connected for the device pool. Please connect "
+                    "Android devices via ADB or iOS devices via libimobiledevice."
+                )
+                raise RuntimeError(msg)
+            if self.config.verbose:
+                print(self.device_pool.report())
+            return request
 
         # Create platform controller (performs all platform-specific checks)
-        try:
-            self.controller = create_controller(platform_config, app_packages)
-        except (ValueError, RuntimeError) as e:
-            raise RuntimeError(str(e)) from e
+        self.controller = self._create_controller()
 
         # Platform-specific additional checks
         if self.config.platform == "android":
@@ -386,7 +633,9 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                     )
 
             # Check ADB Keyboard (warn only, don't fail)
-            if not adb_controller.check_adb_keyboard(self.config.device_id):
+            if not adb_controller.check_adb_keyboard(
+                self.config.device_id, shell=self._adb_shell()
+            ):
                 print(
                     "Warning: ADB Keyboard not found. Text input (Type action) will not work. "
                     "Install from: https://github.com/senzhk/ADBKeyBoard"
@@ -409,6 +658,35 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
 
         return request
 
+    def _create_controller(self) -> SyncPlatformController:
+        """Create the platform controller for the configured device.
+
+        App names are resolved through the shared index in apps.py. The step loop
+        awaits the async controller; the low-level tools use the blocking adapter
+        around it.
+
+        Returns:
+            The controller.
+
+        Raises:
+            RuntimeError: If platform requirements are not met.
+        """
+        platform_config = PlatformConfig(
+            platform=self.config.platform,
+            device_id=self.config.device_id,
+            raw_screencap=self.config.raw_screencap,
+            touch_backend=self.config.touch_backend,
+            # Adaptive settling replaces the sleeps built into each primitive
+            action_delay=0.0 if self._adaptive_settle else None,
+            wda_url=self.config.wda_url,
+            ios_device_id=self.config.ios_device_id,
+            wda_mjpeg_url=self.config.ios_mjpeg_url,
+        )
+        try:
+            return SyncPlatformController(create_async_controller(platform_config))
+        except (ValueError, RuntimeError) as e:
+            raise RuntimeError(str(e)) from e
+
     def _setup_signal_handler(self) -> None:
         """Setup signal handler for graceful interruption.
 
@@ -484,7 +762,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
 
                 # Set the interrupt flag for phone_task internal checking
                 # phone_task will detect this and raise KeyboardInterrupt at a safe point
-                self._interrupt_flag.set()
+                self._set_interrupt()
 
             else:
                 # Second Ctrl+C: Immediate cancellation
@@ -507,7 +785,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 )
 
                 # Set interrupt flag (already set, but ensure it's set)
-                self._interrupt_flag.set()
+                self._set_interrupt()
 
                 # The main loop will detect the increased interrupt count
                 # and cancel the model call immediately
@@ -515,13 +793,343 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         # Register signal handler for SIGINT (Ctrl+C)
         signal.signal(signal.SIGINT, signal_handler)
 
+    def _set_interrupt(self) -> None:
+        """Set the interrupt flag, including that of every running pooled task.
+
+        Called from the signal handler, so the worker set is read without a lock.
+        """
+        self._interrupt_flag.set()
+        for worker in tuple(self._workers):
+            worker._interrupt_count = self._interrupt_count
+            worker._interrupt_flag.set()
+
+    def _adb_shell(self) -> AdbShellSession | None:
+        """Get the persistent ADB shell session owned by the Android controller.
+
+        Returns:
+            The controller's shell session, or None for iOS or when pooling is off.
+        """
+        return getattr(self.controller, "shell", None)
+
+    def _touch_injector(self) -> touch.TouchInjector | None:
+        """Get the touch injector owned by the Android controller.
+
+        Returns:
+            The controller's injector, or None for iOS or the "input" backend.
+        """
+        return getattr(self.controller, "touch", None)
+
+    @property
+    def _aio(self) -> AsyncPlatformController:
+        """Async view of the platform controller used by the step loop.
+
+        Controllers built by before_agent expose one as ``aio``. Any other
+        blocking controller is wrapped to run in worker threads.
+        """
+        aio = getattr(self.controller, "aio", None)
+        if aio is not None:
+            return aio
+        if (
+            self._threaded_controller is None
+            or self._threaded_controller.controller is not self.controller
+        ):
+            self._threaded_controller = ThreadedAsyncController(self.controller)
+        return self._threaded_controller
+
+    async def _interruptible(self, awaitable: Awaitable[T], step: int) -> T:
+        """Await device I/O or a model call, cancelling it on an interrupt.
+
+        Args:
+            awaitable: Operation to wait for.
+            step: Current step number (for error messages).
+
+        Returns:
+            The result of the awaitable.
+
+        Raises:
+            KeyboardInterrupt: If Ctrl+C was pressed while waiting.
+        """
+        task = asyncio.ensure_future(awaitable)
+        interrupted = asyncio.ensure_future(self._interrupt_flag.wait_async())
+        try:
+            await asyncio.wait({task, interrupted}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                return task.result()
+        finally:
+            for pending in (task, interrupted):
+                if not pending.done():
+                    pending.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await pending
+
+        self._check_interrupt(step)
+        msg = f"Task interrupted at step {step}"
+        raise KeyboardInterrupt(msg)
+
+    async def _capture_screen(
+        self, timings: timing.StepTimer | None = None
+    ) -> tuple[Screenshot, str]:
+        """Capture the screen and look up the foreground app concurrently.
+
+        Args:
+            timings: Step timer for the screenshot and current_app spans.
+
+        Returns:
+            Tuple of (screenshot, current app name).
+        """
+        screenshot = self._aio.take_screenshot()
+        current_app = self._get_current_app_async()
+        if timings is not None:
+            screenshot = _timed(timings, "screenshot", screenshot)
+            current_app = _timed(timings, "current_app", current_app)
+        return await asyncio.gather(screenshot, current_app)
+
+    async def _capture_step_screen(
+        self,
+        previous_hash: int | None,
+        stats: TaskStats,
+        timings: timing.StepTimer | None = None,
+        prepared: _PreparedScreen | None = None,
+    ) -> tuple[Screenshot, str, int | None]:
+        """Capture the screen for a step, re-polling while it is unchanged.
+
+        Re-polling only happens with the 'repoll' unchanged screen policy.
+
+        Args:
+            previous_hash: Hash of the previous step's frame, if any.
+            stats: Per-task counters to update.
+            timings: Step timer for the capture spans.
+            prepared: Screen already captured in the background, used instead
+                of the first capture.
+
+        Returns:
+            Tuple of (screenshot, current app name, frame hash or None).
+        """
+        if prepared is not None:
+            screenshot = prepared.screenshot
+            current_app = prepared.current_app
+            frame_hash = prepared.frame_hash
+        else:
+            screenshot, current_app = await self._capture_screen(timings)
+            frame_hash = self._frame_hash(screenshot)
+        if self.config.unchanged_screen_policy != "repoll":
+            return screenshot, current_app, frame_hash
+
+        for _ in range(self.config.unchanged_screen_max_repolls):
+            if not self._is_same_screen(previous_hash, frame_hash):
+                break
+            stats.repolls += 1
+            if self.config.verbose:
+                print("Screen unchanged, polling again...")
+            interrupted = await asyncio.to_thread(
+                self._interrupt_flag.wait, self.config.unchanged_screen_backoff
+            )
+            if interrupted:
+                break
+            screenshot, current_app = await self._capture_screen(timings)
+            frame_hash = self._frame_hash(screenshot)
+
+        return screenshot, current_app, frame_hash
+
+    async def _prepare_next_screen(
+        self, settled: Awaitable[None], timings: timing.StepTimer
+    ) -> _PreparedScreen:
+        """Capture and prepare the screen once it has settled after an action.
+
+        Runs as a background task started right after the action is dispatched
+        (see prefetch_screenshot). The capture still waits for the screen to
+        settle, so the frame is the one the next step would have taken.
+
+        Args:
+            settled: Completes when the screen has settled.
+            timings: Timer of the step the screen is for.
+
+        Returns:
+            The screenshot, foreground app, frame hash and model image.
+        """
+        await settled
+        screenshot, current_app = await self._capture_screen(timings)
+        frame_hash = await asyncio.to_thread(self._frame_hash, screenshot)
+        encoded_image = None
+        if not screenshot.is_sensitive:
+            with timings.span("encode"):
+                encoded_image = await asyncio.to_thread(
+                    self._encode_for_model, screenshot
+                )
+        return _PreparedScreen(screenshot, current_app, frame_hash, encoded_image)
+
+    def _encode_for_model(self, screenshot: Screenshot) -> image_pipeline.EncodedImage:
+        """Downscale/re-encode a screenshot for the vision model.
+
+        Coordinates stay correct because the model answers in 0-999 space.
+
+        Args:
+            screenshot: Screenshot to encode.
+
+        Returns:
+            The encoded image.
+        """
+        return image_pipeline.prepare_for_model(
+            screenshot,
+            max_edge=self.config.screenshot_max_edge,
+            image_format=self.config.screenshot_format,
+            quality=self.config.screenshot_quality,
+        )
+
+    def _frame_hash(self, screenshot: Screenshot) -> int | None:
+        """Compute the perceptual hash of a screenshot.
+
+        Returns:
+            The hash, or None if neither unchanged-screen detection nor the
+            action cache is on, or the screen is sensitive.
+        """
+        if screenshot.is_sensitive or (
+            self.config.unchanged_screen_policy == "off"
+            and not self.config.action_cache
+        ):
+            return None
+        img = screenshot.image
+        if img is None:
+            img = Image.open(BytesIO(base64.b64decode(screenshot.base64_data)))
+        return screen_change.dhash(img)
+
+    def _is_same_screen(self, previous: int | None, current: int | None) -> bool:
+        if previous is None or current is None:
+            return False
+        distance = screen_change.hamming_distance(previous, current)
+        return distance <= self.config.unchanged_screen_threshold
+
+    def _get_current_app(self) -> str:
+        """Get the foreground app, reusing a recent lookup when still fresh.
+
+        Returns:
+            The current app name.
+        """
+        cached = self._cached_current_app()
+        if cached is not None:
+            return cached
+
+        current_app = self.controller.get_current_app()
+        self._current_app_cache = (current_app, time.monotonic())
+        return current_app
+
+    async def _get_current_app_async(self) -> str:
+        """Async variant of _get_current_app, sharing its cache.
+
+        Returns:
+            The current app name.
+        """
+        cached = self._cached_current_app()
+        if cached is not None:
+            return cached
+
+        current_app = await self._aio.get_current_app()
+        self._current_app_cache = (current_app, time.monotonic())
+        return current_app
+
+    def _cached_current_app(self) -> str | None:
+        cached = self._current_app_cache
+        if (
+            cached is not None
+            and time.monotonic() - cached[1] < self.config.current_app_cache_ttl
+        ):
+            return cached[0]
+        return None
+
+    @property
+    def _adaptive_settle(self) -> bool:
+        return self.config.settle_strategy == "adaptive"
+
+    def _settle(
+        self, fixed_delay: float, min_wait: float = settle.DEFAULT_MIN_WAIT
+    ) -> None:
+        """Wait for the device to catch up after an action.
+
+        With the 'fixed' strategy this sleeps for fixed_delay. With 'adaptive' it
+        returns as soon as the screen stops changing, falling back to the rest of
+        fixed_delay if frames cannot be captured.
+
+        Args:
+            fixed_delay: Delay used by the 'fixed' strategy.
+            min_wait: Minimum wait before the first frame ('adaptive' only).
+        """
+        if not self._adaptive_settle:
+            time.sleep(fixed_delay)
+            return
+
+        result = settle.wait_until_stable(
+            self.controller.capture_frame,
+            timeout=max(self.config.settle_timeout, min_wait),
+            min_wait=min_wait,
+            interrupt=self._interrupt_flag,
+        )
+        if self.config.verbose:
+            state = "settled" if result.settled else "not settled"
+            print(
+                f"Screen {state} after {result.elapsed:.2f}s ({result.frames} frames)"
+            )
+        if result.frames < 2 and result.elapsed < fixed_delay:
+            # Frames could not be compared: fall back to the fixed delay
+            self._interrupt_flag.wait(fixed_delay - result.elapsed)
+
+    def _settle_after_action(self, action_name: str | None) -> None:
+        """Wait after an executed action, before the next screenshot.
+
+        Args:
+            action_name: Name of the executed action.
+        """
+        if not self._adaptive_settle:
+            # Primitives already slept; keep a short pause between actions
+            self._interrupt_flag.wait(_STEP_DELAY)
+            return
+
+        if action_name == "Launch":
+            # Launching needs a moment before the launch animation starts
+            min_wait = _LAUNCH_MIN_WAIT
+            fixed_delay = _STEP_DELAY + adb_controller.DEFAULT_LAUNCH_DELAY
+        else:
+            min_wait = settle.DEFAULT_MIN_WAIT
+            fixed_delay = _STEP_DELAY + adb_controller.DEFAULT_TAP_DELAY
+        self._settle(fixed_delay, min_wait=min_wait)
+
+    def _invalidate_current_app(self) -> None:
+        """Drop the cached foreground app (the screen may have changed)."""
+        self._current_app_cache = None
+
+    def _save_screenshot_async(self, path: Path, base64_data: str) -> None:
+        """Queue a debug screenshot to be written by the background writer.
+
+        Args:
+            path: Destination file path.
+            base64_data: Base64-encoded image data.
+        """
+        if self._screenshot_writer is None:
+            self._screenshot_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="autoglm-screenshot"
+            )
+        self._screenshot_writer.submit(
+            self._write_screenshot, path, base64_data, verbose=self.config.verbose
+        )
+
+    @staticmethod
+    def _write_screenshot(path: Path, base64_data: str, *, verbose: bool) -> None:
+        try:
+            path.write_bytes(base64.b64decode(base64_data))
+        except Exception as e:
+            if verbose:
+                print(f"Warning: Failed to save screenshot {path}: {e}")
+
     def _define_tools(self) -> None:
         """Define tools that will be added to the agent."""
         # Always add the high-level phone_task tool
         self.tools.append(self._create_phone_task_tool())
 
-        # Optionally add low-level tools
-        if self.config.expose_low_level_tools:
+        # Replaying recorded tasks needs trajectories and a single bound device
+        if self.config.trajectory_dir and not self.config.device_pool:
+            self.tools.append(self._create_phone_replay_tool())
+
+        # Optionally add low-level tools (they need a single bound device)
+        if self.config.expose_low_level_tools and not self.config.device_pool:
             self.tools.extend(self._create_low_level_tools())
 
     def _check_interrupt(self, step: int = 0) -> None:
@@ -605,7 +1213,120 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             """
             return self._execute_phone_task(task, runtime.tool_call_id)
 
-        return phone_task_tool
+        if not self.config.device_pool:
+            return phone_task_tool
+
+        @tool(
+            "phone_task",
+            description=phone_task_tool.description + _DEVICE_POOL_TOOL_NOTE,
+        )
+        def pooled_phone_task_tool(
+            task: str,
+            runtime: ToolRuntime[None, AgentState],
+            platform: str | None = None,
+            labels: list[str] | None = None,
+            app: str | None = None,
+        ) -> ToolMessage | str:
+            """Execute a phone task on a free device from the device pool."""
+            return self._execute_pooled_task(
+                task,
+                runtime.tool_call_id,
+                platform=platform,
+                labels=labels or [],
+                app=app,
+            )
+
+        return pooled_phone_task_tool
+
+    def _create_phone_replay_tool(self) -> Any:
+        """Create the phone_replay tool for re-running recorded tasks.
+
+        Returns:
+            A tool that replays a trajectory file.
+        """
+
+        @tool("phone_replay")
+        def phone_replay_tool(
+            trajectory_file: str,
+            runtime: ToolRuntime[None, AgentState],
+        ) -> ToolMessage | str:
+            """Replay a phone task recorded earlier, without the vision model.
+
+            Every recorded phone_task result includes the path of its trajectory
+            file. Replaying runs the same actions at device speed, which suits
+            repeated flows such as a daily check-in. The replay stops if the
+            screen no longer looks like the recording; fall back to phone_task
+            then.
+
+            Args:
+                trajectory_file: Trajectory file path, or its name in the
+                    trajectory directory.
+
+            Returns:
+                A message describing the replay result.
+            """
+            try:
+                result = self.replay_trajectory(trajectory_file)
+            except (OSError, ValueError) as e:
+                return ToolMessage(
+                    content=f"✗ Replay failed: {e}",
+                    tool_call_id=runtime.tool_call_id,
+                    name="phone_replay",
+                    status="error",
+                )
+            outcome = "✅ Replay completed" if result.completed else "⚠️ Replay stopped"
+            return ToolMessage(
+                content=f"{outcome} after {result.steps} actions: {result.message}",
+                tool_call_id=runtime.tool_call_id,
+                artifact=result.to_dict(),
+                name="phone_replay",
+                status="success" if result.completed else "error",
+            )
+
+        return phone_replay_tool
+
+    def replay_trajectory(
+        self, path: str | Path, *, verify: bool = True
+    ) -> trajectory.ReplayResult:
+        """Run the actions of a recorded task again on the current device.
+
+        Actions go through _execute_action with the usual settling in between;
+        the vision model is not called. Ctrl+C stops the replay between steps.
+
+        Args:
+            path: Trajectory file, absolute or relative to trajectory_dir.
+            verify: Stop when the screen no longer matches the recorded frame.
+
+        Returns:
+            The replay result.
+
+        Raises:
+            OSError: If the file cannot be read.
+            ValueError: If the file is not a trajectory.
+        """
+        path = Path(path).expanduser()
+        if not path.exists() and self.config.trajectory_dir:
+            path = Path(self.config.trajectory_dir).expanduser() / path
+        recorded = trajectory.load_trajectory(path)
+
+        with self._task_lock:
+            self._phone_task_active = True
+            self._interrupt_flag.clear()
+            try:
+                result = trajectory.replay(
+                    recorded,
+                    self._execute_action,
+                    capture=self.controller.take_screenshot if verify else None,
+                    settle=self._settle_after_action,
+                    should_stop=self._interrupt_flag.is_set,
+                )
+            finally:
+                self._phone_task_active = False
+                self._cleanup_resources()
+
+        if self.config.verbose:
+            print(f"Replay of {path.name}: {result.message} ({result.elapsed:.1f}s)")
+        return result
 
     def _execute_phone_task(
         self, task: str, tool_call_id: str | None
@@ -625,16 +1346,332 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         # Run the async implementation
         return asyncio.run(self._execute_phone_task_async(task, tool_call_id))
 
+    def _execute_pooled_task(
+        self,
+        task: str,
+        tool_call_id: str | None,
+        *,
+        platform: str | None = None,
+        labels: list[str] | None = None,
+        app: str | None = None,
+    ) -> ToolMessage | str:
+        """Execute a phone task on a free device from the device pool.
+
+        Waits for a matching device, then runs the task on a copy of this
+        middleware bound to it, so concurrent tasks do not share a controller,
+        keyboard state or screenshot directory.
+
+        Args:
+            task: Task description from user.
+            tool_call_id: Tool call ID for creating ToolMessage.
+            platform: Required device platform.
+            labels: Affinity labels the device must have.
+            app: App that must be installed on the device.
+
+        Returns:
+            ToolMessage with task result. Its artifact adds the device ID, the
+            queue wait and the pool stats to the task stats.
+        """
+        with self._pool_lock:
+            if self._active_task_count == 0:
+                self._interrupt_flag.clear()
+            self._active_task_count += 1
+            self._phone_task_active = True
+
+        try:
+            with self.device_pool.acquire(
+                platform, labels or [], app, interrupt=self._interrupt_flag
+            ) as lease:
+                if self.config.verbose:
+                    print(
+                        f"Running phone task on {lease.device.device_id} "
+                        f"(waited {lease.queue_wait:.2f}s)"
+                    )
+                worker = self._device_worker(lease.device)
+                with self._pool_lock:
+                    self._workers.add(worker)
+                try:
+                    result = asyncio.run(
+                        worker._execute_phone_task_async(task, tool_call_id)
+                    )
+                finally:
+                    with self._pool_lock:
+                        self._workers.discard(worker)
+                    worker._close_device_worker()
+
+        except KeyboardInterrupt:
+            return ToolMessage(
+                content=(
+                    "⚠️ PHONE TASK INTERRUPTED BY USER ⚠️\n\n"
+                    "The task was cancelled (Ctrl+C) while waiting for a free device."
+                ),
+                tool_call_id=tool_call_id,
+                name="phone_task",
+                status="error",
+            )
+        except (ValueError, RuntimeError, TimeoutError) as e:
+            return ToolMessage(
+                content=f"✗ Phone task failed: {e}",
+                tool_call_id=tool_call_id,
+                name="phone_task",
+                status="error",
+            )
+        finally:
+            with self._pool_lock:
+                self._active_task_count -= 1
+                self._phone_task_active = self._active_task_count > 0
+
+        if isinstance(result, ToolMessage) and isinstance(result.artifact, dict):
+            result.artifact = {
+                **result.artifact,
+                "device_id": lease.device.device_id,
+                "queue_wait": round(lease.queue_wait, 3),
+                "device_pool": self.device_pool.stats(),
+            }
+        if self.config.verbose:
+            print(self.device_pool.report())
+        return result
+
+    def _device_worker(self, device: device_pool.PooledDevice) -> AutoGLMMiddleware:
+        """Create a copy of this middleware bound to one pooled device.
+
+        The copy shares the vision model, prompts and tools, and has its own
+        controller, keyboard restore state, interrupt flag, foreground app cache
+        and screenshot directory.
+
+        Args:
+            device: Device leased for the task.
+
+        Returns:
+            The worker middleware.
+
+        Raises:
+            RuntimeError: If the device cannot be controlled.
+        """
+        if device.platform == "ios":
+            config = replace(
+                self.config,
+                platform="ios",
+                ios_device_id=device.device_id,
+                wda_url=device.wda_url or self.config.wda_url,
+            )
+        else:
+            config = replace(
+                self.config, platform="android", device_id=device.device_id
+            )
+
+        worker = copy.copy(self)
+        worker.config = config
+        if self.config.screenshot_dir:
+            safe_id = re.sub(r"[^\w.-]", "_", device.device_id)
+            worker.screenshot_dir = Path(
+                tempfile.mkdtemp(prefix=f"{safe_id}_", dir=self.screenshot_dir)
+            )
+            config.screenshot_dir = str(worker.screenshot_dir)
+
+        worker.device_pool = None
+        worker._workers = set()
+        worker._task_lock = threading.Lock()
+        worker._interrupt_flag = InterruptEvent()
+        worker._active_task_count = 0
+        worker._original_ime = None
+        worker._current_app_cache = None
+        worker._trajectory = None
+        worker._threaded_controller = None
+        worker._screenshot_writer = None
+        worker.controller = worker._create_controller()
+        return worker
+
+    def _close_device_worker(self) -> None:
+        """Release the controller and screenshot writer of a pooled task."""
+        close = getattr(self.controller, "close", None)
+        if close is not None:
+            close()
+        if self._screenshot_writer is not None:
+            # Queued screenshots are still written
+            self._screenshot_writer.shutdown(wait=False)
+
     async def _execute_phone_task_async(
         self, task: str, tool_call_id: str | None
+    ) -> ToolMessage | str:
+        """Execute a phone automation task, recording its trajectory if enabled.
+
+        Args:
+            task: Task description from user.
+            tool_call_id: Tool call ID for creating ToolMessage.
+
+        Returns:
+            ToolMessage with task result. Its artifact includes the p50/p95 time
+            per stage and, with trajectory_dir set, the path of the trajectory
+            file.
+        """
+        timer = timing.TaskTimer(self.timing_sinks)
+        self._trajectory = recorder = self._start_trajectory(task)
+        try:
+            result = await self._run_phone_task(task, tool_call_id, timer)
+            if isinstance(result, ToolMessage) and isinstance(result.artifact, dict):
+                result.artifact = {**result.artifact, "timings": timer.summary()}
+            if isinstance(result, ToolMessage) and recorder is not None:
+                recorder.finish(result.status, str(result.content), result.artifact)
+                if isinstance(result.artifact, dict):
+                    result.artifact = {
+                        **result.artifact,
+                        "trajectory": str(recorder.path),
+                    }
+            return result
+        finally:
+            if recorder is not None:
+                recorder.close()
+            self._trajectory = None
+
+    def _start_trajectory(self, task: str) -> trajectory.TrajectoryRecorder | None:
+        """Create the trajectory recorder for a task.
+
+        Args:
+            task: Task description.
+
+        Returns:
+            The recorder, or None if trajectory_dir is not set.
+        """
+        if not self.config.trajectory_dir:
+            return None
+        if self.config.platform == "ios":
+            device_id = self.config.ios_device_id
+        else:
+            device_id = self.config.device_id
+        name = "_".join(
+            [
+                time.strftime("%Y%m%d-%H%M%S"),
+                re.sub(r"[^\w.-]", "_", device_id or self.config.platform),
+                uuid.uuid4().hex[:6],
+            ]
+        )
+        return trajectory.TrajectoryRecorder(
+            Path(self.config.trajectory_dir).expanduser() / f"{name}.jsonl",
+            task,
+            device={
+                "platform": self.config.platform,
+                "device_id": device_id,
+                "lang": self.config.lang,
+            },
+        )
+
+    async def _run_batched_actions(
+        self,
+        actions: list[dict[str, Any]],
+        screenshot: Screenshot,
+        step: int,
+        stats: TaskStats,
+        timer: timing.TaskTimer,
+        *,
+        current_app: str,
+    ) -> tuple[int, dict[str, Any] | None, str | None]:
+        """Execute the remaining actions of a batched answer.
+
+        The first action of the batch has already run. Before each further action
+        a low-resolution frame is compared with the screen the batch was planned
+        on; if the page changed, the rest of the batch is dropped and the model
+        plans again from the new screen. A finish action also ends the batch, so
+        the model confirms completion on a fresh screenshot.
+
+        Args:
+            actions: Actions after the first one, in order.
+            screenshot: Screenshot the batch was planned on.
+            step: Current step number.
+            stats: Task counters to update.
+            timer: Task timer; each batched action is timed as its own sample.
+            current_app: Foreground app when the batch was planned.
+
+        Returns:
+            The number of actions executed, the result of the action that failed
+            (None if none failed), and a note for the model if the batch stopped
+            because the screen changed.
+        """
+        reference = adb_controller.screenshot_luma(screenshot)
+        total = len(actions) + 1
+        for executed, action in enumerate(actions):
+            self._check_interrupt(step)
+            if action_parser.is_finish_action(action):
+                break
+
+            timings = timer.step(step)
+            try:
+                with timings.span("batch_check"):
+                    frame = await self._interruptible(self._aio.capture_frame(), step)
+            except Exception as e:  # noqa: BLE001
+                if self.config.verbose:
+                    print(f"Could not check the screen between actions: {e}")
+                frame = None
+            if frame is None or settle.page_changed(reference, frame):
+                stats.batch_aborts += 1
+                if self.config.verbose:
+                    print(f"Screen changed, skipping {len(actions) - executed} actions")
+                note = (
+                    f"Only {executed + 1} of {total} actions were executed because "
+                    "the screen changed. Continue from the current screen."
+                )
+                return executed, None, note
+
+            with timings.span("action", action=action.get("action")):
+                result = await self._interruptible(
+                    self._execute_action_async(
+                        action, screenshot.width, screenshot.height
+                    ),
+                    step,
+                )
+            stats.batched_actions += 1
+            stats.model_calls_avoided += 1
+            if self.config.verbose:
+                print(f"Batched action: {action} -> {result}")
+
+            if result["success"]:
+                with timings.span("settle"):
+                    await asyncio.to_thread(
+                        self._settle_after_action, action.get("action")
+                    )
+            self._record_step(
+                step,
+                screenshot,
+                current_app=current_app,
+                action=action,
+                result=result,
+                timings=timings.durations,
+                note="batched",
+            )
+            if not result["success"]:
+                return executed + 1, result, None
+        else:
+            executed = len(actions)
+        return executed, None, None
+
+    def _record_step(self, step: int, screenshot: Screenshot, **fields: Any) -> None:
+        """Record a step in the task's trajectory, if one is being recorded.
+
+        Args:
+            step: Step number.
+            screenshot: Screenshot the step was based on.
+            **fields: Other TrajectoryRecorder.record_step() arguments.
+        """
+        if self._trajectory is None:
+            return
+        self._trajectory.record_step(
+            step,
+            frame=self._trajectory.record_frame(screenshot),
+            width=screenshot.width,
+            height=screenshot.height,
+            **fields,
+        )
+
+    async def _run_phone_task(
+        self, task: str, tool_call_id: str | None, timer: timing.TaskTimer
     ) -> ToolMessage | str:
         """Execute a phone automation task asynchronously.
 
         This implements the autonomous agent loop with interruptible model calls:
-        1. Take screenshot
+        1. Take screenshot and look up the current app (concurrently, off the loop)
         2. Send to vision model with task description (interruptible)
         3. Parse model response to get action
-        4. Execute action via ADB
+        4. Execute action via ADB (in a worker thread)
         5. Repeat until task complete or max_steps reached
 
         IMPORTANT: Only one phone_task can run at a time since it controls a physical device.
@@ -643,6 +1680,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         Args:
             task: Task description from user.
             tool_call_id: Tool call ID for creating ToolMessage.
+            timer: Collects the stage timings of every step.
 
         Returns:
             ToolMessage with task result.
@@ -659,6 +1697,10 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
 
         # Mark phone_task as active so signal handler will respond
         self._phone_task_active = True
+        stats = TaskStats()
+        # Next screen being prepared in the background and the next step's timer
+        # (see prefetch_screenshot)
+        prefetch: tuple[asyncio.Future[_PreparedScreen], timing.StepTimer] | None = None
 
         try:
             if self.config.verbose:
@@ -673,18 +1715,28 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             self._active_task_count += 1
 
             # Initialize conversation history
-            messages = [
-                {"role": "system", "content": self.system_prompt},
-            ]
+            messages = history.MessageHistory(
+                self.system_prompt,
+                keep_turns=self.config.history_keep_turns,
+                max_tokens=self.config.history_max_tokens,
+                lang=self.config.lang,
+            )
 
             step = 0
             last_thinking = ""
             is_first_step = True
+            previous_hash: int | None = None
+            last_action: dict[str, Any] | None = None
+            reused_actions = 0
+            task_cache = None
+            if self.action_cache is not None:
+                task_cache = action_cache.TaskCache(self.action_cache, task)
             while step < self.config.max_steps:
                 # Check for interrupt signal
                 self._check_interrupt(step)
 
                 step += 1
+                stats.steps = step
 
                 if self.config.verbose:
                     print(f"\n--- Step {step}/{self.config.max_steps} ---")
@@ -692,20 +1744,51 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 # Check interrupt before expensive operations
                 self._check_interrupt(step)
 
-                # Take screenshot using platform controller
-                screenshot_result = self.controller.take_screenshot()
+                # Seconds spent per stage, for the trajectory and the report
+                prefetch_task = None
+                if prefetch is None:
+                    timings = timer.step(step)
+                else:
+                    # Settled and captured in the background since the action
+                    prefetch_task, timings = prefetch
+                    prefetch = None
+
+                # Take screenshot and look up the current app in parallel
+                prepared = None
+                with timings.span("capture"):
+                    if prefetch_task is not None:
+                        prepared = await self._interruptible(prefetch_task, step)
+                    (
+                        screenshot_result,
+                        current_app,
+                        frame_hash,
+                    ) = await self._interruptible(
+                        self._capture_step_screen(
+                            previous_hash, stats, timings, prepared
+                        ),
+                        step,
+                    )
+                policy = self.config.unchanged_screen_policy
+                screen_unchanged = policy != "off" and self._is_same_screen(
+                    previous_hash, frame_hash
+                )
+                previous_hash = frame_hash
+                if task_cache is not None and not task_cache.observe(frame_hash):
+                    stats.cache_divergences += 1
+                    if self.config.verbose:
+                        print("Screen differs from the cached run, asking the model")
 
                 # Check interrupt after screenshot
                 self._check_interrupt(step)
 
                 # 检测敏感页面 - 提示用户选择如何处理
                 if screenshot_result.is_sensitive:
-                    # 获取当前应用信息
-                    current_app = self.controller.get_current_app()
-
                     if self.config.verbose:
                         print(f"\n⚠️  Step {step}: 检测到敏感页面 [{current_app}]")
 
+                    # 用户需要用自己的键盘在手机上输入密码
+                    self._restore_keyboard()
+
                     # 提示用户选择如何处理
                     from rich.console import Console
                     from rich.panel import Panel
@@ -732,6 +1815,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                     console.print()
 
                     # 等待用户选择
+                    wait_start = time.perf_counter()
                     while True:
                         try:
                             choice = input("请选择 [1/2] (默认=1): ").strip()
@@ -753,11 +1837,19 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                                 text_content = f"** Screen Info **\n\n{screen_info}\n\n[系统提示]: 上一步为敏感页面（无法截图）。用户已手动完成敏感操作。"
 
                                 # 仅文本消息，不包含图片
-                                user_message = {
-                                    "role": "user",
-                                    "content": [{"type": "text", "text": text_content}],
-                                }
-                                messages.append(user_message)
+                                messages.add_user(
+                                    [{"type": "text", "text": text_content}]
+                                )
+                                timings.record(
+                                    "sensitive", time.perf_counter() - wait_start
+                                )
+                                self._record_step(
+                                    step,
+                                    screenshot_result,
+                                    current_app=current_app,
+                                    timings=timings.durations,
+                                    note="sensitive",
+                                )
                                 break
                             if choice == "2":
                                 # 终止任务
@@ -768,6 +1860,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                                 return ToolMessage(
                                     content="⚠️ 任务已被用户终止（遇到敏感页面）",
                                     tool_call_id=tool_call_id,
+                                    artifact=stats.to_dict(),
                                     name="phone_task",
                                     status="error",
                                 )
@@ -790,15 +1883,59 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 screenshot_width = screenshot_result.width
                 screenshot_height = screenshot_result.height
 
-                # Get current app for context
-                current_app = self.controller.get_current_app()
+                if screen_unchanged:
+                    stats.unchanged_frames += 1
+                    if self.config.verbose:
+                        print(f"Screen unchanged since the previous step ({policy})")
+
+                # Repeat a previous Wait/Swipe without asking the model
+                if (
+                    screen_unchanged
+                    and policy == "reuse"
+                    and last_action is not None
+                    and last_action.get("action") in _REUSABLE_ACTIONS
+                    and reused_actions < self.config.unchanged_screen_max_reuse
+                ):
+                    reused_actions += 1
+                    stats.model_calls_avoided += 1
+                    if self.config.verbose:
+                        print(f"Reusing previous action: {last_action}")
+                    with timings.span("action", action=last_action.get("action")):
+                        action_result = await self._interruptible(
+                            self._execute_action_async(
+                                last_action, screenshot_width, screenshot_height
+                            ),
+                            step,
+                        )
+                    self._check_interrupt(step)
+                    prefetch = self._start_prefetch(
+                        last_action.get("action"), timer, step
+                    )
+                    if prefetch is None:
+                        with timings.span("settle"):
+                            await asyncio.to_thread(
+                                self._settle_after_action, last_action.get("action")
+                            )
+                    self._record_step(
+                        step,
+                        screenshot_result,
+                        current_app=current_app,
+                        action=last_action,
+                        result=action_result,
+                        timings=timings.durations,
+                        note="reused",
+                    )
+                    continue
+                reused_actions = 0
+                send_image = not (screen_unchanged and policy == "text")
 
-                # Save screenshot for debugging
+                # Save screenshot for debugging (written in the background)
                 if self.config.screenshot_dir:
-                    screenshot_path = self.screenshot_dir / f"step_{step:03d}.png"
-                    with Path(screenshot_path).open("wb") as f:
-                        # Decode base64 string to binary data for file writing
-                        f.write(base64.b64decode(screenshot_base64))
+                    extension = "jpg" if screenshot_result.format == "jpeg" else "png"
+                    self._save_screenshot_async(
+                        self.screenshot_dir / f"step_{step:03d}.{extension}",
+                        screenshot_base64,
+                    )
 
                 # Build screen info in JSON format (matching Open-AutoGLM)
                 import json
@@ -807,108 +1944,136 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                     {"current_app": current_app}, ensure_ascii=False
                 )
 
-                # Build multimodal message (base64_data is already base64 encoded)
-                image_base64 = screenshot_base64
-
                 # Different format for first step vs subsequent steps
+                carries_task = is_first_step
                 if is_first_step:
                     text_content = f"{task}\n\n{screen_info}"
                     is_first_step = False
                 else:
                     text_content = f"** Screen Info **\n\n{screen_info}"
 
-                content = [
-                    {
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{image_base64}"},
-                    },
-                    {
-                        "type": "text",
-                        "text": text_content,
-                    },
-                ]
+                if send_image:
+                    if (
+                        prepared is not None
+                        and prepared.screenshot is screenshot_result
+                        and prepared.encoded_image is not None
+                    ):
+                        encoded_image = prepared.encoded_image
+                    else:
+                        with timings.span("encode"):
+                            encoded_image = self._encode_for_model(screenshot_result)
+                    if self.config.verbose:
+                        print(
+                            f"Image: {screenshot_width}x{screenshot_height} "
+                            f"({encoded_image.original_bytes / 1024:.0f} KB) -> "
+                            f"{encoded_image.width}x{encoded_image.height} "
+                            f"{encoded_image.format.upper()} "
+                            f"({encoded_image.encoded_bytes / 1024:.0f} KB), "
+                            f"saved {encoded_image.bytes_saved / 1024:.0f} KB"
+                        )
+                    content = [
+                        encoded_image.to_message_content(),
+                        {
+                            "type": "text",
+                            "text": text_content,
+                        },
+                    ]
+                else:
+                    stats.text_only_turns += 1
+                    note = _UNCHANGED_SCREEN_NOTE.get(
+                        self.config.lang, _UNCHANGED_SCREEN_NOTE["zh"]
+                    )
+                    content = [{"type": "text", "text": f"{text_content}\n\n{note}"}]
 
-                user_message = {"role": "user", "content": content}
-                messages.append(user_message)
+                messages.add_user(content, pinned=carries_task)
+                prompt = messages.messages()
+                prompt_text = content[-1]["text"]
 
                 # Check interrupt before expensive model call
                 self._check_interrupt(step)
 
-                # Call vision model asynchronously with interrupt checking
                 if self.config.verbose:
-                    print("Calling vision model... (Press Ctrl+C to cancel)")
-
-                # Create async task for model call
-                model_task = asyncio.create_task(
-                    self.config.vision_model.ainvoke(messages)
-                )
-
-                # Wait for model response while checking interrupt flag
-                response = None
-                try:
-                    while not model_task.done():
-                        # Check interrupt every 0.1 seconds
-                        if self._interrupt_flag.is_set():
-                            if self.config.verbose:
-                                print(
-                                    "\n[Interrupt detected during model call - cancelling]"
-                                )
-                            model_task.cancel()
-                            # Wait for cancellation to complete
-                            try:
-                                await model_task
-                            except asyncio.CancelledError:
-                                pass
-                            # Now raise appropriate interrupt exception
-                            self._check_interrupt(step)
-                        # Wait a short time before checking again
-                        await asyncio.sleep(0.1)
-
-                    # Get the result
-                    response = await model_task
-                    response_text = response.content
-
-                except asyncio.CancelledError:
-                    if self.config.verbose:
-                        print("\n[Model call cancelled successfully]")
-                    # Model was cancelled, check if it was due to interrupt
-                    self._check_interrupt(step)
+                    print(
+                        f"Prompt: ~{history.estimate_tokens(prompt)} tokens "
+                        f"({len(prompt)} messages, "
+                        f"{messages.folded_turns} earlier steps summarized)"
+                    )
 
-                # Check interrupt immediately after model returns
-                self._check_interrupt(step)
+                # Propose the cached answer for this screen, or ask the model
+                response_text = None
+                with timings.span("model"):
+                    if task_cache is not None:
+                        response_text = task_cache.propose(current_app, frame_hash)
+                    if response_text is not None:
+                        stats.cache_hits += 1
+                        stats.model_calls_avoided += 1
+                        if self.config.verbose:
+                            print("Using cached action for this screen")
+                    else:
+                        stats.model_calls += 1
+                        response_text = await self._call_vision_model(
+                            prompt, step, timings
+                        )
 
                 if self.config.verbose:
                     print(f"Model response: {response_text[:200]}...")
 
                 # Parse response
-                thinking, action_str = action_parser.parse_response(response_text)
+                with timings.span("parse"):
+                    thinking, action_str = action_parser.parse_response(response_text)
                 last_thinking = thinking
 
                 if self.config.verbose and thinking:
                     print(f"Thinking: {thinking}")
 
-                # Parse action
+                # Parse the action (or the batch of actions)
                 try:
-                    action = action_parser.parse_action(action_str)
+                    with timings.span("parse"):
+                        actions = action_parser.parse_actions(
+                            action_str, self.config.max_batch_actions
+                        )
+                    action = actions[0]
                 except ValueError as e:
                     if self.config.verbose:
                         print(f"Failed to parse action: {e}")
+                    self._record_step(
+                        step,
+                        screenshot_result,
+                        current_app=current_app,
+                        prompt=prompt_text,
+                        response=response_text,
+                        result={"success": False, "message": str(e)},
+                        timings=timings.durations,
+                    )
                     # Add error message and retry
-                    messages.append({"role": "assistant", "content": response_text})
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": f"Error: Failed to parse action. Please provide a valid action. Error: {e}",
-                        }
+                    messages.strip_images()
+                    messages.add_assistant(
+                        response_text, summary="(invalid action, retried)"
+                    )
+                    messages.add_user(
+                        f"Error: Failed to parse action. Please provide a valid action. Error: {e}"
                     )
                     continue
 
                 if self.config.verbose:
                     print(f"Action: {action}")
+                    if len(actions) > 1:
+                        print(f"Batched actions: {actions[1:]}")
 
                 # Check if task is complete
                 if action_parser.is_finish_action(action):
                     finish_message = action.get("message", "Task completed")
+                    if task_cache is not None:
+                        task_cache.commit()
+                    self._record_step(
+                        step,
+                        screenshot_result,
+                        current_app=current_app,
+                        prompt=prompt_text,
+                        response=response_text,
+                        action=action,
+                        timings=timings.durations,
+                    )
                     if self.config.verbose:
                         print(f"\n{'=' * 60}")
                         print("✅ Task Completed Successfully!")
@@ -925,22 +2090,23 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                             f"The task has been fully completed. No further action is needed."
                         ),
                         tool_call_id=tool_call_id,
+                        artifact=stats.to_dict(),
                         name="phone_task",
                         status="success",
                     )
 
                 # Remove image from previous message to save context space (matching Open-AutoGLM)
-                if isinstance(messages[-1].get("content"), list):
-                    messages[-1]["content"] = [
-                        item
-                        for item in messages[-1]["content"]
-                        if item.get("type") == "text"
-                    ]
+                messages.strip_images()
 
-                # Execute action
-                action_result = self._execute_action(
-                    action, screenshot_width, screenshot_height
-                )
+                # Execute action (cancelled if Ctrl+C arrives meanwhile)
+                with timings.span("action", action=action.get("action")):
+                    action_result = await self._interruptible(
+                        self._execute_action_async(
+                            action, screenshot_width, screenshot_height
+                        ),
+                        step,
+                    )
+                last_action = action
 
                 # Check interrupt after action execution
                 self._check_interrupt(step)
@@ -948,26 +2114,63 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 if self.config.verbose:
                     print(f"Action result: {action_result}")
 
+                # Wait for the screen to settle (returns early on interrupt), or
+                # let the next screen be prepared while the step is recorded
+                if len(actions) == 1:
+                    prefetch = self._start_prefetch(action.get("action"), timer, step)
+                if prefetch is None:
+                    with timings.span("settle"):
+                        await asyncio.to_thread(
+                            self._settle_after_action, action.get("action")
+                        )
+                self._record_step(
+                    step,
+                    screenshot_result,
+                    current_app=current_app,
+                    prompt=prompt_text,
+                    response=response_text,
+                    action=action,
+                    result=action_result,
+                    timings=timings.durations,
+                )
+
+                # Run the rest of a batched answer without asking the model again
+                batch_note = None
+                if action_result["success"] and len(actions) > 1:
+                    executed, failure, batch_note = await self._run_batched_actions(
+                        actions[1:],
+                        screenshot_result,
+                        step,
+                        stats,
+                        timer,
+                        current_app=current_app,
+                    )
+                    last_action = actions[executed]
+                    if failure is not None:
+                        action_result = failure
+
+                if task_cache is not None and not task_cache.learn(
+                    current_app,
+                    frame_hash,
+                    response_text,
+                    success=action_result["success"],
+                ):
+                    stats.cache_divergences += 1
+
                 # Add assistant response to history in Open-AutoGLM format
                 assistant_message = (
                     f"<think>{thinking}</think><answer>{action_str}</answer>"
                 )
-                messages.append({"role": "assistant", "content": assistant_message})
+                summary = action_str
+                if not action_result["success"]:
+                    summary += f" (failed: {action_result['message']})"
+                messages.add_assistant(assistant_message, summary=summary)
 
                 # If action failed, add error message
                 if not action_result["success"]:
-                    messages.append(
-                        {
-                            "role": "user",
-                            "content": f"Action failed: {action_result['message']}",
-                        }
-                    )
-
-                # Small delay between actions (check interrupt during sleep)
-                for _ in range(5):  # Split 0.5s into 5x 0.1s for responsive interrupt
-                    if self._interrupt_flag.is_set():
-                        break
-                    await asyncio.sleep(0.1)
+                    messages.add_user(f"Action failed: {action_result['message']}")
+                elif batch_note:
+                    messages.add_user(batch_note)
 
             # Max steps reached
             if self.config.verbose:
@@ -980,6 +2183,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             return ToolMessage(
                 content=f"Phone task incomplete. Reached maximum steps ({self.config.max_steps}). The task did not finish within the step limit. Last status: {last_thinking}",
                 tool_call_id=tool_call_id,
+                artifact=stats.to_dict(),
                 name="phone_task",
                 status="error",
             )
@@ -1017,6 +2221,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                     f"Resources have been cleaned up. You may retry the task if needed."
                 ),
                 tool_call_id=tool_call_id,
+                artifact=stats.to_dict(),
                 name="phone_task",
                 status="error",  # Mark as error so agent knows the task didn't complete
             )
@@ -1032,13 +2237,23 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             return ToolMessage(
                 content=f"✗ {error_msg}",
                 tool_call_id=tool_call_id,
+                artifact=stats.to_dict(),
                 name="phone_task",
                 status="error",
             )
 
         finally:
+            if prefetch is not None:
+                prefetch[0].cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await prefetch[0]
             # Mark phone_task as inactive so signal handler won't interfere with main agent
             self._phone_task_active = False
+            if self.config.verbose:
+                print(f"Task stats: {stats.to_dict()}")
+                print(f"Stage timings:\n{timing.format_summary(timer.summary())}")
+                if self.action_cache is not None:
+                    print(f"Action cache: {self.action_cache.stats()}")
 
             # Ensure cleanup always runs
             self._cleanup_resources()
@@ -1047,6 +2262,103 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             # Release the lock to allow next task to run
             self._task_lock.release()
 
+    def _start_prefetch(
+        self, action_name: str | None, timer: timing.TaskTimer, step: int
+    ) -> tuple[asyncio.Future[_PreparedScreen], timing.StepTimer] | None:
+        """Start preparing the next step's screen in the background.
+
+        Args:
+            action_name: Name of the action just executed.
+            timer: Task timer.
+            step: Current step number.
+
+        Returns:
+            The background task and the timer of the next step, or None if
+            prefetching is off or this was the last step.
+        """
+        if not self.config.prefetch_screenshot or step >= self.config.max_steps:
+            return None
+        timings = timer.step(step + 1)
+
+        def settle_screen() -> None:
+            with timings.span("settle"):
+                self._settle_after_action(action_name)
+
+        # Submitted right away (unlike a coroutine), so the screen settles while
+        # the step loop records the step
+        settled = asyncio.get_running_loop().run_in_executor(None, settle_screen)
+        task = asyncio.ensure_future(self._prepare_next_screen(settled, timings))
+        return task, timings
+
+    async def _call_vision_model(
+        self,
+        prompt: list[Any],
+        step: int,
+        timings: timing.StepTimer | None = None,
+    ) -> str:
+        """Call the vision model, cancelling the call on Ctrl+C.
+
+        Args:
+            prompt: Messages to send.
+            step: Current step number (for interrupt messages).
+            timings: Step timer for the first_token span (streaming only).
+
+        Returns:
+            The response text (see _stream_vision_model when streaming).
+
+        Raises:
+            KeyboardInterrupt: If the user interrupted the call.
+        """
+        if self.config.verbose:
+            print("Calling vision model... (Press Ctrl+C to cancel)")
+
+        if self.config.stream_responses:
+            call = self._stream_vision_model(prompt, timings)
+        else:
+            call = self._invoke_vision_model(prompt)
+        try:
+            return await self._interruptible(call, step)
+        except KeyboardInterrupt:
+            if self.config.verbose:
+                print("\n[Model call cancelled]")
+            raise
+
+    async def _invoke_vision_model(self, prompt: list[Any]) -> str:
+        response = await self.config.vision_model.ainvoke(prompt)
+        return response.content
+
+    async def _stream_vision_model(
+        self, prompt: list[Any], timings: timing.StepTimer | None = None
+    ) -> str:
+        """Stream the model response, stopping once it contains a complete action.
+
+        Args:
+            prompt: Messages to send.
+            timings: Step timer for the time to the first chunk.
+
+        Returns:
+            The response up to the end of its action, or the whole response if
+            no complete action was recognized before the stream ended.
+        """
+        parser = action_parser.StreamingResponseParser(
+            max_actions=self.config.max_batch_actions
+        )
+        start = time.perf_counter()
+        first_chunk = True
+        stream = self.config.vision_model.astream(prompt)
+        try:
+            async for chunk in stream:
+                if first_chunk and timings is not None:
+                    timings.record("first_token", time.perf_counter() - start)
+                first_chunk = False
+                if isinstance(chunk.content, str) and parser.feed(chunk.content):
+                    break
+        finally:
+            await stream.aclose()
+        if parser.complete and self.config.verbose:
+            print("Action received, stopped reading the model response")
+        return parser.response
+
     def _cleanup_resources(self) -> None:
         """Clean up resources after task completion or interruption.
 
@@ -1054,13 +2366,19 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         - Keyboard is restored to original IME if it was changed
         - Resources are properly released
         """
+        self._restore_keyboard()
+
+    def _restore_keyboard(self) -> None:
+        """Switch back to the user's keyboard if a Type action replaced it.
+
+        The next Type action switches to ADB Keyboard again.
+        """
         try:
-            # Restore keyboard if it was changed
-            if self._original_ime and self.config.device_id:
+            if self._original_ime:
                 if self.config.verbose:
                     print("Restoring original keyboard...")
                 adb_controller.restore_keyboard(
-                    self._original_ime, self.config.device_id
+                    self._original_ime, self.config.device_id, shell=self._adb_shell()
                 )
                 self._original_ime = None
         except Exception as e:
@@ -1093,30 +2411,52 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 return {"success": False, "message": f"Failed to launch {app_name}"}
 
             if action_name in ["Tap", "Double Tap", "Long Press"]:
-                element = action.get("element")
-                if not element or len(element) != 2:
+                point = _tap_point(action, screen_width, screen_height)
+                if point is None:
                     return {"success": False, "message": "Invalid element coordinates"}
-                # Convert relative (0-999) to absolute coordinates
-                x = int(element[0] / 1000 * screen_width)
-                y = int(element[1] / 1000 * screen_height)
+                x, y = point
 
                 if action_name == "Tap":
                     self.controller.tap(x, y)
                 elif action_name == "Double Tap":
-                    # Double tap not in protocol - use tap twice
-                    self.controller.tap(x, y)
-                    time.sleep(0.2)
-                    self.controller.tap(x, y)
+                    if self._touch_injector() is not None:
+                        # Both taps in one gesture, at touchscreen speed
+                        adb_controller.double_tap(
+                            x,
+                            y,
+                            self.config.device_id,
+                            delay=0.0 if self._adaptive_settle else None,
+                            shell=self._adb_shell(),
+                            touch=self._touch_injector(),
+                        )
+                    else:
+                        # Double tap not in protocol - use tap twice
+                        self.controller.tap(x, y)
+                        time.sleep(_DOUBLE_TAP_INTERVAL)
+                        self.controller.tap(x, y)
                 # Long press not in protocol - iOS uses long_press via device module
                 elif self.config.platform == "android":
-                    adb_controller.long_press(x, y, 3000, self.config.device_id)
+                    adb_controller.long_press(
+                        x,
+                        y,
+                        3000,
+                        self.config.device_id,
+                        delay=0.0 if self._adaptive_settle else None,
+                        shell=self._adb_shell(),
+                        touch=self._touch_injector(),
+                    )
                 else:
                     from deepagents_cli.middleware.autoglm.ios import (
                         device as ios_device,
                     )
 
                     ios_device.long_press(
-                        x, y, duration=3.0, wda_url=self.config.wda_url
+                        x,
+                        y,
+                        duration=3.0,
+                        wda_url=self.config.wda_url,
+                        delay=0.0 if self._adaptive_settle else 1.0,
+                        client=getattr(self.controller, "wda", None),
                     )
 
                 return {
@@ -1127,86 +2467,57 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
             if action_name in ["Type", "Type_Name"]:
                 text = action.get("text", "")
 
-                try:
-                    # Platform-specific keyboard handling
-                    if self.config.platform == "android":
-                        # Switch to ADB keyboard and save original IME for cleanup
-                        original_ime = adb_controller.set_adb_keyboard(
-                            self.config.device_id
+                # Platform-specific keyboard handling
+                if self.config.platform == "android":
+                    # Switch to ADB keyboard once per task. The original IME is
+                    # kept for _restore_keyboard, which restores it when the task
+                    # ends or a sensitive page needs the user's keyboard, so later
+                    # Type actions reuse the active keyboard.
+                    if self._original_ime is None:
+                        self._original_ime = adb_controller.set_adb_keyboard(
+                            self.config.device_id, shell=self._adb_shell()
                         )
-                        self._original_ime = (
-                            original_ime  # Track for cleanup on interrupt
+                        adb_controller.wait_for_ime(
+                            adb_controller.ADB_KEYBOARD_IME,
+                            self.config.device_id,
+                            timeout=1.0,
+                            shell=self._adb_shell(),
                         )
-                        time.sleep(1.0)  # keyboard_switch_delay
-
-                        # Clear existing text
-                        adb_controller.clear_text(self.config.device_id)
-                        time.sleep(0.5)  # text_clear_delay
 
-                    # Log text length for debugging
-                    if self.config.verbose:
-                        print(f"[Type Action] Inputting text: {len(text)} characters")
-                        print(
-                            f"[Type Action] Text preview: {text[:100]}..."
-                            if len(text) > 100
-                            else f"[Type Action] Text: {text}"
-                        )
+                    # Clear existing text
+                    adb_controller.clear_text(
+                        self.config.device_id, shell=self._adb_shell()
+                    )
+                    self._settle(0.5)  # text_clear_delay
 
-                    # Type text via platform controller
-                    self.controller.type_text(text)
+                # Log text length for debugging
+                if self.config.verbose:
+                    print(f"[Type Action] Inputting text: {len(text)} characters")
+                    print(
+                        f"[Type Action] Text preview: {text[:100]}..."
+                        if len(text) > 100
+                        else f"[Type Action] Text: {text}"
+                    )
 
-                    # Delay for text to be processed
-                    if len(text) > 500:
-                        time.sleep(2.0)  # 2s for long text
-                    else:
-                        time.sleep(1.0)  # 1s for short text
+                # Type text via platform controller
+                self.controller.type_text(text)
 
-                    return {
-                        "success": True,
-                        "message": f"Typed: {len(text)} characters",
-                    }
+                # Delay for text to be processed (adaptive settling happens
+                # after the action instead): 2s for long text, 1s otherwise
+                if not self._adaptive_settle:
+                    time.sleep(2.0 if len(text) > 500 else 1.0)
 
-                finally:
-                    # Restore keyboard (Android only)
-                    if self.config.platform == "android":
-                        try:
-                            if self._original_ime:
-                                adb_controller.restore_keyboard(
-                                    self._original_ime, self.config.device_id
-                                )
-                                time.sleep(0.5)  # keyboard_restore_delay
-                                self._original_ime = None  # Clear after restoration
-                        except Exception as e:
-                            if self.config.verbose:
-                                print(
-                                    f"Warning: Failed to restore keyboard in Type action: {e}"
-                                )
+                return {
+                    "success": True,
+                    "message": f"Typed: {len(text)} characters",
+                }
 
             if action_name == "Swipe":
-                start = action.get("start")
-                end = action.get("end")
-                if not start or not end or len(start) != 2 or len(end) != 2:
+                swipe = _swipe_args(action, screen_width, screen_height)
+                if swipe is None:
                     return {"success": False, "message": "Invalid swipe coordinates"}
-                coordinate_mode = action.get("coordinate_mode")
-                if (
-                    coordinate_mode == "pixel"
-                    or max(start[0], start[1], end[0], end[1]) > 1000
-                ):
-                    start_x = int(start[0])
-                    start_y = int(start[1])
-                    end_x = int(end[0])
-                    end_y = int(end[1])
-                else:
-                    start_x = int(start[0] / 1000 * screen_width)
-                    start_y = int(start[1] / 1000 * screen_height)
-                    end_x = int(end[0] / 1000 * screen_width)
-                    end_y = int(end[1] / 1000 * screen_height)
-
-                duration_ms = action.get("duration_ms")
-                duration = None
-                if isinstance(duration_ms, (int, float)):
-                    duration = duration_ms / 1000.0
-                self.controller.swipe(start_x, start_y, end_x, end_y, duration=duration)
+                *points, duration = swipe
+                self.controller.swipe(*points, duration=duration)
                 return {"success": True, "message": "Executed swipe"}
 
             if action_name == "Back":
@@ -1218,11 +2529,7 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
                 return {"success": True, "message": "Pressed home"}
 
             if action_name == "Wait":
-                duration_str = action.get("duration", "1 seconds")
-                try:
-                    duration = float(duration_str.replace("seconds", "").strip())
-                except ValueError:
-                    duration = 1.0
+                duration = _wait_seconds(action)
                 time.sleep(duration)
                 return {"success": True, "message": f"Waited {duration} seconds"}
 
@@ -1240,6 +2547,86 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         except Exception as e:
             return {"success": False, "message": f"Action execution failed: {e}"}
 
+        finally:
+            # Any action may have switched apps
+            self._invalidate_current_app()
+
+    async def _execute_action_async(
+        self, action: dict[str, Any], screen_width: int, screen_height: int
+    ) -> dict[str, Any]:
+        """Execute a parsed action, awaiting the async controller where possible.
+
+        Taps, swipes, key presses, app launches and waits can be cancelled at any
+        await. Other actions (typing, long press, a double tap sent as one touch
+        gesture, ...) run _execute_action in a worker thread.
+
+        Args:
+            action: Parsed action dictionary.
+            screen_width: Screen width in pixels.
+            screen_height: Screen height in pixels.
+
+        Returns:
+            Dictionary with 'success' (bool) and 'message' (str) keys.
+        """
+        action_name = action.get("action")
+        if action_name not in _ASYNC_ACTIONS or (
+            action_name == "Double Tap" and self._touch_injector() is not None
+        ):
+            return await asyncio.to_thread(
+                self._execute_action, action, screen_width, screen_height
+            )
+
+        controller = self._aio
+        try:
+            if action_name == "Launch":
+                app_name = action.get("app")
+                if not app_name:
+                    return {"success": False, "message": "No app name provided"}
+                if await controller.launch_app(app_name):
+                    return {"success": True, "message": f"Launched {app_name}"}
+                return {"success": False, "message": f"Failed to launch {app_name}"}
+
+            if action_name in {"Tap", "Double Tap"}:
+                point = _tap_point(action, screen_width, screen_height)
+                if point is None:
+                    return {"success": False, "message": "Invalid element coordinates"}
+                x, y = point
+                await controller.tap(x, y)
+                if action_name == "Double Tap":
+                    await asyncio.sleep(_DOUBLE_TAP_INTERVAL)
+                    await controller.tap(x, y)
+                return {
+                    "success": True,
+                    "message": f"Executed {action_name} at ({x}, {y})",
+                }
+
+            if action_name == "Swipe":
+                swipe = _swipe_args(action, screen_width, screen_height)
+                if swipe is None:
+                    return {"success": False, "message": "Invalid swipe coordinates"}
+                *points, duration = swipe
+                await controller.swipe(*points, duration=duration)
+                return {"success": True, "message": "Executed swipe"}
+
+            if action_name == "Back":
+                await controller.press_back()
+                return {"success": True, "message": "Pressed back"}
+
+            if action_name == "Home":
+                await controller.press_home()
+                return {"success": True, "message": "Pressed home"}
+
+            duration = _wait_seconds(action)
+            await asyncio.sleep(duration)
+            return {"success": True, "message": f"Waited {duration} seconds"}
+
+        except Exception as e:
+            return {"success": False, "message": f"Action execution failed: {e}"}
+
+        finally:
+            # Any action may have switched apps
+            self._invalidate_current_app()
+
     def _create_low_level_tools(self) -> list[Any]:
         """Create low-level ADB control tools.
 
@@ -1525,4 +2912,84 @@ class AutoGLMMiddleware(AgentMiddleware[AgentState, Any]):
         return await handler(request.override(system_prompt=system_prompt))
 
 
+async def _timed(timings: timing.StepTimer, stage: str, awaitable: Awaitable[T]) -> T:
+    """Await an operation inside a timing span.
+
+    Args:
+        timings: Step timer to record the span in.
+        stage: Stage name.
+        awaitable: Operation to time.
+
+    Returns:
+        The result of the awaitable.
+    """
+    with timings.span(stage):
+        return await awaitable
+
+
+def _tap_point(
+    action: dict[str, Any], screen_width: int, screen_height: int
+) -> tuple[int, int] | None:
+    """Convert an action's relative (0-999) element to screen coordinates.
+
+    Returns:
+        Tuple of (x, y), or None if the element is missing or malformed.
+    """
+    element = action.get("element")
+    if not element or len(element) != 2:
+        return None
+    return (
+        int(element[0] / 1000 * screen_width),
+        int(element[1] / 1000 * screen_height),
+    )
+
+
+def _swipe_args(
+    action: dict[str, Any], screen_width: int, screen_height: int
+) -> tuple[int, int, int, int, float | None] | None:
+    """Convert a Swipe action to screen coordinates and a duration.
+
+    Coordinates are relative (0-999) unless the action uses pixel mode or any
+    value exceeds 1000.
+
+    Returns:
+        Tuple of (start_x, start_y, end_x, end_y, duration in seconds or None),
+        or None if the coordinates are missing or malformed.
+    """
+    start = action.get("start")
+    end = action.get("end")
+    if not start or not end or len(start) != 2 or len(end) != 2:
+        return None
+    coordinate_mode = action.get("coordinate_mode")
+    if coordinate_mode == "pixel" or max(start[0], start[1], end[0], end[1]) > 1000:
+        start_x = int(start[0])
+        start_y = int(start[1])
+        end_x = int(end[0])
+        end_y = int(end[1])
+    else:
+        start_x = int(start[0] / 1000 * screen_width)
+        start_y = int(start[1] / 1000 * screen_height)
+        end_x = int(end[0] / 1000 * screen_width)
+        end_y = int(end[1] / 1000 * screen_height)
+
+    duration_ms = action.get("duration_ms")
+    duration = None
+    if isinstance(duration_ms, (int, float)):
+        duration = duration_ms / 1000.0
+    return start_x, start_y, end_x, end_y, duration
+
+
+def _wait_seconds(action: dict[str, Any]) -> float:
+    """Parse a Wait action's duration such as "2 seconds" (default 1 second).
+
+    Returns:
+        The duration in seconds.
+    """
+    duration_str = action.get("duration", "1 seconds")
+    try:
+        return float(duration_str.replace("seconds", "").strip())
+    except ValueError:
+        return 1.0
+
+
 __all__ = ["AutoGLMConfig", "AutoGLMMiddleware"]
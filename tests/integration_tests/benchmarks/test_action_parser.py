@@ -0,0 +1,192 @@
+"""Micro-benchmark for the action parser.
+
+Compares parse throughput and failure rate of the single-pass parser against the
+previous AST-based implementation, kept here for reference (split into helpers,
+with the same behavior). The corpus mixes well-formed actions with near-miss
+outputs that used to cost a retry step. Run with ``--log-cli-level=INFO`` to see
+the figures.
+"""
+
+import ast
+import contextlib
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+from deepagents_cli.middleware.autoglm.action_parser import parse_action
+
+logger = logging.getLogger(__name__)
+
+ROUNDS = 200
+
+WELL_FORMED = [
+    'do(action="Tap", element=[500, 300])',
+    'do(action="Swipe", start=[500, 800], end=[500, 200])',
+    'do(action="Launch", app="微信")',
+    'do(action="Type", text="hello, world")',
+    'do(action="Wait", duration="2 seconds")',
+    'do(action="Back")',
+    'finish(message="Sent "hi" to Alice (twice)")',
+]
+
+NEAR_MISSES = [
+    'do(action="Tap", element=[500, 300])</answer>',
+    'do(action="Tap", element=[500, 300]',
+    "do(action=Tap, element=(500, 300),)",
+    "do(action=“Launch”，app=“微信”)",
+    'do("Home")',
+    'Action: do(action="Back") to leave',
+    'finish("all done")',
+]
+
+
+def _legacy_parse_action(action_str: str) -> dict[str, Any]:
+    try:
+        return _legacy_parse(action_str)
+    except Exception as e:
+        msg = f"Failed to parse action '{action_str}': {e}"
+        raise ValueError(msg) from e
+
+
+def _legacy_parse(action_str: str) -> dict[str, Any]:
+    action_str = action_str.strip()
+
+    # Special handling for Type actions (text may contain quotes and commas)
+    if action_str.startswith(('do(action="Type"', 'do(action="Type_Name"')):
+        return _legacy_parse_type(action_str)
+
+    # Handle do(...) actions using AST parsing
+    if action_str.startswith("do("):
+        try:
+            return _legacy_parse_do(action_str)
+        except (SyntaxError, ValueError) as e:
+            msg = f"Failed to parse do() action: {e}"
+            raise ValueError(msg) from e
+
+    # Handle finish(...) actions
+    if action_str.startswith("finish("):
+        return _legacy_parse_finish(action_str)
+
+    # Unknown action format
+    msg = f"Unknown action format: {action_str}"
+    raise ValueError(msg)
+
+
+def _legacy_parse_type(action_str: str) -> dict[str, Any]:
+    # Strategy 1: Find the LAST ") to handle text with embedded quotes
+    # This matches the finish() action parsing strategy
+    if 'text="' in action_str:
+        start_idx = action_str.index('text="') + len('text="')
+        # Find the last ") in the string to get the complete text
+        if '")' in action_str[start_idx:]:
+            end_idx = action_str.rindex('")')
+            text = action_str[start_idx:end_idx]
+            return {"_metadata": "do", "action": "Type", "text": text}
+
+    # Strategy 2: Try to find text with single quotes
+    if "text='" in action_str:
+        start_idx = action_str.index("text='") + len("text='")
+        if "')" in action_str[start_idx:]:
+            end_idx = action_str.rindex("')")
+            text = action_str[start_idx:end_idx]
+            return {"_metadata": "do", "action": "Type", "text": text}
+
+    msg = "Type action missing text parameter"
+    raise ValueError(msg)
+
+
+def _legacy_parse_do(action_str: str) -> dict[str, Any]:
+    # Escape special characters (newlines, tabs, etc.) for valid Python syntax
+    # This handles cases where model output contains unescaped newlines
+    action_str = action_str.replace("\n", "\\n")
+    action_str = action_str.replace("\r", "\\r")
+    action_str = action_str.replace("\t", "\\t")
+
+    # Parse the function call as an expression
+    tree = ast.parse(action_str, mode="eval")
+    if not isinstance(tree.body, ast.Call):
+        # ValueError, so that it is reported like a syntax error
+        msg = "Expected a function call"
+        raise ValueError(msg)  # noqa: TRY004
+
+    # Extract keyword arguments safely, using literal_eval for the values
+    action: dict[str, Any] = {"_metadata": "do"}
+    for keyword in tree.body.keywords:
+        action[keyword.arg] = ast.literal_eval(keyword.value)
+    return action
+
+
+def _legacy_parse_finish(action_str: str) -> dict[str, Any]:
+    # Strategy 1: Find ") at the end - handles messages with internal quotes.
+    # We find the LAST occurrence of ") to handle nested quotes
+    if 'message="' in action_str:
+        start_idx = action_str.index('message="') + len('message="')
+        # Find the last ") in the string
+        if '")' in action_str[start_idx:]:
+            end_idx = action_str.rindex('")')
+            message = action_str[start_idx:end_idx]
+            return {"_metadata": "finish", "message": message}
+
+    # Strategy 2: Try single quotes
+    if "message='" in action_str:
+        start_idx = action_str.index("message='") + len("message='")
+        if "')" in action_str[start_idx:]:
+            end_idx = action_str.rindex("')")
+            message = action_str[start_idx:end_idx]
+            return {"_metadata": "finish", "message": message}
+
+    # Strategy 3: Fallback - extract everything after message= and clean it up
+    if "message=" in action_str:
+        message_raw = action_str.split("message=", 1)[1].strip()
+        # Remove surrounding quotes and trailing )
+        message = message_raw.strip('"').strip("'").rstrip(")")
+        return {"_metadata": "finish", "message": message}
+
+    msg = "finish action missing message parameter"
+    raise ValueError(msg)
+
+
+def _run(
+    parser: Callable[[str], dict[str, Any]], corpus: list[str]
+) -> tuple[float, int]:
+    """Parse the corpus ROUNDS times.
+
+    Returns:
+        Tuple of (microseconds per parse, number of inputs that failed to parse).
+    """
+    failures = 0
+    for text in corpus:
+        try:
+            parser(text)
+        except ValueError:
+            failures += 1
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for text in corpus:
+            with contextlib.suppress(ValueError):
+                parser(text)
+    elapsed = time.perf_counter() - start
+    return elapsed / (ROUNDS * len(corpus)) * 1e6, failures
+
+
+def test_parser_throughput_and_failure_rate() -> None:
+    corpus = WELL_FORMED + NEAR_MISSES
+    legacy_us, legacy_failures = _run(_legacy_parse_action, corpus)
+    current_us, current_failures = _run(parse_action, corpus)
+
+    logger.info(
+        "legacy: %.1f us/parse, %d/%d failed; "
+        "single-pass: %.1f us/parse, %d/%d failed (%.1fx)",
+        legacy_us,
+        legacy_failures,
+        len(corpus),
+        current_us,
+        current_failures,
+        len(corpus),
+        legacy_us / current_us,
+    )
+    assert current_failures == 0
+    assert current_failures <= legacy_failures
+    for text in WELL_FORMED:
+        assert parse_action(text) == _legacy_parse_action(text)
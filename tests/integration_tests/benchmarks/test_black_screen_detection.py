@@ -0,0 +1,60 @@
+"""Micro-benchmark for black/sensitive-screen detection.
+
+Compares the per-step cost of the vectorized region detector against the previous
+implementation (LANCZOS resize to 100x100, then a Python sum over ``getdata()``),
+which is kept here verbatim for reference. Run with ``-s`` to see the timings.
+"""
+
+import time
+from collections.abc import Callable
+
+import pytest
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm.adb_controller import (
+    _is_black_or_nearly_black_screen,
+)
+
+ROUNDS = 20
+
+
+def _legacy_is_black(img: Image.Image, threshold: float = 30.0) -> bool:
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img_small = img.resize((100, 100), Image.Resampling.LANCZOS)
+    pixels = list(img_small.getdata())
+    total_brightness = sum(sum(pixel) / 3 for pixel in pixels)
+    return total_brightness / len(pixels) < threshold
+
+
+def _screens() -> dict[str, Image.Image]:
+    secure = Image.new("RGB", (1080, 2400), "black")
+    secure.paste((255, 255, 255), (0, 0, 1080, 90))
+
+    content = Image.new("RGB", (1080, 2400), (245, 245, 245))
+    for top in range(200, 2200, 240):
+        content.paste((30, 120, 200), (40, top, 1040, top + 160))
+
+    return {"secure": secure, "content": content, "rgba": content.convert("RGBA")}
+
+
+def _per_call_ms(detector: Callable[[Image.Image], bool], img: Image.Image) -> float:
+    detector(img)  # warm-up
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        detector(img)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+@pytest.mark.parametrize("name", ["secure", "content", "rgba"])
+def test_detector_cost(name: str) -> None:
+    img = _screens()[name]
+
+    legacy_ms = _per_call_ms(_legacy_is_black, img)
+    current_ms = _per_call_ms(_is_black_or_nearly_black_screen, img)
+
+    print(
+        f"\n{name}: legacy {legacy_ms:.2f} ms, vectorized {current_ms:.2f} ms "
+        f"({legacy_ms / current_ms:.1f}x)"
+    )
+    assert _is_black_or_nearly_black_screen(img) == _legacy_is_black(img)
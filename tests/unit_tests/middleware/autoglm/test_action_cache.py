@@ -0,0 +1,193 @@
+"""Unit tests for the action cache."""
+
+import threading
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from PIL import Image, ImageDraw
+
+from deepagents_cli.middleware.autoglm import screen_change
+from deepagents_cli.middleware.autoglm.action_cache import (
+    ActionCache,
+    TaskCache,
+    normalize_task,
+)
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+TAP = 'Tap\ndo(action="Tap", element=[500, 500])'
+FINISH = 'Done\nfinish(message="ok")'
+
+
+def _image(stripes: bool = False) -> Image.Image:
+    img = Image.new("RGB", (100, 200), "white")
+    if stripes:
+        draw = ImageDraw.Draw(img)
+        for x in range(0, 100, 10):
+            draw.rectangle((x, 0, x + 4, 200), fill="black")
+    return img
+
+
+WHITE = screen_change.dhash(_image())
+STRIPES = screen_change.dhash(_image(stripes=True))
+
+
+def test_normalize_task() -> None:
+    assert normalize_task("  Open  Settings. ") == "open settings"
+    assert normalize_task("打开设置。") == normalize_task("打开设置")
+
+
+def test_lookup_matches_near_screens_and_evicts_lru() -> None:
+    cache = ActionCache(max_entries=2)
+    cache.store("task", "Settings", WHITE, "a")
+    cache.store("task", "Settings", STRIPES, "b")
+
+    assert cache.lookup("Task.", "Settings", WHITE ^ 0b11).response == "a"
+    assert cache.lookup("task", "WeChat", WHITE) is None
+
+    cache.store("other", "Settings", WHITE, "c")
+
+    assert cache.lookup("task", "Settings", STRIPES) is None
+    assert cache.lookup("task", "Settings", WHITE).response == "a"
+    assert cache.stats() == {"entries": 2, "hits": 2, "misses": 2, "divergences": 0}
+
+
+def test_cache_persists_to_disk(tmp_path: Path) -> None:
+    path = tmp_path / "agent" / "cache.json"
+    cache = ActionCache(path)
+    cache.store("task", "Settings", WHITE, "a", next_hash=STRIPES)
+    cache.save()
+
+    loaded = ActionCache(path)
+    entry = loaded.lookup("task", "Settings", WHITE)
+
+    assert entry.response == "a"
+    assert entry.next_hash == STRIPES
+
+    path.write_text("{not json")
+    assert len(ActionCache(path)) == 0
+
+
+def test_concurrent_saves_do_not_collide(tmp_path: Path) -> None:
+    path = tmp_path / "cache.json"
+    cache = ActionCache(path)
+    cache.store("task", "Settings", WHITE, "a")
+    errors = []
+
+    def save_repeatedly() -> None:
+        for _ in range(50):
+            try:
+                cache.save()
+            except OSError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(ActionCache(path)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["cache.json"]
+
+
+def test_failed_save_does_not_fail_the_task(
+    tmp_path: Path,
+    capsys: pytest.CaptureFixture[str],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    cache = ActionCache(blocker / "cache.json")
+    run = TaskCache(cache, "task")
+    run.observe(WHITE)
+    run.learn("Settings", WHITE, "a", success=True)
+
+    run.commit()
+
+    assert cache.lookup("task", "Settings", WHITE).response == "a"
+    assert "Could not save the action cache" in caplog.text
+    assert not capsys.readouterr().out
+
+
+def test_task_cache_learns_only_from_successful_tasks() -> None:
+    cache = ActionCache()
+    run = TaskCache(cache, "task")
+    run.observe(WHITE)
+    run.learn("Settings", WHITE, "a", success=True)
+    run.observe(STRIPES)
+    assert len(cache) == 0
+
+    run.commit()
+
+    assert cache.lookup("task", "Settings", WHITE).next_hash == STRIPES
+
+
+def test_failed_cached_action_disables_cache() -> None:
+    cache = ActionCache()
+    cache.store("task", "Settings", WHITE, "a")
+    run = TaskCache(cache, "task")
+
+    assert run.propose("Settings", WHITE) == "a"
+    assert not run.learn("Settings", WHITE, "a", success=False)
+    assert run.propose("Settings", WHITE) is None
+    assert cache.stats()["divergences"] == 1
+    assert len(cache) == 0
+
+
+class Controller:
+    """Shows a white screen, or stripes after a tap when tap_changes_screen."""
+
+    def __init__(self) -> None:
+        self.tap_changes_screen = False
+        self.stripes = False
+
+    def take_screenshot(self) -> Screenshot:
+        return Screenshot(
+            base64_data="iVBORw0KGgo=",
+            width=100,
+            height=200,
+            image=_image(self.stripes),
+        )
+
+    def get_current_app(self) -> str:
+        return "Settings"
+
+    def tap(self, _x: int, _y: int) -> None:
+        self.stripes = self.tap_changes_screen
+
+
+async def test_repeated_task_skips_model_until_screen_diverges(
+    tmp_path: Path,
+) -> None:
+    model = FakeMessagesListChatModel(
+        responses=[AIMessage(content=text) for text in (TAP, FINISH, FINISH, FINISH)]
+    )
+    path = tmp_path / "cache.json"
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(vision_model=model, action_cache=True, action_cache_path=path)
+    )
+    controller = Controller()
+    middleware.controller = controller
+    middleware._settle_after_action = lambda _action: None
+
+    first = await middleware._execute_phone_task_async("Tap it", "call-1")
+    second = await middleware._execute_phone_task_async("tap it", "call-2")
+    controller.tap_changes_screen = True
+    third = await middleware._execute_phone_task_async("tap it", "call-3")
+
+    assert [r.status for r in (first, second, third)] == ["success"] * 3
+    assert first.artifact["model_calls"] == 2
+    assert second.artifact["model_calls"] == 1
+    assert second.artifact["cache_hits"] == 1
+    assert third.artifact["cache_hits"] == 1
+    assert third.artifact["cache_divergences"] == 1
+    # The successful run recorded the new follow-up screen
+    entry = ActionCache(path).lookup("tap it", "Settings", WHITE)
+    assert entry.next_hash == STRIPES
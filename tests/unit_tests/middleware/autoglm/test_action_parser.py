@@ -0,0 +1,280 @@
+"""Unit tests for the action parser."""
+
+import random
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm.action_parser import (
+    StreamingResponseParser,
+    parse_action,
+    parse_actions,
+    parse_response,
+)
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+# Well-formed model outputs and the actions they parse to
+CORPUS = [
+    (
+        'do(action="Tap", element=[500, 300])',
+        {"_metadata": "do", "action": "Tap", "element": [500, 300]},
+    ),
+    (
+        'do(action="Swipe", start=[500, 800], end=[500, 200])',
+        {"_metadata": "do", "action": "Swipe", "start": [500, 800], "end": [500, 200]},
+    ),
+    (
+        'do(action="Launch", app="微信")',
+        {"_metadata": "do", "action": "Launch", "app": "微信"},
+    ),
+    (
+        'do(action="Type", text="hello, \'world\'")',
+        {"_metadata": "do", "action": "Type", "text": "hello, 'world'"},
+    ),
+    (
+        'do(action="Type_Name", text="张三")',
+        {"_metadata": "do", "action": "Type", "text": "张三"},
+    ),
+    (
+        'do(action="Wait", duration="2 seconds")',
+        {"_metadata": "do", "action": "Wait", "duration": "2 seconds"},
+    ),
+    (
+        'do(action="Take_over", message="请登录\n然后继续")',
+        {"_metadata": "do", "action": "Take_over", "message": "请登录\n然后继续"},
+    ),
+    ('do(action="Back")', {"_metadata": "do", "action": "Back"}),
+    (
+        'finish(message="Sent "hi" to Alice (twice)")',
+        {"_metadata": "finish", "message": 'Sent "hi" to Alice (twice)'},
+    ),
+    ("finish(message='done')", {"_metadata": "finish", "message": "done"}),
+]
+
+# Near-miss outputs seen from models, and what they should still parse to
+NEAR_MISSES = [
+    (
+        'do(action="Tap", element=[500, 300])</answer>',
+        {"_metadata": "do", "action": "Tap", "element": [500, 300]},
+    ),
+    (
+        'do(action="Tap", element=[500, 300]',
+        {"_metadata": "do", "action": "Tap", "element": [500, 300]},
+    ),
+    (
+        "do(action=Tap, element=(500, 300),)",
+        {"_metadata": "do", "action": "Tap", "element": [500, 300]},
+    ),
+    (
+        "do(action=“Launch”，app=“微信”)",
+        {"_metadata": "do", "action": "Launch", "app": "微信"},
+    ),
+    ('do("Home")', {"_metadata": "do", "action": "Home"}),
+    (
+        'Action: do(action="Back") to leave',
+        {"_metadata": "do", "action": "Back"},
+    ),
+    ('finish("all done")', {"_metadata": "finish", "message": "all done"}),
+    (
+        "finish(message=Opened, nothing else to do)",
+        {"_metadata": "finish", "message": "Opened, nothing else to do"},
+    ),
+    (
+        'do(action="Type", text="line one\nline two")',
+        {"_metadata": "do", "action": "Type", "text": "line one\nline two"},
+    ),
+]
+
+
+@pytest.mark.parametrize(("text", "expected"), CORPUS + NEAR_MISSES)
+def test_parse_action_corpus(text: str, expected: dict[str, Any]) -> None:
+    assert parse_action(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "",
+        "I cannot find the button",
+        'do(action="Tap", element=[500, 3',
+        'do(action="Launch", app="微信)',
+        'do(action="Type")',
+        "finish()",
+    ],
+)
+def test_parse_action_rejects_incomplete_actions(text: str) -> None:
+    with pytest.raises(ValueError, match="Failed to parse action"):
+        parse_action(text)
+
+
+def _mutate(text: str, rng: random.Random) -> str:
+    noise = ['"', "'", "(", ")", "[", "]", ",", "=", "\\", "\n", "，", "“", " "]
+    chars = list(text)
+    for _ in range(rng.randint(1, 4)):
+        position = rng.randrange(len(chars) + 1)
+        operation = rng.random()
+        if operation < 0.4 and chars:
+            del chars[min(position, len(chars) - 1)]
+        elif operation < 0.8:
+            chars.insert(position, rng.choice(noise))
+        else:
+            chars = chars[:position]
+    return "".join(chars)
+
+
+def test_fuzzed_corpus_parses_or_raises_value_error() -> None:
+    rng = random.Random(1234)
+    for text, _ in CORPUS + NEAR_MISSES:
+        for _ in range(300):
+            mutated = _mutate(text, rng)
+            try:
+                action = parse_action(mutated)
+            except ValueError:
+                continue
+            assert action["_metadata"] in {"do", "finish"}, mutated
+            thinking, action_str = parse_response(mutated)
+            assert isinstance(thinking, str)
+            assert isinstance(action_str, str)
+
+
+def test_parse_response_strips_tags_from_thinking() -> None:
+    assert parse_response(
+        '<think>open it</think><answer>do(action="Back")</answer>'
+    ) == ("open it", 'do(action="Back")</answer>')
+
+
+def test_parse_actions_splits_calls_on_their_own_lines() -> None:
+    answer = (
+        '1. do(action="Tap", element=[500, 300])\n'
+        '2. do(action="Type", text="say "hi"; do(action=Back)")\n'
+        '3. finish(message="ok")\n'
+        'do(action="Back")</answer>'
+    )
+
+    actions = parse_actions(answer, max_actions=5)
+
+    assert [a["_metadata"] for a in actions] == ["do", "do", "finish"]
+    assert actions[1]["text"] == 'say "hi"; do(action=Back)'
+    assert len(parse_actions(answer, max_actions=2)) == 2
+    assert parse_actions(answer) == [parse_action(answer)]
+
+
+def test_parse_actions_keeps_the_valid_prefix() -> None:
+    answer = 'do(action="Back")\ndo(action="Tap", element=[1, 2'
+
+    assert parse_actions(answer, max_actions=3) == [
+        {"_metadata": "do", "action": "Back"}
+    ]
+    with pytest.raises(ValueError, match="Failed to parse action"):
+        parse_actions('do(action="Tap", element=[1\ndo(action="Back")', 3)
+
+
+def _feed(text: str, size: int = 3, max_actions: int = 1) -> StreamingResponseParser:
+    parser = StreamingResponseParser(max_actions)
+    for start in range(0, len(text), size):
+        if parser.feed(text[start : start + size]):
+            break
+    return parser
+
+
+@pytest.mark.parametrize("size", [1, 3, 1000])
+def test_stream_completes_at_end_of_do_call(size: int) -> None:
+    parser = _feed(
+        'Tap (the button)\ndo(action="Tap", element=[500, 300]) trailing text', size
+    )
+
+    assert parser.complete
+    assert parse_response(parser.response) == (
+        "Tap (the button)",
+        'do(action="Tap", element=[500, 300])',
+    )
+
+
+def test_stream_ignores_brackets_in_strings() -> None:
+    parser = _feed('do(action="Launch", app="a)b]") extra')
+
+    assert parse_action(parse_response(parser.response)[1]) == {
+        "_metadata": "do",
+        "action": "Launch",
+        "app": "a)b]",
+    }
+
+
+def test_free_text_actions_wait_for_answer_tag_or_end() -> None:
+    typed = 'do(action="Type", text="say "hi") now")'
+    assert not _feed(typed).complete
+    assert _feed(f"<answer>{typed}</answer>").complete
+
+    parser = _feed('<think>done</think><answer>finish(message="a (b)")</answer>x')
+    assert parser.complete
+    assert parse_response(parser.response) == ("done", 'finish(message="a (b)")')
+
+
+def test_batched_stream_waits_for_all_actions() -> None:
+    answer = 'do(action="Back")\ndo(action="Home")'
+
+    assert _feed(answer).complete
+    assert not _feed(answer, max_actions=3).complete
+    parser = _feed(f"<answer>{answer}</answer> padding", max_actions=3)
+    assert parser.complete
+    assert len(parse_actions(parse_response(parser.response)[1], 3)) == 2
+
+
+def test_stream_without_action_is_incomplete() -> None:
+    parser = _feed("I am thinking about do(act")
+
+    assert not parser.complete
+    assert parser.response == "I am thinking about do(act"
+
+
+class StreamingModel:
+    """Streams a response word by word and records how much was read."""
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.sent: list[str] = []
+        self.closed = False
+
+    async def astream(self, _prompt: object) -> AsyncIterator[AIMessageChunk]:
+        try:
+            for word in self.text.split(" "):
+                self.sent.append(word)
+                yield AIMessageChunk(content=f"{word} ")
+        finally:
+            self.closed = True
+
+
+async def test_step_loop_stops_stream_once_action_is_complete(tmp_path: Path) -> None:
+    model = StreamingModel('<answer>finish(message="ok")</answer> ' + "padding " * 50)
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(vision_model=model, screenshot_dir=str(tmp_path))
+    )
+
+    class Controller:
+        def take_screenshot(self) -> Screenshot:
+            return Screenshot(
+                base64_data="iVBORw0KGgo=",
+                width=100,
+                height=200,
+                image=Image.new("RGB", (100, 200), "white"),
+            )
+
+        def get_current_app(self) -> str:
+            return "Settings"
+
+    middleware.controller = Controller()
+
+    result = await middleware._execute_phone_task_async("finish", "call-1")
+
+    assert result.status == "success"
+    assert "ok" in result.content
+    assert model.closed
+    assert len(model.sent) < 10
@@ -0,0 +1,309 @@
+"""Unit tests for the ADB server protocol client."""
+
+import io
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import threading
+from collections.abc import Iterator
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm import adb_client, adb_controller
+from deepagents_cli.middleware.autoglm.adb_controller import ConnectionType
+from deepagents_cli.middleware.autoglm.async_platform import AsyncAndroidController
+from deepagents_cli.middleware.autoglm.platform import PlatformConfig
+
+pytestmark = [
+    pytest.mark.skipif(
+        sys.platform == "win32",
+        reason="the fake device runs commands in a POSIX shell",
+    ),
+    # The fake ADB server listens on TCP, like the real one
+    pytest.mark.enable_socket,
+]
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def _reply(sock: socket.socket, status: bytes, message: str) -> None:
+    payload = message.encode()
+    sock.sendall(status + b"%04x" % len(payload) + payload)
+
+
+class FakeAdbServer(socketserver.ThreadingTCPServer):
+    """ADB server with one device whose shell runs commands on the host."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.devices = {"emulator-5554": "device product:sdk model:Pixel_7"}
+        self.screen = b""
+        self.files: dict[str, bytes] = {}
+        self.services: list[str] = []
+        self.connections = 0
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: FakeAdbServer
+
+    def handle(self) -> None:
+        sock = self.request
+        self.server.connections += 1
+        while (header := _recv_exact(sock, 4)) is not None:
+            service = _recv_exact(sock, int(header, 16)).decode()
+            self.server.services.append(service)
+
+            if service.startswith("host:transport"):
+                serial = service.removeprefix("host:transport:")
+                if ":" not in serial and serial not in self.server.devices:
+                    _reply(sock, b"FAIL", f"device '{serial}' not found")
+                    return
+                sock.sendall(b"OKAY")
+                continue
+
+            if service == "host:version":
+                _reply(sock, b"OKAY", "0029")
+            elif service == "host:devices-l":
+                devices = "".join(
+                    f"{serial}\t{info}\n"
+                    for serial, info in self.server.devices.items()
+                )
+                _reply(sock, b"OKAY", devices)
+            elif service.startswith("host:connect:"):
+                _reply(sock, b"OKAY", f"connected to {service[13:]}")
+            elif service.startswith(("shell:", "exec:")):
+                sock.sendall(b"OKAY")
+                command = service.partition(":")[2]
+                if command.startswith("screencap"):
+                    sock.sendall(self.server.screen)
+                elif "drop-connection" in command:
+                    # Reset instead of closing cleanly
+                    sock.setsockopt(
+                        socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)
+                    )
+                    sock.close()
+                else:
+                    result = subprocess.run(
+                        ["/bin/sh", "-c", command],
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.STDOUT,
+                        check=False,
+                    )
+                    sock.sendall(result.stdout)
+            elif service == "sync:":
+                sock.sendall(b"OKAY")
+                self._sync(sock)
+            else:
+                _reply(sock, b"FAIL", f"unknown service {service}")
+            return
+
+    def _sync(self, sock: socket.socket) -> None:
+        while (packet := _recv_exact(sock, 8)) is not None:
+            request, length = struct.unpack("<4sI", packet)
+            if request == b"SEND":
+                path = _recv_exact(sock, length).decode().rpartition(",")[0]
+                data = b""
+                while True:
+                    request, length = struct.unpack("<4sI", _recv_exact(sock, 8))
+                    if request == b"DONE":
+                        break
+                    data += _recv_exact(sock, length)
+                self.server.files[path] = data
+                sock.sendall(b"OKAY" + struct.pack("<I", 0))
+            elif request == b"RECV":
+                path = _recv_exact(sock, length).decode()
+                if path in self.server.files:
+                    data = self.server.files[path]
+                    sock.sendall(b"DATA" + struct.pack("<I", len(data)) + data)
+                    sock.sendall(b"DONE" + struct.pack("<I", 0))
+                else:
+                    message = b"No such file or directory"
+                    sock.sendall(b"FAIL" + struct.pack("<I", len(message)) + message)
+            else:
+                return
+
+
+@pytest.fixture
+def adb_server(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeAdbServer]:
+    """Run a fake ADB server and point the process-wide client at it."""
+    server = FakeAdbServer()
+    threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+    ).start()
+    monkeypatch.setenv("ANDROID_ADB_SERVER_PORT", str(server.server_address[1]))
+    monkeypatch.delenv("ANDROID_SERIAL", raising=False)
+    monkeypatch.setattr(adb_client, "_default_client", None)
+    yield server
+    if adb_client._default_client is not None:
+        adb_client._default_client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_host_services_replace_the_adb_binary(adb_server: FakeAdbServer) -> None:
+    with patch.object(adb_controller.subprocess, "run") as run:
+        assert adb_controller.check_adb_available()
+        devices = adb_controller.list_devices()
+        connected = adb_controller.connect_device("192.168.1.100")
+
+    run.assert_not_called()
+    assert [(d.device_id, d.status, d.model) for d in devices] == [
+        ("emulator-5554", "device", "Pixel_7")
+    ]
+    assert devices[0].connection_type == ConnectionType.USB
+    assert connected == (True, "Connected to 192.168.1.100:5555")
+
+
+def test_shell_reports_output_and_exit_code(adb_server: FakeAdbServer) -> None:
+    client = adb_client.get_client()
+
+    result = client.shell("emulator-5554", ["echo", "a;b", "$HOME"])
+    assert (result.returncode, result.stdout) == (0, "a;b $HOME\n")
+    result = client.shell(None, "printf abc; exit_code() { return 3; }; exit_code")
+    assert (result.returncode, result.stdout) == (3, "abc")
+
+    assert adb_server.services[0] == "host:transport:emulator-5554"
+    assert adb_server.services[2] == "host:transport-any"
+    with pytest.raises(adb_client.AdbError, match="not found"):
+        client.shell("missing", ["true"])
+
+
+def test_shell_pipeline_reads_from_its_own_stages(adb_server: FakeAdbServer) -> None:
+    client = adb_client.get_client()
+
+    result = client.shell(None, "printf 'a\\nrotation=1\\n' | grep -m 1 rotation")
+
+    assert (result.returncode, result.stdout) == (0, "rotation=1\n")
+
+
+def test_sync_connection_is_reused(adb_server: FakeAdbServer) -> None:
+    client = adb_client.get_client()
+    data = bytes(range(256)) * 600  # Larger than one DATA packet
+
+    client.push("emulator-5554", data, "/data/local/tmp/a")
+    client.push("emulator-5554", b"b", "/data/local/tmp/b")
+
+    assert client.pull("emulator-5554", "/data/local/tmp/a") == data
+    assert adb_server.files["/data/local/tmp/b"] == b"b"
+    assert adb_server.connections == 1
+    with pytest.raises(adb_client.AdbError, match="No such file"):
+        client.pull("emulator-5554", "/missing")
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 80), (200, 200, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_screenshot_uses_exec_service(adb_server: FakeAdbServer) -> None:
+    adb_server.screen = _png()
+
+    with patch.object(adb_controller.subprocess, "run") as run:
+        shot = adb_controller.take_screenshot("emulator-5554")
+
+    run.assert_not_called()
+    assert (shot.width, shot.height) == (40, 80)
+    assert adb_server.services[-1] == "exec:screencap -p"
+
+
+async def test_async_controller_screenshot(adb_server: FakeAdbServer) -> None:
+    adb_server.screen = _png()
+    controller = AsyncAndroidController(
+        PlatformConfig(
+            platform="android", device_id="emulator-5554", use_shell_pool=False
+        )
+    )
+
+    shot = await controller.take_screenshot()
+
+    assert (shot.width, shot.height) == (40, 80)
+
+
+def test_unreachable_server_falls_back_to_binary(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(adb_client, "_default_client", adb_client.AdbClient(port=port))
+    output = "List of devices attached\nR58M123\tdevice model:SM_G970F\n"
+
+    with patch.object(
+        adb_controller.subprocess,
+        "run",
+        return_value=subprocess.CompletedProcess([], 0, output, ""),
+    ) as run:
+        devices = adb_controller.list_devices()
+
+    assert run.call_args.args[0] == ["adb", "devices", "-l"]
+    assert [(d.device_id, d.model) for d in devices] == [("R58M123", "SM_G970F")]
+
+
+@pytest.fixture
+def hung_server_port() -> Iterator[int]:
+    """A port that accepts connections but never answers."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        yield sock.getsockname()[1]
+
+
+def test_hung_server_raises_adb_error(hung_server_port: int) -> None:
+    client = adb_client.AdbClient(port=hung_server_port)
+
+    with pytest.raises(adb_client.AdbError, match="timed out"):
+        client.connect("192.168.1.5:5555", timeout=0.1)
+    with pytest.raises(adb_client.AdbError, match="timed out"):
+        client.shell(None, "true", timeout=0.1)
+
+
+def test_lost_connection_is_not_retried_through_the_binary(
+    adb_server: FakeAdbServer,
+) -> None:
+    with (
+        patch.object(adb_controller.subprocess, "run") as run,
+        pytest.raises(ConnectionResetError),
+    ):
+        adb_controller._run_shell("drop-connection", None)
+
+    run.assert_not_called()
+
+
+def test_slow_command_still_times_out(adb_server: FakeAdbServer) -> None:
+    client = adb_client.get_client()
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        client.shell(None, "sleep 1", timeout=0.1)
+
+
+def test_hung_server_falls_back_to_binary(
+    monkeypatch: pytest.MonkeyPatch, hung_server_port: int
+) -> None:
+    monkeypatch.setattr(
+        adb_client, "_default_client", adb_client.AdbClient(port=hung_server_port)
+    )
+    monkeypatch.setattr(adb_client.AdbClient._query, "__defaults__", (0.1,))
+
+    with patch.object(
+        adb_controller.subprocess,
+        "run",
+        return_value=subprocess.CompletedProcess([], 0, "Android Debug Bridge", ""),
+    ) as run:
+        assert adb_controller.check_adb_available()
+
+    assert run.call_args.args[0] == ["adb", "version"]
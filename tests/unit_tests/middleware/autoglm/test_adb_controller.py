@@ -0,0 +1,352 @@
+"""Unit tests for the ADB controller."""
+
+import base64
+import io
+import os
+import shlex
+import struct
+import subprocess
+import sys
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm import adb_client, adb_controller
+
+
+@pytest.fixture(autouse=True)
+def _no_adb_server() -> Iterator[None]:
+    """Exercise the adb binary path even if an ADB server is running."""
+    with patch.object(
+        adb_client, "_Connection", side_effect=adb_client.AdbError("unreachable")
+    ):
+        yield
+
+
+def _png_bytes(size: tuple[int, int], color: tuple[int, int, int]) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _completed(
+    stdout: bytes | str, returncode: int = 0, stderr: bytes = b""
+) -> subprocess.CompletedProcess:
+    return subprocess.CompletedProcess(
+        args=[], returncode=returncode, stdout=stdout, stderr=stderr
+    )
+
+
+class TestDecodeRawScreencap:
+    @pytest.mark.parametrize("header_words", [3, 4])
+    def test_rgba_with_legacy_and_modern_headers(self, header_words: int) -> None:
+        width, height = 3, 2
+        header = struct.pack("<III", width, height, 1)
+        if header_words == 4:
+            header += struct.pack("<I", 1)  # color space (Android 9+)
+        pixels = bytes([10, 20, 30, 255]) * (width * height)
+
+        img = adb_controller.decode_raw_screencap(header + pixels)
+
+        assert img.size == (width, height)
+        assert img.getpixel((2, 1))[:3] == (10, 20, 30)
+
+    def test_rgb565(self) -> None:
+        header = struct.pack("<III", 1, 1, 4)
+        img = adb_controller.decode_raw_screencap(header + b"\x00\xf8")
+        assert img.getpixel((0, 0)) == (255, 0, 0)
+
+    def test_rgbx_is_saved_as_rgb(self) -> None:
+        header = struct.pack("<III", 2, 2, 2)
+        pixels = bytes([200, 150, 100, 0]) * 4
+
+        shot = adb_controller.screenshot_from_screencap(
+            0, header + pixels, b"", raw=True
+        )
+
+        assert (shot.width, shot.height) == (2, 2)
+        assert not shot.is_sensitive
+        png = Image.open(io.BytesIO(base64.b64decode(shot.base64_data)))
+        assert png.mode == "RGB"
+        assert png.getpixel((1, 1)) == (200, 150, 100)
+
+    def test_truncated_buffer_raises(self) -> None:
+        header = struct.pack("<III", 10, 10, 1)
+        with pytest.raises(ValueError, match="truncated"):
+            adb_controller.decode_raw_screencap(header + b"\x00" * 16)
+
+    def test_unknown_format_raises(self) -> None:
+        with pytest.raises(ValueError, match="pixel format"):
+            adb_controller.decode_raw_screencap(struct.pack("<III", 1, 1, 99))
+
+
+class TestTakeScreenshot:
+    def test_png_is_streamed_without_reencoding(self) -> None:
+        png = _png_bytes((40, 80), (200, 200, 200))
+        with patch.object(
+            adb_controller.subprocess, "run", return_value=_completed(png)
+        ) as run:
+            shot = adb_controller.take_screenshot("serial")
+
+        assert run.call_args.args[0] == [
+            "adb",
+            "-s",
+            "serial",
+            "exec-out",
+            "screencap",
+            "-p",
+        ]
+        assert base64.b64decode(shot.base64_data) == png
+        assert (shot.width, shot.height) == (40, 80)
+        assert not shot.is_sensitive
+        assert shot.image is not None
+
+    def test_preamble_before_png_is_ignored(self) -> None:
+        png = _png_bytes((4, 4), (255, 255, 255))
+        with patch.object(
+            adb_controller.subprocess,
+            "run",
+            return_value=_completed(b"WARNING: linker\n" + png),
+        ):
+            shot = adb_controller.take_screenshot()
+        assert base64.b64decode(shot.base64_data) == png
+
+    def test_raw_capture(self) -> None:
+        data = struct.pack("<IIII", 2, 2, 1, 0) + bytes([255, 255, 255, 255]) * 4
+        with patch.object(
+            adb_controller.subprocess, "run", return_value=_completed(data)
+        ) as run:
+            shot = adb_controller.take_screenshot(raw=True)
+
+        assert "-p" not in run.call_args.args[0]
+        assert (shot.width, shot.height) == (2, 2)
+        decoded = Image.open(io.BytesIO(base64.b64decode(shot.base64_data)))
+        assert decoded.size == (2, 2)
+
+    def test_failed_capture_is_treated_as_sensitive(self) -> None:
+        with patch.object(
+            adb_controller.subprocess,
+            "run",
+            return_value=_completed(b"", returncode=1, stderr=b"Status: -1"),
+        ):
+            shot = adb_controller.take_screenshot()
+        assert shot.is_sensitive
+
+
+class TestBlackScreenDetection:
+    @staticmethod
+    def _page(background: int, size: tuple[int, int] = (1080, 2400)) -> Image.Image:
+        return Image.new("RGB", size, (background,) * 3)
+
+    def test_black_page_with_lit_status_bar(self) -> None:
+        img = self._page(0)
+        img.paste((255, 255, 255), (0, 0, 1080, 100))  # status bar
+        img.paste((255, 255, 255), (0, 2300, 1080, 2400))  # navigation bar
+        assert adb_controller._is_black_or_nearly_black_screen(img)
+
+    def test_dark_page_with_visible_content(self) -> None:
+        img = self._page(10)
+        img.paste((240, 240, 240), (100, 1000, 500, 1400))  # a lit card
+        assert not adb_controller._is_black_or_nearly_black_screen(img)
+
+    def test_regular_page(self) -> None:
+        assert not adb_controller._is_black_or_nearly_black_screen(self._page(200))
+
+    def test_tiny_and_grayscale_images(self) -> None:
+        assert adb_controller._is_black_or_nearly_black_screen(Image.new("L", (3, 3)))
+        assert not adb_controller._is_black_or_nearly_black_screen(
+            Image.new("RGBA", (2, 5), (255, 255, 255, 255))
+        )
+
+
+class TestGetCurrentApp:
+    def test_focus_lines_are_filtered_on_device(self) -> None:
+        focus = (
+            "  mCurrentFocus=Window{1f2e u0 com.tencent.mm/"
+            "com.tencent.mm.ui.LauncherUI}\n"
+            "  mFocusedApp=ActivityRecord{9a8b u0 com.tencent.mm/.ui.LauncherUI t42}\n"
+        )
+        with patch.object(
+            adb_controller, "_run_shell", return_value=_completed(focus)
+        ) as run:
+            assert adb_controller.get_current_app() == "微信"
+
+        run.assert_called_once()
+        assert "grep" in run.call_args.args[0]
+
+    def test_falls_back_to_full_dump(self) -> None:
+        full = "WINDOW MANAGER\n  mCurrentFocus=Window{1 u0 org.example/.Main}\n"
+        with patch.object(
+            adb_controller,
+            "_run_shell",
+            side_effect=[_completed(""), _completed(full)],
+        ):
+            assert adb_controller.get_current_app() == "org.example"
+
+    def test_no_focused_window_is_home(self) -> None:
+        with patch.object(
+            adb_controller,
+            "_run_shell",
+            side_effect=[_completed(""), _completed("  mCurrentFocus=null\n")],
+        ):
+            assert adb_controller.get_current_app() == "System Home"
+
+
+ACK = (
+    "Broadcasting: Intent { act=ADB_INPUT_B64 flg=0x400000 }\n"
+    "Broadcast completed: result=0\n"
+)
+
+
+def _typed(call: object) -> str:
+    words = shlex.split(call.args[0].partition(" then ")[2])
+    return base64.b64decode(words[words.index("msg") + 1].rstrip(";")).decode()
+
+
+def _device_shell(tmp_path: Path, ime: str) -> Callable[..., object]:
+    """Run commands in a local shell with fake `settings` and `am` tools."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in {
+        "settings": f"echo {ime}",
+        "am": "echo 'Broadcast completed: result=0'",
+    }.items():
+        tool = bin_dir / name
+        tool.write_text(f"#!/bin/sh\n{script}\n")
+        tool.chmod(0o755)
+    env = {**os.environ, "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}"}
+
+    def run(command: str, *_: object, **__: object) -> object:
+        return subprocess.run(
+            ["/bin/sh", "-c", command],
+            capture_output=True,
+            text=True,
+            env=env,
+            check=False,
+        )
+
+    return run
+
+
+class TestTypeText:
+    def test_long_text_is_sent_in_one_broadcast(self) -> None:
+        text = "长文本 " * 1000
+        shell = object()
+        with (
+            patch.object(
+                adb_controller, "_run_shell", return_value=_completed(ACK)
+            ) as run,
+            patch.object(adb_controller.time, "sleep") as sleep,
+        ):
+            adb_controller.type_text(text, shell=shell)
+
+        run.assert_called_once()
+        assert _typed(run.call_args) == text
+        assert run.call_args.args[2] is shell
+        sleep.assert_not_called()
+
+    def test_large_payload_is_pushed_without_a_session(self) -> None:
+        text = "x" * 5000
+        with (
+            patch.object(
+                adb_controller.subprocess, "run", return_value=_completed("")
+            ) as push,
+            patch.object(
+                adb_controller, "_run_shell", return_value=_completed(ACK)
+            ) as run,
+        ):
+            adb_controller.type_text(text, device_id="emulator-5554")
+
+        assert push.call_args.args[0][:3] == ["adb", "-s", "emulator-5554"]
+        assert base64.b64decode(push.call_args.kwargs["input"]).decode() == text
+        assert "$(cat " in run.call_args.args[0]
+
+    def test_unacknowledged_broadcast_falls_back_to_chunks(self) -> None:
+        text = "a" * 700
+        responses = [_completed("", returncode=1)] + [_completed(ACK)] * 3
+        with (
+            patch.object(adb_controller, "_run_shell", side_effect=responses) as run,
+            patch.object(adb_controller.time, "sleep") as sleep,
+        ):
+            adb_controller.type_text(text, shell=object())
+
+        chunks = [_typed(call) for call in run.call_args_list[1:]]
+        assert chunks == ["a" * 300, "a" * 300, "a" * 100]
+        sleep.assert_not_called()
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a POSIX shell")
+    def test_broadcast_requires_adb_keyboard_to_be_active(self, tmp_path: Path) -> None:
+        device = _device_shell(
+            tmp_path, "com.google.android.inputmethod.latin/.LatinIME"
+        )
+        with (
+            patch.object(adb_controller, "_run_shell", side_effect=device) as run,
+            patch.object(adb_controller.time, "sleep"),
+            pytest.raises(RuntimeError, match=r"chunks \[1\]"),
+        ):
+            adb_controller.type_text("hello", shell=object())
+
+        # The bulk broadcast and every chunk retry are refused
+        assert run.call_count == 1 + adb_controller._INPUT_CHUNK_RETRIES
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a POSIX shell")
+    def test_broadcast_is_delivered_with_adb_keyboard_active(
+        self, tmp_path: Path
+    ) -> None:
+        device = _device_shell(tmp_path, adb_controller.ADB_KEYBOARD_IME)
+        with patch.object(adb_controller, "_run_shell", side_effect=device) as run:
+            adb_controller.type_text("hello", shell=object())
+
+        run.assert_called_once()
+        assert _typed(run.call_args) == "hello"
+
+    def test_chunk_failing_every_retry_raises(self) -> None:
+        with (
+            patch.object(
+                adb_controller, "_run_shell", return_value=_completed("Error")
+            ),
+            patch.object(adb_controller.time, "sleep"),
+            pytest.raises(RuntimeError, match=r"chunks \[1\]"),
+        ):
+            adb_controller.type_text("hello", shell=object())
+
+
+class TestCheckAdbKeyboard:
+    def test_answer_is_cached_per_device(self) -> None:
+        responses = {
+            "pm": _completed("package:com.android.adbkeyboard\n"),
+            "ime": _completed(adb_controller.ADB_KEYBOARD_IME + "\n"),
+        }
+        with (
+            patch.dict(adb_controller._adb_keyboard_available, clear=True),
+            patch.object(
+                adb_controller,
+                "_run_shell",
+                side_effect=lambda args, *_, **__: responses[args[0]],
+            ) as run,
+        ):
+            assert adb_controller.check_adb_keyboard("emulator-5554")
+            assert adb_controller.check_adb_keyboard("emulator-5554")
+            assert run.call_count == 2
+
+            responses["ime"] = _completed("")
+            assert not adb_controller.check_adb_keyboard("emulator-5556")
+            assert not adb_controller.check_adb_keyboard("emulator-5554", refresh=True)
+            assert run.call_count == 6
+
+    def test_unreachable_device_is_not_cached(self) -> None:
+        with (
+            patch.dict(adb_controller._adb_keyboard_available, clear=True),
+            patch.object(
+                adb_controller,
+                "_run_shell",
+                side_effect=[subprocess.TimeoutExpired("adb", 5)]
+                + [_completed("package:com.android.adbkeyboard\n")]
+                + [_completed(adb_controller.ADB_KEYBOARD_IME)],
+            ),
+        ):
+            assert not adb_controller.check_adb_keyboard()
+            assert adb_controller.check_adb_keyboard()
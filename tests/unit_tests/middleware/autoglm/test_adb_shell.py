@@ -0,0 +1,111 @@
+"""Unit tests for the persistent adb shell session pool."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from deepagents_cli.middleware.autoglm.adb_shell import (
+    AdbShellError,
+    AdbShellPool,
+    AdbShellSession,
+)
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="fake adb relies on a POSIX shell"
+)
+
+
+@pytest.fixture
+def fake_adb(tmp_path: Path) -> str:
+    """Create an `adb` stand-in that ignores its arguments and runs a local shell."""
+    script = tmp_path / "adb"
+    script.write_text("#!/bin/sh\nexec /bin/sh\n")
+    script.chmod(0o755)
+    return str(script)
+
+
+class TestAdbShellSession:
+    def test_run_returns_output_and_exit_code(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            result = session.run(["echo", "hello world"])
+            assert result.returncode == 0
+            assert result.stdout == "hello world\n"
+
+            result = session.run("exit_code() { return 3; }; exit_code")
+            assert result.returncode == 3
+        finally:
+            session.close()
+
+    def test_output_without_trailing_newline_is_preserved(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            assert session.run(["printf", "abc"]).stdout == "abc"
+        finally:
+            session.close()
+
+    def test_arguments_are_quoted(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            result = session.run(["echo", "a;b", "$HOME"])
+            assert result.stdout == "a;b $HOME\n"
+        finally:
+            session.close()
+
+    def test_redirects_cover_pipelines_and_lists(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            # The first command would read the next request if stdin leaked
+            result = session.run("cat; echo err >&2 | cat; echo done")
+            assert result.stdout == "err\ndone\n"
+            assert session.run("echo next").stdout == "next\n"
+        finally:
+            session.close()
+
+    def test_reuses_single_process(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            first = session.run("echo $$").stdout
+            second = session.run("echo $$").stdout
+            assert first == second
+        finally:
+            session.close()
+
+    def test_reconnects_after_process_dies(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            first_pid = session.run("echo $$").stdout
+            session._process.kill()
+            session._process.wait()
+            assert not session.is_alive()
+            assert session.run("echo $$").stdout != first_pid
+            assert session.ping()
+        finally:
+            session.close()
+
+    def test_timeout_resets_session(self, fake_adb: str) -> None:
+        session = AdbShellSession(adb_path=fake_adb)
+        try:
+            with pytest.raises(subprocess.TimeoutExpired):
+                session.run(["sleep", "5"], timeout=0.2)
+            assert not session.is_alive()
+            assert session.run(["echo", "ok"]).stdout == "ok\n"
+        finally:
+            session.close()
+
+    def test_missing_adb_raises(self, tmp_path: Path) -> None:
+        session = AdbShellSession(adb_path=str(tmp_path / "missing-adb"))
+        with pytest.raises(AdbShellError):
+            session.run(["echo", "hi"])
+
+
+class TestAdbShellPool:
+    def test_one_session_per_device(self, fake_adb: str) -> None:
+        pool = AdbShellPool(adb_path=fake_adb)
+        try:
+            assert pool.get("a") is pool.get("a")
+            assert pool.get("a") is not pool.get("b")
+        finally:
+            pool.close_all()
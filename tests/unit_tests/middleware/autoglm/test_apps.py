@@ -0,0 +1,89 @@
+"""Unit tests for app name lookups."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from deepagents_cli.middleware.autoglm import apps
+
+
+@pytest.mark.parametrize(
+    ("query", "package"),
+    [
+        ("微信", "com.tencent.mm"),
+        ("chrome", "com.android.chrome"),
+        ("google maps", "com.google.android.apps.maps"),
+        ("Google-Maps", "com.google.android.apps.maps"),
+        ("小红书app", "com.xingin.xhs"),
+        ("Setings", "com.android.settings"),
+        ("settings page", "com.android.settings"),
+    ],
+)
+def test_find_package_name(query: str, package: str) -> None:
+    assert apps.find_package_name(query) == package
+
+
+@pytest.mark.parametrize("query", ["Notes app", "qwertyuiop", "", "   "])
+def test_find_package_name_rejects_weak_matches(query: str) -> None:
+    assert apps.find_package_name(query) is None
+
+
+@pytest.mark.parametrize(
+    ("query", "main_app"),
+    [("微信读书", "微信"), ("抖音火山版", "抖音"), ("抖音极速版", "抖音")],
+)
+def test_sister_apps_do_not_match_the_main_app(query: str, main_app: str) -> None:
+    assert apps.find_package_name(query) is None
+    assert apps.find_bundle_id(query) != apps.find_bundle_id(main_app)
+
+
+def test_index_without_fuzzy() -> None:
+    index = apps.AppIndex({"Chrome": "com.android.chrome"})
+    assert index.find("CHROME", fuzzy=False) == "com.android.chrome"
+    assert index.find("chrome browser", fuzzy=False) is None
+    assert index.find("chrome browser") == "com.android.chrome"
+
+
+def test_reverse_lookup_keeps_first_name() -> None:
+    assert apps.get_app_name("com.tencent.mm") == "微信"
+    assert apps.get_app_name("com.unknown.package") is None
+    assert apps.get_ios_app_name("com.apple.Preferences") == "设置"
+
+
+def test_later_updates_override_names_but_not_display_name() -> None:
+    index = apps.AppIndex({"Mail": "com.example.mail"})
+    index.update({"mail": "org.other.mail", "Inbox": "com.example.mail"})
+
+    assert index.find("Mail") == "com.example.mail"
+    assert index.find("MAIL") == "org.other.mail"
+    assert index.name_for("com.example.mail") == "Mail"
+
+
+def test_load_app_registry(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(apps, "APP_PACKAGES", dict(apps.APP_PACKAGES))
+    monkeypatch.setattr(apps, "APP_PACKAGES_IOS", dict(apps.APP_PACKAGES_IOS))
+    monkeypatch.setattr(apps, "_ANDROID_INDEX", apps.AppIndex(apps.APP_PACKAGES))
+    monkeypatch.setattr(apps, "_IOS_INDEX", apps.AppIndex(apps.APP_PACKAGES_IOS))
+
+    yaml_file = tmp_path / "apps.yaml"
+    yaml_file.write_text(
+        "android:\n"
+        "  公司内网: com.example.intranet\n"
+        "ios:\n"
+        "  公司内网: com.example.Intranet\n",
+        encoding="utf-8",
+    )
+    assert apps.load_app_registry(yaml_file) == 2
+    assert apps.find_package_name("公司内网app") == "com.example.intranet"
+    assert apps.find_bundle_id("公司内网") == "com.example.Intranet"
+    assert "公司内网" in apps.list_supported_apps()
+
+    json_file = tmp_path / "apps.json"
+    json_file.write_text(json.dumps({"windows": {"a": "b"}}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Unknown platform"):
+        apps.load_app_registry(json_file)
+
+    json_file.write_text(json.dumps({"android": ["not", "a", "table"]}))
+    with pytest.raises(ValueError, match="must map app names"):
+        apps.load_app_registry(json_file)
@@ -0,0 +1,171 @@
+"""Unit tests for the async platform controllers and the blocking adapter."""
+
+import asyncio
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import numpy as np
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm import async_platform, platform
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.async_platform import SyncPlatformController
+from deepagents_cli.middleware.autoglm.platform import PlatformConfig
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+SLOW_TAP = 10.0
+
+
+class SlowAsyncController:
+    """Async controller whose taps hang until cancelled."""
+
+    def __init__(self, on_tap: Callable[[], None] = lambda: None) -> None:
+        self.on_tap = on_tap
+        self.threads: set[str] = set()
+        self.tap_cancelled = threading.Event()
+        self.closed = False
+
+    async def take_screenshot(self) -> Screenshot:
+        self.threads.add(threading.current_thread().name)
+        return Screenshot(
+            base64_data="iVBORw0KGgo=",
+            width=1000,
+            height=2000,
+            image=Image.new("RGB", (1000, 2000), "white"),
+        )
+
+    async def get_current_app(self) -> str:
+        return "Settings"
+
+    async def tap(self, x: int, y: int) -> None:  # noqa: ARG002
+        self.on_tap()
+        try:
+            await asyncio.sleep(SLOW_TAP)
+        except asyncio.CancelledError:
+            self.tap_cancelled.set()
+            raise
+
+    async def capture_frame(self) -> np.ndarray:
+        return np.zeros((16, 8), dtype=np.uint8)
+
+    async def aclose(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def adapter() -> Iterator[tuple[SyncPlatformController, SlowAsyncController]]:
+    controller = SlowAsyncController()
+    sync_controller = SyncPlatformController(controller)
+    yield sync_controller, controller
+    sync_controller.close()
+
+
+def test_blocking_calls_run_on_the_device_loop(
+    adapter: tuple[SyncPlatformController, SlowAsyncController],
+) -> None:
+    sync_controller, controller = adapter
+
+    assert sync_controller.get_current_app() == "Settings"
+    assert sync_controller.take_screenshot().width == 1000
+    assert controller.threads == {"autoglm-device-io"}
+
+
+async def test_cancelling_aio_call_cancels_device_coroutine(
+    adapter: tuple[SyncPlatformController, SlowAsyncController],
+) -> None:
+    sync_controller, controller = adapter
+
+    task = asyncio.create_task(sync_controller.aio.tap(1, 1))
+    await asyncio.sleep(0.1)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await asyncio.to_thread(controller.tap_cancelled.wait, 1.0)
+
+
+def test_create_controller_wraps_the_async_controller(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    controller = SlowAsyncController()
+    monkeypatch.setattr(
+        async_platform, "create_async_controller", lambda *_args: controller
+    )
+
+    sync_controller = platform.create_controller(PlatformConfig(platform="android"))
+    try:
+        assert sync_controller.get_current_app() == "Settings"
+    finally:
+        sync_controller.close()
+    assert controller.closed
+
+
+def test_close_releases_controller_and_stops_loop() -> None:
+    controller = SlowAsyncController()
+    sync_controller = SyncPlatformController(controller)
+
+    sync_controller.close()
+    sync_controller.close()
+
+    assert controller.closed
+    assert not sync_controller._thread.is_alive()
+
+
+async def test_run_host_kills_command_on_timeout() -> None:
+    start = time.perf_counter()
+    with pytest.raises(TimeoutError):
+        await async_platform._run_host(
+            [sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2
+        )
+    assert time.perf_counter() - start < 2
+
+
+async def test_interrupt_cancels_action_in_flight(tmp_path: Path) -> None:
+    model = FakeMessagesListChatModel(
+        responses=[AIMessage(content='Tap\ndo(action="Tap", element=[500, 500])')]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(vision_model=model, screenshot_dir=str(tmp_path))
+    )
+    loop = asyncio.get_running_loop()
+    controller = SlowAsyncController(
+        on_tap=lambda: loop.call_soon_threadsafe(
+            loop.call_later, 0.1, middleware._interrupt_flag.set
+        )
+    )
+    middleware.controller = SyncPlatformController(controller)
+
+    start = time.perf_counter()
+    try:
+        result = await middleware._execute_phone_task_async("tap it", "call-1")
+    finally:
+        middleware.controller.close()
+    elapsed = time.perf_counter() - start
+
+    assert result.status == "error"
+    assert controller.tap_cancelled.is_set()
+    # The handler waits 300ms for a second Ctrl+C; the tap would take 10s
+    assert elapsed < 2
+
+
+async def test_interrupt_event_wakes_waiting_coroutine() -> None:
+    event = async_platform.InterruptEvent()
+    threading.Timer(0.05, event.set).start()
+
+    start = time.perf_counter()
+    await asyncio.wait_for(event.wait_async(), timeout=2)
+
+    assert event.is_set()
+    assert time.perf_counter() - start < 0.5
+    assert not event._waiters
+    # Already set: returns at once
+    await asyncio.wait_for(event.wait_async(), timeout=0.1)
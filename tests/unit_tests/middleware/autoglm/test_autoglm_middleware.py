@@ -0,0 +1,408 @@
+"""Unit tests for the phone_task step loop."""
+
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatResult
+from PIL import Image
+from pydantic import Field
+
+from deepagents_cli.middleware.autoglm import adb_controller, timing
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+DEVICE_DELAY = 0.2
+
+
+class FakeController:
+    """Platform controller that simulates slow device I/O."""
+
+    def __init__(self) -> None:
+        self.threads: set[str] = set()
+        self.taps: list[tuple[int, int]] = []
+        self.swipes: list[tuple[int, int, int, int]] = []
+        self.typed: list[str] = []
+        self.color = "white"
+
+    def _io(self) -> None:
+        self.threads.add(threading.current_thread().name)
+        time.sleep(DEVICE_DELAY)
+
+    def take_screenshot(self) -> Screenshot:
+        self._io()
+        return Screenshot(
+            base64_data="iVBORw0KGgo=",
+            width=1000,
+            height=2000,
+            image=Image.new("RGB", (1000, 2000), self.color),
+        )
+
+    def capture_frame(self) -> np.ndarray:
+        return adb_controller.sample_luma(Image.new("RGB", (1000, 2000), self.color))
+
+    def get_current_app(self) -> str:
+        self._io()
+        return "Settings"
+
+    def tap(self, x: int, y: int) -> None:
+        self.threads.add(threading.current_thread().name)
+        self.taps.append((x, y))
+
+    def swipe(
+        self,
+        start_x: int,
+        start_y: int,
+        end_x: int,
+        end_y: int,
+        duration: float | None = None,  # noqa: ARG002
+    ) -> None:
+        self.swipes.append((start_x, start_y, end_x, end_y))
+
+    def type_text(self, text: str) -> None:
+        self.typed.append(text)
+
+
+class RecordingChatModel(FakeMessagesListChatModel):
+    """Fake chat model that keeps the messages of every call."""
+
+    received: list[list[BaseMessage]] = Field(default_factory=list)
+
+    def _generate(
+        self, messages: list[BaseMessage], *args: Any, **kwargs: Any
+    ) -> ChatResult:
+        self.received.append(messages)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def _middleware(
+    tmp_path: Path, *responses: str
+) -> tuple[AutoGLMMiddleware, FakeController]:
+    model = FakeMessagesListChatModel(
+        responses=[AIMessage(content=text) for text in responses]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(vision_model=model, screenshot_dir=str(tmp_path))
+    )
+    controller = FakeController()
+    middleware.controller = controller
+    return middleware, controller
+
+
+async def test_capture_and_app_lookup_overlap(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path)
+
+    start = time.perf_counter()
+    screenshot, current_app = await middleware._capture_screen()
+    elapsed = time.perf_counter() - start
+
+    assert current_app == "Settings"
+    assert screenshot.width == 1000
+    assert elapsed < 2 * DEVICE_DELAY
+    assert threading.main_thread().name not in controller.threads
+
+
+async def test_step_loop_runs_actions_and_saves_screenshots(tmp_path: Path) -> None:
+    middleware, controller = _middleware(
+        tmp_path,
+        'Tap the wifi entry\ndo(action="Tap", element=[500, 500])',
+        'Done\nfinish(message="ok")',
+    )
+
+    result = await middleware._execute_phone_task_async("open settings", "call-1")
+    middleware._screenshot_writer.shutdown(wait=True)
+
+    assert result.status == "success"
+    assert controller.taps == [(500, 1000)]
+    saved = sorted(p.name for p in tmp_path.iterdir())  # noqa: ASYNC240
+    assert saved == [
+        "step_001.png",
+        "step_002.png",
+    ]
+
+
+def test_current_app_is_cached_until_an_action_runs(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path)
+    calls = []
+    controller.get_current_app = lambda: calls.append(1) or "Settings"
+
+    assert middleware._get_current_app() == "Settings"
+    assert middleware._get_current_app() == "Settings"
+    assert len(calls) == 1
+
+    middleware._execute_action({"action": "Tap", "element": [1, 1]}, 1000, 2000)
+    middleware._get_current_app()
+    assert len(calls) == 2
+
+
+def test_adaptive_settle_returns_once_screen_is_stable(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path)
+    middleware.config.settle_strategy = "adaptive"
+    controller.capture_frame = lambda: np.zeros((16, 8), dtype=np.uint8)
+
+    start = time.perf_counter()
+    middleware._settle_after_action("Tap")
+    assert time.perf_counter() - start < 0.5
+
+
+def test_adaptive_settle_falls_back_to_fixed_delay(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path)
+    middleware.config.settle_strategy = "adaptive"
+
+    def capture_frame() -> np.ndarray:
+        raise RuntimeError
+
+    controller.capture_frame = capture_frame
+
+    start = time.perf_counter()
+    middleware._settle(0.3)
+    assert time.perf_counter() - start >= 0.3
+
+
+async def test_unchanged_screen_reuses_previous_swipe(tmp_path: Path) -> None:
+    middleware, controller = _middleware(
+        tmp_path,
+        'Scroll down\ndo(action="Swipe", start=[500, 800], end=[500, 200])',
+        'Done\nfinish(message="ok")',
+    )
+    middleware.config.unchanged_screen_policy = "reuse"
+
+    result = await middleware._execute_phone_task_async("scroll", "call-1")
+
+    assert result.status == "success"
+    assert len(controller.swipes) == 3
+    assert result.artifact["model_calls"] == 2
+    assert result.artifact["model_calls_avoided"] == 2
+    assert result.artifact["unchanged_frames"] == 3
+
+
+async def test_unchanged_screen_sends_text_only_turn(tmp_path: Path) -> None:
+    middleware, _ = _middleware(
+        tmp_path,
+        'Tap\ndo(action="Tap", element=[500, 500])',
+        'Done\nfinish(message="ok")',
+    )
+    middleware.config.unchanged_screen_policy = "text"
+    model = RecordingChatModel(responses=middleware.config.vision_model.responses)
+    middleware.config.vision_model = model
+
+    result = await middleware._execute_phone_task_async("tap", "call-1")
+
+    assert result.status == "success"
+    sent = [messages[-1].content for messages in model.received]
+    assert [item["type"] for item in sent[0]] == ["image_url", "text"]
+    assert [item["type"] for item in sent[1]] == ["text"]
+    assert result.artifact["text_only_turns"] == 1
+
+
+async def test_policy_off_reports_stats_without_hashing(tmp_path: Path) -> None:
+    middleware, _ = _middleware(tmp_path, 'Done\nfinish(message="ok")')
+
+    result = await middleware._execute_phone_task_async("noop", "call-1")
+
+    assert result.artifact["steps"] == 1
+    assert result.artifact["model_calls"] == 1
+    assert result.artifact["unchanged_frames"] == 0
+
+
+async def test_keyboard_is_switched_once_per_task(tmp_path: Path) -> None:
+    middleware, controller = _middleware(
+        tmp_path,
+        'Type\ndo(action="Type", text="user")',
+        'Tap\ndo(action="Tap", element=[500, 500])',
+        'Type\ndo(action="Type", text="secret")',
+        'Done\nfinish(message="ok")',
+    )
+    middleware._settle_after_action = lambda _action: None
+    gboard = "com.google.android.inputmethod.latin/.LatinIME"
+
+    with (
+        patch.object(adb_controller, "set_adb_keyboard", return_value=gboard) as switch,
+        patch.object(adb_controller, "wait_for_ime", return_value=True) as wait,
+        patch.object(adb_controller, "clear_text") as clear,
+        patch.object(adb_controller, "restore_keyboard") as restore,
+        patch.object(time, "sleep"),
+    ):
+        result = await middleware._execute_phone_task_async("log in", "call-1")
+
+    assert result.status == "success"
+    assert controller.typed == ["user", "secret"]
+    switch.assert_called_once()
+    wait.assert_called_once()
+    assert clear.call_count == 2
+    restore.assert_called_once_with(gboard, None, shell=None)
+    assert middleware._original_ime is None
+
+
+async def test_keyboard_is_restored_for_sensitive_pages(tmp_path: Path) -> None:
+    middleware, controller = _middleware(
+        tmp_path,
+        'Type\ndo(action="Type", text="user")',
+        'Type\ndo(action="Type", text="code")',
+        'Done\nfinish(message="ok")',
+    )
+    middleware._settle_after_action = lambda _action: None
+    take_screenshot = controller.take_screenshot
+    screenshots = iter([False, True])
+
+    def screenshot() -> Screenshot:
+        shot = take_screenshot()
+        shot.is_sensitive = next(screenshots, False)
+        return shot
+
+    controller.take_screenshot = screenshot
+    events = []
+    gboard = "com.google.android.inputmethod.latin/.LatinIME"
+
+    with (
+        patch.object(
+            adb_controller,
+            "set_adb_keyboard",
+            side_effect=lambda *_, **__: events.append("switch") or gboard,
+        ),
+        patch.object(adb_controller, "wait_for_ime", return_value=True),
+        patch.object(adb_controller, "clear_text"),
+        patch.object(
+            adb_controller,
+            "restore_keyboard",
+            side_effect=lambda *_, **__: events.append("restore"),
+        ),
+        patch(
+            "builtins.input", side_effect=lambda _prompt: events.append("prompt") or ""
+        ),
+        patch.object(time, "sleep"),
+    ):
+        result = await middleware._execute_phone_task_async("log in", "call-1")
+
+    assert result.status == "success"
+    assert controller.typed == ["user", "code"]
+    assert events == ["switch", "restore", "prompt", "switch", "restore"]
+
+
+BATCH = """Fill in the form
+do(action="Tap", element=[500, 200])
+do(action="Tap", element=[500, 400])
+do(action="Swipe", start=[500, 800], end=[500, 200])
+finish(message="too early")"""
+
+
+async def test_batched_actions_run_without_model_calls(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path, BATCH, 'Done\nfinish(message="ok")')
+    middleware.config.max_batch_actions = 5
+    middleware._settle_after_action = lambda _action: None
+
+    result = await middleware._execute_phone_task_async("fill form", "call-1")
+
+    assert result.status == "success"
+    assert "ok" in result.content
+    assert controller.taps == [(500, 400), (500, 800)]
+    assert len(controller.swipes) == 1
+    assert result.artifact["model_calls"] == 2
+    assert result.artifact["batched_actions"] == 2
+    assert result.artifact["model_calls_avoided"] == 2
+
+
+async def test_batch_stops_when_the_page_changes(tmp_path: Path) -> None:
+    middleware, controller = _middleware(tmp_path, BATCH, 'Done\nfinish(message="ok")')
+    middleware.config.max_batch_actions = 5
+    middleware._settle_after_action = lambda _action: None
+    model = RecordingChatModel(responses=middleware.config.vision_model.responses)
+    middleware.config.vision_model = model
+
+    def navigate(x: int, y: int) -> None:
+        controller.taps.append((x, y))
+        controller.color = "black"
+
+    controller.tap = navigate
+
+    result = await middleware._execute_phone_task_async("fill form", "call-1")
+
+    assert result.status == "success"
+    assert controller.taps == [(500, 400)]
+    assert controller.swipes == []
+    assert result.artifact["batch_aborts"] == 1
+    assert result.artifact["batched_actions"] == 0
+    assert "Only 1 of 4 actions" in str(model.received[1][-2].content)
+
+
+async def test_stage_timings_are_reported(tmp_path: Path) -> None:
+    sink = timing.MemorySink()
+    model = FakeMessagesListChatModel(
+        responses=[
+            AIMessage(content='Tap\ndo(action="Tap", element=[500, 500])'),
+            AIMessage(content='Done\nfinish(message="ok")'),
+        ]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(
+            vision_model=model,
+            screenshot_dir=str(tmp_path),
+            timing_log=str(tmp_path / "timings.jsonl"),
+            timing_sinks=[sink],
+        )
+    )
+    middleware.controller = FakeController()
+    middleware._settle_after_action = lambda _action: None
+
+    result = await middleware._execute_phone_task_async("tap", "call-1")
+
+    summary = result.artifact["timings"]
+    assert summary["capture"]["count"] == 2
+    assert summary["screenshot"]["p50"] >= DEVICE_DELAY
+    assert {"current_app", "encode", "model", "parse"} <= set(summary)
+    assert summary["action"]["count"] == 1
+    assert len(sink.durations("screenshot")) == 2
+    assert {span.step for span in sink.spans} == {1, 2}
+    logged = (tmp_path / "timings.jsonl").read_text().splitlines()
+    assert len(logged) == len(sink.spans)
+
+
+async def test_next_screen_is_prepared_while_the_step_is_recorded(
+    tmp_path: Path,
+) -> None:
+    sink = timing.MemorySink()
+    model = FakeMessagesListChatModel(
+        responses=[
+            AIMessage(content='Tap\ndo(action="Tap", element=[500, 500])'),
+            AIMessage(content='Done\nfinish(message="ok")'),
+        ]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(
+            vision_model=model,
+            screenshot_dir=str(tmp_path),
+            prefetch_screenshot=True,
+            timing_sinks=[sink],
+        )
+    )
+    middleware.controller = FakeController()
+    recorded = threading.Event()
+    overlapped = []
+
+    def settle(_action: str | None) -> None:
+        # Only returns True if the step is recorded while the screen settles
+        overlapped.append(recorded.wait(timeout=1))
+
+    def record_step(step: int, *_args: Any, **_kwargs: Any) -> None:
+        if step == 1:
+            recorded.set()
+
+    middleware._settle_after_action = settle
+    middleware._record_step = record_step
+
+    result = await middleware._execute_phone_task_async("tap", "call-1")
+
+    assert result.status == "success"
+    assert middleware.controller.taps == [(500, 1000)]
+    assert overlapped == [True]
+    # The prefetched screen is not encoded again for the model
+    assert [span.step for span in sink.spans if span.stage == "encode"] == [1, 2]
+    assert [span.step for span in sink.spans if span.stage == "settle"] == [2]
@@ -0,0 +1,212 @@
+"""Unit tests for the device pool and pooled phone_task execution."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.device_pool import (
+    DevicePool,
+    PooledDevice,
+    parse_device_labels,
+    parse_device_map,
+)
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+DEVICE_DELAY = 0.3
+
+
+def _pool(
+    *devices: PooledDevice, apps: dict[str, set[str]] | None = None
+) -> DevicePool:
+    apps = apps or {}
+    return DevicePool(devices, installed_apps=lambda d: apps.get(d.device_id))
+
+
+def test_checkout_routes_by_platform_label_and_app() -> None:
+    pool = _pool(
+        PooledDevice("a1", "android", frozenset({"rack-a"})),
+        PooledDevice("a2", "android", frozenset({"rack-b"})),
+        PooledDevice("i1", "ios"),
+        apps={"a1": {"com.android.settings"}, "a2": {"com.tencent.mm"}},
+    )
+
+    with pool.acquire(platform="ios") as lease:
+        assert lease.device.device_id == "i1"
+    with pool.acquire(labels=["rack-a"]) as lease:
+        assert lease.device.device_id == "a1"
+    with pool.acquire(platform="android", app="微信") as lease:
+        assert lease.device.device_id == "a2"
+
+    with pytest.raises(RuntimeError, match="labels=rack-c"):
+        pool.checkout(labels=["rack-c"])
+    with pytest.raises(ValueError, match="Unknown platform"):
+        pool.checkout(platform="symbian")
+
+
+def test_busy_device_makes_next_task_wait() -> None:
+    pool = _pool(PooledDevice("a1", "android"))
+    first = pool.checkout()
+    threading.Timer(0.2, pool.release, [first.device]).start()
+
+    second = pool.checkout(timeout=2)
+    pool.release(second.device)
+
+    assert second.device is first.device
+    assert second.queue_wait >= 0.15
+    stats = pool.stats()
+    assert stats["tasks"] == 2
+    assert stats["queue_wait_max"] >= 0.15
+    assert stats["devices"]["a1"]["tasks"] == 2
+    assert stats["devices"]["a1"]["utilization"] > 0
+    assert "a1 (android, idle): 2 tasks" in pool.report()
+
+
+def test_free_devices_are_used_evenly() -> None:
+    pool = _pool(PooledDevice("a1", "android"), PooledDevice("a2", "android"))
+
+    leases = [pool.checkout(), pool.checkout()]
+
+    assert {lease.device.device_id for lease in leases} == {"a1", "a2"}
+    assert all(lease.queue_wait < 0.1 for lease in leases)
+
+
+def test_waiting_stops_on_timeout_and_interrupt() -> None:
+    pool = _pool(PooledDevice("a1", "android"))
+    pool.checkout()
+    interrupt = threading.Event()
+    threading.Timer(0.1, interrupt.set).start()
+
+    with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.1)
+    with pytest.raises(KeyboardInterrupt):
+        pool.checkout(interrupt=interrupt)
+    assert pool.stats()["waiting"] == 0
+
+
+def test_parse_device_settings() -> None:
+    assert parse_device_labels("emulator-5554=rack-a, pixel;10.0.0.2:5555=") == {
+        "emulator-5554": ["rack-a", "pixel"],
+        "10.0.0.2:5555": [],
+    }
+    assert parse_device_map("abc=http://localhost:8101/?a=b") == {
+        "abc": "http://localhost:8101/?a=b"
+    }
+    assert parse_device_map(None) == {}
+    with pytest.raises(ValueError, match="Invalid device entry"):
+        parse_device_map("rack-a")
+
+
+class FakeController:
+    """Blocking controller whose screenshots take DEVICE_DELAY seconds."""
+
+    def __init__(self, device_id: str) -> None:
+        self.device_id = device_id
+        self.closed = False
+
+    def take_screenshot(self) -> Screenshot:
+        time.sleep(DEVICE_DELAY)
+        return Screenshot(
+            base64_data="iVBORw0KGgo=",
+            width=1000,
+            height=2000,
+            image=Image.new("RGB", (1000, 2000), "white"),
+        )
+
+    def get_current_app(self) -> str:
+        return "Settings"
+
+    def close(self) -> None:
+        self.closed = True
+
+
+@pytest.fixture
+def controllers(monkeypatch: pytest.MonkeyPatch) -> dict[str, FakeController]:
+    """Fake controllers created for pooled tasks, by device ID."""
+    created: dict[str, FakeController] = {}
+
+    def create_controller(worker: AutoGLMMiddleware) -> FakeController:
+        device_id = worker.config.device_id or worker.config.ios_device_id
+        created[device_id] = FakeController(device_id)
+        return created[device_id]
+
+    monkeypatch.setattr(AutoGLMMiddleware, "_create_controller", create_controller)
+    return created
+
+
+def _pooled_middleware(tmp_path: Path, pool: DevicePool) -> AutoGLMMiddleware:
+    model = FakeMessagesListChatModel(
+        responses=[AIMessage(content='Done\nfinish(message="ok")')]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(
+            vision_model=model, screenshot_dir=str(tmp_path), device_pool=True
+        )
+    )
+    middleware.device_pool = pool
+    return middleware
+
+
+def _run_concurrently(
+    middleware: AutoGLMMiddleware, count: int, **requirements: object
+) -> list[ToolMessage]:
+    with ThreadPoolExecutor(count) as executor:
+        return list(
+            executor.map(
+                lambda i: middleware._execute_pooled_task(
+                    f"task {i}", f"call-{i}", **requirements
+                ),
+                range(count),
+            )
+        )
+
+
+def test_concurrent_tasks_run_on_separate_devices(
+    tmp_path: Path, controllers: dict[str, FakeController]
+) -> None:
+    pool = _pool(PooledDevice("a1", "android"), PooledDevice("i1", "ios"))
+    middleware = _pooled_middleware(tmp_path, pool)
+
+    start = time.perf_counter()
+    results = _run_concurrently(middleware, 2)
+    elapsed = time.perf_counter() - start
+
+    assert [result.status for result in results] == ["success", "success"]
+    assert {result.artifact["device_id"] for result in results} == {"a1", "i1"}
+    assert all(controller.closed for controller in controllers.values())
+    # The tasks captured their screens at the same time
+    assert elapsed < 2 * DEVICE_DELAY
+    # Each task saved its screenshots in its own directory
+    task_dirs = sorted(path.name.split("_")[0] for path in tmp_path.iterdir())
+    assert task_dirs == ["a1", "i1"]
+    assert not middleware._phone_task_active
+
+
+def test_tasks_queue_for_a_busy_device(
+    tmp_path: Path, controllers: dict[str, FakeController]
+) -> None:
+    pool = _pool(
+        PooledDevice("a1", "android", frozenset({"rack-a"})),
+        PooledDevice("a2", "android"),
+    )
+    middleware = _pooled_middleware(tmp_path, pool)
+
+    results = _run_concurrently(middleware, 2, labels=["rack-a"])
+    missing = middleware._execute_pooled_task("task", "call-3", platform="ios")
+
+    waits = sorted(result.artifact["queue_wait"] for result in results)
+    assert waits[0] < DEVICE_DELAY <= waits[1]
+    assert set(controllers) == {"a1"}
+    assert pool.stats()["devices"]["a1"]["tasks"] == 2
+    assert all("a1" in result.artifact["device_pool"]["devices"] for result in results)
+    assert missing.status == "error"
+    assert "No device in the pool matches platform=ios" in missing.content
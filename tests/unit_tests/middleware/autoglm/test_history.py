@@ -0,0 +1,105 @@
+"""Unit tests for the token-budgeted phone_task history."""
+
+from deepagents_cli.middleware.autoglm import history
+from deepagents_cli.middleware.autoglm.history import MessageHistory
+
+IMAGE = {"type": "image_url", "image_url": {"url": "data:image/png;base64,AAAA"}}
+
+
+def _screen(step: int) -> list[dict]:
+    return [IMAGE, {"type": "text", "text": f"** Screen Info ** step {step}"}]
+
+
+def _run(messages: MessageHistory, steps: int) -> None:
+    messages.add_user(_screen(0), pinned=True)
+    messages.strip_images()
+    messages.add_assistant("<think>t0</think><answer>a0</answer>", summary="a0")
+    for step in range(1, steps):
+        messages.add_user(_screen(step))
+        messages.strip_images()
+        messages.add_assistant(
+            f"<think>{'x' * 400}</think><answer>a{step}</answer>",
+            summary=f"a{step}",
+        )
+
+
+def test_estimate_text_tokens_counts_cjk_per_character() -> None:
+    assert history.estimate_text_tokens("abcdefgh") == 2
+    assert history.estimate_text_tokens("打开微信") == 4
+
+
+def test_estimate_message_tokens_counts_images() -> None:
+    tokens = history.estimate_message_tokens({"role": "user", "content": _screen(1)})
+    assert tokens > history.IMAGE_TOKEN_ESTIMATE
+
+
+def test_short_history_is_sent_verbatim() -> None:
+    messages = MessageHistory("system", keep_turns=8, max_tokens=None)
+    _run(messages, 3)
+
+    prompt = messages.messages()
+    assert [m["role"] for m in prompt] == [
+        "system",
+        "user",
+        "assistant",
+        "user",
+        "assistant",
+        "user",
+        "assistant",
+    ]
+    assert messages.folded_turns == 0
+
+
+def test_old_turns_are_folded_into_summary() -> None:
+    messages = MessageHistory("system", keep_turns=2, max_tokens=None, lang="en")
+    _run(messages, 6)
+
+    prompt = messages.messages()
+    assert prompt[0]["role"] == "system"
+    assert "step 0" in prompt[1]["content"][0]["text"]
+    summary = prompt[2]["content"]
+    assert summary.startswith("** Earlier Actions (Summary) **")
+    assert "a0" in summary
+    assert "a3" in summary
+    assert "a4" not in summary
+    # Two verbatim turns of user + assistant follow the summary
+    assert len(prompt) == 3 + 4
+    assert prompt[-1]["content"].endswith("<answer>a5</answer>")
+
+
+def test_token_budget_folds_until_prompt_fits() -> None:
+    messages = MessageHistory("system", keep_turns=None, max_tokens=500)
+    _run(messages, 20)
+
+    prompt = messages.messages()
+    assert history.estimate_tokens(prompt) <= 500
+    assert messages.folded_turns > 0
+    assert prompt[-1]["content"].endswith("<answer>a19</answer>")
+
+
+def test_latest_turn_is_never_folded() -> None:
+    messages = MessageHistory("system", keep_turns=None, max_tokens=1)
+    _run(messages, 3)
+    messages.add_user(_screen(3))
+
+    prompt = messages.messages()
+    assert prompt[-1]["content"] == _screen(3)
+
+
+def test_strip_images_keeps_text() -> None:
+    messages = MessageHistory("system")
+    messages.add_user(_screen(0), pinned=True)
+    messages.strip_images()
+
+    assert messages.messages()[1]["content"] == [
+        {"type": "text", "text": "** Screen Info ** step 0"}
+    ]
+
+
+def test_summary_is_capped() -> None:
+    messages = MessageHistory("system", keep_turns=1, max_tokens=None, lang="en")
+    _run(messages, history.MAX_SUMMARY_LINES + 10)
+
+    summary = messages.messages()[2]["content"]
+    assert "earlier steps omitted" in summary
+    assert len(summary.splitlines()) == history.MAX_SUMMARY_LINES + 2
@@ -0,0 +1,76 @@
+"""Unit tests for screenshot preparation for the vision model."""
+
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm import image_pipeline
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+
+
+def _screenshot(size: tuple[int, int] = (1080, 2400)) -> Screenshot:
+    img = Image.new("RGB", size, (30, 120, 200))
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return Screenshot(
+        base64_data=base64.b64encode(buffer.getvalue()).decode("utf-8"),
+        width=size[0],
+        height=size[1],
+        image=img,
+    )
+
+
+def _decode(encoded: image_pipeline.EncodedImage) -> Image.Image:
+    return Image.open(io.BytesIO(base64.b64decode(encoded.base64_data)))
+
+
+def test_png_without_resize_is_passed_through() -> None:
+    shot = _screenshot()
+    encoded = image_pipeline.prepare_for_model(shot, max_edge=4096)
+
+    assert encoded.base64_data == shot.base64_data
+    assert encoded.bytes_saved == 0
+    assert encoded.original_bytes == len(base64.b64decode(shot.base64_data))
+
+
+def test_downscale_keeps_aspect_ratio() -> None:
+    encoded = image_pipeline.prepare_for_model(_screenshot(), max_edge=1200)
+
+    assert (encoded.width, encoded.height) == (540, 1200)
+    assert _decode(encoded).size == (540, 1200)
+
+
+@pytest.mark.parametrize("image_format", ["jpeg", "webp"])
+def test_lossy_formats(image_format: str) -> None:
+    shot = _screenshot()
+    shot.image = None  # Force decoding from the base64 payload
+    encoded = image_pipeline.prepare_for_model(
+        shot, max_edge=1280, image_format=image_format, quality=70
+    )
+
+    assert _decode(encoded).format == image_format.upper()
+    assert encoded.to_message_content()["image_url"]["url"].startswith(
+        f"data:image/{image_format};base64,"
+    )
+    assert encoded.bytes_saved > 0
+
+
+def test_validate_format() -> None:
+    assert image_pipeline.validate_format("JPG") == "jpeg"
+    with pytest.raises(ValueError, match="Unsupported screenshot format"):
+        image_pipeline.validate_format("gif")
+
+
+def test_jpeg_frame_is_passed_through_for_jpeg_output() -> None:
+    shot = _screenshot((400, 800))
+    buffer = io.BytesIO()
+    shot.image.save(buffer, format="JPEG")
+    shot.base64_data = base64.b64encode(buffer.getvalue()).decode("utf-8")
+    shot.format = "jpeg"
+
+    assert image_pipeline.prepare_for_model(shot, image_format="jpg").base64_data == (
+        shot.base64_data
+    )
+    assert image_pipeline.prepare_for_model(shot).format == "png"
@@ -0,0 +1,143 @@
+"""Unit tests for iOS screenshot header parsing and the WDA MJPEG stream reader."""
+
+import base64
+import io
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from deepagents_cli.middleware.autoglm.ios import mjpeg, screenshot as ios_screenshot
+from deepagents_cli.middleware.autoglm.ios.mjpeg import (
+    MjpegStream,
+    iter_jpeg_frames,
+    jpeg_size,
+)
+
+
+def _encode(size: tuple[int, int], image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def test_png_size_reads_ihdr_only() -> None:
+    data = base64.b64encode(_encode((1179, 2556), "PNG")).decode()
+
+    assert ios_screenshot.png_size(data) == (1179, 2556)
+    # The rest of the payload is never decoded
+    assert ios_screenshot.png_size(data[:40] + "!!!") == (1179, 2556)
+    assert ios_screenshot.png_size(base64.b64encode(b"GIF89a" * 8).decode()) is None
+
+
+def test_screenshot_from_base64_handles_non_png() -> None:
+    data = base64.b64encode(_encode((30, 60), "JPEG")).decode()
+
+    shot = ios_screenshot.screenshot_from_base64(data)
+
+    assert (shot.width, shot.height) == (30, 60)
+
+
+def test_jpeg_size_reads_frame_header() -> None:
+    assert jpeg_size(_encode((375, 812), "JPEG")) == (375, 812)
+    assert jpeg_size(b"not a jpeg") is None
+
+
+def test_frames_are_split_across_chunks_and_boundaries() -> None:
+    first, second = _encode((10, 20), "JPEG"), _encode((30, 40), "JPEG")
+    body = (
+        b"--BoundaryString\r\nContent-type: image/jpg\r\n\r\n"
+        + first
+        + b"\r\n\r\n--BoundaryString\r\nContent-type: image/jpg\r\n\r\n"
+        + second
+        + b"\r\n\r\n"
+    )
+    chunks = [body[i : i + 7] for i in range(0, len(body), 7)]
+
+    assert list(iter_jpeg_frames(chunks)) == [first, second]
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    frame = _encode((60, 120), "JPEG")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.server.failures:
+            self.server.failures -= 1
+            self.send_error(503)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        self.end_headers()
+        try:
+            for _ in range(50):
+                self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n\r\n")
+                self.wfile.write(self.frame + b"\r\n")
+                self.wfile.flush()
+                if self.server.stopped.wait(0.02):
+                    return
+        except OSError:
+            pass
+
+
+@pytest.fixture
+def mjpeg_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MjpegHandler)
+    server.daemon_threads = True
+    server.stopped = threading.Event()
+    server.failures = 1  # Refuse the first connection
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.stopped.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.enable_socket
+def test_stream_keeps_latest_frame(mjpeg_url: str) -> None:
+    stream = MjpegStream(mjpeg_url, reconnect_delay=0.05)
+    assert stream.latest() is None
+
+    stream.start()
+    try:
+        frame = stream.wait_for_frame(timeout=5)
+        assert frame is not None
+        newer = stream.wait_for_frame(timeout=5, newer_than=frame.timestamp)
+    finally:
+        stream.stop()
+
+    assert newer is not None
+    assert newer.timestamp > frame.timestamp
+    shot = stream.latest().to_screenshot()
+    assert (shot.width, shot.height, shot.format) == (60, 120, "jpeg")
+    assert base64.b64decode(shot.base64_data) == _MjpegHandler.frame
+    assert stream.latest(max_age=0) is None
+
+
+@pytest.mark.enable_socket
+def test_reader_bugs_are_not_swallowed(
+    mjpeg_url: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    errors: list[type[BaseException]] = []
+    monkeypatch.setattr(
+        threading, "excepthook", lambda args: errors.append(args.exc_type)
+    )
+
+    def broken_jpeg_size(_data: bytes) -> None:
+        raise TypeError
+
+    monkeypatch.setattr(mjpeg, "jpeg_size", broken_jpeg_size)
+    stream = MjpegStream(mjpeg_url, reconnect_delay=0.05)
+    stream.start()
+    try:
+        stream._thread.join(5)
+        assert not stream.running
+    finally:
+        stream.stop()
+
+    assert errors == [TypeError]
@@ -0,0 +1,65 @@
+"""Unit tests for unchanged screen detection."""
+
+import pytest
+from PIL import Image, ImageDraw
+
+from deepagents_cli.middleware.autoglm import screen_change
+
+
+def _screen(label_y: int | None = None) -> Image.Image:
+    img = Image.new("RGB", (1080, 2400), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, 1080, 300), fill="navy")
+    if label_y is not None:
+        draw.rectangle((100, label_y, 980, label_y + 400), fill="black")
+    return img
+
+
+def test_identical_frames_have_identical_hashes() -> None:
+    assert screen_change.dhash(_screen(800)) == screen_change.dhash(_screen(800))
+
+
+def test_hash_ignores_small_compression_noise() -> None:
+    frame = _screen(800)
+    noisy = frame.copy()
+    noisy.putpixel((540, 1200), (250, 250, 250))
+
+    distance = screen_change.hamming_distance(
+        screen_change.dhash(frame), screen_change.dhash(noisy)
+    )
+    assert distance <= 2
+
+
+def test_changed_content_changes_the_hash() -> None:
+    distance = screen_change.hamming_distance(
+        screen_change.dhash(_screen(800)), screen_change.dhash(_screen(1600))
+    )
+    assert distance > 10
+
+
+def test_hash_size_sets_bit_length() -> None:
+    assert screen_change.dhash(_screen(800), hash_size=8).bit_length() <= 64
+
+
+def test_validate_policy() -> None:
+    assert screen_change.validate_policy("Repoll") == "repoll"
+    with pytest.raises(ValueError, match="Unsupported unchanged screen policy"):
+        screen_change.validate_policy("skip")
+
+
+def test_task_stats_to_dict() -> None:
+    stats = screen_change.TaskStats(steps=3, model_calls=2, model_calls_avoided=1)
+
+    assert stats.to_dict()["model_calls_avoided"] == 1
+    assert set(stats.to_dict()) == {
+        "steps",
+        "model_calls",
+        "unchanged_frames",
+        "repolls",
+        "text_only_turns",
+        "model_calls_avoided",
+        "cache_hits",
+        "cache_divergences",
+        "batched_actions",
+        "batch_aborts",
+    }
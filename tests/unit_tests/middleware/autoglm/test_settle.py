@@ -0,0 +1,84 @@
+"""Unit tests for adaptive settle detection."""
+
+import threading
+from collections.abc import Callable
+
+import numpy as np
+import pytest
+
+from deepagents_cli.middleware.autoglm import settle
+
+
+def _frames(*values: int) -> Callable[[], np.ndarray]:
+    frames = iter([np.full((8, 4), v, dtype=np.uint8) for v in values])
+    return lambda: next(frames)
+
+
+def test_returns_once_consecutive_frames_match() -> None:
+    result = settle.wait_until_stable(
+        _frames(0, 120, 200, 200, 255), min_wait=0, interval=0
+    )
+    assert result.settled
+    assert result.frames == 4
+
+
+def test_requires_configured_number_of_stable_frames() -> None:
+    result = settle.wait_until_stable(
+        _frames(0, 0, 50, 50, 50), min_wait=0, interval=0, stable_frames=2
+    )
+    assert result.settled
+    assert result.frames == 5
+
+
+def test_times_out_on_a_screen_that_keeps_changing() -> None:
+    counter = iter(range(10_000))
+    result = settle.wait_until_stable(
+        lambda: np.full((4, 4), next(counter) * 10 % 256, dtype=np.uint8),
+        timeout=0.2,
+        min_wait=0,
+        interval=0.01,
+    )
+    assert not result.settled
+    assert result.elapsed >= 0.2
+
+
+def test_capture_errors_end_the_wait() -> None:
+    def broken() -> np.ndarray:
+        raise RuntimeError
+
+    result = settle.wait_until_stable(broken, min_wait=0)
+    assert not result.settled
+    assert result.frames == 0
+
+
+def test_interrupt_aborts_the_wait() -> None:
+    interrupt = threading.Event()
+    interrupt.set()
+    result = settle.wait_until_stable(_frames(), min_wait=5, interrupt=interrupt)
+    assert not result.settled
+    assert result.elapsed < 1
+
+
+def test_frame_difference() -> None:
+    a = np.zeros((2, 2), dtype=np.uint8)
+    b = np.full((2, 2), 10, dtype=np.uint8)
+    assert settle.frame_difference(a, b) == 10
+    assert settle.frame_difference(b, a) == 10
+    assert settle.frame_difference(a, np.zeros((2, 3), dtype=np.uint8)) == float("inf")
+
+
+def test_page_changed_ignores_the_keyboard_area() -> None:
+    page = np.zeros((100, 10), dtype=np.uint8)
+    with_keyboard = page.copy()
+    with_keyboard[60:] = 255
+    next_page = np.full((100, 10), 200, dtype=np.uint8)
+
+    assert not settle.page_changed(page, with_keyboard)
+    assert settle.page_changed(page, next_page)
+    assert settle.page_changed(page, np.zeros((10, 100), dtype=np.uint8))
+
+
+def test_validate_strategy() -> None:
+    assert settle.validate_strategy("Adaptive") == "adaptive"
+    with pytest.raises(ValueError, match="Unsupported settle strategy"):
+        settle.validate_strategy("sometimes")
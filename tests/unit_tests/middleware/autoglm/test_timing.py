@@ -0,0 +1,72 @@
+"""Unit tests for stage timing spans."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from deepagents_cli.middleware.autoglm import timing
+
+
+def test_percentile_interpolates_between_ranks() -> None:
+    values = [4.0, 1.0, 3.0, 2.0]
+
+    assert timing.percentile(values, 50) == pytest.approx(2.5)
+    assert timing.percentile(values, 95) == pytest.approx(3.85)
+    assert timing.percentile([7.0], 95) == 7.0
+    assert timing.percentile([], 50) == 0.0
+
+
+def test_step_timer_adds_up_repeated_stages(tmp_path: Path) -> None:
+    sink = timing.JsonlSink(tmp_path / "spans.jsonl")
+    timer = timing.TaskTimer([sink])
+
+    first = timer.step(1)
+    first.record("capture", 0.25)
+    first.record("capture", 0.5)
+    first.record("model", 1.0)
+    with first.span("action", action="Tap"):
+        pass
+    timer.step(2).record("capture", 0.25)
+    sink.close()
+
+    assert first.durations["capture"] == 0.75
+    summary = timer.summary()
+    assert summary["capture"]["count"] == 2
+    assert summary["capture"]["total"] == 1.0
+    assert summary["model"]["p95"] == 1.0
+    records = [json.loads(line) for line in sink.path.read_text().splitlines()]
+    assert [r["stage"] for r in records] == [
+        "capture",
+        "capture",
+        "model",
+        "action",
+        "capture",
+    ]
+    assert records[3]["attributes"] == {"action": "Tap"}
+    assert {r["task_id"] for r in records} == {timer.task_id}
+    assert "capture" in timing.format_summary(summary)
+
+
+def test_failing_sink_does_not_stop_the_task(caplog: pytest.LogCaptureFixture) -> None:
+    calls = []
+
+    class BrokenSink:
+        def emit(self, _span: timing.Span) -> None:
+            calls.append(1)
+            raise OSError("disk full")
+
+        def close(self) -> None:
+            pass
+
+    memory = timing.MemorySink()
+    timer = timing.TaskTimer([BrokenSink(), memory])
+
+    with pytest.raises(KeyError), timer.step(1).span("parse"):
+        raise KeyError
+    timer.step(2).record("parse", 0.1)
+
+    assert len(memory.durations("parse")) == 2
+    assert len(calls) == 1
+    assert "BrokenSink failed" in caplog.text
+    assert "disk full" in caplog.text
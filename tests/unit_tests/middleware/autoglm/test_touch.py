@@ -0,0 +1,160 @@
+"""Unit tests for touch injection."""
+
+import socket
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from deepagents_cli.middleware.autoglm import adb_client, adb_controller, touch
+from deepagents_cli.middleware.autoglm.touch import TouchError, TouchInjector
+
+GETEVENT = """\
+add device 1: /dev/input/event1
+  name:     "touchpad"
+  events:
+    ABS (0003): ABS_MT_SLOT           : value 0, min 0, max 4, fuzz 0, flat 0
+                ABS_MT_POSITION_X     : value 0, min 0, max 99, fuzz 0, flat 0
+                ABS_MT_POSITION_Y     : value 0, min 0, max 99, fuzz 0, flat 0
+add device 2: /dev/input/event2
+  name:     "sec_touchscreen"
+  events:
+    KEY (0001): BTN_TOUCH
+    ABS (0003): ABS_MT_SLOT           : value 0, min 0, max 9, fuzz 0, flat 0
+                ABS_MT_POSITION_X     : value 0, min 0, max 1079, fuzz 0, flat 0
+                ABS_MT_POSITION_Y     : value 0, min 0, max 2399, fuzz 0, flat 0
+                ABS_MT_TRACKING_ID    : value 0, min 0, max 65535, fuzz 0, flat 0
+  input props:
+    INPUT_PROP_DIRECT
+"""
+
+
+class FakeShell:
+    """Persistent shell session answering the commands the injector runs."""
+
+    def __init__(self, getevent: str = GETEVENT, rotation: int = 0) -> None:
+        self.replies = {
+            "getevent": getevent,
+            "wm size": "Physical size: 1080x2400\n",
+            "dumpsys input": f"    SurfaceOrientation: {rotation}\n",
+        }
+        self.commands: list[str] = []
+
+    def run(
+        self, command: str, timeout: float | None = None
+    ) -> subprocess.CompletedProcess[str]:
+        self.commands.append(command)
+        for prefix, reply in self.replies.items():
+            if command.startswith(prefix):
+                return subprocess.CompletedProcess(command, 0, reply, "")
+        if command.startswith("e()"):
+            return subprocess.CompletedProcess(command, 0, "", "")
+        return subprocess.CompletedProcess(command, 1, "not found", "")
+
+
+def test_parse_getevent_prefers_the_touchscreen() -> None:
+    panel = touch.parse_getevent(GETEVENT)
+
+    assert panel == touch.TouchPanel(1079, 2399, 10, 0, "/dev/input/event2")
+    assert touch.parse_getevent("add device 1: /dev/input/event0\n") is None
+
+
+def test_parse_minitouch_header() -> None:
+    panel = touch.parse_minitouch_header("v 1\n^ 10 1079 2399 255\n$ 1234\n")
+
+    assert (panel.max_contacts, panel.max_x, panel.max_y) == (10, 1079, 2399)
+    with pytest.raises(TouchError):
+        touch.parse_minitouch_header("garbage")
+
+
+def test_stroke_commands_move_all_fingers_together() -> None:
+    commands = touch.stroke_commands([((0, 0), (100, 0)), ((0, 50), (0, 150))], 160)
+
+    assert commands[:3] == ["d 0 0 0 50", "d 1 0 50 50", "c"]
+    assert commands[-6:] == ["m 0 100 0 50", "m 1 0 150 50", "c", "u 0", "u 1", "c"]
+    assert touch.commands_duration(commands) == pytest.approx(0.16)
+
+
+def test_sendevent_script_for_a_tap() -> None:
+    panel = touch.TouchPanel(1079, 2399, path="/dev/input/event2")
+
+    script = touch.sendevent_script(touch.tap_commands(10, 20), panel)
+
+    prelude = "e() { sendevent /dev/input/event2 $1 $2 $3; }; "
+    assert script.startswith(prelude)
+    assert script.removeprefix(prelude).split("; ") == [
+        "e 3 47 0",
+        "e 3 57 1",
+        "e 1 330 1",
+        "e 3 53 10",
+        "e 3 54 20",
+        "e 0 0 0",
+        "sleep 0.02",
+        "e 3 47 0",
+        "e 3 57 -1",
+        "e 1 330 0",
+        "e 0 0 0",
+    ]
+
+
+def test_sendevent_injector_maps_rotated_screens() -> None:
+    shell = FakeShell(rotation=1)
+    injector = TouchInjector("emulator-5554", "sendevent", shell)
+    injector.set_screen_size(2400, 1080)
+
+    injector.tap(0, 0)
+    injector.tap(2400, 1080)
+
+    scripts = [c for c in shell.commands if c.startswith("e()")]
+    assert "e 3 53 1079; e 3 54 0" in scripts[0]
+    assert "e 3 53 0; e 3 54 2399" in scripts[1]
+    assert sum(c.startswith("getevent") for c in shell.commands) == 1
+
+
+def test_unavailable_injector_falls_back_to_input(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    class Client:
+        def open_stream(self, *_args: object) -> socket.socket:
+            raise adb_client.AdbError
+
+    monkeypatch.setattr(adb_client, "get_client", Client)
+    shell = FakeShell(getevent="")
+    injector = TouchInjector("emulator-5554", "auto", shell)
+
+    with patch.object(adb_controller, "_run_shell") as run:
+        adb_controller.tap(5, 6, "emulator-5554", delay=0, shell=shell, touch=injector)
+        adb_controller.tap(5, 6, "emulator-5554", delay=0, shell=shell, touch=injector)
+
+    assert run.call_count == 2
+    assert run.call_args.args[0] == ["input", "tap", "5", "6"]
+    assert "minitouch" in injector.error
+    assert "sendevent" in injector.error
+    # The backends are probed only once
+    assert sum(c.startswith("getevent") for c in shell.commands) == 1
+
+
+def test_minitouch_streams_gestures_over_one_socket(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    device, host = socket.socketpair()
+    device.sendall(b"v 1\n^ 10 1079 2399 255\n$ 1234\n")
+
+    class Client:
+        def open_stream(
+            self, _device_id: str, service: str, _timeout: float
+        ) -> socket.socket:
+            assert service == "localabstract:minitouch"
+            return host
+
+    monkeypatch.setattr(adb_client, "get_client", Client)
+    injector = TouchInjector("emulator-5554", "minitouch", FakeShell())
+    injector.set_screen_size(1080, 2400)
+
+    injector.double_tap(540, 1200)
+    injector.close()
+
+    received = device.recv(4096).decode().splitlines()
+    device.close()
+    tap = ["d 0 540 1200 50", "c", "w 20", "u 0", "c"]
+    assert received == [*tap, "w 80", *tap]
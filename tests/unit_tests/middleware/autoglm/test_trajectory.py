@@ -0,0 +1,171 @@
+"""Unit tests for trajectory recording and replay."""
+
+import base64
+import json
+from io import BytesIO
+from pathlib import Path
+from typing import Any
+
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage
+from PIL import Image, ImageDraw
+
+from deepagents_cli.middleware.autoglm.adb_controller import Screenshot
+from deepagents_cli.middleware.autoglm.trajectory import (
+    TrajectoryRecorder,
+    load_trajectory,
+    replay,
+)
+from deepagents_cli.middleware.autoglm_middleware import (
+    AutoGLMConfig,
+    AutoGLMMiddleware,
+)
+
+TAP = {"_metadata": "do", "action": "Tap", "element": [500, 500]}
+FINISH = {"_metadata": "finish", "message": "ok"}
+
+
+def _screenshot(stripes: bool = False) -> Screenshot:
+    img = Image.new("RGB", (100, 200), "white")
+    if stripes:
+        draw = ImageDraw.Draw(img)
+        for x in range(0, 100, 10):
+            draw.rectangle((x, 0, x + 4, 200), fill="black")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return Screenshot(
+        base64_data=base64.b64encode(buffer.getvalue()).decode(),
+        width=100,
+        height=200,
+        image=img,
+    )
+
+
+def _record(path: Path, steps: list[dict[str, Any]]) -> None:
+    recorder = TrajectoryRecorder(path, "check in", {"platform": "android"})
+    screenshot = _screenshot()
+    for number, fields in enumerate(steps, start=1):
+        recorder.record_step(
+            number,
+            frame=recorder.record_frame(screenshot),
+            width=screenshot.width,
+            height=screenshot.height,
+            **fields,
+        )
+    recorder.finish("success", "ok")
+    recorder.close()
+
+
+def test_recorder_stores_each_frame_once(tmp_path: Path) -> None:
+    path = tmp_path / "task.jsonl"
+    _record(
+        path,
+        [
+            {"action": TAP, "result": {"success": True}, "timings": {"model": 1.23456}},
+            {"action": FINISH, "response": 'finish(message="ok")'},
+        ],
+    )
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [r["type"] for r in records] == ["task", "frame", "step", "step", "end"]
+    assert records[2]["frame"] == records[3]["frame"] == records[1]["id"]
+    assert records[2]["timings"] == {"model": 1.2346}
+
+    recorded = load_trajectory(path)
+    assert recorded.task == "check in"
+    assert len(recorded.frames) == 1
+    assert recorded.steps[1].action == FINISH
+    assert recorded.end["status"] == "success"
+
+
+def test_truncated_recording_is_readable(tmp_path: Path) -> None:
+    path = tmp_path / "task.jsonl"
+    _record(path, [{"action": TAP, "result": {"success": True}}])
+    path.write_text(path.read_text() + '{"type": "step", "st')
+
+    recorded = load_trajectory(path)
+
+    assert len(recorded.steps) == 1
+
+
+def test_replay_runs_recorded_actions_until_finish(tmp_path: Path) -> None:
+    path = tmp_path / "task.jsonl"
+    _record(
+        path,
+        [
+            {"action": TAP, "result": {"success": True}},
+            {"action": None, "result": {"success": False, "message": "parse"}},
+            {"action": {**TAP, "element": [1, 1]}, "result": {"success": False}},
+            {"action": FINISH},
+        ],
+    )
+    executed = []
+    settled = []
+
+    result = replay(
+        load_trajectory(path),
+        lambda action, w, h: (
+            executed.append((action["element"], w, h)) or {"success": True}
+        ),
+        capture=_screenshot,
+        settle=settled.append,
+    )
+
+    assert result.completed
+    assert result.message == "ok"
+    assert executed == [([500, 500], 100, 200)]
+    assert settled == ["Tap"]
+
+
+def test_replay_stops_when_screen_differs(tmp_path: Path) -> None:
+    path = tmp_path / "task.jsonl"
+    _record(path, [{"action": TAP, "result": {"success": True}}, {"action": FINISH}])
+    executed = []
+
+    result = replay(
+        load_trajectory(path),
+        lambda *args: executed.append(args) or {"success": True},
+        capture=lambda: _screenshot(stripes=True),
+    )
+
+    assert not result.completed
+    assert result.diverged_at == 1
+    assert executed == []
+
+
+async def test_recorded_task_replays_without_model(tmp_path: Path) -> None:
+    model = FakeMessagesListChatModel(
+        responses=[
+            AIMessage(content='Tap\ndo(action="Tap", element=[500, 500])'),
+            AIMessage(content='Done\nfinish(message="ok")'),
+        ]
+    )
+    middleware = AutoGLMMiddleware(
+        AutoGLMConfig(vision_model=model, trajectory_dir=str(tmp_path))
+    )
+    taps = []
+
+    class Controller:
+        def take_screenshot(self) -> Screenshot:
+            return _screenshot()
+
+        def get_current_app(self) -> str:
+            return "Settings"
+
+        def tap(self, x: int, y: int) -> None:
+            taps.append((x, y))
+
+    middleware.controller = Controller()
+    middleware._settle_after_action = lambda _action: None
+
+    result = await middleware._execute_phone_task_async("tap it", "call-1")
+    path = Path(result.artifact["trajectory"])
+    replayed = middleware.replay_trajectory(path.name)
+
+    assert result.status == "success"
+    assert "phone_replay" in [t.name for t in middleware.tools]
+    recorded = load_trajectory(path)
+    assert recorded.steps[0].action["action"] == "Tap"
+    assert {"capture", "model", "action", "settle"} <= set(recorded.steps[0].timings)
+    assert replayed.completed
+    assert taps == [(50, 100), (50, 100)]
@@ -0,0 +1,187 @@
+"""Unit tests for the pooled WebDriverAgent client against a local HTTP server."""
+
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from deepagents_cli.middleware.autoglm import apps
+from deepagents_cli.middleware.autoglm.async_platform import AsyncIOSController
+from deepagents_cli.middleware.autoglm.ios import device as ios_device
+from deepagents_cli.middleware.autoglm.ios.wda_client import AsyncWDAClient, WDAClient
+from deepagents_cli.middleware.autoglm.platform import PlatformConfig
+
+# The fake WebDriverAgent listens on TCP, like the real one
+pytestmark = pytest.mark.enable_socket
+
+
+class FakeWDA(ThreadingHTTPServer):
+    """Minimal WebDriverAgent stand-in that records requests and connections."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.connections = 0
+        self.requests: list[tuple[str, str, object]] = []
+        self.sessions = ["s1", "s2"]
+        self.valid_session = "s1"
+        self.unavailable = 0  # Number of 503 responses to send first
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeWDA
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        self._handle(None)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        self._handle(body)
+
+    def _handle(self, body: object) -> None:
+        self.server.requests.append((self.command, self.path, body))
+        if self.server.unavailable:
+            self.server.unavailable -= 1
+            self._reply(503, {"value": "busy"})
+        elif self.path == "/session":
+            self.server.valid_session = self.server.sessions.pop(0)
+            self._reply(200, {"sessionId": self.server.valid_session})
+        elif self.path.startswith("/session/") and not self.path.startswith(
+            f"/session/{self.server.valid_session}/"
+        ):
+            self._reply(404, {"value": {"error": "invalid session id"}})
+        else:
+            self._reply(200, {"value": {"bundleId": "com.apple.Preferences"}})
+
+    def _reply(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def wda() -> Iterator[FakeWDA]:
+    server = FakeWDA()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_one_connection(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url)
+
+    for _ in range(5):
+        assert client.get("status").status_code == 200
+
+    assert wda.connections == 1
+
+
+def test_scoped_endpoints_use_cached_session(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url)
+
+    assert client.ensure_session() == "s1"
+    client.post("actions", json={"actions": []}, scoped=True)
+
+    assert wda.requests[-1] == ("POST", "/session/s1/actions", {"actions": []})
+    assert client.url("wda/homescreen", scoped=False) == f"{wda.url}/wda/homescreen"
+
+
+def test_expired_session_is_recreated_once(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url, session_id="stale")
+
+    response = client.post("actions", json={}, scoped=True)
+
+    assert response.status_code == 200
+    assert client.session_id == "s1"
+    assert [path for _, path, _ in wda.requests] == [
+        "/session/stale/actions",
+        "/session",
+        "/session/s1/actions",
+    ]
+
+
+def test_get_is_retried_on_gateway_errors(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url, backoff=0)
+    wda.unavailable = 2
+
+    assert client.get("status").status_code == 200
+    assert len(wda.requests) == 3
+
+
+def test_post_is_not_replayed(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url, backoff=0)
+    wda.unavailable = 1
+
+    assert client.post("wda/homescreen").status_code == 503
+    assert len(wda.requests) == 1
+
+
+def test_device_functions_accept_a_client(wda: FakeWDA) -> None:
+    client = WDAClient(wda.url, session_id="s1")
+
+    ios_device.tap(300, 600, client=client, delay=0)
+    app = ios_device.get_current_app(client=client)
+
+    assert wda.requests[0][1] == "/session/s1/actions"
+    assert wda.requests[0][2]["actions"][0]["actions"][0]["x"] == 100
+    assert app == apps.get_ios_app_name("com.apple.Preferences")
+    assert wda.connections == 1
+
+
+async def test_async_client_reuses_connection_and_retries_get(wda: FakeWDA) -> None:
+    client = AsyncWDAClient(wda.url, backoff=0)
+    wda.unavailable = 1
+
+    for _ in range(3):
+        assert (await client.get("status")).status_code == 200
+    await client.aclose()
+
+    assert len(wda.requests) == 4
+    assert wda.connections == 1
+
+
+async def test_async_client_recreates_expired_session(wda: FakeWDA) -> None:
+    client = AsyncWDAClient(wda.url, session_id="stale")
+
+    response = await client.post("actions", json={}, scoped=True)
+    await client.aclose()
+
+    assert response.status_code == 200
+    assert client.session_id == "s1"
+
+
+async def test_async_ios_controller_sends_wda_commands(wda: FakeWDA) -> None:
+    controller = AsyncIOSController(
+        PlatformConfig(
+            platform="ios", wda_url=wda.url, wda_session_id="s1", action_delay=0
+        )
+    )
+
+    await controller.tap(300, 600)
+    app = await controller.get_current_app()
+    await controller.aclose()
+
+    assert wda.requests[0][1] == "/session/s1/actions"
+    assert wda.requests[0][2] == ios_device.tap_actions(300, 600)
+    assert app == apps.get_ios_app_name("com.apple.Preferences")